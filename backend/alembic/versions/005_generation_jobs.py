@@ -0,0 +1,53 @@
+"""Durable очередь задач генерации: generation_jobs
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'generation_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('subject_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default=sa.text("'queued'")),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default=sa.text('3')),
+        sa.Column('run_after', sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text('now()')),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_until', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text('now()')),
+        sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_generation_jobs_subject_id', 'generation_jobs', ['subject_id'])
+    op.create_index(
+        'ix_generation_jobs_claim',
+        'generation_jobs',
+        ['status', 'priority', 'run_after'],
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_generation_jobs_claim', table_name='generation_jobs')
+    op.drop_index('ix_generation_jobs_subject_id', table_name='generation_jobs')
+    op.drop_table('generation_jobs')
@@ -0,0 +1,29 @@
+"""Add (created_at, id) index for keyset pagination of personalized_tracks
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Список треков: ORDER BY created_at DESC, id DESC + курсор (created_at, id) < (...)
+    op.create_index(
+        'ix_personalized_tracks_created_at_id',
+        'personalized_tracks',
+        ['created_at', 'id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_personalized_tracks_created_at_id', table_name='personalized_tracks')
@@ -5,16 +5,18 @@ Health check endpoint для Backend сервиса.
 - Статус самого сервиса
 - Доступность PostgreSQL БД
 - Доступность ML сервиса
+
+GET /api/health/ml-client — метрики пула соединений с ML сервисом.
+GET /api/health/db-pool — насыщение пулов соединений с БД.
 """
 
-import httpx
 from fastapi import APIRouter, Depends, status
 from pydantic import BaseModel
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.src.core.config import settings
-from backend.src.core.database import get_db
+from backend.src.core.database import get_db, get_pool_stats
+from backend.src.services.ml_client import get_ml_client
 
 router = APIRouter(prefix="/api/health", tags=["health"])
 
@@ -54,9 +56,8 @@ async def health_check(db: AsyncSession = Depends(get_db)) -> HealthResponse:
     # Проверка ML сервиса
     ml_service_available = False
     try:
-        async with httpx.AsyncClient(timeout=5.0, follow_redirects=True) as client:
-            response = await client.get(f"{settings.ML_SERVICE_URL}/health")
-            ml_service_available = response.status_code == 200
+        response = await get_ml_client().get("/health", follow_redirects=True)
+        ml_service_available = response.status_code == 200
     except Exception:
         ml_service_available = False
 
@@ -66,3 +67,27 @@ async def health_check(db: AsyncSession = Depends(get_db)) -> HealthResponse:
         database_available=database_available,
         ml_service_available=ml_service_available,
     )
+
+
+@router.get("/ml-client")
+async def ml_client_metrics() -> dict:
+    """
+    Метрики общего клиента ML-сервиса этого процесса.
+
+    Returns:
+        dict: запросы, ошибки, новые / переиспользованные соединения,
+        латентность по endpoint'ам
+    """
+    return get_ml_client().get_stats()
+
+
+@router.get("/db-pool")
+async def db_pool_metrics() -> dict:
+    """
+    Насыщение пулов соединений с БД этого процесса.
+
+    Returns:
+        dict: api / background → занятые и свободные соединения, overflow,
+        saturation, пик занятых с запуска
+    """
+    return get_pool_stats()
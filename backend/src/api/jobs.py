@@ -0,0 +1,29 @@
+"""
+Роутер очереди задач генерации.
+
+Endpoints:
+- GET /api/jobs/metrics - глубина очереди, латентность, счётчики воркеров
+"""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.src.core.database import get_db
+from backend.src.services.job_queue import get_queue_metrics
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/metrics")
+async def queue_metrics(db: AsyncSession = Depends(get_db)) -> dict:
+    """
+    Метрики очереди generation_jobs.
+
+    Args:
+        db: Сессия базы данных
+
+    Returns:
+        dict: depth по статусам, ready, oldest_ready_age_sec,
+        avg_wait_sec / avg_run_sec за час и счётчики пула этого процесса
+    """
+    return await get_queue_metrics(db)
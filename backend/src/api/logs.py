@@ -3,20 +3,34 @@
 
 Endpoints:
 - POST /api/logs/step - сохранение лога шага от ML сервиса
+- POST /api/logs/steps:bulk - пакетное сохранение логов шагов
 - GET /api/logs/track/{track_id} - все логи трека
 - GET /api/logs/track/{track_id}/step/{step_name} - лог конкретного шага
 """
 
+import json
+import logging
 import uuid
+from datetime import datetime, timedelta, timezone
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.src.core.config import settings
 from backend.src.core.database import get_db
 from backend.src.models.generation_log import GenerationLog
+from backend.src.models.personalized_track import PersonalizedTrack
+from backend.src.services.event_bus import (
+    publish_event,
+    publish_events,
+    step_summary,
+    track_topic,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/logs", tags=["logs"])
 
@@ -47,6 +61,142 @@ class StepLogResponse(BaseModel):
         from_attributes = True
 
 
+class BulkStepLogResponse(BaseModel):
+    """Ответ пакетного сохранения — только id созданных логов."""
+
+    ids: List[uuid.UUID]
+    # Треки, удалённые до записи: их логи пропущены, а не валят всю пачку по FK
+    skipped_track_ids: List[uuid.UUID] = []
+
+
+_STEP_LOG_LIST = TypeAdapter(List[StepLogRequest])
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+# Порядок колонок для COPY
+COPY_COLUMNS = (
+    "id",
+    "track_id",
+    "step_name",
+    "step_output",
+    "llm_calls",
+    "step_duration_sec",
+    "error_message",
+    "created_at",
+)
+
+
+def _step_completed_event(log_request: StepLogRequest) -> tuple[str, str, dict] | None:
+    """Событие step_completed для шины прогресса (только для успешных шагов)."""
+    if log_request.error_message is not None:
+        return None
+    return track_topic(log_request.track_id), "step_completed", {
+        "step_name": log_request.step_name,
+        "duration_sec": log_request.step_duration_sec,
+        "tokens_used": sum(call.get("tokens_used", 0) for call in log_request.llm_calls),
+        "summary": step_summary(log_request.step_name, log_request.step_output),
+    }
+
+
+def _errors(e: ValidationError) -> list:
+    # Без input: не возвращать клиенту мегабайты step_output
+    return e.errors(include_url=False, include_context=False, include_input=False)
+
+
+def _parse_bulk_body(body: bytes, content_type: str) -> list[StepLogRequest]:
+    """
+    Разбирает тело bulk-запроса: JSON-массив или NDJSON (по строке на лог).
+
+    Raises:
+        HTTPException 422: Невалидный JSON или лог (с номером записи)
+    """
+    if content_type.split(";", 1)[0].strip() in NDJSON_CONTENT_TYPES:
+        items = []
+        for line_no, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(StepLogRequest.model_validate_json(line))
+            except ValidationError as e:
+                raise HTTPException(
+                    status_code=422,
+                    detail={
+                        "line": line_no,
+                        "errors": _errors(e),
+                    },
+                )
+        return items
+
+    try:
+        return _STEP_LOG_LIST.validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=_errors(e),
+        )
+
+
+def _step_log_rows(log_requests: list[StepLogRequest]) -> list[dict]:
+    """Строки generation_logs с id и created_at, назначенными на стороне приложения."""
+    # created_at растёт внутри пачки — логи трека читаются с order_by(created_at).
+    # Naive UTC, как default модели (GenerationLog.created_at)
+    base = datetime.utcnow()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "track_id": log_request.track_id,
+            "step_name": log_request.step_name,
+            "step_output": log_request.step_output,
+            "llm_calls": log_request.llm_calls,
+            "step_duration_sec": log_request.step_duration_sec,
+            "error_message": log_request.error_message,
+            "created_at": base + timedelta(microseconds=index),
+        }
+        for index, log_request in enumerate(log_requests)
+    ]
+
+
+async def _existing_track_ids(db: AsyncSession, track_ids: set[uuid.UUID]) -> set[uuid.UUID]:
+    """
+    Треки из пачки, которые ещё существуют.
+
+    FOR KEY SHARE держит их до коммита: удаление трека не проскочит между
+    проверкой и INSERT/COPY и не уронит пачку на FK.
+    """
+    result = await db.execute(
+        select(PersonalizedTrack.id)
+        .where(PersonalizedTrack.id.in_(track_ids))
+        .with_for_update(key_share=True)
+    )
+    return set(result.scalars().all())
+
+
+async def _copy_step_logs(db: AsyncSession, rows: list[dict]) -> None:
+    """COPY строк в generation_logs через asyncpg в транзакции сессии."""
+    conn = await db.connection()
+    # asyncpg-адаптер SQLAlchemy открывает транзакцию лениво, на первом запросе —
+    # без него COPY закоммитился бы отдельно от остальной записи
+    await conn.exec_driver_sql("SELECT 1")
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        GenerationLog.__tablename__,
+        columns=list(COPY_COLUMNS),
+        records=[
+            (
+                row["id"],
+                row["track_id"],
+                row["step_name"],
+                json.dumps(row["step_output"], ensure_ascii=False),
+                json.dumps(row["llm_calls"], ensure_ascii=False),
+                row["step_duration_sec"],
+                row["error_message"],
+                row["created_at"].replace(tzinfo=timezone.utc),
+            )
+            for row in rows
+        ],
+    )
+
+
 @router.post("/step", response_model=StepLogResponse, status_code=status.HTTP_201_CREATED)
 async def create_step_log(
     log_request: StepLogRequest,
@@ -74,12 +224,83 @@ async def create_step_log(
     )
 
     db.add(log)
+    event = _step_completed_event(log_request)
+    if event is not None:
+        await publish_event(db, *event)
     await db.commit()
     await db.refresh(log)
 
     return StepLogResponse.model_validate(log)
 
 
+@router.post(
+    "/steps:bulk",
+    response_model=BulkStepLogResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_step_logs_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+) -> BulkStepLogResponse:
+    """
+    Сохраняет пачку логов шагов одной транзакцией.
+
+    Вызывается фоновым sink'ом StepLogger ML сервиса. Тело — JSON-массив
+    StepLogRequest или NDJSON (Content-Type: application/x-ndjson).
+    До STEP_LOG_COPY_THRESHOLD логов — один multi-row INSERT, больше — COPY.
+    События step_completed публикуются одним запросом. Логи треков, удалённых
+    до записи, пропускаются — их track_id возвращаются в skipped_track_ids.
+
+    Args:
+        request: Запрос с логами шагов (в порядке выполнения)
+        db: Сессия базы данных
+
+    Returns:
+        BulkStepLogResponse: id сохранённых логов в порядке запроса и пропущенные треки
+
+    Raises:
+        HTTPException 413: Больше STEP_LOG_BULK_MAX логов
+        HTTPException 422: Невалидное тело
+    """
+    log_requests = _parse_bulk_body(
+        await request.body(), request.headers.get("content-type", "application/json")
+    )
+    if len(log_requests) > settings.STEP_LOG_BULK_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many step logs: {len(log_requests)} > {settings.STEP_LOG_BULK_MAX}",
+        )
+    if not log_requests:
+        return BulkStepLogResponse(ids=[])
+
+    track_ids = {log_request.track_id for log_request in log_requests}
+    existing = await _existing_track_ids(db, track_ids)
+    skipped = track_ids - existing
+    if skipped:
+        log_requests = [item for item in log_requests if item.track_id in existing]
+        logger.warning(
+            f"Skipping step logs for {len(skipped)} deleted track(s): "
+            f"{', '.join(sorted(map(str, skipped)))}"
+        )
+    if not log_requests:
+        return BulkStepLogResponse(ids=[], skipped_track_ids=sorted(skipped))
+
+    rows = _step_log_rows(log_requests)
+    if len(rows) >= settings.STEP_LOG_COPY_THRESHOLD:
+        await _copy_step_logs(db, rows)
+    else:
+        await db.execute(insert(GenerationLog).values(rows))
+
+    events = [event for event in map(_step_completed_event, log_requests) if event is not None]
+    await publish_events(db, events)
+    await db.commit()
+
+    return BulkStepLogResponse(
+        ids=[row["id"] for row in rows],
+        skipped_track_ids=sorted(skipped),
+    )
+
+
 @router.get("/track/{track_id}", response_model=List[StepLogResponse])
 async def get_track_logs(
     track_id: uuid.UUID,
@@ -343,13 +343,11 @@ async def rollback_prompt(
 @router.get("/processors", response_model=list[ProcessorInfo])
 async def list_available_processors() -> list[ProcessorInfo]:
     """Доступные процессоры (из ML-сервиса)."""
-    import httpx
-    from backend.src.core.config import settings
+    from backend.src.services.ml_client import get_ml_client
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(f"{settings.ML_SERVICE_URL}/manual/processors")
-        resp.raise_for_status()
-        data = resp.json()
+    resp = await get_ml_client().get("/manual/processors")
+    resp.raise_for_status()
+    data = resp.json()
 
     return [ProcessorInfo(**p) for p in data.get("processors", [])]
 
@@ -5,10 +5,11 @@ Endpoints:
 - POST /api/tracks/generate - запуск генерации трека (202)
 - POST /api/tracks/generate-batch - batch-генерация N треков (202)
 - POST /api/tracks/{id}/cancel - остановка генерации
-- GET /api/tracks/{id} - получение трека по ID
-- GET /api/tracks/{id}/progress - SSE прогресс генерации (polling generation_logs)
+- POST /api/tracks/{id}/retry - повтор с первого невыполненного / указанного шага (202)
+- GET /api/tracks/{id} - получение трека по ID (?fields= — только нужные части)
+- GET /api/tracks/{id}/progress - SSE прогресс генерации (push из шины событий)
 - GET /api/tracks/batch/{batch_id}/progress - SSE прогресс batch-генерации
-- GET /api/tracks - список треков с фильтрами
+- GET /api/tracks - список треков с фильтрами (offset или keyset cursor)
 """
 
 import asyncio
@@ -16,11 +17,13 @@ import json
 import uuid
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.src.core.config import settings
 from backend.src.core.database import AsyncSessionLocal, get_db
 from backend.src.models.generation_log import GenerationLog
 from backend.src.models.personalized_track import PersonalizedTrack
@@ -30,10 +33,13 @@ from backend.src.schemas.track import (
     GenerateBatchRequest,
     GenerationStartedResponse,
     BatchGenerationStartedResponse,
+    RetryTrackRequest,
     TrackDetail,
     TrackListResponse,
 )
 from backend.src.services import field_usage_service, track_service
+from backend.src.services.event_bus import get_event_bus, step_summary as _step_summary, track_topic
+from backend.src.services.manual_service import STEP_DEPENDENCIES
 
 router = APIRouter(prefix="/api/tracks", tags=["tracks"])
 
@@ -64,53 +70,10 @@ STEP_SHORT_NAMES = {
 ALL_STEPS = list(STEP_SHORT_NAMES.keys())
 
 
-def _step_summary(step_name: str, step_output: dict) -> dict:
-    """Извлечь ключевые метрики из step_output для SSE summary."""
-    short = STEP_SHORT_NAMES.get(step_name, step_name)
-    if short == "B1":
-        return {
-            "effective_level": step_output.get("effective_level"),
-            "estimated_weeks": step_output.get("estimated_weeks"),
-        }
-    elif short == "B2":
-        comps = step_output.get("competencies", [])
-        return {"competencies_count": len(comps)}
-    elif short == "B3":
-        return {
-            "knowledge_count": len(step_output.get("knowledge_items", [])),
-            "skills_count": len(step_output.get("skill_items", [])),
-            "habits_count": len(step_output.get("habit_items", [])),
-        }
-    elif short == "B4":
-        return {
-            "units_count": len(step_output.get("units", [])),
-            "clusters_count": len(step_output.get("clusters", [])),
-        }
-    elif short == "B5":
-        return {
-            "total_weeks": step_output.get("total_weeks"),
-            "levels": len(step_output.get("levels", [])),
-        }
-    elif short == "B6":
-        return {
-            "blueprints_count": len(step_output.get("blueprints", step_output.get("lesson_blueprints", []))),
-        }
-    elif short == "B7":
-        return {
-            "weeks": step_output.get("total_weeks", step_output.get("weeks")),
-            "checkpoints": len(step_output.get("checkpoints", [])),
-        }
-    elif short == "B8":
-        return {
-            "overall_valid": step_output.get("overall_valid"),
-            "checks": len(step_output.get("checks", step_output.get("validation_checks", []))),
-        }
-    return {}
-
-
-def _make_sse(event: str, data: dict) -> str:
-    """Форматировать SSE event."""
-    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+def _make_sse(event: str, data: dict, event_id: str | None = None) -> str:
+    """Форматировать SSE event (с id — для Last-Event-ID при переподключении)."""
+    id_line = f"id: {event_id}\n" if event_id else ""
+    return f"event: {event}\n{id_line}data: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 @router.post("/generate", response_model=GenerationStartedResponse, status_code=status.HTTP_202_ACCEPTED)
@@ -173,283 +136,381 @@ async def cancel_track(
         )
 
 
+@router.post("/{track_id}/retry", response_model=GenerationStartedResponse, status_code=status.HTTP_202_ACCEPTED)
+async def retry_track(
+    track_id: uuid.UUID,
+    request: RetryTrackRequest | None = None,
+    db: AsyncSession = Depends(get_db),
+) -> GenerationStartedResponse:
+    """Повторяет генерацию, переиспользуя выполненные шаги. Возвращает 202 сразу."""
+    try:
+        return await track_service.retry_track(
+            track_id, db, from_step=request.from_step if request else None
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+_TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def _running_steps(completed: set[str]) -> list[str]:
+    """Шаги, все зависимости которых выполнены (B5 и B6 идут одновременно)."""
+    return [
+        step for step in ALL_STEPS
+        if step not in completed and all(dep in completed for dep in STEP_DEPENDENCIES[step])
+    ]
+
+
+class _TrackProgress:
+    """
+    Состояние прогресса одного трека для SSE.
+
+    Превращает snapshot из БД и события шины в SSE-события фронтенда
+    (step_update / complete / error / cancelled), не дублируя уже отправленное.
+    В batch-режиме отдаёт только завершённые шаги с track_id и batch_index.
+    """
+
+    def __init__(self, track_id: uuid.UUID, batch_index: int | None = None):
+        self.track_id = track_id
+        self.batch_index = batch_index
+        self.completed: set[str] = set()
+        self.sent_running: set[str] = set()
+        self.status: str | None = None
+        self.duration_sec: float | None = None
+        self.finished = False
+
+    @property
+    def is_batch(self) -> bool:
+        return self.batch_index is not None
+
+    def apply_snapshot(self, snapshot: dict, event_id: str | None) -> list[str]:
+        """Состояние из БД: трек (status, ...) + его логи."""
+        out: list[str] = []
+        for log in snapshot["logs"]:
+            out += self._step_completed(log, event_id)
+        out += self._status(
+            snapshot["status"],
+            snapshot.get("error_message"),
+            snapshot.get("duration_sec"),
+            snapshot.get("total_tokens"),
+            event_id,
+        )
+        return out
+
+    def apply(self, event: dict) -> list[str]:
+        """Событие шины."""
+        data = event["data"]
+        if event["type"] == "step_completed":
+            out = self._step_completed(data, event["id"])
+            if self.status not in _TERMINAL_STATUSES:
+                out += self._running(event["id"])
+            return out
+        if event["type"] == "track_status":
+            return self._status(
+                data["status"],
+                data.get("error_message"),
+                data.get("duration_sec"),
+                data.get("total_tokens"),
+                event["id"],
+            )
+        return []
+
+    def _step_completed(self, log: dict, event_id: str | None) -> list[str]:
+        step_name = log["step_name"]
+        if step_name in self.completed:
+            return []
+        self.completed.add(step_name)
+        self.sent_running.discard(step_name)
+        data = {
+            "step": STEP_SHORT_NAMES.get(step_name, step_name),
+            "status": "completed",
+            "description": STEP_DESCRIPTIONS.get(step_name, step_name),
+            "duration_sec": log.get("duration_sec"),
+            "tokens_used": log.get("tokens_used", 0),
+            "summary": log.get("summary", {}),
+        }
+        if self.is_batch:
+            data = {"track_id": str(self.track_id), "batch_index": self.batch_index, **data}
+        return [_make_sse("step_update", data, event_id)]
+
+    def _running(self, event_id: str | None) -> list[str]:
+        if self.is_batch:
+            return []
+        out = []
+        for step_name in _running_steps(self.completed):
+            if step_name not in self.sent_running:
+                self.sent_running.add(step_name)
+                out.append(_make_sse("step_update", {
+                    "step": STEP_SHORT_NAMES.get(step_name, step_name),
+                    "status": "running",
+                    "description": STEP_DESCRIPTIONS.get(step_name, step_name),
+                }, event_id))
+        return out
+
+    def _status(
+        self,
+        status_: str,
+        error_message: str | None,
+        duration_sec: float | None,
+        total_tokens: int | None,
+        event_id: str | None,
+    ) -> list[str]:
+        self.status = status_
+        self.duration_sec = duration_sec
+        if status_ not in _TERMINAL_STATUSES:
+            return self._running(event_id)
+
+        self.finished = True
+        if self.is_batch:
+            return []
+        if status_ == "completed":
+            return [_make_sse("complete", {
+                "total_duration_sec": duration_sec,
+                "total_tokens": total_tokens or 0,
+            }, event_id)]
+        if status_ == "cancelled":
+            completed_steps = [STEP_SHORT_NAMES[s] for s in ALL_STEPS if s in self.completed]
+            return [_make_sse("cancelled", {
+                "completed_steps": completed_steps,
+                "last_step": completed_steps[-1] if completed_steps else None,
+            }, event_id)]
+        failed_step = next((s for s in ALL_STEPS if s not in self.completed), None)
+        return [_make_sse("error", {
+            "error": error_message or "Generation failed",
+            "failed_step": STEP_SHORT_NAMES.get(failed_step) if failed_step else None,
+        }, event_id)]
+
+
+async def _load_progress_snapshots(
+    track_filter,
+) -> list[dict]:
+    """
+    Один раз читает треки и их логи для начального состояния SSE
+    (и при resync). Порядок — по batch_index.
+    """
+    async with AsyncSessionLocal() as db:
+        track_result = await db.execute(
+            select(
+                PersonalizedTrack.id,
+                PersonalizedTrack.status,
+                PersonalizedTrack.error_message,
+                PersonalizedTrack.generation_duration_sec,
+                PersonalizedTrack.generation_metadata,
+                PersonalizedTrack.batch_index,
+            )
+            .where(track_filter)
+            .order_by(PersonalizedTrack.batch_index)
+        )
+        tracks = track_result.all()
+        if not tracks:
+            return []
+
+        log_result = await db.execute(
+            select(
+                GenerationLog.track_id,
+                GenerationLog.step_name,
+                GenerationLog.step_duration_sec,
+                GenerationLog.llm_calls,
+                GenerationLog.step_output,
+            )
+            .where(
+                GenerationLog.track_id.in_([t.id for t in tracks]),
+                GenerationLog.error_message.is_(None),
+            )
+            .order_by(GenerationLog.created_at)
+        )
+        logs = log_result.all()
+
+    snapshots = []
+    for t in tracks:
+        snapshots.append({
+            "track_id": t.id,
+            "status": t.status,
+            "error_message": t.error_message,
+            "duration_sec": t.generation_duration_sec,
+            "total_tokens": (t.generation_metadata or {}).get("total_tokens", 0),
+            "batch_index": t.batch_index,
+            "logs": [
+                {
+                    "step_name": log.step_name,
+                    "duration_sec": log.step_duration_sec,
+                    "tokens_used": sum(c.get("tokens_used", 0) for c in (log.llm_calls or [])),
+                    "summary": _step_summary(log.step_name, log.step_output or {}),
+                }
+                for log in logs if log.track_id == t.id
+            ],
+        })
+    return snapshots
+
+
 @router.get("/{track_id}/progress")
 async def get_track_progress(
     track_id: uuid.UUID,
+    last_event_id: Optional[str] = Header(None),
 ):
     """
     SSE endpoint для real-time прогресса генерации.
-    Поллит generation_logs и статус трека каждые 2 секунды.
+
+    События приходят из шины (LISTEN/NOTIFY) без поллинга БД: состояние
+    читается один раз при подключении. При переподключении с Last-Event-ID
+    пропущенные события отдаются из буфера шины.
     Использует собственные сессии (не DI), т.к. генератор живёт дольше запроса.
     """
     async def event_generator():
-        last_seen_step_names: set[str] = set()
-        sent_running: set[str] = set()
-        timeout_seconds = 600  # 10 минут
-        elapsed = 0.0
-        poll_interval = 2.0
-
-        # Сначала отправить текущий статус
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(
-                select(PersonalizedTrack).where(PersonalizedTrack.id == track_id)
-            )
-            track = result.scalar_one_or_none()
-
-        if not track:
-            yield _make_sse("error", {"error": "Track not found"})
-            return
-
-        # Если трек уже завершён — отдать финальный статус сразу
-        if track.status in ("completed", "failed", "cancelled"):
-            if track.status == "completed":
-                yield _make_sse("complete", {
-                    "total_duration_sec": track.generation_duration_sec,
-                    "total_tokens": track.generation_metadata.get("total_tokens", 0) if track.generation_metadata else 0,
-                })
-            elif track.status == "cancelled":
-                async with AsyncSessionLocal() as db:
-                    log_result = await db.execute(
-                        select(GenerationLog)
-                        .where(GenerationLog.track_id == track_id)
-                        .order_by(GenerationLog.created_at)
-                    )
-                    logs = log_result.scalars().all()
-                completed_steps = [STEP_SHORT_NAMES.get(l.step_name, l.step_name) for l in logs]
-                yield _make_sse("cancelled", {
-                    "completed_steps": completed_steps,
-                    "last_step": completed_steps[-1] if completed_steps else None,
-                })
+        bus = get_event_bus()
+        topics = [track_topic(track_id)]
+        progress = _TrackProgress(track_id)
+
+        async with bus.subscribe(topics) as sub:
+            replayed = bus.replay(topics, last_event_id) if last_event_id else None
+            if replayed is not None:
+                for event in replayed:
+                    for chunk in progress.apply(event):
+                        yield chunk
             else:
-                yield _make_sse("error", {
-                    "error": track.error_message or "Generation failed",
-                    "failed_step": None,
-                })
-            return
-
-        while elapsed < timeout_seconds:
-            async with AsyncSessionLocal() as db:
-                # Получить новые логи
-                result = await db.execute(
-                    select(GenerationLog)
-                    .where(GenerationLog.track_id == track_id)
-                    .order_by(GenerationLog.created_at)
-                )
-                logs = result.scalars().all()
-
-                completed_step_names = {log.step_name for log in logs}
-
-                # Отправить step_update для новых завершённых шагов
-                for log in logs:
-                    if log.step_name not in last_seen_step_names:
-                        last_seen_step_names.add(log.step_name)
-                        short = STEP_SHORT_NAMES.get(log.step_name, log.step_name)
-
-                        tokens_used = 0
-                        if log.llm_calls:
-                            for call in log.llm_calls:
-                                tokens_used += call.get("tokens_used", 0)
-
-                        summary = _step_summary(log.step_name, log.step_output or {})
-
-                        yield _make_sse("step_update", {
-                            "step": short,
-                            "status": "completed",
-                            "description": STEP_DESCRIPTIONS.get(log.step_name, log.step_name),
-                            "duration_sec": log.step_duration_sec,
-                            "tokens_used": tokens_used,
-                            "summary": summary,
-                        })
-
-                # Определить следующий шаг (running) — только один одновременно
-                next_running = None
-                for step_name in ALL_STEPS:
-                    if step_name not in completed_step_names:
-                        next_running = step_name
-                        break
-
-                if next_running and next_running not in sent_running:
-                    # Сначала сбросить предыдущий running (если был и теперь завершён)
-                    sent_running = {next_running}
-                    short = STEP_SHORT_NAMES.get(next_running, next_running)
-                    yield _make_sse("step_update", {
-                        "step": short,
-                        "status": "running",
-                        "description": STEP_DESCRIPTIONS.get(next_running, next_running),
-                    })
-
-                # Проверить статус трека
-                track_result = await db.execute(
-                    select(PersonalizedTrack.status, PersonalizedTrack.error_message,
-                           PersonalizedTrack.generation_duration_sec, PersonalizedTrack.generation_metadata)
-                    .where(PersonalizedTrack.id == track_id)
-                )
-                row = track_result.one_or_none()
-
-            if not row:
-                yield _make_sse("error", {"error": "Track not found"})
-                return
-
-            track_status, error_msg, duration, metadata = row
-
-            if track_status == "completed":
-                total_tokens = 0
-                if metadata:
-                    total_tokens = metadata.get("total_tokens", 0)
-                yield _make_sse("complete", {
-                    "total_duration_sec": duration,
-                    "total_tokens": total_tokens,
-                })
-                return
-
-            if track_status == "failed":
-                failed_step = None
-                for step_name in ALL_STEPS:
-                    if step_name not in completed_step_names:
-                        failed_step = STEP_SHORT_NAMES.get(step_name, step_name)
-                        break
-                yield _make_sse("error", {
-                    "error": error_msg or "Generation failed",
-                    "failed_step": failed_step,
-                })
-                return
-
-            if track_status == "cancelled":
-                completed_steps = [
-                    STEP_SHORT_NAMES.get(s, s) for s in ALL_STEPS if s in completed_step_names
-                ]
-                yield _make_sse("cancelled", {
-                    "completed_steps": completed_steps,
-                    "last_step": completed_steps[-1] if completed_steps else None,
-                })
-                return
-
-            await asyncio.sleep(poll_interval)
-            elapsed += poll_interval
-
-        # Timeout
-        yield _make_sse("error", {"error": "Progress polling timeout"})
+                snapshots = await _load_progress_snapshots(PersonalizedTrack.id == track_id)
+                if not snapshots:
+                    yield _make_sse("error", {"error": "Track not found"})
+                    return
+                for chunk in progress.apply_snapshot(snapshots[0], bus.last_event_id(topics)):
+                    yield chunk
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.SSE_MAX_DURATION_SEC
+            while not progress.finished:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    yield _make_sse("error", {"error": "Progress stream timeout"})
+                    return
+                event = await sub.get(min(settings.SSE_KEEPALIVE_SEC, remaining))
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif event["type"] == "resync":
+                    snapshots = await _load_progress_snapshots(PersonalizedTrack.id == track_id)
+                    if snapshots:
+                        for chunk in progress.apply_snapshot(snapshots[0], bus.last_event_id(topics)):
+                            yield chunk
+                else:
+                    for chunk in progress.apply(event):
+                        yield chunk
 
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        headers=_SSE_HEADERS,
     )
 
 
 @router.get("/batch/{batch_id}/progress")
 async def get_batch_progress(
     batch_id: uuid.UUID,
+    last_event_id: Optional[str] = Header(None),
 ):
     """SSE endpoint для прогресса batch-генерации.
+
+    Подписывается на события всех треков batch; batch_complete — когда
+    все треки в терминальном статусе.
     Использует собственные сессии (не DI), т.к. генератор живёт дольше запроса.
     """
     async def event_generator():
-        timeout_seconds = 600
-        elapsed = 0.0
-        poll_interval = 2.0
-        last_seen: dict[str, set[str]] = {}  # track_id_str → set of step_names
-
-        # Получить все треки batch
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(
-                select(PersonalizedTrack)
-                .where(PersonalizedTrack.batch_id == batch_id)
-                .order_by(PersonalizedTrack.batch_index)
-            )
-            tracks = result.scalars().all()
+        bus = get_event_bus()
+        batch_filter = PersonalizedTrack.batch_id == batch_id
 
-        if not tracks:
+        # Состав batch нужен до подписки — читаем снимок сразу
+        snapshots = await _load_progress_snapshots(batch_filter)
+        if not snapshots:
             yield _make_sse("error", {"error": "Batch not found"})
             return
 
-        track_ids = [t.id for t in tracks]
-        track_id_strs = [str(t.id) for t in tracks]
-        for tid_str in track_id_strs:
-            last_seen[tid_str] = set()
-
-        while elapsed < timeout_seconds:
-            async with AsyncSessionLocal() as db:
-                # Получить логи для всех треков batch
-                log_result = await db.execute(
-                    select(GenerationLog)
-                    .where(GenerationLog.track_id.in_(track_ids))
-                    .order_by(GenerationLog.created_at)
-                )
-                logs = log_result.scalars().all()
-
-                # Отправить новые события
-                for log in logs:
-                    tid_str = str(log.track_id)
-                    if log.step_name not in last_seen.get(tid_str, set()):
-                        last_seen.setdefault(tid_str, set()).add(log.step_name)
-                        short = STEP_SHORT_NAMES.get(log.step_name, log.step_name)
-                        tokens_used = 0
-                        if log.llm_calls:
-                            for call in log.llm_calls:
-                                tokens_used += call.get("tokens_used", 0)
-
-                        yield _make_sse("step_update", {
-                            "track_id": tid_str,
-                            "batch_index": track_id_strs.index(tid_str),
-                            "step": short,
-                            "status": "completed",
-                            "description": STEP_DESCRIPTIONS.get(log.step_name, log.step_name),
-                            "duration_sec": log.step_duration_sec,
-                            "tokens_used": tokens_used,
-                            "summary": _step_summary(log.step_name, log.step_output or {}),
-                        })
-
-                # Проверить статусы всех треков
-                track_result = await db.execute(
-                    select(PersonalizedTrack)
-                    .where(PersonalizedTrack.batch_id == batch_id)
-                )
-                current_tracks = track_result.scalars().all()
-
-            all_done = all(t.status in ("completed", "failed", "cancelled") for t in current_tracks)
-
-            if all_done:
-                results_summary = []
-                for t in sorted(current_tracks, key=lambda x: x.batch_index or 0):
-                    results_summary.append({
-                        "track_id": str(t.id),
-                        "batch_index": t.batch_index,
-                        "status": t.status,
-                        "duration_sec": t.generation_duration_sec,
-                    })
-                yield _make_sse("batch_complete", {
-                    "results": results_summary,
-                })
-                return
-
-            await asyncio.sleep(poll_interval)
-            elapsed += poll_interval
-
-        yield _make_sse("error", {"error": "Batch progress polling timeout"})
+        progress = {
+            snap["track_id"]: _TrackProgress(snap["track_id"], batch_index=i)
+            for i, snap in enumerate(snapshots)
+        }
+        topics = [track_topic(tid) for tid in progress]
+
+        def _batch_complete() -> str:
+            return _make_sse("batch_complete", {
+                "results": [
+                    {
+                        "track_id": str(tid),
+                        "batch_index": snap["batch_index"],
+                        "status": p.status,
+                        "duration_sec": p.duration_sec,
+                    }
+                    for (tid, p), snap in zip(progress.items(), snapshots)
+                ],
+            })
+
+        async def _apply_snapshots(snaps: list[dict]):
+            event_id = bus.last_event_id(topics)
+            for snap in snaps:
+                for chunk in progress[snap["track_id"]].apply_snapshot(snap, event_id):
+                    yield chunk
+
+        async with bus.subscribe(topics) as sub:
+            replayed = bus.replay(topics, last_event_id) if last_event_id else None
+            if replayed is not None:
+                for event in replayed:
+                    for chunk in progress[uuid.UUID(event["topic"].split(":", 1)[1])].apply(event):
+                        yield chunk
+            else:
+                # Перечитать после подписки — события между чтениями не теряются
+                async for chunk in _apply_snapshots(await _load_progress_snapshots(batch_filter)):
+                    yield chunk
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.SSE_MAX_DURATION_SEC
+            while not all(p.finished for p in progress.values()):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    yield _make_sse("error", {"error": "Batch progress stream timeout"})
+                    return
+                event = await sub.get(min(settings.SSE_KEEPALIVE_SEC, remaining))
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif event["type"] == "resync":
+                    async for chunk in _apply_snapshots(await _load_progress_snapshots(batch_filter)):
+                        yield chunk
+                else:
+                    tid = uuid.UUID(event["topic"].split(":", 1)[1])
+                    for chunk in progress[tid].apply(event):
+                        yield chunk
+
+            yield _batch_complete()
 
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        headers=_SSE_HEADERS,
     )
 
 
 @router.get("/{track_id}", response_model=TrackDetail)
 async def get_track(
     track_id: uuid.UUID,
+    fields: Optional[str] = Query(
+        None,
+        description="Только эти ключи track_data / JSONB-колонки, например schedule,validation",
+    ),
     db: AsyncSession = Depends(get_db),
-) -> TrackDetail:
-    """Получает детальную информацию о треке."""
-    track = await track_service.get_track(track_id, db)
+):
+    """Получает детальную информацию о треке (целиком или только ?fields=)."""
+    try:
+        field_names = track_service.parse_track_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    track = await track_service.get_track(track_id, db, fields=field_names)
 
     if not track:
         raise HTTPException(
@@ -457,6 +518,9 @@ async def get_track(
             detail=f"Track {track_id} not found",
         )
 
+    if field_names is not None:
+        # Незапрошенные JSONB-колонки не отдаём вовсе (а не пустыми)
+        return JSONResponse(jsonable_encoder(track, exclude_unset=True))
     return track
 
 
@@ -466,16 +530,23 @@ async def list_tracks(
     status_filter: Optional[str] = Query(None, alias="status"),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    count: str = Query("exact", description="exact | estimate | none"),
     db: AsyncSession = Depends(get_db),
 ) -> TrackListResponse:
-    """Получает список треков с фильтрацией и пагинацией."""
-    return await track_service.list_tracks(
-        db=db,
-        profile_id=profile_id,
-        status=status_filter,
-        limit=limit,
-        offset=offset,
-    )
+    """Получает список треков с фильтрацией и пагинацией (offset или cursor)."""
+    try:
+        return await track_service.list_tracks(
+            db=db,
+            profile_id=profile_id,
+            status=status_filter,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            count=count,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.get("/{track_id}/field-usage", response_model=FieldUsageResponse)
@@ -13,6 +13,18 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "nastavnik_testing"
     POSTGRES_HOST: str = "db"
     POSTGRES_PORT: int = 5432
+    # Пулы соединений (core/database.py): API и фоновая генерация — по одному
+    # engine на процесс. Максимум соединений процесса — сумма size + overflow
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    BACKGROUND_DB_POOL_SIZE: int = 5
+    BACKGROUND_DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT_SEC: float = 30.0  # ожидание свободного соединения
+    # PgBouncer (transaction pooling): NullPool, без кэша prepared statements
+    DB_PGBOUNCER: bool = False
+    # Прямое соединение с PostgreSQL для LISTEN шины событий: PgBouncer в режиме
+    # transaction pooling LISTEN не поддерживает. Пусто — тот же адрес, что у engine
+    DB_LISTEN_URL: str = ""
 
     # Backend configuration
     BACKEND_HOST: str = "0.0.0.0"
@@ -20,6 +32,40 @@ class Settings(BaseSettings):
 
     # ML Service configuration
     ML_SERVICE_URL: str = "http://ml:8001"
+    # Общий клиент ML (services/ml_client.py): пул keep-alive соединений на процесс
+    ML_POOL_MAX_CONNECTIONS: int = 100
+    ML_POOL_MAX_KEEPALIVE: int = 20
+    ML_POOL_KEEPALIVE_EXPIRY_SEC: float = 60.0  # меньше --timeout-keep-alive uvicorn ML
+    ML_HTTP2: bool = False  # нужен пакет h2 и HTTP/2-сервер ML
+    ML_TIMEOUT_SEC: float = 30.0
+    ML_ENDPOINT_TIMEOUTS: dict[str, float] = {
+        "/pipeline/run": 600.0,
+        "/pipeline/resume": 600.0,
+        "/pipeline/run-batch": 600.0,
+        "/manual/execute-step": 120.0,
+        "/manual/processors": 10.0,
+        "/health": 5.0,
+    }
+
+    # Generation job queue (PostgreSQL, FOR UPDATE SKIP LOCKED)
+    JOB_WORKERS: int = 2  # воркеров на процесс; 0 — только ставить задачи в очередь
+    JOB_POLL_INTERVAL_SEC: float = 1.0
+    JOB_VISIBILITY_TIMEOUT_SEC: int = 120  # продлевается heartbeat'ом, пока задача выполняется
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SEC: float = 10.0  # база экспоненциального backoff
+    JOB_RETRY_BACKOFF_MAX_SEC: float = 600.0
+
+    # Batch-генерация: статусы/результаты треков пишутся пачками этого размера
+    TRACK_STATUS_FLUSH_SIZE: int = 100
+
+    # POST /api/logs/steps:bulk: до порога — один INSERT, от порога — COPY
+    STEP_LOG_COPY_THRESHOLD: int = 100
+    STEP_LOG_BULK_MAX: int = 5000
+
+    # Progress events (LISTEN/NOTIFY → SSE)
+    EVENT_BUS_CHANNEL: str = "track_progress"
+    SSE_KEEPALIVE_SEC: float = 15.0
+    SSE_MAX_DURATION_SEC: float = 600.0
 
     # CORS: comma-separated list of allowed origins
     # Dev default: localhost + Docker frontend container
@@ -44,6 +90,18 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def asyncpg_dsn(self) -> str:
+        """Plain PostgreSQL DSN for raw asyncpg connections (LISTEN)."""
+        return self.database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    @property
+    def listen_dsn(self) -> str:
+        """DSN for the EventBus LISTEN connection (DB_LISTEN_URL or asyncpg_dsn)."""
+        if not self.DB_LISTEN_URL:
+            return self.asyncpg_dsn
+        return self.DB_LISTEN_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
 
 # Global settings instance
 settings = Settings()
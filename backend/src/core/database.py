@@ -1,20 +1,73 @@
-"""Database engine and session management."""
+"""Database engine and session management.
 
+Два engine на процесс:
+- engine / AsyncSessionLocal — запросы API (get_db) и очередь задач;
+- background_engine / BackgroundSessionLocal — фоновая генерация
+  (статусы треков, логи шагов), чтобы долгие задачи не занимали пул API.
+
+DB_PGBOUNCER=true — режим для PgBouncer (transaction pooling): без пула
+на стороне приложения (NullPool) и без кэша prepared statements asyncpg.
+LISTEN шины событий (services/event_bus.py) через такой PgBouncer не работает —
+для него DB_LISTEN_URL задаёт прямое соединение с PostgreSQL (по умолчанию
+тот же адрес, что у engine).
+"""
+
+from typing import Any
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import NullPool
 
 from backend.src.core.config import settings
 
-# Create async engine
-engine: AsyncEngine = create_async_engine(
-    settings.database_url,
-    echo=False,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+# Счётчики checkout по engine (метрики насыщения пула)
+_pool_counters: dict[str, dict[str, int]] = {}
+_pool_capacity: dict[str, int] = {}
+
+
+def _create_engine(name: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    """Создать engine с размерами пула из настроек (или NullPool для PgBouncer)."""
+    if settings.DB_PGBOUNCER:
+        new_engine = create_async_engine(
+            settings.database_url,
+            echo=False,
+            poolclass=NullPool,
+            connect_args={"statement_cache_size": 0, "prepared_statement_cache_size": 0},
+        )
+    else:
+        new_engine = create_async_engine(
+            settings.database_url,
+            echo=False,
+            pool_pre_ping=True,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+        )
+
+    _pool_capacity[name] = pool_size + max(0, max_overflow)
+    counters = _pool_counters[name] = {"checked_out": 0, "peak_checked_out": 0, "checkouts": 0}
+
+    @event.listens_for(new_engine.sync_engine, "checkout")
+    def _on_checkout(*args: Any) -> None:
+        counters["checkouts"] += 1
+        counters["checked_out"] += 1
+        counters["peak_checked_out"] = max(counters["peak_checked_out"], counters["checked_out"])
+
+    @event.listens_for(new_engine.sync_engine, "checkin")
+    def _on_checkin(*args: Any) -> None:
+        counters["checked_out"] = max(0, counters["checked_out"] - 1)
+
+    return new_engine
+
+
+# Create async engines
+engine: AsyncEngine = _create_engine("api", settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+background_engine: AsyncEngine = _create_engine(
+    "background", settings.BACKGROUND_DB_POOL_SIZE, settings.BACKGROUND_DB_MAX_OVERFLOW
 )
 
-# Create async session factory
+# Create async session factories
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -22,6 +75,11 @@ AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
     autoflush=False,
 )
+BackgroundSessionLocal = async_sessionmaker(
+    background_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
 
 # Declarative base for ORM models
 Base = declarative_base()
@@ -38,3 +96,40 @@ async def get_db() -> AsyncSession:
             raise
         finally:
             await session.close()
+
+
+def get_pool_stats() -> dict[str, dict[str, Any]]:
+    """
+    Состояние пулов соединений процесса.
+
+    Returns:
+        dict: engine → размер пула, занятые / свободные соединения, overflow,
+        saturation (занято / максимум), пик занятых и число checkout
+    """
+    stats = {}
+    for name, current in (("api", engine), ("background", background_engine)):
+        pool = current.pool
+        counters = _pool_counters.get(name, {})
+        entry: dict[str, Any] = {
+            "pool": type(pool).__name__,
+            "checkouts": counters.get("checkouts", 0),
+            "peak_checked_out": counters.get("peak_checked_out", 0),
+        }
+        if not isinstance(pool, NullPool):
+            capacity = _pool_capacity[name]
+            entry.update({
+                "size": pool.size(),
+                "max_connections": capacity,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "saturation": round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+            })
+        stats[name] = entry
+    return stats
+
+
+async def dispose_engines() -> None:
+    """Закрыть соединения обоих engine (shutdown API / воркера)."""
+    await engine.dispose()
+    await background_engine.dispose()
@@ -6,7 +6,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.src.core.config import settings
-from backend.src.core.database import Base, engine
+from backend.src.core.database import Base, dispose_engines, engine
+from backend.src.services.event_bus import start_event_bus, stop_event_bus
+from backend.src.services.job_queue import start_job_workers, stop_job_workers
+from backend.src.services.ml_client import close_ml_client
+from backend.src.services.track_service import JOB_HANDLERS, handle_dead_job
 
 
 @asynccontextmanager
@@ -16,10 +20,23 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    # Startup: LISTEN for progress events (pushed to SSE clients)
+    await start_event_bus()
+
+    # Startup: Workers of the generation job queue
+    await start_job_workers(JOB_HANDLERS, on_dead=handle_dead_job)
+
     yield
 
-    # Shutdown: Close database connections
-    await engine.dispose()
+    # Shutdown: Return in-flight jobs to the queue
+    await stop_job_workers()
+    await stop_event_bus()
+
+    # Shutdown: Close pooled connections to the ML service
+    await close_ml_client()
+
+    # Shutdown: Close database connections (API and background pools)
+    await dispose_engines()
 
 
 # Create FastAPI app
@@ -41,13 +58,14 @@ app.add_middleware(
 
 
 # Register routers
-from backend.src.api import profiles, tracks, logs, health, manual
+from backend.src.api import profiles, tracks, logs, health, manual, jobs
 
 app.include_router(profiles.router)
 app.include_router(tracks.router)
 app.include_router(logs.router)
 app.include_router(health.router)
 app.include_router(manual.router)
+app.include_router(jobs.router)
 
 # TODO: Register QA and Export routers when implemented
 # from backend.src.api import qa, export
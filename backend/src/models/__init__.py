@@ -8,6 +8,7 @@ from backend.src.models.manual_session import ManualSession
 from backend.src.models.manual_step_run import ManualStepRun
 from backend.src.models.prompt_version import PromptVersion
 from backend.src.models.processor_config import ProcessorConfig
+from backend.src.models.generation_job import GenerationJob
 
 __all__ = [
     "StudentProfile",
@@ -18,4 +19,5 @@ __all__ = [
     "ManualStepRun",
     "PromptVersion",
     "ProcessorConfig",
+    "GenerationJob",
 ]
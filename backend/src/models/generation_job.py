@@ -0,0 +1,94 @@
+"""
+SQLAlchemy модель для очереди задач генерации.
+
+Durable-очередь поверх PostgreSQL: воркеры забирают задачи через
+SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько реплик backend
+могут обрабатывать одну очередь без двойного выполнения.
+"""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Index, Integer, String, Text, TIMESTAMP, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.src.core.database import Base
+
+
+class GenerationJob(Base):
+    """
+    Задача в очереди генерации.
+
+    Attributes:
+        id: UUID первичный ключ
+        kind: Тип задачи (track, batch)
+        subject_id: track_id или batch_id, к которому относится задача
+        payload: JSONB аргументы обработчика
+        priority: Приоритет (больше — раньше)
+        status: queued, running, succeeded, failed
+        attempts: Сколько раз задачу уже забирали
+        max_attempts: Лимит попыток
+        run_after: Не запускать раньше (backoff между попытками)
+        locked_by: Идентификатор воркера, выполняющего задачу
+        locked_until: Visibility timeout — после него задачу может забрать другой воркер
+        last_error: Текст последней ошибки
+    """
+
+    __tablename__ = "generation_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),
+    )
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    subject_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), nullable=True, index=True
+    )
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    priority: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default=text("0")
+    )
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default="queued", server_default=text("'queued'")
+    )
+    attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default=text("0")
+    )
+    max_attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=3, server_default=text("3")
+    )
+    run_after: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+    )
+    locked_by: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+    )
+    started_at: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+
+    __table_args__ = (
+        # Частичный индекс под запрос claim: только живые задачи
+        Index(
+            "ix_generation_jobs_claim",
+            "status",
+            "priority",
+            "run_after",
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    def __repr__(self) -> str:
+        """Строковое представление."""
+        return f"<GenerationJob(id={self.id}, kind={self.kind}, status={self.status})>"
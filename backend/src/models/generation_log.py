@@ -7,7 +7,7 @@ SQLAlchemy модель для логов генерации треков.
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, Index, Integer, String, Text
+from sqlalchemy import Float, ForeignKey, Index, String, Text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -63,7 +63,7 @@ class GenerationLog(Base):
     )
 
     step_duration_sec: Mapped[float] = mapped_column(
-        Integer,
+        Float,
         nullable=True,
         comment="Длительность шага в секундах",
     )
@@ -6,7 +6,7 @@
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, TIMESTAMP, Float, Integer, ForeignKey, text
+from sqlalchemy import Column, String, TIMESTAMP, Float, Integer, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -67,5 +67,10 @@ class PersonalizedTrack(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # Keyset-пагинация списка треков (см. track_service.list_tracks)
+        Index("ix_personalized_tracks_created_at_id", "created_at", "id"),
+    )
+
     def __repr__(self) -> str:
         return f"<PersonalizedTrack(id={self.id}, status={self.status})>"
@@ -18,6 +18,12 @@ class GenerateBatchRequest(BaseModel):
     batch_size: int = Field(ge=2, le=5)
 
 
+class RetryTrackRequest(BaseModel):
+    """Request to retry generation reusing completed steps."""
+    # Пересчитать шаг и зависящие от него (B7 или B7_schedule); None — с первого невыполненного
+    from_step: str | None = None
+
+
 class GenerationStartedResponse(BaseModel):
     """Response when track generation starts (202)."""
     track_id: UUID
@@ -49,8 +55,9 @@ class TrackDetail(BaseModel):
     id: UUID
     profile_id: UUID
     qa_report_id: UUID | None = None
+    # С ?fields= — только запрошенные ключи track_data; прочие JSONB не отдаются
     track_data: dict[str, Any]
-    generation_metadata: dict[str, Any]
+    generation_metadata: dict[str, Any] = Field(default_factory=dict)
     algorithm_version: str
     validation_b8: dict[str, Any] | None = None
     status: str
@@ -65,7 +72,9 @@ class TrackDetail(BaseModel):
 class TrackListResponse(BaseModel):
     """Response for track listing."""
     tracks: list[TrackSummary]
-    total: int
+    total: int | None  # None при count=none
+    total_is_estimate: bool = False  # count=estimate: оценка планировщика PostgreSQL
+    next_cursor: str | None = None  # для ?cursor= следующей страницы; None — страница последняя
 
 
 class FieldUsageItem(BaseModel):
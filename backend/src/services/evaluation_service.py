@@ -3,14 +3,10 @@
 import logging
 from typing import Any
 
-import httpx
-
-from backend.src.core.config import settings
+from backend.src.services.ml_client import get_ml_client
 
 logger = logging.getLogger(__name__)
 
-ML_URL = settings.ML_SERVICE_URL
-
 
 async def compute_auto_evaluation(
     step_name: str,
@@ -18,18 +14,17 @@ async def compute_auto_evaluation(
     input_data: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
     """Запросить авто-метрики у ML-сервиса."""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(
-            f"{ML_URL}/manual/evaluate",
-            json={
-                "step_name": step_name,
-                "parsed_result": parsed_result,
-                "input_data": input_data,
-                "run_llm_judge": False,
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
+    response = await get_ml_client().post(
+        "/manual/evaluate",
+        json={
+            "step_name": step_name,
+            "parsed_result": parsed_result,
+            "input_data": input_data,
+            "run_llm_judge": False,
+        },
+    )
+    response.raise_for_status()
+    data = response.json()
     return data.get("auto_evaluation", {})
 
 
@@ -40,17 +35,17 @@ async def run_llm_judge(
     use_mock: bool = True,
 ) -> dict[str, Any]:
     """Запросить LLM-as-Judge оценку у ML-сервиса."""
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            f"{ML_URL}/manual/evaluate",
-            json={
-                "step_name": step_name,
-                "parsed_result": parsed_result,
-                "input_data": input_data,
-                "run_llm_judge": True,
-                "use_mock": use_mock,
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
+    response = await get_ml_client().post(
+        "/manual/evaluate",
+        json={
+            "step_name": step_name,
+            "parsed_result": parsed_result,
+            "input_data": input_data,
+            "run_llm_judge": True,
+            "use_mock": use_mock,
+        },
+        timeout=60.0,  # LLM-as-Judge — дольше авто-метрик
+    )
+    response.raise_for_status()
+    data = response.json()
     return data.get("llm_judge_evaluation", {})
@@ -0,0 +1,355 @@
+"""
+Шина событий прогресса генерации.
+
+Публикация — pg_notify в транзакции, которая меняет данные (событие уходит
+только после commit). Каждая реплика держит одно LISTEN-соединение и
+раздаёт события локальным SSE-подписчикам без поллинга БД. Последние
+события каждого топика хранятся в кольцевом буфере для Last-Event-ID replay.
+
+Топики: track:<track_id>. Типы событий:
+- step_completed: step_name, duration_sec, tokens_used, summary
+- track_status: status, error_message, duration_sec, total_tokens
+- resync: локальное, LISTEN-соединение переподключилось — подписчику
+  нужно перечитать состояние из БД
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import asyncpg
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Лимит payload NOTIFY в PostgreSQL — 8000 байт
+MAX_NOTIFY_BYTES = 7900
+
+
+def track_topic(track_id: uuid.UUID | str) -> str:
+    """Топик событий трека."""
+    return f"track:{track_id}"
+
+
+def step_summary(step_name: str, step_output: dict) -> dict:
+    """Извлечь ключевые метрики из step_output для SSE summary."""
+    short = step_name.split("_", 1)[0]
+    if short == "B1":
+        return {
+            "effective_level": step_output.get("effective_level"),
+            "estimated_weeks": step_output.get("estimated_weeks"),
+        }
+    elif short == "B2":
+        comps = step_output.get("competencies", [])
+        return {"competencies_count": len(comps)}
+    elif short == "B3":
+        return {
+            "knowledge_count": len(step_output.get("knowledge_items", [])),
+            "skills_count": len(step_output.get("skill_items", [])),
+            "habits_count": len(step_output.get("habit_items", [])),
+        }
+    elif short == "B4":
+        return {
+            "units_count": len(step_output.get("units", [])),
+            "clusters_count": len(step_output.get("clusters", [])),
+        }
+    elif short == "B5":
+        return {
+            "total_weeks": step_output.get("total_weeks"),
+            "levels": len(step_output.get("levels", [])),
+        }
+    elif short == "B6":
+        return {
+            "blueprints_count": len(step_output.get("blueprints", step_output.get("lesson_blueprints", []))),
+        }
+    elif short == "B7":
+        return {
+            "weeks": step_output.get("total_weeks", step_output.get("weeks")),
+            "checkpoints": len(step_output.get("checkpoints", [])),
+        }
+    elif short == "B8":
+        return {
+            "overall_valid": step_output.get("overall_valid"),
+            "checks": len(step_output.get("checks", step_output.get("validation_checks", []))),
+        }
+    return {}
+
+
+def _new_event_id() -> str:
+    # Уникален между репликами; порядок задаёт порядок доставки NOTIFY (порядок commit)
+    return f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+
+
+async def publish_event(
+    session: AsyncSession,
+    topic: str,
+    event_type: str,
+    data: dict[str, Any],
+) -> None:
+    """
+    Опубликовать событие в транзакции session (доставка — после commit).
+
+    Args:
+        session: Сессия, в которой меняются данные события
+        topic: Топик (track_topic)
+        event_type: step_completed / track_status
+        data: Компактные данные события (без больших JSONB)
+    """
+    payload = _event_payload(topic, event_type, data)
+    await session.execute(select(func.pg_notify(settings.EVENT_BUS_CHANNEL, payload)))
+
+
+async def publish_events(
+    session: AsyncSession,
+    events: list[tuple[str, str, dict[str, Any]]],
+) -> None:
+    """
+    Опубликовать несколько событий одним запросом (порядок сохраняется).
+
+    Args:
+        session: Сессия, в которой меняются данные событий
+        events: (topic, event_type, data) в порядке доставки
+    """
+    if not events:
+        return
+    payloads = [_event_payload(topic, event_type, data) for topic, event_type, data in events]
+    await session.execute(
+        text("SELECT pg_notify(:channel, p) FROM unnest(CAST(:payloads AS text[])) AS p"),
+        {"channel": settings.EVENT_BUS_CHANNEL, "payloads": payloads},
+    )
+
+
+def _event_payload(topic: str, event_type: str, data: dict[str, Any]) -> str:
+    event = {"id": _new_event_id(), "topic": topic, "type": event_type, "data": data}
+    payload = json.dumps(event, ensure_ascii=False, default=str)
+    if len(payload.encode("utf-8")) > MAX_NOTIFY_BYTES:
+        event["data"] = {k: v for k, v in data.items() if k not in ("summary", "error_message")}
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+    return payload
+
+
+class Subscription:
+    """Очередь событий одного SSE-клиента."""
+
+    def __init__(self, topics: list[str], max_size: int):
+        self.topics = topics
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=max_size)
+        self.overflowed = False
+
+    def put(self, event: dict[str, Any]) -> None:
+        """Положить событие; при переполнении — заменить всё на resync."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"id": None, "topic": None, "type": "resync", "data": {}})
+
+    async def get(self, timeout: float) -> dict[str, Any] | None:
+        """Следующее событие или None по таймауту (для keep-alive)."""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event["type"] == "resync":
+            self.overflowed = False
+        return event
+
+
+class EventBus:
+    """In-process pub/sub поверх PostgreSQL LISTEN/NOTIFY."""
+
+    def __init__(
+        self,
+        dsn: str | None = None,
+        channel: str | None = None,
+        buffer_size: int = 200,
+        max_topics: int = 2000,
+        subscriber_queue_size: int = 1000,
+    ):
+        self.dsn = dsn or settings.listen_dsn
+        self.channel = channel or settings.EVENT_BUS_CHANNEL
+        self.buffer_size = buffer_size
+        self.max_topics = max_topics
+        self.subscriber_queue_size = subscriber_queue_size
+
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._buffers: OrderedDict[str, deque[dict[str, Any]]] = OrderedDict()
+        self._listener: asyncio.Task | None = None
+        self._had_connection = False
+        self.connected = False
+        self.received = 0
+        self.reconnects = 0
+
+    # ------------------------------------------------------------------
+    # LISTEN connection
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Запускает фоновое LISTEN-соединение (с переподключением)."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen_loop(), name="event-bus-listener")
+
+    async def stop(self) -> None:
+        """Останавливает LISTEN-соединение."""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def _listen_loop(self) -> None:
+        delay = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: closed.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                self.connected = True
+                if self._had_connection:
+                    # Пока соединения не было, события могли потеряться
+                    self.reconnects += 1
+                    self._broadcast_resync()
+                self._had_connection = True
+                delay = 1.0
+                logger.info(f"Event bus listening on '{self.channel}'")
+                await closed.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event bus connection failed: {e}")
+            finally:
+                self.connected = False
+                if conn is not None and not conn.is_closed():
+                    await asyncio.shield(conn.close())
+            await asyncio.sleep(delay)
+            delay = min(30.0, delay * 2)
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning(f"Event bus: malformed payload on '{channel}'")
+            return
+        self.dispatch(event)
+
+    # ------------------------------------------------------------------
+    # Local delivery
+    # ------------------------------------------------------------------
+
+    def dispatch(self, event: dict[str, Any]) -> None:
+        """Сохранить событие в буфере топика и раздать подписчикам."""
+        topic = event.get("topic")
+        if not topic:
+            return
+        self.received += 1
+        buffer = self._buffers.get(topic)
+        if buffer is None:
+            buffer = self._buffers[topic] = deque(maxlen=self.buffer_size)
+            while len(self._buffers) > self.max_topics:
+                self._buffers.popitem(last=False)
+        else:
+            self._buffers.move_to_end(topic)
+        buffer.append(event)
+
+        for sub in self._subscribers.get(topic, ()):
+            sub.put(event)
+
+    def _broadcast_resync(self) -> None:
+        resync = {"id": None, "topic": None, "type": "resync", "data": {}}
+        for subs in self._subscribers.values():
+            for sub in subs:
+                sub.put(resync)
+
+    @asynccontextmanager
+    async def subscribe(self, topics: list[str]) -> AsyncIterator[Subscription]:
+        """Подписка на топики на время SSE-соединения."""
+        sub = Subscription(topics, self.subscriber_queue_size)
+        for topic in topics:
+            self._subscribers.setdefault(topic, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            for topic in topics:
+                subs = self._subscribers.get(topic)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[topic]
+
+    def replay(self, topics: list[str], last_event_id: str) -> list[dict[str, Any]] | None:
+        """
+        События топиков после last_event_id (в порядке доставки).
+
+        Returns:
+            None если last_event_id уже вытеснен из буфера — нужен snapshot из БД
+        """
+        home = next(
+            (t for t in topics if any(e["id"] == last_event_id for e in self._buffers.get(t, ()))),
+            None,
+        )
+        if home is None:
+            return None
+
+        events: list[dict[str, Any]] = []
+        for topic in topics:
+            buffer = list(self._buffers.get(topic, ()))
+            if topic == home:
+                ids = [e["id"] for e in buffer]
+                events.extend(buffer[ids.index(last_event_id) + 1:])
+            else:
+                events.extend(e for e in buffer if e["id"] > last_event_id)
+        events.sort(key=lambda e: e["id"])
+        return events
+
+    def last_event_id(self, topics: list[str]) -> str | None:
+        """id последнего события топиков (для snapshot)."""
+        ids = [self._buffers[t][-1]["id"] for t in topics if self._buffers.get(t)]
+        return max(ids) if ids else None
+
+    def get_stats(self) -> dict[str, Any]:
+        """Состояние шины."""
+        return {
+            "connected": self.connected,
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "buffered_topics": len(self._buffers),
+        }
+
+
+# Global event bus instance
+_bus: EventBus | None = None
+
+
+def get_event_bus() -> EventBus:
+    """Get or create the process-wide event bus."""
+    global _bus
+    if _bus is None:
+        _bus = EventBus()
+    return _bus
+
+
+async def start_event_bus() -> None:
+    """Start listening for progress events."""
+    await get_event_bus().start()
+
+
+async def stop_event_bus() -> None:
+    """Stop the global event bus."""
+    global _bus
+    if _bus is not None:
+        await _bus.stop()
+        _bus = None
@@ -0,0 +1,527 @@
+"""
+Durable очередь задач генерации поверх PostgreSQL.
+
+- enqueue_job: добавить задачу в той же транзакции, что и треки
+- JobQueue: claim через SELECT ... FOR UPDATE SKIP LOCKED, heartbeat,
+  visibility timeout, retry с экспоненциальным backoff
+- JobWorkerPool: пул воркер-корутин; реплик (и процессов src.worker) может быть сколько угодно
+- get_queue_metrics: глубина очереди и латентность
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.src.core.config import settings
+from backend.src.core.database import AsyncSessionLocal
+from backend.src.models.generation_job import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[GenerationJob], Awaitable[None]]
+
+
+class RetryableJobError(Exception):
+    """Временная ошибка обработчика: задачу нужно повторить с backoff."""
+    pass
+
+
+def enqueue_job(
+    db: AsyncSession,
+    kind: str,
+    payload: dict,
+    *,
+    subject_id: uuid.UUID | None = None,
+    priority: int = 0,
+    max_attempts: int | None = None,
+) -> GenerationJob:
+    """
+    Добавляет задачу в сессию. Коммитит вызывающий — вместе с созданием треков.
+
+    Args:
+        db: Сессия базы данных
+        kind: Тип задачи (ключ в handlers пула)
+        payload: JSON-аргументы обработчика
+        subject_id: track_id / batch_id
+        priority: Больше — раньше
+        max_attempts: Лимит попыток (по умолчанию JOB_MAX_ATTEMPTS)
+    """
+    job = GenerationJob(
+        id=uuid.uuid4(),
+        kind=kind,
+        subject_id=subject_id,
+        payload=payload,
+        priority=priority,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    return job
+
+
+def retry_delay(attempts: int, base: float, maximum: float) -> float:
+    """Экспоненциальный backoff: base, 2*base, 4*base, ... не больше maximum."""
+    return min(maximum, base * (2 ** max(0, attempts - 1)))
+
+
+def _default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """Операции над таблицей generation_jobs."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        *,
+        worker_id: str | None = None,
+        visibility_timeout_sec: int | None = None,
+        retry_backoff_sec: float | None = None,
+        retry_backoff_max_sec: float | None = None,
+    ):
+        self._session_factory = session_factory
+        self.worker_id = worker_id or _default_worker_id()
+        self.visibility_timeout_sec = visibility_timeout_sec or settings.JOB_VISIBILITY_TIMEOUT_SEC
+        self.retry_backoff_sec = retry_backoff_sec or settings.JOB_RETRY_BACKOFF_SEC
+        self.retry_backoff_max_sec = retry_backoff_max_sec or settings.JOB_RETRY_BACKOFF_MAX_SEC
+
+    def _lock_expiry(self):
+        return func.now() + timedelta(seconds=self.visibility_timeout_sec)
+
+    async def claim(self) -> Optional[GenerationJob]:
+        """
+        Забирает следующую задачу: queued с наступившим run_after или running
+        с истёкшим visibility timeout (воркер умер / реплику передеплоили).
+        """
+        now = func.now()
+        candidate = (
+            select(GenerationJob.id)
+            .where(
+                or_(
+                    and_(GenerationJob.status == "queued", GenerationJob.run_after <= now),
+                    and_(GenerationJob.status == "running", GenerationJob.locked_until < now),
+                ),
+                GenerationJob.attempts < GenerationJob.max_attempts,
+            )
+            .order_by(
+                GenerationJob.priority.desc(),
+                GenerationJob.run_after,
+                GenerationJob.created_at,
+            )
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(GenerationJob)
+            .where(GenerationJob.id == candidate)
+            .values(
+                status="running",
+                attempts=GenerationJob.attempts + 1,
+                locked_by=self.worker_id,
+                locked_until=self._lock_expiry(),
+                started_at=func.coalesce(GenerationJob.started_at, now),
+            )
+            .returning(GenerationJob)
+            .execution_options(synchronize_session=False)
+        )
+        async with self._session_factory() as session:
+            result = await session.execute(stmt)
+            job = result.scalar_one_or_none()
+            await session.commit()
+        return job
+
+    def _owned(self, job: GenerationJob) -> tuple:
+        """
+        Условия владения задачей: этот claim всё ещё действующий.
+
+        locked_by общий для всех корутин пула (hostname:pid), поэтому токеном
+        claim служит attempts, который claim() увеличивает при каждом захвате:
+        после истечения visibility timeout и повторного claim старый владелец
+        уже не сможет ни продлить, ни завершить задачу.
+        """
+        return (
+            GenerationJob.status == "running",
+            GenerationJob.locked_by == self.worker_id,
+            GenerationJob.attempts == job.attempts,
+        )
+
+    async def heartbeat(self, job: GenerationJob) -> bool:
+        """
+        Продлевает visibility timeout задачи, которую держит этот claim.
+
+        Returns:
+            False если задачу уже забрал другой воркер
+        """
+        return await self._update(
+            job.id,
+            *self._owned(job),
+            locked_until=self._lock_expiry(),
+        )
+
+    async def complete(self, job: GenerationJob) -> bool:
+        """
+        Задача выполнена.
+
+        Returns:
+            False если claim устарел и результат не записан
+        """
+        owned = await self._update(
+            job.id,
+            *self._owned(job),
+            status="succeeded",
+            finished_at=func.now(),
+            locked_by=None,
+            locked_until=None,
+        )
+        if not owned:
+            logger.warning(f"Job {job.id}: stale claim, completion ignored")
+        return owned
+
+    async def fail(self, job: GenerationJob, error: str, *, retryable: bool = True) -> bool:
+        """
+        Ошибка выполнения: повтор с backoff, пока есть попытки.
+
+        Args:
+            job: Задача, полученная из claim()
+            error: Текст ошибки
+            retryable: False — сразу failed, без повторов
+
+        Returns:
+            True если задача поставлена на повтор
+        """
+        if retryable and job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts, self.retry_backoff_sec, self.retry_backoff_max_sec)
+            owned = await self._update(
+                job.id,
+                *self._owned(job),
+                status="queued",
+                run_after=func.now() + timedelta(seconds=delay),
+                last_error=error,
+                locked_by=None,
+                locked_until=None,
+            )
+            if not owned:
+                logger.warning(f"Job {job.id}: stale claim, failure ignored: {error}")
+                return False
+            logger.warning(
+                f"Job {job.id} ({job.kind}) attempt {job.attempts}/{job.max_attempts} "
+                f"failed, retry in {delay:.0f}s: {error}"
+            )
+            return True
+
+        owned = await self._update(
+            job.id,
+            *self._owned(job),
+            status="failed",
+            last_error=error,
+            finished_at=func.now(),
+            locked_by=None,
+            locked_until=None,
+        )
+        if not owned:
+            logger.warning(f"Job {job.id}: stale claim, failure ignored: {error}")
+            return False
+        logger.error(f"Job {job.id} ({job.kind}) failed permanently: {error}")
+        return False
+
+    async def release(self, job: GenerationJob) -> bool:
+        """Вернуть задачу в очередь без траты попытки (остановка воркера)."""
+        return await self._update(
+            job.id,
+            *self._owned(job),
+            status="queued",
+            attempts=GenerationJob.attempts - 1,
+            run_after=func.now(),
+            locked_by=None,
+            locked_until=None,
+        )
+
+    async def reap_expired(self) -> list[GenerationJob]:
+        """
+        Помечает failed задачи с истёкшим visibility timeout и исчерпанными попытками.
+
+        Returns:
+            Помеченные задачи (для on_dead обработчика)
+        """
+        candidates = (
+            select(GenerationJob.id)
+            .where(
+                GenerationJob.status == "running",
+                GenerationJob.locked_until < func.now(),
+                GenerationJob.attempts >= GenerationJob.max_attempts,
+            )
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(GenerationJob)
+            .where(GenerationJob.id.in_(candidates))
+            .values(
+                status="failed",
+                last_error="Visibility timeout expired on final attempt",
+                finished_at=func.now(),
+                locked_by=None,
+                locked_until=None,
+            )
+            .returning(GenerationJob)
+            .execution_options(synchronize_session=False)
+        )
+        async with self._session_factory() as session:
+            result = await session.execute(stmt)
+            jobs = list(result.scalars().all())
+            await session.commit()
+        return jobs
+
+    async def _update(self, job_id: uuid.UUID, *conditions, **values) -> bool:
+        """UPDATE одной задачи; True если строка подошла под условия."""
+        async with self._session_factory() as session:
+            result = await session.execute(
+                update(GenerationJob)
+                .where(GenerationJob.id == job_id, *conditions)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        return result.rowcount > 0
+
+
+class JobWorkerPool:
+    """
+    Пул воркер-корутин, обрабатывающих очередь.
+
+    Обработчик задачи выбирается по job.kind. Исключение обработчика —
+    повтор с backoff; отмена воркера (shutdown) — задача возвращается в очередь.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: dict[str, JobHandler],
+        *,
+        concurrency: int = 1,
+        poll_interval_sec: float = 1.0,
+        on_dead: JobHandler | None = None,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval_sec = poll_interval_sec
+        self.on_dead = on_dead
+        self._workers: list[asyncio.Task] = []
+        self._stopping = False
+
+        self.busy = 0
+        self.claimed = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+        self.released = 0
+        self.total_wait_sec = 0.0
+        self.total_run_sec = 0.0
+
+    async def start(self) -> None:
+        """Запускает воркеры."""
+        self._stopping = False
+        self._workers = [
+            asyncio.create_task(self._worker_loop(i), name=f"job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        logger.info(f"Job worker pool started: {self.concurrency} workers ({self.queue.worker_id})")
+
+    async def stop(self) -> None:
+        """Останавливает воркеры; выполняемые задачи возвращаются в очередь."""
+        self._stopping = True
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Job worker pool stopped")
+
+    async def _worker_loop(self, index: int) -> None:
+        while not self._stopping:
+            try:
+                job = await self.queue.claim()
+            except Exception as e:
+                logger.error(f"Job worker {index}: claim failed: {e}")
+                await asyncio.sleep(self.poll_interval_sec)
+                continue
+
+            if job is None:
+                await self._reap()
+                await asyncio.sleep(self.poll_interval_sec)
+                continue
+
+            await self.process(job)
+
+    async def process(self, job: GenerationJob) -> None:
+        """Выполняет одну забранную задачу и фиксирует результат в очереди."""
+        self.claimed += 1
+        if job.created_at is not None and job.attempts == 1:
+            self.total_wait_sec += max(
+                0.0, time.time() - job.created_at.timestamp()
+            )
+
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            await self.queue.fail(
+                job, f"No handler for job kind '{job.kind}'", retryable=False
+            )
+            self.failed += 1
+            return
+
+        self.busy += 1
+        started = time.monotonic()
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await handler(job)
+        except asyncio.CancelledError:
+            await asyncio.shield(self.queue.release(job))
+            self.released += 1
+            logger.info(f"Job {job.id} released back to queue (worker stopping)")
+            raise
+        except Exception as e:
+            if await self.queue.fail(job, str(e)):
+                self.retried += 1
+            else:
+                self.failed += 1
+        else:
+            if await self.queue.complete(job):
+                self.succeeded += 1
+        finally:
+            heartbeat.cancel()
+            self.busy -= 1
+            self.total_run_sec += time.monotonic() - started
+
+    async def _heartbeat(self, job: GenerationJob) -> None:
+        interval = max(1.0, self.queue.visibility_timeout_sec / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.queue.heartbeat(job):
+                    logger.warning(f"Job {job.id} heartbeat: claim lost to another worker")
+                    return
+            except Exception as e:
+                logger.warning(f"Job {job.id} heartbeat failed: {e}")
+
+    async def _reap(self) -> None:
+        try:
+            dead = await self.queue.reap_expired()
+        except Exception as e:
+            logger.error(f"Reaping expired jobs failed: {e}")
+            return
+        for job in dead:
+            self.failed += 1
+            logger.error(f"Job {job.id} ({job.kind}) lost its worker on the final attempt")
+            if self.on_dead is not None:
+                try:
+                    await self.on_dead(job)
+                except Exception as e:
+                    logger.error(f"on_dead handler failed for job {job.id}: {e}")
+
+    def get_stats(self) -> dict[str, Any]:
+        """Счётчики этого процесса."""
+        return {
+            "worker_id": self.queue.worker_id,
+            "workers": len(self._workers),
+            "busy": self.busy,
+            "claimed": self.claimed,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+            "released": self.released,
+            "avg_wait_sec": round(self.total_wait_sec / self.claimed, 3) if self.claimed else None,
+            "avg_run_sec": (
+                round(self.total_run_sec / (self.claimed - self.busy), 3)
+                if self.claimed > self.busy else None
+            ),
+        }
+
+
+async def get_queue_metrics(db: AsyncSession) -> dict[str, Any]:
+    """
+    Глубина очереди и латентность по всей очереди (все реплики).
+
+    - depth: число задач по статусам
+    - ready: queued задачи, которые уже можно забирать
+    - oldest_ready_age_sec: сколько ждёт самая старая готовая задача
+    - avg_wait_sec / avg_run_sec: за последний час
+    """
+    rows = await db.execute(
+        select(GenerationJob.status, func.count()).group_by(GenerationJob.status)
+    )
+    depth = {status: count for status, count in rows.all()}
+
+    ready_row = await db.execute(
+        select(
+            func.count(),
+            func.extract("epoch", func.now() - func.min(GenerationJob.run_after)),
+        ).where(GenerationJob.status == "queued", GenerationJob.run_after <= func.now())
+    )
+    ready, oldest_age = ready_row.one()
+
+    hour_ago = func.now() - timedelta(hours=1)
+    latency_row = await db.execute(
+        select(
+            func.avg(func.extract("epoch", GenerationJob.started_at - GenerationJob.created_at)),
+            func.avg(func.extract("epoch", GenerationJob.finished_at - GenerationJob.started_at)),
+        ).where(GenerationJob.finished_at >= hour_ago)
+    )
+    avg_wait, avg_run = latency_row.one()
+
+    return {
+        "depth": depth,
+        "ready": ready or 0,
+        "oldest_ready_age_sec": round(float(oldest_age), 3) if oldest_age is not None else None,
+        "avg_wait_sec": round(float(avg_wait), 3) if avg_wait is not None else None,
+        "avg_run_sec": round(float(avg_run), 3) if avg_run is not None else None,
+        "pool": _pool.get_stats() if _pool is not None else None,
+    }
+
+
+# Global worker pool of this process
+_pool: JobWorkerPool | None = None
+
+
+def get_job_pool() -> JobWorkerPool | None:
+    """Пул воркеров процесса (None если воркеры не запущены)."""
+    return _pool
+
+
+async def start_job_workers(
+    handlers: dict[str, JobHandler],
+    on_dead: JobHandler | None = None,
+    concurrency: int | None = None,
+) -> JobWorkerPool | None:
+    """Запускает глобальный пул воркеров (JOB_WORKERS=0 — не запускать)."""
+    global _pool
+    concurrency = settings.JOB_WORKERS if concurrency is None else concurrency
+    if concurrency <= 0:
+        return None
+    if _pool is None:
+        _pool = JobWorkerPool(
+            JobQueue(),
+            handlers,
+            concurrency=concurrency,
+            poll_interval_sec=settings.JOB_POLL_INTERVAL_SEC,
+            on_dead=on_dead,
+        )
+        await _pool.start()
+    return _pool
+
+
+async def stop_job_workers() -> None:
+    """Останавливает глобальный пул воркеров."""
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
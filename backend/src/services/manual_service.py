@@ -5,21 +5,18 @@ import uuid
 from datetime import datetime
 from typing import Any
 
-import httpx
 from sqlalchemy import select, func, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from backend.src.core.config import settings
 from backend.src.models.manual_session import ManualSession
 from backend.src.models.manual_step_run import ManualStepRun
 from backend.src.models.processor_config import ProcessorConfig
 from backend.src.models.student_profile import StudentProfile
+from backend.src.services.ml_client import get_ml_client
 
 logger = logging.getLogger(__name__)
 
-ML_URL = settings.ML_SERVICE_URL
-
 # Маппинг зависимостей между шагами (auto-input)
 STEP_DEPENDENCIES: dict[str, list[str]] = {
     "B1_validate": [],
@@ -218,14 +215,9 @@ async def _render_prompt_with_profile(
     if prompt_text:
         payload["prompt_text"] = prompt_text
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.post(
-            f"{ML_URL}/manual/render-prompt",
-            json=payload,
-        )
-        resp.raise_for_status()
-        render_data = resp.json()
-        return render_data["rendered_prompt"]
+    resp = await get_ml_client().post("/manual/render-prompt", json=payload)
+    resp.raise_for_status()
+    return resp.json()["rendered_prompt"]
 
 
 async def _get_auto_input(
@@ -334,19 +326,18 @@ async def run_step(
             step_run.preprocessor_results = preprocessor_results
 
         # Выполнить шаг через ML
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(
-                f"{ML_URL}/manual/execute-step",
-                json={
-                    "step_name": step_name,
-                    "prompt": prompt_text,
-                    "input_data": input_data,
-                    "llm_params": step_run.llm_params,
-                    "use_mock": use_mock,
-                },
-            )
-            resp.raise_for_status()
-            exec_result = resp.json()
+        resp = await get_ml_client().post(
+            "/manual/execute-step",
+            json={
+                "step_name": step_name,
+                "prompt": prompt_text,
+                "input_data": input_data,
+                "llm_params": step_run.llm_params,
+                "use_mock": use_mock,
+            },
+        )
+        resp.raise_for_status()
+        exec_result = resp.json()
 
         step_run.raw_response = exec_result.get("raw_response")
         step_run.parsed_result = exec_result.get("parsed_result")
@@ -427,18 +418,17 @@ async def _run_processors(
     results = []
     for config in configs:
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                resp = await client.post(
-                    f"{ML_URL}/manual/processors/run",
-                    json={
-                        "processor_name": config.processor_name,
-                        "data": data,
-                        "step_name": step_name,
-                        "config_params": config.config_params,
-                    },
-                )
-                resp.raise_for_status()
-                results.append(resp.json())
+            resp = await get_ml_client().post(
+                "/manual/processors/run",
+                json={
+                    "processor_name": config.processor_name,
+                    "data": data,
+                    "step_name": step_name,
+                    "config_params": config.config_params,
+                },
+            )
+            resp.raise_for_status()
+            results.append(resp.json())
         except Exception as e:
             results.append({
                 "name": config.processor_name,
@@ -0,0 +1,218 @@
+"""
+Общий HTTP-клиент backend → ML-сервис.
+
+Один httpx.AsyncClient на процесс (API-реплика или воркер): соединения с
+ML-сервисом переиспользуются (keep-alive), вместо TCP-handshake и нового
+пула на каждый вызов. Особенно важно для ручного режима, где один запуск
+шага — 3+N последовательных вызовов ML.
+
+- Лимиты пула: ML_POOL_MAX_CONNECTIONS / ML_POOL_MAX_KEEPALIVE, простаивающее
+  соединение живёт ML_POOL_KEEPALIVE_EXPIRY_SEC (меньше keep-alive uvicorn ML).
+- Таймауты по endpoint'ам: ML_ENDPOINT_TIMEOUTS, остальные — ML_TIMEOUT_SEC.
+- HTTP/2 (ML_HTTP2): нужен пакет h2 и сервер с HTTP/2; для http:// — prior
+  knowledge. Без h2 клиент остаётся на HTTP/1.1.
+- Метрики: запросы/ошибки/латентность по endpoint'ам, новые и
+  переиспользованные соединения (GET /api/health/ml-client).
+
+Закрывается в lifespan API и при остановке воркера (close_ml_client).
+"""
+
+import logging
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import httpx
+
+from backend.src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def endpoint_timeout(path: str) -> float:
+    """Таймаут запроса к endpoint'у ML (ML_ENDPOINT_TIMEOUTS или ML_TIMEOUT_SEC)."""
+    return settings.ML_ENDPOINT_TIMEOUTS.get(path, settings.ML_TIMEOUT_SEC)
+
+
+class MLServiceClient:
+    """Клиент ML-сервиса с общим пулом соединений и метриками."""
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """
+        Args:
+            base_url: URL ML-сервиса (по умолчанию ML_SERVICE_URL)
+            transport: HTTP transport (тесты); лимиты пула и HTTP/2 тогда не применяются
+        """
+        base_url = base_url or settings.ML_SERVICE_URL
+        http2 = settings.ML_HTTP2
+        if http2 and not _h2_available():
+            logger.warning("ML_HTTP2=true, but package h2 is not installed: using HTTP/1.1")
+            http2 = False
+
+        self.http2 = http2
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=settings.ML_TIMEOUT_SEC,
+            limits=httpx.Limits(
+                max_connections=settings.ML_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ML_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.ML_POOL_KEEPALIVE_EXPIRY_SEC,
+            ),
+            http2=http2,
+            # Без TLS нет ALPN: HTTP/2 только prior knowledge
+            http1=not (http2 and base_url.startswith("http://")),
+            transport=transport,
+        )
+        self._requests = 0
+        self._errors = 0
+        self._new_connections = 0
+        self._endpoints: dict[str, dict[str, float]] = defaultdict(
+            lambda: {"requests": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Выполнить запрос к ML-сервису.
+
+        Args:
+            method: HTTP-метод
+            path: Путь endpoint'а (/pipeline/run, /manual/execute-step, ...)
+            timeout: Таймаут вместо таймаута endpoint'а
+            **kwargs: Аргументы httpx.AsyncClient.request (json, params, ...)
+
+        Returns:
+            httpx.Response (raise_for_status — на стороне вызывающего)
+        """
+        opened_connection = False
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            nonlocal opened_connection
+            if event == "connection.connect_tcp.started":
+                opened_connection = True
+
+        stats = self._endpoints[path]
+        start = time.perf_counter()
+        try:
+            return await self._client.request(
+                method,
+                path,
+                timeout=endpoint_timeout(path) if timeout is None else timeout,
+                extensions={"trace": trace},
+                **kwargs,
+            )
+        except httpx.HTTPError:
+            self._errors += 1
+            stats["errors"] += 1
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._requests += 1
+            self._new_connections += opened_connection
+            stats["requests"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        path: str,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Потоковый запрос к ML-сервису (тело читается по мере прихода).
+
+        Латентность в метриках — до конца чтения ответа; таймаут endpoint'а
+        действует как таймаут между порциями данных.
+
+        Yields:
+            httpx.Response с непрочитанным телом (aiter_lines, ...)
+        """
+        stats = self._endpoints[path]
+        start = time.perf_counter()
+        try:
+            async with self._client.stream(
+                method,
+                path,
+                timeout=endpoint_timeout(path) if timeout is None else timeout,
+                **kwargs,
+            ) as response:
+                yield response
+        except httpx.HTTPError:
+            self._errors += 1
+            stats["errors"] += 1
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._requests += 1
+            stats["requests"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Счётчики клиента: запросы, ошибки, соединения, латентность по endpoint'ам."""
+        return {
+            "http2": self.http2,
+            "requests": self._requests,
+            "errors": self._errors,
+            "new_connections": self._new_connections,
+            "reused_connections": max(0, self._requests - self._errors - self._new_connections),
+            "endpoints": {
+                path: {
+                    "requests": int(stats["requests"]),
+                    "errors": int(stats["errors"]),
+                    "avg_ms": round(stats["total_ms"] / stats["requests"], 1),
+                    "max_ms": round(stats["max_ms"], 1),
+                }
+                for path, stats in self._endpoints.items()
+                if stats["requests"]
+            },
+        }
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_client: MLServiceClient | None = None
+
+
+def get_ml_client() -> MLServiceClient:
+    """Общий клиент ML-сервиса процесса (создаётся при первом вызове)."""
+    global _client
+    if _client is None:
+        _client = MLServiceClient()
+    return _client
+
+
+async def close_ml_client() -> None:
+    """Закрыть общий клиент (shutdown API / воркера)."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
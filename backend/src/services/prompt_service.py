@@ -4,17 +4,14 @@ import logging
 import uuid
 from typing import Any
 
-import httpx
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.src.core.config import settings
 from backend.src.models.prompt_version import PromptVersion
+from backend.src.services.ml_client import get_ml_client
 
 logger = logging.getLogger(__name__)
 
-ML_URL = settings.ML_SERVICE_URL
-
 
 async def get_all_steps_latest(db: AsyncSession) -> list[dict[str, Any]]:
     """Получить все шаги с последней версией промпта."""
@@ -120,10 +117,9 @@ async def rollback_to_version(
 
 async def load_baselines(db: AsyncSession) -> list[PromptVersion]:
     """Загрузить baseline промпты из ML-сервиса."""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(f"{ML_URL}/manual/prompts/baseline")
-        response.raise_for_status()
-        data = response.json()
+    response = await get_ml_client().get("/manual/prompts/baseline")
+    response.raise_for_status()
+    data = response.json()
 
     created = []
     for baseline in data["prompts"]:
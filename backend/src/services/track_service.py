@@ -2,25 +2,37 @@
 Сервис для управления персонализированными треками.
 
 Предоставляет функции:
-- generate_track: Запуск генерации трека (background task, 202)
+- generate_track: Запуск генерации трека (задача в durable очереди, 202)
 - cancel_track: Остановка генерации (ставит статус cancelling)
 - generate_track_batch: Batch-генерация N треков
+- retry_track: Повтор генерации с первого невыполненного (или указанного) шага
+- JOB_HANDLERS / handle_dead_job: обработчики задач очереди generation_jobs
 - get_track / list_tracks: Чтение данных
 """
 
 import asyncio
+import base64
+import json
 import logging
 import uuid
 from datetime import datetime
 from typing import Optional
 
 import httpx
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import bindparam, delete, func, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from backend.src.core.config import settings
+from backend.src.core.database import BackgroundSessionLocal
 from backend.src.models.personalized_track import PersonalizedTrack
+from backend.src.models.generation_job import GenerationJob
+from backend.src.models.generation_log import GenerationLog
 from backend.src.models.student_profile import StudentProfile
+from backend.src.services.event_bus import publish_events, track_topic
+from backend.src.services.job_queue import RetryableJobError, enqueue_job
+from backend.src.services.manual_service import ALL_STEPS, STEP_DEPENDENCIES
+from backend.src.services.ml_client import get_ml_client
 from backend.src.schemas.track import (
     BatchGenerationStartedResponse,
     GenerationStartedResponse,
@@ -31,26 +43,144 @@ from backend.src.schemas.track import (
 
 logger = logging.getLogger(__name__)
 
-# Running background tasks: track_id → asyncio.Task
+# Running background tasks of this process: track_id / batch_id → asyncio.Task
 _running_tasks: dict[uuid.UUID, asyncio.Task] = {}
 
+# Треки batch, которые не генерируются заново (итог сохранён или отменён)
+_BATCH_SKIP_STATUSES = ("completed", "failed", "cancelled", "cancelling")
 
-def _make_session_factory() -> async_sessionmaker[AsyncSession]:
-    """Создаёт независимый session factory для background tasks."""
-    engine = create_async_engine(
-        settings.database_url,
-        echo=False,
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10,
-    )
-    return async_sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
+# Приоритеты задач очереди: одиночная генерация из UI важнее batch
+TRACK_JOB_PRIORITY = 10
+BATCH_JOB_PRIORITY = 0
+
+
+# Поля результата, которые пишет TrackStatusWriter (None — оставить как есть)
+_TRACK_RESULT_FIELDS = (
+    "track_data",
+    "generation_metadata",
+    "validation_b8",
+    "generation_duration_sec",
+    "error_message",
+)
+
+
+def _nullable_bind_type(column_type):
+    """JSONB по умолчанию пишет None как JSON null — для COALESCE нужен SQL NULL."""
+    if isinstance(column_type, postgresql.JSONB):
+        return postgresql.JSONB(none_as_null=True)
+    return column_type
+
+
+def _bulk_status_statement():
+    """UPDATE статусов по id для executemany: одна команда на все строки."""
+    table = PersonalizedTrack.__table__
+    return (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            status=bindparam("b_status"),
+            updated_at=bindparam("b_updated_at"),
+            **{
+                field: func.coalesce(
+                    bindparam(f"b_{field}", type_=_nullable_bind_type(table.c[field].type)),
+                    table.c[field],
+                )
+                for field in _TRACK_RESULT_FIELDS
+            },
+        )
     )
 
 
+class TrackStatusWriter:
+    """
+    Пакетная запись статусов и результатов треков (из background task).
+
+    Обновления копятся и применяются одной транзакцией: один UPDATE через
+    executemany (asyncpg — одним round-trip) и события track_status одним
+    pg_notify. Повторное обновление трека до flush заменяет предыдущее.
+    При flush_size запись идёт по мере поступления результатов; остаток
+    пишется при выходе из контекста.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        flush_size: int = 100,
+    ):
+        self.session_factory = session_factory
+        self.flush_size = flush_size
+        self._pending: dict[uuid.UUID, dict] = {}
+
+    async def add(
+        self,
+        track_id: uuid.UUID,
+        *,
+        status: str,
+        track_data: dict | None = None,
+        generation_metadata: dict | None = None,
+        validation_b8: dict | None = None,
+        generation_duration_sec: float | None = None,
+        error_message: str | None = None,
+    ) -> None:
+        """Добавить обновление трека; при flush_size накопленных — записать."""
+        self._pending.pop(track_id, None)
+        self._pending[track_id] = {
+            "b_id": track_id,
+            "b_status": status,
+            "b_updated_at": datetime.utcnow(),
+            "b_track_data": track_data,
+            "b_generation_metadata": generation_metadata,
+            "b_validation_b8": validation_b8,
+            "b_generation_duration_sec": generation_duration_sec,
+            "b_error_message": error_message,
+        }
+        if len(self._pending) >= self.flush_size:
+            await self.flush()
+
+    async def add_many(
+        self,
+        track_ids: list[uuid.UUID],
+        *,
+        status: str,
+        error_message: str | None = None,
+    ) -> None:
+        """Одинаковый статус для нескольких треков."""
+        for track_id in track_ids:
+            await self.add(track_id, status=status, error_message=error_message)
+
+    async def flush(self) -> int:
+        """
+        Записать накопленные обновления одной транзакцией.
+
+        Returns:
+            Число обновлённых треков
+        """
+        if not self._pending:
+            return 0
+        rows = list(self._pending.values())
+        self._pending.clear()
+
+        async with self.session_factory() as session:
+            await session.execute(_bulk_status_statement(), rows)
+            await publish_events(session, [
+                (track_topic(row["b_id"]), "track_status", {
+                    "status": row["b_status"],
+                    "error_message": row["b_error_message"],
+                    "duration_sec": row["b_generation_duration_sec"],
+                    "total_tokens": (row["b_generation_metadata"] or {}).get("total_tokens"),
+                })
+                for row in rows
+            ])
+            await session.commit()
+        return len(rows)
+
+    async def __aenter__(self) -> "TrackStatusWriter":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.flush()
+
+
 async def _update_track_status(
     session_factory: async_sessionmaker[AsyncSession],
     track_id: uuid.UUID,
@@ -62,54 +192,120 @@ async def _update_track_status(
     generation_duration_sec: float | None = None,
     error_message: str | None = None,
 ) -> None:
-    """Обновить статус трека в БД (из background task)."""
+    """Обновить статус трека в БД (из background task) и опубликовать track_status."""
+    async with TrackStatusWriter(session_factory) as writer:
+        await writer.add(
+            track_id,
+            status=status,
+            track_data=track_data,
+            generation_metadata=generation_metadata,
+            validation_b8=validation_b8,
+            generation_duration_sec=generation_duration_sec,
+            error_message=error_message,
+        )
+
+
+async def _get_track_status(
+    session_factory: async_sessionmaker[AsyncSession],
+    track_id: uuid.UUID,
+) -> str | None:
+    """Текущий статус трека в БД."""
     async with session_factory() as session:
-        values: dict = {
-            "status": status,
-            "updated_at": datetime.utcnow(),
-        }
-        if track_data is not None:
-            values["track_data"] = track_data
-        if generation_metadata is not None:
-            values["generation_metadata"] = generation_metadata
-        if validation_b8 is not None:
-            values["validation_b8"] = validation_b8
-        if generation_duration_sec is not None:
-            values["generation_duration_sec"] = generation_duration_sec
-        if error_message is not None:
-            values["error_message"] = error_message
-
-        await session.execute(
-            update(PersonalizedTrack)
-            .where(PersonalizedTrack.id == track_id)
-            .values(**values)
+        result = await session.execute(
+            select(PersonalizedTrack.status).where(PersonalizedTrack.id == track_id)
         )
-        await session.commit()
+        return result.scalar_one_or_none()
+
+
+async def _get_track_statuses(
+    session_factory: async_sessionmaker[AsyncSession],
+    track_ids: list[uuid.UUID],
+) -> dict[uuid.UUID, str]:
+    """Текущие статусы треков в БД (track_id → status)."""
+    async with session_factory() as session:
+        result = await session.execute(
+            select(PersonalizedTrack.id, PersonalizedTrack.status)
+            .where(PersonalizedTrack.id.in_(track_ids))
+        )
+        return {track_id: track_status for track_id, track_status in result.all()}
+
+
+def _resolve_step(step: str) -> str:
+    """B7 / B7_schedule → B7_schedule."""
+    for name in ALL_STEPS:
+        if step in (name, name.split("_", 1)[0]):
+            return name
+    raise ValueError(f"Unknown pipeline step: {step}")
+
+
+def _downstream_steps(step_name: str) -> set[str]:
+    """Шаг и все шаги, транзитивно зависящие от него."""
+    affected = {step_name}
+    for name in ALL_STEPS:
+        if any(dep in affected for dep in STEP_DEPENDENCIES[name]):
+            affected.add(name)
+    return affected
+
+
+async def _load_step_outputs(
+    session_factory: async_sessionmaker[AsyncSession],
+    track_id: uuid.UUID,
+) -> dict[str, dict]:
+    """Последние успешные результаты шагов трека из generation_logs."""
+    async with session_factory() as session:
+        result = await session.execute(
+            select(GenerationLog.step_name, GenerationLog.step_output)
+            .where(
+                GenerationLog.track_id == track_id,
+                GenerationLog.error_message.is_(None),
+            )
+            .order_by(GenerationLog.created_at)
+        )
+        return {name: output for name, output in result.all() if output}
 
 
 async def _run_generation(
     track_id: uuid.UUID,
     profile_data: dict,
     algorithm_version: str,
+    final_attempt: bool = True,
+    resume: bool = False,
+    from_step: str | None = None,
 ) -> None:
-    """Background task: вызывает ML pipeline и обновляет трек в БД."""
-    sf = _make_session_factory()
+    """
+    Задача очереди: вызывает ML pipeline и обновляет трек в БД.
+
+    Сетевые ошибки до ML на не последней попытке пробрасываются как
+    RetryableJobError — очередь повторит задачу с backoff.
+    При resume ML получает сохранённые результаты шагов и выполняет
+    только недостающие (POST /pipeline/resume).
+    """
+    sf = BackgroundSessionLocal
+
+    # Отменён, пока ждал в очереди
+    if await _get_track_status(sf, track_id) in ("cancelling", "cancelled"):
+        await _update_track_status(sf, track_id, status="cancelled")
+        logger.info(f"Track {track_id} cancelled before generation started")
+        return
 
     # Поставить статус running
     await _update_track_status(sf, track_id, status="running")
 
     try:
-        async with httpx.AsyncClient(timeout=600.0) as client:
-            response = await client.post(
-                f"{settings.ML_SERVICE_URL}/pipeline/run",
-                json={
-                    "profile": profile_data,
-                    "track_id": str(track_id),
-                    "algorithm_version": algorithm_version,
-                },
-            )
-            response.raise_for_status()
-            result_data = response.json()
+        request_data: dict = {
+            "profile": profile_data,
+            "track_id": str(track_id),
+            "algorithm_version": algorithm_version,
+        }
+        endpoint = "/pipeline/run"
+        if resume:
+            endpoint = "/pipeline/resume"
+            request_data["step_outputs"] = await _load_step_outputs(sf, track_id)
+            request_data["from_step"] = from_step
+
+        response = await get_ml_client().post(endpoint, json=request_data)
+        response.raise_for_status()
+        result_data = response.json()
 
         await _update_track_status(
             sf,
@@ -125,9 +321,24 @@ async def _run_generation(
         logger.info(f"Track {track_id} generation completed")
 
     except asyncio.CancelledError:
-        # Task was cancelled (from cancel_track)
-        await _update_track_status(sf, track_id, status="cancelled")
-        logger.info(f"Track {track_id} generation cancelled (task.cancel)")
+        if await _get_track_status(sf, track_id) == "cancelling":
+            # Task was cancelled (from cancel_track)
+            await _update_track_status(sf, track_id, status="cancelled")
+            logger.info(f"Track {track_id} generation cancelled (task.cancel)")
+        else:
+            # Воркер останавливается (деплой) — задача вернётся в очередь
+            await _update_track_status(sf, track_id, status="pending")
+            logger.info(f"Track {track_id} generation interrupted, requeued")
+            raise
+
+    except httpx.TransportError as e:
+        if not final_attempt:
+            await _update_track_status(sf, track_id, status="pending")
+            raise RetryableJobError(f"ML service unavailable: {e}") from e
+        await _update_track_status(
+            sf, track_id, status="failed", error_message=f"ML service unavailable: {e}"
+        )
+        logger.error(f"Track {track_id} generation failed: {e}")
 
     except httpx.HTTPStatusError as e:
         # ML вернул ошибку — проверяем, может это cancellation
@@ -161,72 +372,206 @@ async def _run_batch_generation(
     track_ids: list[uuid.UUID],
     profile_data: dict,
     algorithm_version: str,
+    final_attempt: bool = True,
 ) -> None:
-    """Background task: вызывает ML batch pipeline."""
-    sf = _make_session_factory()
+    """
+    Задача очереди: вызывает ML batch pipeline.
+
+    ML отдаёт результаты потоком NDJSON (строка на трек по мере готовности):
+    каждый трек сохраняется сразу, не дожидаясь самого медленного в batch.
+    Статусы пишутся TrackStatusWriter; ошибки, отмена и возврат в очередь
+    затрагивают только ещё не сохранённые треки. Повтор задачи генерирует
+    только треки, не сохранённые прошлыми попытками.
+    """
+    sf = BackgroundSessionLocal
+    writer = TrackStatusWriter(sf, flush_size=settings.TRACK_STATUS_FLUSH_SIZE)
+
+    # Повтор задачи: треки, сохранённые прошлой попыткой, не перезапускаются
+    statuses = await _get_track_statuses(sf, track_ids)
+    cancelling = [t for t in track_ids if statuses.get(t) == "cancelling"]
+    if cancelling:
+        await writer.add_many(cancelling, status="cancelled")
+    track_ids = [t for t in track_ids if statuses.get(t) not in _BATCH_SKIP_STATUSES]
+    remaining = set(track_ids)
+    if not track_ids:
+        await writer.flush()
+        _running_tasks.pop(batch_id, None)
+        logger.info(f"Batch {batch_id}: all tracks already finished")
+        return
 
     # Поставить статус running для всех треков
-    for tid in track_ids:
-        await _update_track_status(sf, tid, status="running")
+    await writer.add_many(track_ids, status="running")
+    await writer.flush()
 
     try:
-        async with httpx.AsyncClient(timeout=600.0) as client:
-            response = await client.post(
-                f"{settings.ML_SERVICE_URL}/pipeline/run-batch",
-                json={
-                    "profile": profile_data,
-                    "track_ids": [str(t) for t in track_ids],
-                    "algorithm_version": algorithm_version,
-                },
-            )
+        async with get_ml_client().stream(
+            "POST",
+            "/pipeline/run-batch",
+            json={
+                "profile": profile_data,
+                "track_ids": [str(t) for t in track_ids],
+                "algorithm_version": algorithm_version,
+            },
+            headers={"Accept": "application/x-ndjson"},
+        ) as response:
+            if response.is_error:
+                await response.aread()
             response.raise_for_status()
-            result_data = response.json()
-
-        # result_data.results — массив результатов по каждому треку
-        results = result_data.get("results", [])
-        for i, res in enumerate(results):
-            tid = track_ids[i] if i < len(track_ids) else None
-            if not tid:
-                continue
-            if res.get("status") == "cancelled":
-                await _update_track_status(sf, tid, status="cancelled")
-            elif res.get("error"):
-                await _update_track_status(
-                    sf, tid, status="failed", error_message=res["error"]
-                )
-            else:
-                await _update_track_status(
-                    sf,
-                    tid,
-                    status="completed",
-                    track_data=res.get("track_data", {}),
-                    generation_metadata=res.get("generation_metadata", {}),
-                    validation_b8=res.get("validation_b8"),
-                    generation_duration_sec=res.get("generation_metadata", {}).get(
-                        "total_duration_sec", 0
-                    ),
-                )
+            async for res in _iter_batch_results(response):
+                tid = _batch_result_track_id(res, track_ids)
+                if tid not in remaining:
+                    continue
+                await _add_batch_result(writer, tid, res)
+                await writer.flush()
+                remaining.discard(tid)
+
+        if remaining:
+            # Поток оборвался до итоговой строки
+            raise httpx.RemoteProtocolError(
+                f"batch stream ended without {len(remaining)} track results"
+            )
+        logger.info(f"Batch {batch_id} generation completed ({len(track_ids)} tracks)")
 
-        logger.info(f"Batch {batch_id} generation completed ({len(results)} tracks)")
+    except asyncio.CancelledError:
+        # Воркер останавливается (деплой) — задача вернётся в очередь
+        pending = [t for t in track_ids if t in remaining]
+        await writer.add_many(pending, status="pending")
+        await writer.flush()
+        logger.info(f"Batch {batch_id} generation interrupted, requeued")
+        raise
+
+    except httpx.TransportError as e:
+        pending = [t for t in track_ids if t in remaining]
+        if not final_attempt:
+            await writer.add_many(pending, status="pending")
+            await writer.flush()
+            raise RetryableJobError(f"ML service unavailable: {e}") from e
+        await writer.add_many(pending, status="failed", error_message=f"Batch error: {e}")
+        await writer.flush()
+        logger.error(f"Batch {batch_id} generation failed: {e}")
 
     except Exception as e:
-        # Mark all tracks as failed
-        for tid in track_ids:
-            await _update_track_status(
-                sf, tid, status="failed", error_message=f"Batch error: {e}"
-            )
+        # Mark unfinished tracks as failed
+        pending = [t for t in track_ids if t in remaining]
+        await writer.add_many(pending, status="failed", error_message=f"Batch error: {e}")
+        await writer.flush()
         logger.error(f"Batch {batch_id} generation failed: {e}")
 
     finally:
         _running_tasks.pop(batch_id, None)
 
 
+async def _iter_batch_results(response: httpx.Response):
+    """
+    Результаты треков из ответа /pipeline/run-batch.
+
+    NDJSON — по строке на трек по мере получения (итоговая строка done
+    пропускается); ответ application/json (ML без потоковой выдачи) — массив
+    results целиком.
+    """
+    if "application/x-ndjson" not in response.headers.get("content-type", ""):
+        await response.aread()
+        for i, res in enumerate(response.json().get("results", [])):
+            yield {"index": i, **res}
+        return
+    async for line in response.aiter_lines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not record.get("done"):
+            yield record
+
+
+def _batch_result_track_id(res: dict, track_ids: list[uuid.UUID]) -> uuid.UUID | None:
+    """Трек результата: по track_id записи, иначе по позиции в batch."""
+    if res.get("track_id"):
+        return uuid.UUID(str(res["track_id"]))
+    index = res.get("index")
+    if isinstance(index, int) and 0 <= index < len(track_ids):
+        return track_ids[index]
+    return None
+
+
+async def _add_batch_result(writer: TrackStatusWriter, track_id: uuid.UUID, res: dict) -> None:
+    """Добавить в writer итог одного трека из ответа batch pipeline."""
+    if res.get("status") == "cancelled":
+        await writer.add(track_id, status="cancelled")
+    elif res.get("error"):
+        await writer.add(track_id, status="failed", error_message=res["error"])
+    else:
+        await writer.add(
+            track_id,
+            status="completed",
+            track_data=res.get("track_data", {}),
+            generation_metadata=res.get("generation_metadata", {}),
+            validation_b8=res.get("validation_b8"),
+            generation_duration_sec=res.get("generation_metadata", {}).get(
+                "total_duration_sec", 0
+            ),
+        )
+
+
+async def _handle_track_job(job: GenerationJob) -> None:
+    """Обработчик задачи kind=track."""
+    payload = job.payload
+    track_id = uuid.UUID(payload["track_id"])
+    task = asyncio.create_task(
+        _run_generation(
+            track_id,
+            payload["profile"],
+            payload["algorithm_version"],
+            final_attempt=job.attempts >= job.max_attempts,
+            # Повтор после сбоя тоже продолжает с уже выполненных шагов
+            resume=payload.get("resume", False) or job.attempts > 1,
+            from_step=payload.get("from_step"),
+        )
+    )
+    # cancel_track на этой реплике отменит task; на других — ML увидит cancelling
+    _running_tasks[track_id] = task
+    await task
+
+
+async def _handle_batch_job(job: GenerationJob) -> None:
+    """Обработчик задачи kind=batch."""
+    payload = job.payload
+    batch_id = uuid.UUID(payload["batch_id"])
+    task = asyncio.create_task(
+        _run_batch_generation(
+            batch_id,
+            [uuid.UUID(t) for t in payload["track_ids"]],
+            payload["profile"],
+            payload["algorithm_version"],
+            final_attempt=job.attempts >= job.max_attempts,
+        )
+    )
+    _running_tasks[batch_id] = task
+    await task
+
+
+async def handle_dead_job(job: GenerationJob) -> None:
+    """Воркер пропал на последней попытке: пометить треки задачи failed."""
+    payload = job.payload
+    track_ids = payload.get("track_ids") or [payload["track_id"]]
+    async with TrackStatusWriter(BackgroundSessionLocal) as writer:
+        await writer.add_many(
+            [uuid.UUID(tid) for tid in track_ids],
+            status="failed",
+            error_message="Generation worker lost (visibility timeout expired)",
+        )
+
+
+JOB_HANDLERS = {
+    "track": _handle_track_job,
+    "batch": _handle_batch_job,
+}
+
+
 async def generate_track(
     profile_id: uuid.UUID,
     db: AsyncSession,
 ) -> GenerationStartedResponse:
     """
-    Создаёт трек и запускает генерацию в background task.
+    Создаёт трек и ставит задачу генерации в очередь.
     Возвращает 202 сразу.
     """
     from backend.src.models.student_profile import StudentProfile
@@ -248,15 +593,21 @@ async def generate_track(
         status="pending",
     )
     db.add(track)
+    # Задача в той же транзакции: трек без задачи (и наоборот) не появится
+    enqueue_job(
+        db,
+        "track",
+        {
+            "track_id": str(track.id),
+            "profile": profile.data,
+            "algorithm_version": "v1.0",
+        },
+        subject_id=track.id,
+        priority=TRACK_JOB_PRIORITY,
+    )
     await db.commit()
     await db.refresh(track)
 
-    # Запустить background task
-    task = asyncio.create_task(
-        _run_generation(track.id, profile.data, "v1.0")
-    )
-    _running_tasks[track.id] = task
-
     return GenerationStartedResponse(
         track_id=track.id,
         status="pending",
@@ -270,7 +621,7 @@ async def generate_track_batch(
     db: AsyncSession,
 ) -> BatchGenerationStartedResponse:
     """
-    Создаёт N треков с общим batch_id и запускает batch pipeline.
+    Создаёт N треков с общим batch_id и ставит batch pipeline в очередь.
     """
     from backend.src.models.student_profile import StudentProfile
 
@@ -299,13 +650,19 @@ async def generate_track_batch(
         db.add(track)
         track_ids.append(track.id)
 
-    await db.commit()
-
-    # Запустить background task для batch
-    task = asyncio.create_task(
-        _run_batch_generation(batch_id, track_ids, profile.data, "v1.0")
+    enqueue_job(
+        db,
+        "batch",
+        {
+            "batch_id": str(batch_id),
+            "track_ids": [str(t) for t in track_ids],
+            "profile": profile.data,
+            "algorithm_version": "v1.0",
+        },
+        subject_id=batch_id,
+        priority=BATCH_JOB_PRIORITY,
     )
-    _running_tasks[batch_id] = task
+    await db.commit()
 
     return BatchGenerationStartedResponse(
         batch_id=batch_id,
@@ -315,13 +672,80 @@ async def generate_track_batch(
     )
 
 
+async def retry_track(
+    track_id: uuid.UUID,
+    db: AsyncSession,
+    from_step: str | None = None,
+) -> GenerationStartedResponse:
+    """
+    Повторяет генерацию трека, переиспользуя выполненные шаги.
+
+    Без from_step ML продолжит с первого шага без сохранённого результата;
+    с from_step — пересчитает этот шаг и всё, что от него зависит.
+    """
+    result = await db.execute(
+        select(PersonalizedTrack).where(PersonalizedTrack.id == track_id)
+    )
+    track = result.scalar_one_or_none()
+
+    if not track:
+        raise ValueError(f"Track {track_id} not found")
+
+    allowed = ("failed", "cancelled", "completed") if from_step else ("failed", "cancelled")
+    if track.status not in allowed:
+        raise ValueError(f"Cannot retry track in status '{track.status}'")
+
+    step_name = _resolve_step(from_step) if from_step else None
+
+    profile_result = await db.execute(
+        select(StudentProfile).where(StudentProfile.id == track.profile_id)
+    )
+    profile = profile_result.scalar_one_or_none()
+    if not profile:
+        raise ValueError(f"Profile {track.profile_id} not found")
+
+    if step_name:
+        # Логи пересчитываемых шагов больше не актуальны (и не должны попасть в прогресс)
+        await db.execute(
+            delete(GenerationLog).where(
+                GenerationLog.track_id == track_id,
+                GenerationLog.step_name.in_(_downstream_steps(step_name)),
+            )
+        )
+
+    track.status = "pending"
+    track.error_message = None
+    track.updated_at = datetime.utcnow()
+    enqueue_job(
+        db,
+        "track",
+        {
+            "track_id": str(track_id),
+            "profile": profile.data,
+            "algorithm_version": track.algorithm_version,
+            "resume": True,
+            "from_step": step_name,
+        },
+        subject_id=track_id,
+        priority=TRACK_JOB_PRIORITY,
+    )
+    await db.commit()
+
+    return GenerationStartedResponse(
+        track_id=track_id,
+        status="pending",
+        progress_url=f"/api/tracks/{track_id}/progress",
+    )
+
+
 async def cancel_track(
     track_id: uuid.UUID,
     db: AsyncSession,
 ) -> bool:
     """
     Отменяет генерацию трека.
-    Ставит статус cancelling — ML проверит между шагами.
+    Ставит статус cancelling — ML проверит между шагами,
+    воркер очереди не запустит ещё не начатую генерацию.
     """
     result = await db.execute(
         select(PersonalizedTrack).where(PersonalizedTrack.id == track_id)
@@ -346,11 +770,74 @@ async def cancel_track(
     return True
 
 
+# Ключи track_data (результаты шагов B1-B8), которые можно запросить через ?fields=
+TRACK_DATA_FIELDS = (
+    "validated_profile",
+    "competency_set",
+    "ksa_matrix",
+    "learning_units",
+    "hierarchy",
+    "lesson_blueprints",
+    "schedule",
+    "validation",
+)
+# JSONB-колонки трека, которые тоже можно запросить через ?fields=
+TRACK_JSONB_FIELDS = ("generation_metadata", "validation_b8")
+
+# Колонки трека без тяжёлых JSONB — всегда в ответе
+_TRACK_CORE_COLUMNS = (
+    PersonalizedTrack.id,
+    PersonalizedTrack.profile_id,
+    PersonalizedTrack.qa_report_id,
+    PersonalizedTrack.algorithm_version,
+    PersonalizedTrack.status,
+    PersonalizedTrack.error_message,
+    PersonalizedTrack.generation_duration_sec,
+    PersonalizedTrack.batch_id,
+    PersonalizedTrack.batch_index,
+    PersonalizedTrack.created_at,
+    PersonalizedTrack.updated_at,
+)
+
+TRACK_COUNT_MODES = ("exact", "estimate", "none")
+
+
+def parse_track_fields(fields: str | None) -> list[str] | None:
+    """
+    Разбирает ?fields=schedule,validation.
+
+    Raises:
+        ValueError: Неизвестное поле
+    """
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in TRACK_DATA_FIELDS + TRACK_JSONB_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Allowed: {', '.join(TRACK_DATA_FIELDS + TRACK_JSONB_FIELDS)}"
+        )
+    return names
+
+
 async def get_track(
     track_id: uuid.UUID,
     db: AsyncSession,
+    fields: list[str] | None = None,
 ) -> Optional[TrackDetail]:
-    """Получает детальную информацию о треке."""
+    """
+    Получает детальную информацию о треке.
+
+    Args:
+        track_id: UUID трека
+        db: Сессия базы данных
+        fields: Только эти ключи track_data / JSONB-колонки (parse_track_fields);
+            None — трек целиком
+    """
+    if fields is not None:
+        return await _get_track_projection(track_id, db, fields)
+
     result = await db.execute(
         select(PersonalizedTrack).where(PersonalizedTrack.id == track_id)
     )
@@ -376,60 +863,151 @@ async def get_track(
     )
 
 
+async def _get_track_projection(
+    track_id: uuid.UUID,
+    db: AsyncSession,
+    fields: list[str],
+) -> Optional[TrackDetail]:
+    """Трек с частью track_data: ключи JSONB извлекаются в SQL (track_data -> 'key')."""
+    data_fields = [name for name in fields if name in TRACK_DATA_FIELDS]
+    jsonb_fields = [name for name in fields if name in TRACK_JSONB_FIELDS]
+    columns = [
+        *_TRACK_CORE_COLUMNS,
+        *(PersonalizedTrack.track_data[name].label(f"track_data.{name}") for name in data_fields),
+        *(getattr(PersonalizedTrack, name) for name in jsonb_fields),
+    ]
+
+    result = await db.execute(select(*columns).where(PersonalizedTrack.id == track_id))
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    values = dict(row._mapping)
+    track_data = {
+        name: values[f"track_data.{name}"]
+        for name in data_fields
+        if values[f"track_data.{name}"] is not None
+    }
+    core = {column.key: values[column.key] for column in _TRACK_CORE_COLUMNS}
+    extra = {name: values[name] for name in jsonb_fields}
+    if "validation_b8" in extra:
+        extra["validation_b8"] = extra["validation_b8"] or {}
+    return TrackDetail(**core, track_data=track_data, **extra)
+
+
+def encode_track_cursor(created_at: datetime, track_id: uuid.UUID) -> str:
+    """Курсор keyset-пагинации: позиция последнего трека страницы."""
+    raw = f"{created_at.isoformat()}|{track_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_track_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Разбирает курсор encode_track_cursor.
+
+    Raises:
+        ValueError: Невалидный курсор
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, track_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(track_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def _estimate_count(db: AsyncSession, query) -> int:
+    """Оценка числа строк по плану PostgreSQL (EXPLAIN) — без прохода по таблице."""
+    sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
 async def list_tracks(
     db: AsyncSession,
     profile_id: Optional[uuid.UUID] = None,
     status: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    count: str = "exact",
 ) -> TrackListResponse:
-    """Получает список треков с фильтрацией."""
-    query = select(PersonalizedTrack)
-
-    if profile_id:
-        query = query.where(PersonalizedTrack.profile_id == profile_id)
-    if status:
-        query = query.where(PersonalizedTrack.status == status)
-
-    query = query.order_by(PersonalizedTrack.created_at.desc())
-    query = query.limit(limit).offset(offset)
-
-    result = await db.execute(query)
-    tracks = result.scalars().all()
+    """
+    Получает список треков с фильтрацией.
+
+    Читает только колонки TrackSummary (topic — JOIN со student_profiles),
+    без track_data / generation_metadata / validation_b8.
+
+    Args:
+        db: Сессия базы данных
+        profile_id: Фильтр по профилю
+        status: Фильтр по статусу
+        limit: Размер страницы
+        offset: Смещение (игнорируется, если передан cursor)
+        cursor: next_cursor предыдущей страницы — keyset-пагинация
+        count: exact — COUNT(*), estimate — оценка планировщика, none — без total
+
+    Raises:
+        ValueError: Невалидный cursor или count
+    """
+    if count not in TRACK_COUNT_MODES:
+        raise ValueError(f"Invalid count mode: {count}. Allowed: {', '.join(TRACK_COUNT_MODES)}")
 
-    from sqlalchemy import func
-    count_query = select(PersonalizedTrack)
+    filters = []
     if profile_id:
-        count_query = count_query.where(PersonalizedTrack.profile_id == profile_id)
+        filters.append(PersonalizedTrack.profile_id == profile_id)
     if status:
-        count_query = count_query.where(PersonalizedTrack.status == status)
-
-    count_result = await db.execute(select(func.count()).select_from(count_query.subquery()))
-    total = count_result.scalar() or 0
-
-    # Загружаем профили для получения topic
-    profile_ids = list({t.profile_id for t in tracks if t.profile_id})
-    profile_topics: dict[uuid.UUID, str] = {}
-    if profile_ids:
-        profiles_result = await db.execute(
-            select(StudentProfile.id, StudentProfile.topic).where(StudentProfile.id.in_(profile_ids))
+        filters.append(PersonalizedTrack.status == status)
+
+    query = (
+        select(
+            PersonalizedTrack.id,
+            PersonalizedTrack.profile_id,
+            StudentProfile.topic,
+            PersonalizedTrack.status,
+            PersonalizedTrack.algorithm_version,
+            PersonalizedTrack.generation_duration_sec,
+            PersonalizedTrack.created_at,
         )
-        profile_topics = {row[0]: row[1] for row in profiles_result.all()}
-
-    items = [
-        TrackSummary(
-            id=track.id,
-            profile_id=track.profile_id,
-            topic=profile_topics.get(track.profile_id),
-            status=track.status,
-            algorithm_version=track.algorithm_version,
-            generation_duration_sec=track.generation_duration_sec,
-            created_at=track.created_at,
+        .outerjoin(StudentProfile, StudentProfile.id == PersonalizedTrack.profile_id)
+        .where(*filters)
+        .order_by(PersonalizedTrack.created_at.desc(), PersonalizedTrack.id.desc())
+    )
+    if cursor:
+        after_created_at, after_id = decode_track_cursor(cursor)
+        query = query.where(
+            tuple_(PersonalizedTrack.created_at, PersonalizedTrack.id)
+            < tuple_(after_created_at, after_id)
         )
-        for track in tracks
-    ]
+    elif offset:
+        query = query.offset(offset)
+
+    # +1 строка — узнать, есть ли следующая страница
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [TrackSummary.model_validate(dict(row._mapping)) for row in rows]
+    next_cursor = (
+        encode_track_cursor(rows[-1].created_at, rows[-1].id) if has_more and rows else None
+    )
+
+    total: int | None = None
+    if count == "exact":
+        count_result = await db.execute(
+            select(func.count()).select_from(PersonalizedTrack).where(*filters)
+        )
+        total = count_result.scalar() or 0
+    elif count == "estimate":
+        total = await _estimate_count(db, select(PersonalizedTrack.id).where(*filters))
 
     return TrackListResponse(
         tracks=items,
         total=total,
+        total_is_estimate=count == "estimate",
+        next_cursor=next_cursor,
     )
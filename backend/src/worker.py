@@ -0,0 +1,41 @@
+"""
+Отдельный процесс-воркер очереди генерации.
+
+Запуск: python -m backend.src.worker
+Позволяет масштабировать генерацию независимо от API-реплик
+(у которых можно выставить JOB_WORKERS=0).
+"""
+
+import asyncio
+import logging
+import signal
+
+from backend.src.core.database import dispose_engines
+from backend.src.services.job_queue import start_job_workers, stop_job_workers
+from backend.src.services.ml_client import close_ml_client
+from backend.src.services.track_service import JOB_HANDLERS, handle_dead_job
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    """Запускает пул воркеров и ждёт SIGTERM / SIGINT."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    pool = await start_job_workers(JOB_HANDLERS, on_dead=handle_dead_job)
+    if pool is None:
+        logger.error("JOB_WORKERS=0: nothing to run")
+        return
+
+    await stop.wait()
+    await stop_job_workers()
+    await close_ml_client()
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
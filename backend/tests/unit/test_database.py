@@ -0,0 +1,53 @@
+"""
+Тесты для core/database: общие engine процесса, режим PgBouncer, метрики пулов.
+
+Соединения с БД не открываются.
+"""
+
+from sqlalchemy.pool import NullPool
+
+from backend.src.core import database
+from backend.src.core.config import settings
+
+
+class TestEngines:
+    """Тесты настройки engine."""
+
+    def test_pool_sizes_from_settings(self):
+        stats = database.get_pool_stats()
+
+        assert stats["api"]["max_connections"] == settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        assert stats["background"]["size"] == settings.BACKGROUND_DB_POOL_SIZE
+        assert stats["background"]["saturation"] == 0.0
+
+    def test_background_sessions_share_engine(self):
+        from backend.src.services import track_service
+
+        assert track_service.BackgroundSessionLocal is database.BackgroundSessionLocal
+        assert database.BackgroundSessionLocal.kw["bind"] is database.background_engine
+
+    def test_pgbouncer_mode_uses_null_pool(self, monkeypatch):
+        monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+
+        engine = database._create_engine("test", 5, 5)
+
+        assert isinstance(engine.pool, NullPool)
+        database._pool_counters.pop("test", None)
+        database._pool_capacity.pop("test", None)
+
+
+class TestListenDsn:
+    """Тесты DSN для LISTEN-соединения шины событий."""
+
+    def test_defaults_to_engine_address(self, monkeypatch):
+        monkeypatch.setattr(settings, "DB_LISTEN_URL", "")
+
+        assert settings.listen_dsn == settings.asyncpg_dsn
+
+    def test_direct_url_bypasses_pgbouncer(self, monkeypatch):
+        from backend.src.services.event_bus import EventBus
+
+        monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+        monkeypatch.setattr(settings, "DB_LISTEN_URL", "postgresql+asyncpg://u:p@postgres:5432/db")
+
+        assert EventBus().dsn == "postgresql://u:p@postgres:5432/db"
@@ -0,0 +1,133 @@
+"""
+Тесты для event_bus и push-прогресса SSE (_TrackProgress).
+
+Используют локальную доставку (EventBus.dispatch) — не требуют БД.
+"""
+
+import json
+import uuid
+from unittest.mock import AsyncMock
+
+from backend.src.services.event_bus import EventBus, publish_event, publish_events, track_topic
+
+
+def _event(topic: str, event_id: str, event_type: str = "step_completed", **data) -> dict:
+    return {"id": event_id, "topic": topic, "type": event_type, "data": data}
+
+
+class TestEventBus:
+    """Тесты локальной раздачи, буфера и replay."""
+
+    async def test_subscriber_receives_only_its_topics(self):
+        bus = EventBus(dsn="postgresql://unused")
+        async with bus.subscribe(["track:a"]) as sub:
+            bus.dispatch(_event("track:b", "1"))
+            bus.dispatch(_event("track:a", "2", step_name="B1_validate"))
+
+            event = await sub.get(timeout=0.1)
+            assert event["id"] == "2"
+            assert await sub.get(timeout=0.01) is None
+
+        assert bus.get_stats()["subscribers"] == 0
+
+    def test_replay_after_last_event_id(self):
+        bus = EventBus(dsn="postgresql://unused")
+        for i in range(1, 5):
+            bus.dispatch(_event("track:a", f"100{i}"))
+
+        replayed = bus.replay(["track:a"], "1002")
+        assert [e["id"] for e in replayed] == ["1003", "1004"]
+
+    def test_replay_unknown_id_requires_snapshot(self):
+        bus = EventBus(dsn="postgresql://unused", buffer_size=2)
+        for i in range(1, 5):
+            bus.dispatch(_event("track:a", f"100{i}"))
+
+        assert bus.replay(["track:a"], "1001") is None  # вытеснен из буфера
+        assert bus.last_event_id(["track:a"]) == "1004"
+
+    async def test_overflow_turns_into_resync(self):
+        bus = EventBus(dsn="postgresql://unused", subscriber_queue_size=2)
+        async with bus.subscribe(["track:a"]) as sub:
+            for i in range(5):
+                bus.dispatch(_event("track:a", str(i)))
+
+            event = await sub.get(timeout=0.1)
+            assert event["type"] == "resync"
+            assert await sub.get(timeout=0.01) is None
+
+    async def test_publish_uses_pg_notify_in_session(self):
+        session = AsyncMock()
+        await publish_event(session, track_topic("t1"), "track_status", {"status": "running"})
+
+        stmt = session.execute.await_args.args[0]
+        params = stmt.compile().params
+        payload = json.loads(next(v for v in params.values() if str(v).startswith("{")))
+        assert payload["topic"] == "track:t1"
+        assert payload["data"] == {"status": "running"}
+
+    async def test_publish_events_in_one_statement(self):
+        session = AsyncMock()
+        await publish_events(session, [
+            (track_topic("t1"), "step_completed", {"step_name": "B1_validate"}),
+            (track_topic("t2"), "step_completed", {"step_name": "B2_competencies"}),
+        ])
+
+        session.execute.assert_awaited_once()
+        payloads = [json.loads(p) for p in session.execute.await_args.args[1]["payloads"]]
+        assert [p["topic"] for p in payloads] == ["track:t1", "track:t2"]
+
+        session.execute.reset_mock()
+        await publish_events(session, [])
+        session.execute.assert_not_awaited()
+
+
+class TestTrackProgress:
+    """Тесты преобразования событий шины в SSE-события фронтенда."""
+
+    def test_parallel_steps_reported_running_together(self):
+        from backend.src.api.tracks import _TrackProgress
+
+        progress = _TrackProgress(uuid.uuid4())
+        progress.apply_snapshot({"status": "running", "logs": []}, None)
+        chunks: list[str] = []
+        for i, step in enumerate(["B1_validate", "B2_competencies", "B3_ksa_matrix", "B4_learning_units"]):
+            chunks = progress.apply(_event("t", str(i), step_name=step, tokens_used=1))
+
+        running = [c for c in chunks if '"status": "running"' in c]
+        assert len(running) == 2
+        assert '"step": "B5"' in running[0] and '"step": "B6"' in running[1]
+
+    def test_duplicate_step_from_snapshot_and_event_sent_once(self):
+        from backend.src.api.tracks import _TrackProgress
+
+        progress = _TrackProgress(uuid.uuid4())
+        progress.apply_snapshot({
+            "status": "running",
+            "logs": [{"step_name": "B1_validate", "tokens_used": 5, "summary": {}}],
+        }, "1")
+
+        assert progress.apply(_event("t", "2", step_name="B1_validate")) == []
+
+    def test_failed_status_finishes_with_failed_step(self):
+        from backend.src.api.tracks import _TrackProgress
+
+        progress = _TrackProgress(uuid.uuid4())
+        progress.apply(_event("t", "1", step_name="B1_validate"))
+        chunks = progress.apply(_event("t", "2", "track_status", status="failed", error_message="boom"))
+
+        assert progress.finished
+        assert chunks[0].startswith("event: error\nid: 2\n")
+        assert '"failed_step": "B2"' in chunks[0]
+
+    def test_batch_mode_tags_track_and_skips_terminal_events(self):
+        from backend.src.api.tracks import _TrackProgress
+
+        track_id = uuid.uuid4()
+        progress = _TrackProgress(track_id, batch_index=1)
+        chunks = progress.apply(_event("t", "1", step_name="B1_validate"))
+        assert f'"track_id": "{track_id}"' in chunks[0]
+        assert '"batch_index": 1' in chunks[0]
+
+        assert progress.apply(_event("t", "2", "track_status", status="completed")) == []
+        assert progress.finished
@@ -0,0 +1,237 @@
+"""
+Тесты для job_queue: пул воркеров, retry/backoff, release при остановке,
+постановка задач из track_service.
+
+Используют фейковую очередь — не требуют БД.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from backend.src.models.generation_job import GenerationJob
+from backend.src.services.job_queue import (
+    JobQueue,
+    JobWorkerPool,
+    RetryableJobError,
+    retry_delay,
+)
+
+
+def _job(kind: str = "track", attempts: int = 1, max_attempts: int = 3) -> GenerationJob:
+    return GenerationJob(
+        id=uuid.uuid4(),
+        kind=kind,
+        payload={},
+        attempts=attempts,
+        max_attempts=max_attempts,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+@pytest.fixture
+def fake_queue():
+    """JobQueue с замоканными операциями БД."""
+    queue = MagicMock()
+    queue.worker_id = "test:1"
+    queue.visibility_timeout_sec = 120
+    queue.complete = AsyncMock()
+    queue.release = AsyncMock()
+    queue.heartbeat = AsyncMock()
+    queue.fail = AsyncMock(return_value=True)
+    return queue
+
+
+class TestRetryDelay:
+    """Тесты экспоненциального backoff."""
+
+    def test_doubles_and_caps(self):
+        assert retry_delay(1, 10, 600) == 10
+        assert retry_delay(2, 10, 600) == 20
+        assert retry_delay(3, 10, 600) == 40
+        assert retry_delay(10, 10, 600) == 600
+
+
+class TestJobWorkerPool:
+    """Тесты JobWorkerPool.process."""
+
+    async def test_success_completes_job(self, fake_queue):
+        handler = AsyncMock()
+        pool = JobWorkerPool(fake_queue, {"track": handler})
+        job = _job()
+
+        await pool.process(job)
+
+        handler.assert_awaited_once_with(job)
+        fake_queue.complete.assert_awaited_once_with(job)
+        assert pool.get_stats()["succeeded"] == 1
+
+    async def test_handler_error_goes_to_retry(self, fake_queue):
+        pool = JobWorkerPool(
+            fake_queue, {"track": AsyncMock(side_effect=RetryableJobError("ML down"))}
+        )
+        job = _job()
+
+        await pool.process(job)
+
+        fake_queue.fail.assert_awaited_once_with(job, "ML down")
+        fake_queue.complete.assert_not_awaited()
+        assert pool.get_stats()["retried"] == 1
+
+    async def test_unknown_kind_fails_without_retry(self, fake_queue):
+        fake_queue.fail = AsyncMock(return_value=False)
+        pool = JobWorkerPool(fake_queue, {})
+        job = _job(kind="unknown")
+
+        await pool.process(job)
+
+        fake_queue.fail.assert_awaited_once()
+        assert fake_queue.fail.await_args.kwargs["retryable"] is False
+        assert job.attempts == 1
+        assert pool.get_stats()["failed"] == 1
+
+    async def test_cancelled_worker_releases_job(self, fake_queue):
+        started = asyncio.Event()
+
+        async def slow_handler(job):
+            started.set()
+            await asyncio.sleep(10)
+
+        pool = JobWorkerPool(fake_queue, {"track": slow_handler})
+        job = _job()
+        task = asyncio.create_task(pool.process(job))
+        await started.wait()
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        fake_queue.release.assert_awaited_once_with(job)
+        fake_queue.complete.assert_not_awaited()
+
+    async def test_stop_drains_workers(self, fake_queue):
+        fake_queue.claim = AsyncMock(return_value=None)
+        fake_queue.reap_expired = AsyncMock(return_value=[])
+        pool = JobWorkerPool(fake_queue, {}, concurrency=3, poll_interval_sec=0.01)
+
+        await pool.start()
+        await asyncio.sleep(0.03)
+        assert pool.get_stats()["workers"] == 3
+        await pool.stop()
+
+        assert pool.get_stats()["workers"] == 0
+        assert fake_queue.claim.await_count >= 3
+
+    async def test_stale_claim_not_counted_as_success(self, fake_queue):
+        fake_queue.complete = AsyncMock(return_value=False)
+        pool = JobWorkerPool(fake_queue, {"track": AsyncMock()})
+
+        await pool.process(_job())
+
+        assert pool.get_stats()["succeeded"] == 0
+
+
+def _queue_with_session(rowcount: int):
+    """JobQueue с фейковой сессией, которая запоминает выполненные запросы."""
+    result = MagicMock()
+    result.rowcount = rowcount
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    session.commit = AsyncMock()
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return JobQueue(session_factory, worker_id="host:1"), session
+
+
+class TestJobQueueOwnership:
+    """Тесты токена claim: устаревший владелец не меняет задачу."""
+
+    @pytest.mark.parametrize("operation", ["heartbeat", "complete", "release", "fail"])
+    async def test_updates_require_current_claim(self, operation):
+        queue, session = _queue_with_session(rowcount=1)
+        job = _job(attempts=2)
+
+        args = (job, "boom") if operation == "fail" else (job,)
+        await getattr(queue, operation)(*args)
+
+        stmt = session.execute.await_args.args[0]
+        params = stmt.compile().params
+        where = str(stmt.whereclause)
+        assert "generation_jobs.status" in where
+        assert "generation_jobs.locked_by" in where
+        assert "generation_jobs.attempts" in where
+        assert "running" in params.values()
+        assert "host:1" in params.values()
+        assert 2 in params.values()
+
+    async def test_stale_claim_is_ignored(self):
+        queue, _ = _queue_with_session(rowcount=0)
+        job = _job(attempts=1)
+
+        assert await queue.complete(job) is False
+        assert await queue.heartbeat(job) is False
+        assert await queue.fail(job, "boom") is False
+
+
+class TestTrackJobs:
+    """Тесты интеграции track_service с очередью."""
+
+    async def test_generate_track_enqueues_job(self):
+        from backend.src.services.track_service import TRACK_JOB_PRIORITY, generate_track
+
+        profile = MagicMock()
+        profile.data = {"topic": "Python"}
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = profile
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=result)
+        db.commit = AsyncMock()
+        db.refresh = AsyncMock()
+
+        response = await generate_track(uuid.uuid4(), db)
+
+        jobs = [c.args[0] for c in db.add.call_args_list if isinstance(c.args[0], GenerationJob)]
+        assert len(jobs) == 1
+        assert jobs[0].kind == "track"
+        assert jobs[0].subject_id == response.track_id
+        assert jobs[0].priority == TRACK_JOB_PRIORITY
+        assert jobs[0].payload["profile"] == {"topic": "Python"}
+
+    @patch("backend.src.services.track_service._update_track_status", new_callable=AsyncMock)
+    @patch("backend.src.services.track_service._get_track_status", new_callable=AsyncMock)
+    @patch("backend.src.services.track_service.BackgroundSessionLocal")
+    async def test_ml_unavailable_is_retryable_until_final_attempt(
+        self, mock_sf, mock_status, mock_update
+    ):
+        from backend.src.services import track_service
+
+        mock_status.return_value = "pending"
+        client = MagicMock()
+        client.post = AsyncMock(side_effect=httpx.ConnectError("refused"))
+
+        with patch("backend.src.services.track_service.get_ml_client", return_value=client):
+            with pytest.raises(RetryableJobError):
+                await track_service._run_generation(uuid.uuid4(), {}, "v1.0", final_attempt=False)
+            assert mock_update.await_args.kwargs["status"] == "pending"
+
+            await track_service._run_generation(uuid.uuid4(), {}, "v1.0", final_attempt=True)
+            assert mock_update.await_args.kwargs["status"] == "failed"
+
+    @patch("backend.src.services.track_service._update_track_status", new_callable=AsyncMock)
+    @patch("backend.src.services.track_service._get_track_status", new_callable=AsyncMock)
+    @patch("backend.src.services.track_service.BackgroundSessionLocal")
+    async def test_cancelled_while_queued_skips_ml(self, mock_sf, mock_status, mock_update):
+        from backend.src.services import track_service
+
+        mock_status.return_value = "cancelling"
+
+        with patch("backend.src.services.track_service.get_ml_client") as mock_client:
+            await track_service._run_generation(uuid.uuid4(), {}, "v1.0")
+
+        mock_client.assert_not_called()
+        assert mock_update.await_args.kwargs["status"] == "cancelled"
@@ -0,0 +1,79 @@
+"""
+Тесты для ml_client: общий клиент ML-сервиса, таймауты endpoint'ов, метрики.
+
+Используют httpx.MockTransport — не требуют ML сервис.
+"""
+
+import httpx
+import pytest
+
+from backend.src.core.config import settings
+from backend.src.services import ml_client
+from backend.src.services.ml_client import MLServiceClient, endpoint_timeout
+
+
+def _echo_timeouts(seen: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.url.path, request.extensions["timeout"]["read"]))
+        if request.url.path == "/broken":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    return handler
+
+
+class TestMLServiceClient:
+    """Тесты запросов через общий клиент."""
+
+    async def test_endpoint_timeouts(self):
+        seen: list = []
+        client = MLServiceClient("http://ml", transport=httpx.MockTransport(_echo_timeouts(seen)))
+
+        await client.post("/pipeline/run", json={})
+        await client.post("/manual/render-prompt", json={})
+        await client.post("/manual/evaluate", json={}, timeout=60.0)
+        await client.aclose()
+
+        assert seen == [
+            ("/pipeline/run", 600.0),
+            ("/manual/render-prompt", settings.ML_TIMEOUT_SEC),
+            ("/manual/evaluate", 60.0),
+        ]
+
+    async def test_stats_per_endpoint(self):
+        client = MLServiceClient("http://ml", transport=httpx.MockTransport(_echo_timeouts([])))
+
+        await client.get("/health")
+        await client.get("/health")
+        with pytest.raises(httpx.ConnectError):
+            await client.post("/broken")
+        await client.aclose()
+
+        stats = client.get_stats()
+        assert (stats["requests"], stats["errors"]) == (3, 1)
+        assert stats["endpoints"]["/health"]["requests"] == 2
+        assert stats["endpoints"]["/broken"]["errors"] == 1
+
+    def test_http2_falls_back_without_h2(self, monkeypatch):
+        monkeypatch.setattr(settings, "ML_HTTP2", True)
+        monkeypatch.setattr(ml_client, "_h2_available", lambda: False)
+
+        assert MLServiceClient("http://ml").http2 is False
+
+    def test_unknown_endpoint_uses_default_timeout(self):
+        assert endpoint_timeout("/manual/processors") == 10.0
+        assert endpoint_timeout("/nope") == settings.ML_TIMEOUT_SEC
+
+
+class TestSharedClient:
+    """Тесты общего клиента процесса."""
+
+    async def test_shared_until_closed(self, monkeypatch):
+        monkeypatch.setattr(ml_client, "_client", None)
+
+        client = ml_client.get_ml_client()
+        assert ml_client.get_ml_client() is client
+
+        await ml_client.close_ml_client()
+        assert ml_client._client is None
+        assert client._client.is_closed
@@ -0,0 +1,167 @@
+"""
+Тесты для POST /api/logs/steps:bulk: разбор JSON/NDJSON, INSERT vs COPY,
+пакетная публикация событий.
+
+Используют моки сессии — не требуют БД.
+"""
+
+import json
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from backend.src.api import logs
+from backend.src.api.logs import _parse_bulk_body, create_step_logs_bulk
+
+
+def _log(track_id: uuid.UUID, step_name: str, error: str | None = None) -> dict:
+    return {
+        "track_id": str(track_id),
+        "step_name": step_name,
+        "step_output": {"competencies": [1, 2]},
+        "llm_calls": [{"tokens_used": 10}],
+        "step_duration_sec": 1.5,
+        "error_message": error,
+    }
+
+
+def _request(body: bytes, content_type: str = "application/json") -> MagicMock:
+    request = MagicMock()
+    request.body = AsyncMock(return_value=body)
+    request.headers = {"content-type": content_type}
+    return request
+
+
+@pytest.fixture
+def mock_db():
+    """AsyncSession с замоканным raw asyncpg-соединением."""
+    db = AsyncMock()
+    driver = MagicMock()
+    driver.copy_records_to_table = AsyncMock()
+    raw = MagicMock()
+    raw.driver_connection = driver
+    conn = MagicMock()
+    conn.exec_driver_sql = AsyncMock()
+    conn.get_raw_connection = AsyncMock(return_value=raw)
+    db.connection = AsyncMock(return_value=conn)
+    db.driver = driver
+    return db
+
+
+def _existing_tracks(db: AsyncMock, *track_ids: uuid.UUID) -> None:
+    """Результат SELECT существующих треков (остальные execute его игнорируют)."""
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = list(track_ids)
+    db.execute.return_value = result
+
+
+class TestParseBulkBody:
+    """Тесты разбора тела запроса."""
+
+    def test_json_array(self):
+        track_id = uuid.uuid4()
+        body = json.dumps([_log(track_id, "B1_validate"), _log(track_id, "B2_competencies")])
+
+        items = _parse_bulk_body(body.encode(), "application/json")
+
+        assert [item.step_name for item in items] == ["B1_validate", "B2_competencies"]
+
+    def test_ndjson_skips_blank_lines(self):
+        track_id = uuid.uuid4()
+        body = "\n".join([json.dumps(_log(track_id, "B1_validate")), "", json.dumps(_log(track_id, "B2_competencies"))])
+
+        items = _parse_bulk_body(body.encode(), "application/x-ndjson; charset=utf-8")
+
+        assert len(items) == 2
+
+    def test_ndjson_error_reports_line(self):
+        body = json.dumps(_log(uuid.uuid4(), "B1_validate")) + "\n{\"step_name\": 1}"
+
+        with pytest.raises(HTTPException) as exc:
+            _parse_bulk_body(body.encode(), "application/x-ndjson")
+
+        assert exc.value.status_code == 422
+        assert exc.value.detail["line"] == 2
+
+
+class TestBulkInsert:
+    """Тесты записи пачки логов."""
+
+    @patch("backend.src.api.logs.publish_events", new_callable=AsyncMock)
+    async def test_small_batch_single_insert(self, mock_publish, mock_db):
+        track_id = uuid.uuid4()
+        _existing_tracks(mock_db, track_id)
+        body = json.dumps([_log(track_id, "B1_validate"), _log(track_id, "B2_competencies", error="boom")])
+
+        response = await create_step_logs_bulk(_request(body.encode()), mock_db)
+
+        assert len(response.ids) == 2
+        assert response.skipped_track_ids == []
+        assert mock_db.execute.await_count == 2  # SELECT треков + INSERT
+        stmt = mock_db.execute.await_args.args[0]
+        assert stmt.compile().params["step_name_m1"] == "B2_competencies"
+        mock_db.driver.copy_records_to_table.assert_not_awaited()
+        # Событие только для успешного шага
+        events = mock_publish.await_args.args[1]
+        assert [e[2]["step_name"] for e in events] == ["B1_validate"]
+        assert events[0][2]["tokens_used"] == 10
+        mock_db.commit.assert_awaited_once()
+
+    @patch("backend.src.api.logs.publish_events", new_callable=AsyncMock)
+    async def test_large_batch_uses_copy(self, mock_publish, mock_db, monkeypatch):
+        monkeypatch.setattr(logs.settings, "STEP_LOG_COPY_THRESHOLD", 3)
+        track_id = uuid.uuid4()
+        _existing_tracks(mock_db, track_id)
+        body = "\n".join(json.dumps(_log(track_id, f"B{i}_step")) for i in range(1, 5))
+
+        response = await create_step_logs_bulk(_request(body.encode(), "application/x-ndjson"), mock_db)
+
+        assert mock_db.execute.await_count == 1  # только SELECT треков
+        copy = mock_db.driver.copy_records_to_table.await_args
+        records = copy.kwargs["records"]
+        assert copy.args[0] == "generation_logs"
+        assert [r[0] for r in records] == response.ids
+        assert json.loads(records[0][3]) == {"competencies": [1, 2]}
+        assert records[0][-1] < records[-1][-1]  # порядок created_at сохраняется
+        assert len(mock_publish.await_args.args[1]) == 4
+
+    @patch("backend.src.api.logs.publish_events", new_callable=AsyncMock)
+    async def test_deleted_track_logs_skipped(self, mock_publish, mock_db):
+        alive, deleted = uuid.uuid4(), uuid.uuid4()
+        _existing_tracks(mock_db, alive)
+        body = json.dumps([_log(deleted, "B1_validate"), _log(alive, "B1_validate")])
+
+        response = await create_step_logs_bulk(_request(body.encode()), mock_db)
+
+        assert len(response.ids) == 1
+        assert response.skipped_track_ids == [deleted]
+        stmt = mock_db.execute.await_args.args[0]
+        assert stmt.compile().params["track_id_m0"] == alive
+        events = mock_publish.await_args.args[1]
+        assert [e[0] for e in events] == [f"track:{alive}"]
+        mock_db.commit.assert_awaited_once()
+
+    async def test_all_tracks_deleted_writes_nothing(self, mock_db):
+        deleted = uuid.uuid4()
+        _existing_tracks(mock_db)
+        body = json.dumps([_log(deleted, "B1_validate")])
+
+        response = await create_step_logs_bulk(_request(body.encode()), mock_db)
+
+        assert response.ids == []
+        assert response.skipped_track_ids == [deleted]
+        assert mock_db.execute.await_count == 1
+        mock_db.commit.assert_not_awaited()
+
+    async def test_too_many_logs_rejected(self, mock_db, monkeypatch):
+        monkeypatch.setattr(logs.settings, "STEP_LOG_BULK_MAX", 1)
+        track_id = uuid.uuid4()
+        body = json.dumps([_log(track_id, "B1_validate"), _log(track_id, "B2_competencies")])
+
+        with pytest.raises(HTTPException) as exc:
+            await create_step_logs_bulk(_request(body.encode()), mock_db)
+
+        assert exc.value.status_code == 413
+        mock_db.commit.assert_not_awaited()
@@ -5,10 +5,12 @@
 """
 
 import asyncio
+import json
 import uuid
 from datetime import datetime
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, call, patch
 
+import httpx
 import pytest
 
 from backend.src.schemas.track import (
@@ -289,3 +291,396 @@ class TestSchemas:
         )
         assert detail.batch_id is not None
         assert detail.batch_index == 0
+
+
+class TestRetryTrack:
+    """Тесты retry_track — повтор генерации с выполненных шагов."""
+
+    async def test_retry_failed_track_enqueues_resume_job(self, mock_db, mock_track, mock_profile):
+        """retry_track ставит resume-задачу и возвращает трек в pending."""
+        from backend.src.models.generation_job import GenerationJob
+        from backend.src.services.track_service import retry_track
+
+        mock_track.status = "failed"
+        mock_track.error_message = "B7 timeout"
+        track_result = MagicMock()
+        track_result.scalar_one_or_none.return_value = mock_track
+        profile_result = MagicMock()
+        profile_result.scalar_one_or_none.return_value = mock_profile
+        mock_db.execute = AsyncMock(side_effect=[track_result, profile_result])
+        mock_db.add = MagicMock()
+
+        result = await retry_track(mock_track.id, mock_db)
+
+        assert result.status == "pending"
+        assert mock_track.status == "pending"
+        assert mock_track.error_message is None
+        job = mock_db.add.call_args.args[0]
+        assert isinstance(job, GenerationJob)
+        assert job.payload["resume"] is True
+        assert job.payload["from_step"] is None
+
+    async def test_retry_from_step_drops_downstream_logs(self, mock_db, mock_track, mock_profile):
+        """from_step=B5 удаляет логи B5, B7, B8 и передаётся полным именем."""
+        from backend.src.services.track_service import retry_track
+
+        mock_track.status = "completed"
+        track_result = MagicMock()
+        track_result.scalar_one_or_none.return_value = mock_track
+        profile_result = MagicMock()
+        profile_result.scalar_one_or_none.return_value = mock_profile
+        mock_db.execute = AsyncMock(side_effect=[track_result, profile_result, MagicMock()])
+        mock_db.add = MagicMock()
+
+        await retry_track(mock_track.id, mock_db, from_step="B5")
+
+        delete_stmt = mock_db.execute.await_args_list[2].args[0]
+        params = delete_stmt.compile().params
+        assert set(next(v for v in params.values() if isinstance(v, list))) == {
+            "B5_hierarchy", "B7_schedule", "B8_validation",
+        }
+        assert mock_db.add.call_args.args[0].payload["from_step"] == "B5_hierarchy"
+
+    async def test_retry_running_track_raises(self, mock_db, mock_track):
+        """Нельзя повторить трек, который ещё генерируется."""
+        from backend.src.services.track_service import retry_track
+
+        mock_track.status = "running"
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = mock_track
+        mock_db.execute = AsyncMock(return_value=mock_result)
+
+        with pytest.raises(ValueError, match="Cannot retry"):
+            await retry_track(mock_track.id, mock_db)
+
+
+def _summary_row(created_at: datetime) -> MagicMock:
+    row = MagicMock()
+    row.id = uuid.uuid4()
+    row.created_at = created_at
+    row._mapping = {
+        "id": row.id,
+        "profile_id": uuid.uuid4(),
+        "topic": "Python",
+        "status": "completed",
+        "algorithm_version": "v1.0",
+        "generation_duration_sec": 12.5,
+        "created_at": created_at,
+    }
+    return row
+
+
+class TestListTracks:
+    """Тесты облегчённого списка треков и keyset-пагинации."""
+
+    async def test_selects_only_summary_columns(self, mock_db):
+        from sqlalchemy.dialects import postgresql
+
+        from backend.src.services.track_service import list_tracks
+
+        rows_result = MagicMock()
+        rows_result.all.return_value = [_summary_row(datetime(2026, 1, 2)), _summary_row(datetime(2026, 1, 1))]
+        mock_db.execute = AsyncMock(return_value=rows_result)
+
+        response = await list_tracks(mock_db, limit=2, count="none")
+
+        sql = str(mock_db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "track_data" not in sql and "generation_metadata" not in sql
+        assert "LEFT OUTER JOIN student_profiles" in sql
+        assert mock_db.execute.await_count == 1  # count=none — без COUNT
+        assert response.total is None
+        assert response.next_cursor is None
+        assert [t.topic for t in response.tracks] == ["Python", "Python"]
+
+    async def test_next_cursor_continues_after_last_row(self, mock_db):
+        from backend.src.services.track_service import decode_track_cursor, list_tracks
+
+        rows = [_summary_row(datetime(2026, 1, d)) for d in (3, 2, 1)]
+        rows_result = MagicMock()
+        rows_result.all.return_value = rows
+        count_result = MagicMock()
+        count_result.scalar.return_value = 3
+        mock_db.execute = AsyncMock(side_effect=[rows_result, count_result])
+
+        response = await list_tracks(mock_db, limit=2)
+
+        assert len(response.tracks) == 2
+        assert response.total == 3 and not response.total_is_estimate
+        assert decode_track_cursor(response.next_cursor) == (rows[1].created_at, rows[1].id)
+
+        mock_db.execute = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[])))
+        await list_tracks(mock_db, limit=2, offset=50, cursor=response.next_cursor, count="none")
+        stmt = mock_db.execute.await_args.args[0]
+        assert "(personalized_tracks.created_at, personalized_tracks.id) <" in str(stmt)
+        assert stmt._offset_clause is None  # cursor важнее offset
+
+    async def test_invalid_cursor_and_count_rejected(self, mock_db):
+        from backend.src.services.track_service import list_tracks
+
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            await list_tracks(mock_db, cursor="not-a-cursor")
+        with pytest.raises(ValueError, match="count mode"):
+            await list_tracks(mock_db, count="fast")
+
+
+class TestTrackFields:
+    """Тесты ?fields= для GET /api/tracks/{id}."""
+
+    def test_parse_track_fields(self):
+        from backend.src.services.track_service import parse_track_fields
+
+        assert parse_track_fields(None) is None
+        assert parse_track_fields("schedule, validation,schedule") == ["schedule", "validation"]
+        with pytest.raises(ValueError, match="Unknown fields: track_data"):
+            parse_track_fields("schedule,track_data")
+
+    async def test_projection_extracts_requested_keys(self, mock_db, mock_track):
+        from sqlalchemy.dialects import postgresql
+
+        from backend.src.services.track_service import get_track
+
+        now = datetime(2026, 1, 1)
+        row = MagicMock()
+        row._mapping = {
+            "id": mock_track.id,
+            "profile_id": uuid.uuid4(),
+            "qa_report_id": None,
+            "algorithm_version": "v1.0",
+            "status": "completed",
+            "error_message": None,
+            "generation_duration_sec": 10.0,
+            "batch_id": None,
+            "batch_index": None,
+            "created_at": now,
+            "updated_at": now,
+            "track_data.schedule": {"weeks": []},
+            "track_data.validation": None,
+        }
+        result = MagicMock()
+        result.one_or_none.return_value = row
+        mock_db.execute = AsyncMock(return_value=result)
+
+        track = await get_track(mock_track.id, mock_db, fields=["schedule", "validation"])
+
+        sql = str(mock_db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "personalized_tracks.track_data[" in sql
+        assert "generation_metadata" not in sql
+        assert track.track_data == {"schedule": {"weeks": []}}
+        assert "generation_metadata" not in track.model_dump(exclude_unset=True)
+
+
+def _session_factory(session):
+    """Mock async_sessionmaker, выдающий одну сессию."""
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+class TestTrackStatusWriter:
+    """Тесты пакетной записи статусов треков."""
+
+    async def test_flush_is_one_statement_and_one_commit(self, mock_db):
+        from sqlalchemy.dialects import postgresql
+        from backend.src.services.track_service import TrackStatusWriter
+
+        ids = [uuid.uuid4() for _ in range(3)]
+        writer = TrackStatusWriter(_session_factory(mock_db))
+
+        with patch(
+            "backend.src.services.track_service.publish_events", new_callable=AsyncMock
+        ) as mock_publish:
+            await writer.add_many(ids, status="running")
+            await writer.add(ids[1], status="failed", error_message="boom")
+            assert await writer.flush() == 3
+            assert await writer.flush() == 0
+
+        statement, rows = mock_db.execute.await_args.args
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert sql.startswith("UPDATE personalized_tracks SET")
+        assert "coalesce" in sql
+        # Последнее обновление трека заменяет предыдущее
+        assert [(row["b_id"], row["b_status"]) for row in rows] == [
+            (ids[0], "running"), (ids[2], "running"), (ids[1], "failed"),
+        ]
+        assert mock_db.execute.await_count == 1
+        mock_db.commit.assert_awaited_once()
+        events = mock_publish.await_args.args[1]
+        assert [event[2]["status"] for event in events] == ["running", "running", "failed"]
+
+    async def test_flushes_incrementally(self, mock_db):
+        from backend.src.services.track_service import TrackStatusWriter
+
+        with patch("backend.src.services.track_service.publish_events", new_callable=AsyncMock):
+            async with TrackStatusWriter(_session_factory(mock_db), flush_size=2) as writer:
+                for _ in range(5):
+                    await writer.add(uuid.uuid4(), status="completed", track_data={})
+                assert mock_db.commit.await_count == 2
+
+        assert mock_db.commit.await_count == 3
+
+    def test_missing_fields_keep_column_values(self):
+        from sqlalchemy.dialects import postgresql
+        from backend.src.services.track_service import _bulk_status_statement
+
+        compiled = _bulk_status_statement().compile(dialect=postgresql.dialect())
+
+        # None в JSONB — SQL NULL, иначе COALESCE затёр бы track_data значением 'null'
+        processor = compiled.binds["b_track_data"].type.bind_processor(postgresql.dialect())
+        assert processor is None or processor(None) is None
+
+    @patch(
+        "backend.src.services.track_service._get_track_statuses",
+        new_callable=AsyncMock, return_value={},
+    )
+    @patch("backend.src.services.track_service.get_ml_client")
+    @patch("backend.src.services.track_service.TrackStatusWriter")
+    async def test_batch_generation_json_fallback(self, mock_writer_cls, mock_ml, _):
+        from backend.src.services import track_service
+
+        writer = _mock_writer(mock_writer_cls)
+        ids = [uuid.uuid4() for _ in range(3)]
+        mock_ml.return_value = _ml_client(httpx.Response(200, json={"results": [
+            {"track_data": {"a": 1}, "generation_metadata": {"total_duration_sec": 5}},
+            {"error": "B5 failed"},
+            {"status": "cancelled"},
+        ]}))
+
+        await track_service._run_batch_generation(uuid.uuid4(), ids, {}, "v1.0")
+
+        writer.add_many.assert_awaited_once_with(ids, status="running")
+        added = [(c.args[0], c.kwargs["status"]) for c in writer.add.await_args_list]
+        assert added == [(ids[0], "completed"), (ids[1], "failed"), (ids[2], "cancelled")]
+        assert writer.add.await_args_list[0].kwargs["generation_duration_sec"] == 5
+
+
+class TestBatchStream:
+    """Тесты потоковой выдачи результатов batch (NDJSON)."""
+
+    @patch(
+        "backend.src.services.track_service._get_track_statuses",
+        new_callable=AsyncMock, return_value={},
+    )
+    @patch("backend.src.services.track_service.get_ml_client")
+    @patch("backend.src.services.track_service.TrackStatusWriter")
+    async def test_each_track_persisted_as_it_arrives(self, mock_writer_cls, mock_ml, _):
+        from backend.src.services import track_service
+
+        writer = _mock_writer(mock_writer_cls)
+        ids = [uuid.uuid4() for _ in range(3)]
+        seen: list = []
+        mock_ml.return_value = _ml_client(_ndjson_response([
+            {"index": 2, "track_id": str(ids[2]), "error": "B5 failed"},
+            {"index": 0, "track_id": str(ids[0]), "track_data": {"a": 1},
+             "generation_metadata": {"total_duration_sec": 5}},
+            {"index": 1, "track_id": str(ids[1]), "status": "cancelled"},
+            {"done": True, "tracks": 3},
+        ], seen))
+
+        await track_service._run_batch_generation(uuid.uuid4(), ids, {}, "v1.0")
+
+        assert seen == ["application/x-ndjson"]
+        added = [(c.args[0], c.kwargs["status"]) for c in writer.add.await_args_list]
+        assert added == [(ids[2], "failed"), (ids[0], "completed"), (ids[1], "cancelled")]
+        # running + по flush на каждый трек
+        assert writer.flush.await_count == 4
+        assert writer.add_many.await_count == 1
+
+    @patch(
+        "backend.src.services.track_service._get_track_statuses",
+        new_callable=AsyncMock, return_value={},
+    )
+    @patch("backend.src.services.track_service.get_ml_client")
+    @patch("backend.src.services.track_service.TrackStatusWriter")
+    async def test_truncated_stream_requeues_only_unfinished(self, mock_writer_cls, mock_ml, _):
+        from backend.src.services import track_service
+        from backend.src.services.job_queue import RetryableJobError
+
+        writer = _mock_writer(mock_writer_cls)
+        ids = [uuid.uuid4() for _ in range(3)]
+        mock_ml.return_value = _ml_client(_ndjson_response([
+            {"index": 1, "track_id": str(ids[1]), "track_data": {}},
+        ]))
+
+        with pytest.raises(RetryableJobError):
+            await track_service._run_batch_generation(
+                uuid.uuid4(), ids, {}, "v1.0", final_attempt=False
+            )
+
+        assert writer.add.await_args.args[0] == ids[1]
+        writer.add_many.assert_awaited_with([ids[0], ids[2]], status="pending")
+
+    @patch("backend.src.services.track_service._get_track_statuses", new_callable=AsyncMock)
+    @patch("backend.src.services.track_service.get_ml_client")
+    @patch("backend.src.services.track_service.TrackStatusWriter")
+    async def test_retry_skips_tracks_saved_by_previous_attempt(
+        self, mock_writer_cls, mock_ml, mock_statuses
+    ):
+        from backend.src.services import track_service
+
+        writer = _mock_writer(mock_writer_cls)
+        ids = [uuid.uuid4() for _ in range(4)]
+        # Попытка 1 сохранила ids[0] и ids[1], ids[2] отменяют
+        mock_statuses.return_value = {
+            ids[0]: "completed", ids[1]: "failed", ids[2]: "cancelling", ids[3]: "pending",
+        }
+        requested: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested.extend(json.loads(request.content)["track_ids"])
+            return _ndjson_response([
+                {"index": 0, "track_id": str(ids[3]), "track_data": {}},
+                {"done": True, "tracks": 1},
+            ])(request)
+
+        mock_ml.return_value = _ml_client(handler)
+
+        await track_service._run_batch_generation(uuid.uuid4(), ids, {}, "v1.0")
+
+        assert requested == [str(ids[3])]
+        assert writer.add_many.await_args_list == [
+            call([ids[2]], status="cancelled"), call([ids[3]], status="running"),
+        ]
+        assert [c.args[0] for c in writer.add.await_args_list] == [ids[3]]
+
+    @patch("backend.src.services.track_service._get_track_statuses", new_callable=AsyncMock)
+    @patch("backend.src.services.track_service.get_ml_client")
+    async def test_retry_with_all_tracks_saved_skips_ml(self, mock_ml, mock_statuses):
+        from backend.src.services import track_service
+
+        ids = [uuid.uuid4() for _ in range(2)]
+        mock_statuses.return_value = {tid: "completed" for tid in ids}
+
+        await track_service._run_batch_generation(uuid.uuid4(), ids, {}, "v1.0")
+
+        mock_ml.assert_not_called()
+
+
+def _mock_writer(mock_writer_cls):
+    """Mock TrackStatusWriter для проверки записанных статусов."""
+    writer = mock_writer_cls.return_value
+    writer.add = AsyncMock()
+    writer.add_many = AsyncMock()
+    writer.flush = AsyncMock()
+    return writer
+
+
+def _ml_client(response):
+    """MLServiceClient на httpx.MockTransport с заданным ответом."""
+    from backend.src.services.ml_client import MLServiceClient
+
+    handler = response if callable(response) else (lambda request: response)
+    return MLServiceClient("http://ml", transport=httpx.MockTransport(handler))
+
+
+def _ndjson_response(records: list[dict], seen_accept: list | None = None):
+    """Обработчик MockTransport, отвечающий NDJSON-потоком записей."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        if seen_accept is not None:
+            seen_accept.append(request.headers["accept"])
+        body = "".join(json.dumps(record) + "\n" for record in records)
+        return httpx.Response(
+            200, content=body.encode(), headers={"content-type": "application/x-ndjson"}
+        )
+
+    return handler
@@ -0,0 +1 @@
+"""Бенчмарки pipeline: накладные расходы оркестратора отдельно от задержки LLM."""
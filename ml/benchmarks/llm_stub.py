@@ -0,0 +1,131 @@
+"""LLM-заглушка для бенчмарков: ответы из mock fixtures, задержка по модели.
+
+Задержка вызова = time-to-first-token (логнормальное распределение вокруг
+медианы ttft_ms) + output_tokens / tokens_per_sec. С вероятностью error_rate
+вызов завершается DeepSeekError — как после исчерпанных ретраев DeepSeekClient.
+Параметры задаются по умолчанию и по шагам (B7_schedule, ...).
+"""
+
+import asyncio
+import json
+import math
+import random
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Any
+
+from ml.src.prompts.json_utils import estimate_tokens
+from ml.src.services.deepseek_client import DeepSeekError
+from ml.src.services.mock_llm_client import MockLLMClient
+from ml.src.services.pipeline_orchestrator import PIPELINE_STEPS, current_track_id
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "mock_responses"
+
+# Схема ответа → шаг; частичные схемы (шарды B6/B7, семантика B8) — по промпту
+_STEP_BY_MODEL = {step.response_model: step.step_name for step in PIPELINE_STEPS}
+
+
+@dataclass
+class StepLatency:
+    """Модель задержки и ошибок LLM-вызовов одного шага."""
+
+    ttft_ms: float = 800.0  # медиана time-to-first-token
+    ttft_sigma: float = 0.5  # σ логнормального распределения ttft
+    tokens_per_sec: float = 60.0  # скорость генерации; 0 — без учёта длины ответа
+    error_rate: float = 0.0
+
+    def sample_ms(self, rng: random.Random, output_tokens: int) -> float:
+        ttft = self.ttft_ms * math.exp(rng.gauss(0.0, self.ttft_sigma)) if self.ttft_ms else 0.0
+        generation = output_tokens / self.tokens_per_sec * 1000 if self.tokens_per_sec else 0.0
+        return ttft + generation
+
+
+@dataclass
+class CallRecord:
+    """Один смоделированный LLM-вызов."""
+
+    track_id: str | None
+    step_name: str
+    latency_ms: float
+    tokens_used: int
+    failed: bool
+
+
+def load_latency_profile(path: Path) -> tuple[StepLatency, dict[str, StepLatency]]:
+    """
+    Профиль задержек из JSON: {"default": {...}, "steps": {"B7_schedule": {...}}}.
+
+    Поля шага, которых нет в файле, берутся из default.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    known = {f.name for f in fields(StepLatency)}
+    default = StepLatency(**{k: v for k, v in data.get("default", {}).items() if k in known})
+    steps = {
+        step_name: StepLatency(**{
+            **asdict(default),
+            **{k: v for k, v in overrides.items() if k in known},
+        })
+        for step_name, overrides in data.get("steps", {}).items()
+    }
+    return default, steps
+
+
+class LatencyLLMClient:
+    """
+    Клиент с интерфейсом DeepSeekClient.chat_completion для run_pipeline(llm_client=...).
+
+    Ответ строит MockLLMClient (шаг — по схеме ответа или по промпту), затем вызов «ждёт»
+    смоделированную задержку, умноженную на time_scale. stream / on_progress
+    не эмулируются. Все вызовы записываются в calls (трек — current_track_id).
+    """
+
+    def __init__(
+        self,
+        default: StepLatency | None = None,
+        steps: dict[str, StepLatency] | None = None,
+        time_scale: float = 1.0,
+        seed: int = 0,
+        fixtures_dir: Path = FIXTURES_DIR,
+    ):
+        self.default = default or StepLatency()
+        self.steps = steps or {}
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.calls: list[CallRecord] = []
+        self._mock = MockLLMClient(fixtures_dir=str(fixtures_dir))
+
+    async def chat_completion(
+        self,
+        prompt: str,
+        response_model: Any,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        **kwargs,
+    ) -> tuple[Any, dict[str, Any]]:
+        result, metadata = await self._mock.chat_completion(
+            prompt, response_model, step_name=_STEP_BY_MODEL.get(response_model)
+        )
+        step_name = metadata["step_name"]
+        latency = self.steps.get(step_name, self.default)
+        latency_ms = latency.sample_ms(self.rng, estimate_tokens(metadata["raw_response"]))
+        failed = self.rng.random() < latency.error_rate
+
+        await asyncio.sleep(latency_ms * self.time_scale / 1000)
+
+        track_id = current_track_id.get()
+        self.calls.append(CallRecord(
+            track_id=str(track_id) if track_id else None,
+            step_name=step_name,
+            latency_ms=latency_ms * self.time_scale,
+            tokens_used=metadata["tokens_used"],
+            failed=failed,
+        ))
+        if failed:
+            raise DeepSeekError(f"Simulated LLM failure at {step_name}")
+        return result, {
+            **metadata,
+            "duration_ms": latency_ms * self.time_scale,
+            "model": "latency-stub",
+            "streamed": False,
+        }
@@ -0,0 +1,91 @@
+"""Метрики бенчмарков: перцентили, задержка event loop, критический путь LLM."""
+
+import asyncio
+import sys
+import time
+from collections import defaultdict
+from typing import Iterable
+
+from ml.benchmarks.llm_stub import CallRecord
+from ml.src.services.pipeline_orchestrator import PIPELINE_STEP_NAMES, STEP_DEPENDENCIES
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль q (0–100) с линейной интерполяцией; 0.0 для пустого списка."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def distribution(values: list[float]) -> dict[str, float]:
+    """p50 / p95 / p99 / mean / max, округлённые до 0.01."""
+    summary = {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "max": max(values, default=0.0),
+    }
+    return {key: round(value, 2) for key, value in summary.items()}
+
+
+def llm_critical_path_ms(calls: Iterable[CallRecord]) -> float:
+    """
+    Нижняя граница длительности трека, заданная только задержкой LLM.
+
+    Вызовы одного шага считаются параллельными (fan-out B6/B7): время шага —
+    максимум его вызовов. Затем — самый длинный путь по STEP_DEPENDENCIES.
+    Приближение: последовательные ретраи внутри шага не суммируются.
+    """
+    step_ms: dict[str, float] = defaultdict(float)
+    for call in calls:
+        step_ms[call.step_name] = max(step_ms[call.step_name], call.latency_ms)
+
+    finish: dict[str, float] = {}
+    for step_name in PIPELINE_STEP_NAMES:
+        start = max((finish[dep] for dep in STEP_DEPENDENCIES[step_name]), default=0.0)
+        finish[step_name] = start + step_ms.get(step_name, 0.0)
+    return max(finish.values(), default=0.0)
+
+
+class EventLoopLagMonitor:
+    """
+    Задержка event loop: фоновая задача спит interval_sec и измеряет,
+    насколько позже запланированного она просыпается.
+    """
+
+    def __init__(self, interval_sec: float = 0.01):
+        self.interval_sec = interval_sec
+        self.samples_ms: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="event-loop-lag-monitor")
+
+    async def stop(self) -> dict[str, float]:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        return distribution(self.samples_ms)
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval_sec
+            await asyncio.sleep(self.interval_sec)
+            self.samples_ms.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+
+def max_rss_kb() -> int:
+    """Пиковый RSS процесса в КБ (0, если resource недоступен)."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS отдаёт байты, Linux — килобайты
+    return rss // 1024 if sys.platform == "darwin" else rss
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Fixture-replay benchmark of run_pipeline / run_pipeline_batch.
+
+LLM заменён LatencyLLMClient (ответы — mock fixtures, задержка и ошибки —
+по модели), поэтому измеряются накладные расходы самого оркестратора:
+overhead трека = его длительность минус критический путь LLM-задержек.
+Backend не нужен: проверка отмены отключена, логи шагов пишутся во
+временную директорию.
+
+Для каждого числа треков отчёт содержит p50/p95/p99 длительности и
+overhead, пропускную способность, задержку event loop и память на трек.
+
+Usage:
+    python -m ml.benchmarks.run_benchmark --tracks 1,10,100,500 --time-scale 0.01
+    python -m ml.benchmarks.run_benchmark --mode batch --latency-profile latency.json \\
+        --output bench.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+from unittest.mock import patch
+
+ML_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ML_DIR.parent))
+
+from ml.benchmarks.llm_stub import (  # noqa: E402
+    LatencyLLMClient,
+    StepLatency,
+    load_latency_profile,
+)
+from ml.benchmarks.metrics import (  # noqa: E402
+    EventLoopLagMonitor,
+    distribution,
+    llm_critical_path_ms,
+    max_rss_kb,
+)
+from ml.src.services import pipeline_orchestrator, step_logger  # noqa: E402
+
+BENCHMARK_MODES = ("pipeline", "batch")
+DEFAULT_PROFILE = ML_DIR / "test_profile_1.json"
+
+
+async def _never_cancelled(track_id: uuid.UUID) -> bool:
+    return False
+
+
+@contextlib.contextmanager
+def isolated_pipeline(log_dir: Path) -> Iterator[None]:
+    """Pipeline без backend: отмена не проверяется, логи — в log_dir, print — в никуда."""
+    previous = os.environ.get("DISABLE_BACKEND_LOGGING")
+    os.environ["DISABLE_BACKEND_LOGGING"] = "true"
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+                patch.object(pipeline_orchestrator, "_check_cancelled", _never_cancelled), \
+                patch.object(step_logger, "LOG_DIR", log_dir):
+            yield
+    finally:
+        if previous is None:
+            os.environ.pop("DISABLE_BACKEND_LOGGING", None)
+        else:
+            os.environ["DISABLE_BACKEND_LOGGING"] = previous
+
+
+async def run_scenario(
+    mode: str,
+    tracks: int,
+    client: LatencyLLMClient,
+    profile: dict[str, Any],
+    trace_memory: bool = False,
+) -> dict[str, Any]:
+    """
+    Запустить tracks генераций одновременно и собрать метрики.
+
+    Args:
+        mode: pipeline — tracks параллельных run_pipeline; batch — один run_pipeline_batch
+        tracks: Число треков
+        client: LLM-заглушка (её calls дополняются вызовами сценария)
+        profile: Профиль учащегося
+        trace_memory: Считать пик памяти через tracemalloc (замедляет выполнение)
+
+    Returns:
+        Метрики сценария (JSON-сериализуемые)
+    """
+    if mode not in BENCHMARK_MODES:
+        raise ValueError(f"Unknown benchmark mode: {mode}")
+
+    first_call = len(client.calls)
+    track_ids = [uuid.uuid4() for _ in range(tracks)]
+    durations_ms: dict[str, float] = {}
+    failed = 0
+
+    rss_before = max_rss_kb()
+    if trace_memory:
+        tracemalloc.start()
+    monitor = EventLoopLagMonitor()
+    monitor.start()
+    start = time.perf_counter()
+
+    if mode == "pipeline":
+        async def _one(track_id: uuid.UUID) -> None:
+            nonlocal failed
+            track_start = time.perf_counter()
+            try:
+                await pipeline_orchestrator.run_pipeline(profile, track_id, llm_client=client)
+            except Exception:
+                failed += 1
+                return
+            durations_ms[str(track_id)] = (time.perf_counter() - track_start) * 1000
+
+        await asyncio.gather(*(_one(track_id) for track_id in track_ids))
+    else:
+        batch = await pipeline_orchestrator.run_pipeline_batch(
+            profile, track_ids, llm_client=client
+        )
+        for track_id, result in zip(track_ids, batch["results"]):
+            if "generation_metadata" not in result:
+                failed += 1
+                continue
+            durations_ms[str(track_id)] = (
+                result["generation_metadata"]["total_duration_sec"] * 1000
+            )
+
+    wall_sec = time.perf_counter() - start
+    loop_lag = await monitor.stop()
+    traced_peak_kb = 0.0
+    if trace_memory:
+        traced_peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    rss_growth_kb = max_rss_kb() - rss_before
+
+    calls = client.calls[first_call:]
+    calls_by_track = defaultdict(list)
+    for call in calls:
+        calls_by_track[call.track_id].append(call)
+    overhead_ms = [
+        duration - llm_critical_path_ms(calls_by_track[track_id])
+        for track_id, duration in durations_ms.items()
+    ]
+
+    return {
+        "mode": mode,
+        "tracks": tracks,
+        "succeeded": tracks - failed,
+        "failed": failed,
+        "wall_sec": round(wall_sec, 3),
+        "throughput_tracks_per_sec": round((tracks - failed) / wall_sec, 3) if wall_sec else 0.0,
+        "llm_calls": len(calls),
+        "llm_calls_failed": sum(1 for call in calls if call.failed),
+        "latency_ms": distribution(list(durations_ms.values())),
+        "overhead_ms": distribution(overhead_ms),
+        "event_loop_lag_ms": loop_lag,
+        "memory_per_track_kb": {
+            "max_rss_growth": round(rss_growth_kb / tracks, 2),
+            "traced_peak": round(traced_peak_kb / tracks, 2) if trace_memory else None,
+        },
+    }
+
+
+async def run_benchmark(
+    modes: list[str],
+    track_counts: list[int],
+    client: LatencyLLMClient,
+    profile: dict[str, Any],
+    trace_memory: bool = False,
+) -> list[dict[str, Any]]:
+    """Все сценарии по очереди в одном event loop; логи шагов — во временной директории."""
+    scenarios = []
+    with tempfile.TemporaryDirectory(prefix="pipeline-bench-") as log_dir:
+        with isolated_pipeline(Path(log_dir)):
+            try:
+                for mode in modes:
+                    for tracks in track_counts:
+                        scenario = await run_scenario(mode, tracks, client, profile, trace_memory)
+                        scenarios.append(scenario)
+                        _print_scenario(scenario)
+            finally:
+                await step_logger.close_step_logger()
+    return scenarios
+
+
+def _print_scenario(scenario: dict[str, Any]) -> None:
+    latency = scenario["latency_ms"]
+    overhead = scenario["overhead_ms"]
+    print(
+        f"{scenario['mode']:>8} x{scenario['tracks']:<4} "
+        f"p50={latency['p50']:.0f}ms p95={latency['p95']:.0f}ms p99={latency['p99']:.0f}ms "
+        f"overhead p50={overhead['p50']:.1f}ms p99={overhead['p99']:.1f}ms "
+        f"{scenario['throughput_tracks_per_sec']:.2f} tracks/s "
+        f"lag p99={scenario['event_loop_lag_ms']['p99']:.1f}ms "
+        f"failed={scenario['failed']}",
+        file=sys.__stdout__,
+        flush=True,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fixture-replay benchmark of the B1-B8 pipeline")
+    parser.add_argument("--mode", choices=[*BENCHMARK_MODES, "both"], default="pipeline")
+    parser.add_argument("--tracks", default="1,10,100", help="Числа одновременных треков")
+    parser.add_argument("--profile", type=Path, default=DEFAULT_PROFILE)
+    parser.add_argument(
+        "--latency-profile", type=Path,
+        help='JSON {"default": {...}, "steps": {"B7_schedule": {...}}} (поля StepLatency)',
+    )
+    parser.add_argument("--ttft-ms", type=float, default=StepLatency.ttft_ms)
+    parser.add_argument("--ttft-sigma", type=float, default=StepLatency.ttft_sigma)
+    parser.add_argument("--tokens-per-sec", type=float, default=StepLatency.tokens_per_sec)
+    parser.add_argument("--error-rate", type=float, default=StepLatency.error_rate)
+    parser.add_argument(
+        "--time-scale", type=float, default=1.0,
+        help="Множитель смоделированных задержек (0.01 — в 100 раз быстрее)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="Пик памяти через tracemalloc")
+    parser.add_argument("--output", type=Path, help="Сохранить результаты в JSON")
+    parser.add_argument("--log-level", default="ERROR")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+
+    if args.latency_profile:
+        default, steps = load_latency_profile(args.latency_profile)
+    else:
+        default = StepLatency(args.ttft_ms, args.ttft_sigma, args.tokens_per_sec, args.error_rate)
+        steps = {}
+    client = LatencyLLMClient(default, steps, time_scale=args.time_scale, seed=args.seed)
+
+    with open(args.profile, encoding="utf-8") as f:
+        profile = json.load(f)
+    modes = list(BENCHMARK_MODES) if args.mode == "both" else [args.mode]
+    track_counts = [int(value) for value in args.tracks.split(",") if value.strip()]
+
+    scenarios = asyncio.run(
+        run_benchmark(modes, track_counts, client, profile, args.trace_memory)
+    )
+
+    if args.output:
+        report = {
+            "created_at": datetime.utcnow().isoformat(),
+            "config": {
+                "default_latency": default.__dict__,
+                "step_latency": {name: latency.__dict__ for name, latency in steps.items()},
+                "time_scale": args.time_scale,
+                "seed": args.seed,
+                "profile": str(args.profile),
+            },
+            "scenarios": scenarios,
+        }
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Results saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
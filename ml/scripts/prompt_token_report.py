@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Compare prompt sizes of B1-B8 across prompt JSON serialization modes.
+
+Строит промпты всех шагов из выходов шагов (mock fixtures или логи трека)
+в каждом режиме settings.PROMPT_JSON_MODE и печатает оценку токенов.
+
+Usage:
+    python scripts/prompt_token_report.py
+    python scripts/prompt_token_report.py --track-id <uuid> --logs-dir ml/logs
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+ML_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ML_DIR.parent))
+
+from ml.src.core.config import settings  # noqa: E402
+from ml.src.prompts.b1_prompt import get_b1_prompt  # noqa: E402
+from ml.src.prompts.b2_prompt import get_b2_prompt  # noqa: E402
+from ml.src.prompts.b3_prompt import get_b3_prompt  # noqa: E402
+from ml.src.prompts.b4_prompt import get_b4_prompt  # noqa: E402
+from ml.src.prompts.b5_prompt import get_b5_prompt  # noqa: E402
+from ml.src.prompts.b6_prompt import get_b6_prompt  # noqa: E402
+from ml.src.prompts.b7_prompt import get_b7_prompt  # noqa: E402
+from ml.src.prompts.b8_prompt import get_b8_prompt  # noqa: E402
+from ml.src.prompts.json_utils import PROMPT_JSON_MODES, estimate_tokens  # noqa: E402
+
+STEP_NAMES = [
+    "B1_validate",
+    "B2_competencies",
+    "B3_ksa_matrix",
+    "B4_learning_units",
+    "B5_hierarchy",
+    "B6_problem_formulations",
+    "B7_schedule",
+    "B8_validation",
+]
+
+
+def load_outputs(track_id: str | None, logs_dir: Path) -> dict[str, dict[str, Any]]:
+    """Выходы шагов: из ml/logs/<track_id> или из mock fixtures."""
+    if track_id:
+        outputs = {}
+        for step_file in sorted((logs_dir / track_id).glob("step_*.json")):
+            with open(step_file, encoding="utf-8") as f:
+                log_data = json.load(f)
+            outputs[log_data["step_name"]] = log_data["step_output"]
+        return outputs
+
+    fixtures = ML_DIR / "tests" / "fixtures" / "mock_responses"
+    outputs = {}
+    for step_name in STEP_NAMES:
+        with open(fixtures / f"{step_name}.json", encoding="utf-8") as f:
+            outputs[step_name] = json.load(f)
+    return outputs
+
+
+def prompt_builders(
+    profile: dict[str, Any], outputs: dict[str, dict[str, Any]]
+) -> dict[str, Callable[[], str]]:
+    """Промпт каждого шага — так же, как его строит pipeline."""
+    b1 = outputs["B1_validate"]
+    b4 = outputs["B4_learning_units"]
+    b5 = outputs["B5_hierarchy"]
+    schedule_info = {
+        "schedule": profile.get("schedule", []),
+        "practice_windows": profile.get("practice_windows", []),
+        "weekly_hours": profile.get("weekly_hours", 5),
+    }
+    complete_track = {
+        "validated_profile": b1,
+        "competency_set": outputs["B2_competencies"],
+        "ksa_matrix": outputs["B3_ksa_matrix"],
+        "learning_units": b4,
+        "hierarchy": b5,
+        "lesson_blueprints": outputs["B6_problem_formulations"],
+        "schedule": outputs["B7_schedule"],
+    }
+    return {
+        "B1_validate": lambda: get_b1_prompt(profile),
+        "B2_competencies": lambda: get_b2_prompt(b1),
+        "B3_ksa_matrix": lambda: get_b3_prompt(profile, outputs["B2_competencies"]),
+        "B4_learning_units": lambda: get_b4_prompt(outputs["B3_ksa_matrix"]),
+        "B5_hierarchy": lambda: get_b5_prompt(
+            b4, b1.get("total_time_budget_minutes", 0), b1.get("estimated_weeks", 12)
+        ),
+        "B6_problem_formulations": lambda: get_b6_prompt(b4.get("clusters", []), b4),
+        "B7_schedule": lambda: get_b7_prompt(
+            b5, outputs["B6_problem_formulations"], schedule_info, b5.get("total_weeks", 12)
+        ),
+        "B8_validation": lambda: get_b8_prompt(complete_track, profile),
+    }
+
+
+def build_report(
+    profile: dict[str, Any], outputs: dict[str, dict[str, Any]]
+) -> dict[str, dict[str, int]]:
+    """step_name → {mode: оценка токенов промпта}."""
+    builders = prompt_builders(profile, outputs)
+    report: dict[str, dict[str, int]] = {step_name: {} for step_name in builders}
+    original_mode = settings.PROMPT_JSON_MODE
+    try:
+        for mode in PROMPT_JSON_MODES:
+            settings.PROMPT_JSON_MODE = mode
+            for step_name, build in builders.items():
+                report[step_name][mode] = estimate_tokens(build())
+    finally:
+        settings.PROMPT_JSON_MODE = original_mode
+    return report
+
+
+def print_report(report: dict[str, dict[str, int]]) -> None:
+    """Таблица: токены по режимам и экономия относительно pretty."""
+    header = f"{'step':<26}" + "".join(f"{mode:>14}" for mode in PROMPT_JSON_MODES)
+    print(header)
+    print("-" * len(header))
+    totals = {mode: 0 for mode in PROMPT_JSON_MODES}
+    for step_name, sizes in report.items():
+        row = f"{step_name:<26}"
+        for mode in PROMPT_JSON_MODES:
+            totals[mode] += sizes[mode]
+            row += f"{_cell(sizes[mode], sizes['pretty']):>14}"
+        print(row)
+    print("-" * len(header))
+    print(f"{'total':<26}" + "".join(
+        f"{_cell(totals[mode], totals['pretty']):>14}" for mode in PROMPT_JSON_MODES
+    ))
+    print(f"\nТекущий режим (PROMPT_JSON_MODE): {settings.PROMPT_JSON_MODE}")
+
+
+def _cell(tokens: int, baseline: int) -> str:
+    if tokens == baseline or not baseline:
+        return str(tokens)
+    return f"{tokens} ({(tokens - baseline) / baseline:+.0%})"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--track-id", help="Взять выходы шагов из логов трека")
+    parser.add_argument("--logs-dir", type=Path, default=ML_DIR / "ml" / "logs")
+    parser.add_argument("--profile", type=Path, default=ML_DIR / "test_profile_1.json")
+    args = parser.parse_args()
+
+    with open(args.profile, encoding="utf-8") as f:
+        profile = json.load(f)
+
+    outputs = load_outputs(args.track_id, args.logs_dir)
+    missing = [step for step in STEP_NAMES if step not in outputs]
+    if missing:
+        print(f"Missing step outputs: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    print_report(build_report(profile, outputs))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
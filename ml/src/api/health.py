@@ -4,12 +4,19 @@ Health check endpoint для ML сервиса.
 Проверяет:
 - Статус самого сервиса
 - Доступность DeepSeek API
+- Состояние лимитера LLM-вызовов (GET /health/llm)
+- Очередь логов шагов: доставка и backpressure (GET /health/step-logs)
 """
 
+from typing import Any
+
 from fastapi import APIRouter, status
 from pydantic import BaseModel
 
 from ml.src.services.deepseek_client import get_deepseek_client
+from ml.src.services.llm_cache import get_llm_cache
+from ml.src.services.rate_limiter import get_rate_limiter
+from ml.src.services.step_logger import get_step_logger
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -48,3 +55,20 @@ async def health_check() -> HealthResponse:
         service="ml",
         deepseek_available=deepseek_available,
     )
+
+
+@router.get("/llm")
+async def llm_stats() -> dict[str, Any]:
+    """Метрики лимитера (in-flight, очередь, 429) и кэша LLM-ответов."""
+    cache = get_llm_cache()
+    return {
+        "rate_limiter": get_rate_limiter().get_stats(),
+        "cache": cache.get_stats() if cache is not None else None,
+    }
+
+
+@router.get("/step-logs")
+async def step_log_stats() -> dict[str, Any]:
+    """Метрики очереди логов шагов (доставлено, ошибки, ожидания продюсеров)."""
+    step_logger = await get_step_logger()
+    return step_logger.get_stats()
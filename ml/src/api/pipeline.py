@@ -4,9 +4,16 @@
 Предоставляет endpoints:
 - POST /pipeline/run - синхронный запуск pipeline
 - POST /pipeline/run-batch - batch запуск N pipeline параллельно
+  (Accept: application/x-ndjson — результат каждого трека строкой по мере готовности)
+- POST /pipeline/resume - продолжение pipeline с первого невыполненного шага
 """
 
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 
 from ml.src.schemas.pipeline import (
     PipelineRunRequest,
@@ -14,15 +21,31 @@ from ml.src.schemas.pipeline import (
     PipelineBatchRequest,
     PipelineBatchResponse,
     PipelineError,
+    PipelineResumeRequest,
 )
 from ml.src.services.pipeline_orchestrator import (
+    iter_pipeline_batch,
+    resolve_step_name,
     run_pipeline,
     run_pipeline_batch,
+    select_resumable_outputs,
     PipelineCancelled,
 )
+from ml.src.services.llm_client_factory import get_llm_client
+from ml.src.services.step_logger import get_step_logger
 
 router = APIRouter(prefix="/pipeline", tags=["pipeline"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _llm_client(provider: str | None) -> Any:
+    """Общий LLM client провайдера запроса; неизвестный провайдер — 400."""
+    try:
+        return await get_llm_client(provider)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 
 @router.post("/run", response_model=PipelineRunResponse)
 async def run_pipeline_sync(request: PipelineRunRequest) -> PipelineRunResponse:
@@ -34,9 +57,12 @@ async def run_pipeline_sync(request: PipelineRunRequest) -> PipelineRunResponse:
     """
     from uuid import UUID
 
+    llm_client = await _llm_client(request.llm_provider)
     try:
         track_id = UUID(request.track_id)
-        result = await run_pipeline(request.profile, track_id, request.algorithm_version)
+        result = await run_pipeline(
+            request.profile, track_id, request.algorithm_version, llm_client=llm_client
+        )
         return result
     except PipelineCancelled as e:
         raise HTTPException(
@@ -50,19 +76,83 @@ async def run_pipeline_sync(request: PipelineRunRequest) -> PipelineRunResponse:
         )
 
 
+@router.post("/resume", response_model=PipelineRunResponse)
+async def resume_pipeline(request: PipelineResumeRequest) -> PipelineRunResponse:
+    """
+    Продолжение pipeline после ошибки или отмены.
+
+    Восстанавливает результаты выполненных шагов (из step_outputs запроса
+    или из ml/logs/<track_id>) и запускает только недостающие шаги.
+    from_step принудительно пересчитывает шаг и всё, что от него зависит.
+    """
+    from uuid import UUID
+
+    track_id = UUID(request.track_id)
+    if request.from_step:
+        try:
+            resolve_step_name(request.from_step)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    llm_client = await _llm_client(request.llm_provider)
+    step_outputs = request.step_outputs
+    if step_outputs is None:
+        step_logger = await get_step_logger()
+        # Чтение JSON-файлов шагов — в worker-потоке, не блокируя event loop
+        step_outputs = await asyncio.to_thread(step_logger.load_step_outputs, track_id)
+
+    try:
+        resume_from = select_resumable_outputs(step_outputs, request.from_step)
+        return await run_pipeline(
+            request.profile, track_id, request.algorithm_version,
+            resume_from=resume_from, llm_client=llm_client,
+        )
+    except PipelineCancelled as e:
+        raise HTTPException(
+            status_code=499,  # Client Closed Request
+            detail=f"Pipeline cancelled after steps: {', '.join(e.completed_steps)}",
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Pipeline execution failed: {str(e)}",
+        )
+
+
 @router.post("/run-batch", response_model=PipelineBatchResponse)
-async def run_pipeline_batch_endpoint(request: PipelineBatchRequest) -> PipelineBatchResponse:
+async def run_pipeline_batch_endpoint(
+    request: PipelineBatchRequest,
+    http_request: Request,
+) -> Any:
     """
     Batch запуск pipeline для N треков.
 
     Запускает N генераций параллельно и возвращает массив результатов.
+    С Accept: application/x-ndjson отвечает потоком: строка на трек
+    ({"index", "track_id", ...результат}) сразу после его завершения,
+    последняя строка — {"done": true, "tracks": N}. Отключение клиента
+    отменяет незавершённые треки.
+    fork_after — шаги до развилки выполняются один раз на весь batch.
     """
     from uuid import UUID
 
+    llm_client = await _llm_client(request.llm_provider)
     try:
         track_ids = [UUID(tid) for tid in request.track_ids]
+        if request.fork_after:
+            resolve_step_name(request.fork_after)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if NDJSON_MEDIA_TYPE in http_request.headers.get("accept", ""):
+        return StreamingResponse(
+            _batch_ndjson(request, track_ids, llm_client), media_type=NDJSON_MEDIA_TYPE
+        )
+
+    try:
         result = await run_pipeline_batch(
-            request.profile, track_ids, request.algorithm_version
+            request.profile, track_ids, request.algorithm_version,
+            llm_client=llm_client, fork_after=request.fork_after,
         )
         return result
     except Exception as e:
@@ -70,3 +160,19 @@ async def run_pipeline_batch_endpoint(request: PipelineBatchRequest) -> Pipeline
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Batch pipeline execution failed: {str(e)}",
         )
+
+
+async def _batch_ndjson(
+    request: PipelineBatchRequest,
+    track_ids: list[Any],
+    llm_client: Any,
+) -> AsyncIterator[bytes]:
+    """NDJSON-поток результатов batch: строка на трек и итоговая строка done."""
+    count = 0
+    async for result in iter_pipeline_batch(
+        request.profile, track_ids, request.algorithm_version,
+        llm_client=llm_client, fork_after=request.fork_after,
+    ):
+        count += 1
+        yield (json.dumps(result, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+    yield (json.dumps({"done": True, "tracks": count}) + "\n").encode("utf-8")
@@ -20,40 +20,36 @@ from ml.src.pipeline.b6_problem_formulations import run_b6_problem_formulations
 from ml.src.pipeline.b7_schedule import run_b7_schedule
 from ml.src.pipeline.b8_validation import run_b8_validation
 from ml.src.schemas.step_testing import StepTestRequest, StepTestResponse
-from ml.src.services.deepseek_client import DeepSeekClient
-from ml.src.services.mock_llm_client import MockLLMClient
+from ml.src.services.llm_client_factory import get_llm_client
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/steps", tags=["step-testing"])
 
 
-def get_llm_client(
-    use_mock: bool, step_name: str | None = None
-) -> DeepSeekClient | MockLLMClient:
+async def get_step_client(request: StepTestRequest, step_name: str) -> Any:
     """
-    Создать LLM client (Mock или DeepSeek) в зависимости от флага.
+    Общий LLM client из реестра провайдеров (без создания клиента на запрос).
 
     Args:
-        use_mock: True для MockLLMClient, False для DeepSeekClient
-        step_name: Explicit step name for MockLLMClient (e.g., 'B1_validate')
+        request: use_mock — MockLLMClient с фиксированным шагом; иначе
+            request.llm_provider (None — провайдер по умолчанию)
+        step_name: Шаг для mock fixtures (e.g., 'B1_validate')
 
     Returns:
         LLM client с методом chat_completion
     """
-    if use_mock:
-        return MockLLMClient(
-            fixtures_dir="tests/fixtures/mock_responses", fixed_step_name=step_name
-        )
-    else:
-        return DeepSeekClient()
+    if request.use_mock:
+        mock_client = await get_llm_client("mock")
+        return mock_client.with_fixed_step(step_name)
+    return await get_llm_client(request.llm_provider)
 
 
 @router.post("/b1", response_model=StepTestResponse)
 async def test_b1_validate_profile(request: StepTestRequest) -> StepTestResponse:
     """Тестирование B1: Profile Validation and Enrichment."""
     try:
-        client = get_llm_client(request.use_mock, step_name="B1_validate")
+        client = await get_step_client(request, "B1_validate")
         profile = request.inputs["profile"]
         result, metadata = await run_b1_validate(profile, client)
 
@@ -79,7 +75,7 @@ async def test_b1_validate_profile(request: StepTestRequest) -> StepTestResponse
 async def test_b2_competencies(request: StepTestRequest) -> StepTestResponse:
     """Тестирование B2: Competency Formulation."""
     try:
-        client = get_llm_client(request.use_mock, step_name="B2_competencies")
+        client = await get_step_client(request, "B2_competencies")
         validated_profile = request.inputs["validated_profile"]
         result, metadata = await run_b2_competencies(validated_profile, client)
 
@@ -105,7 +101,7 @@ async def test_b2_competencies(request: StepTestRequest) -> StepTestResponse:
 async def test_b3_ksa_matrix(request: StepTestRequest) -> StepTestResponse:
     """Тестирование B3: KSA Matrix."""
     try:
-        client = get_llm_client(request.use_mock, step_name="B3_ksa_matrix")
+        client = await get_step_client(request, "B3_ksa_matrix")
         profile = request.inputs["profile"]
         competencies = request.inputs["competencies"]
         result, metadata = await run_b3_ksa_matrix(profile, competencies, client)
@@ -132,7 +128,7 @@ async def test_b3_ksa_matrix(request: StepTestRequest) -> StepTestResponse:
 async def test_b4_learning_units(request: StepTestRequest) -> StepTestResponse:
     """Тестирование B4: Learning Units Design."""
     try:
-        client = get_llm_client(request.use_mock, step_name="B4_learning_units")
+        client = await get_step_client(request, "B4_learning_units")
         ksa_matrix = request.inputs["ksa_matrix"]
         result, metadata = await run_b4_learning_units(ksa_matrix, client)
 
@@ -158,7 +154,7 @@ async def test_b4_learning_units(request: StepTestRequest) -> StepTestResponse:
 async def test_b5_hierarchy(request: StepTestRequest) -> StepTestResponse:
     """Тестирование B5: Hierarchy and Levels."""
     try:
-        client = get_llm_client(request.use_mock, step_name="B5_hierarchy")
+        client = await get_step_client(request, "B5_hierarchy")
         learning_units = request.inputs["learning_units"]
         time_budget_minutes = request.inputs["time_budget_minutes"]
         estimated_weeks = request.inputs["estimated_weeks"]
@@ -188,7 +184,7 @@ async def test_b5_hierarchy(request: StepTestRequest) -> StepTestResponse:
 async def test_b6_problem_formulations(request: StepTestRequest) -> StepTestResponse:
     """Тестирование B6: Problem Formulations."""
     try:
-        client = get_llm_client(request.use_mock, step_name="B6_problem_formulations")
+        client = await get_step_client(request, "B6_problem_formulations")
         clusters = request.inputs["clusters"]
         units = request.inputs["units"]
         result, metadata = await run_b6_problem_formulations(clusters, units, client)
@@ -215,7 +211,7 @@ async def test_b6_problem_formulations(request: StepTestRequest) -> StepTestResp
 async def test_b7_schedule(request: StepTestRequest) -> StepTestResponse:
     """Тестирование B7: Schedule Assembly."""
     try:
-        client = get_llm_client(request.use_mock, step_name="B7_schedule")
+        client = await get_step_client(request, "B7_schedule")
         hierarchy = request.inputs["hierarchy"]
         blueprints = request.inputs["blueprints"]
         profile = request.inputs["profile"]
@@ -246,7 +242,7 @@ async def test_b7_schedule(request: StepTestRequest) -> StepTestResponse:
 async def test_b8_validation(request: StepTestRequest) -> StepTestResponse:
     """Тестирование B8: Track Validation."""
     try:
-        client = get_llm_client(request.use_mock, step_name="B8_validation")
+        client = await get_step_client(request, "B8_validation")
         complete_track = request.inputs["complete_track"]
         profile = request.inputs["profile"]
         max_retries = request.inputs.get("max_retries", 3)
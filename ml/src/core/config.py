@@ -12,6 +12,87 @@ class Settings(BaseSettings):
     DEEPSEEK_MODEL: str = "deepseek-chat"
     DEEPSEEK_MAX_RETRIES: int = 3
     DEEPSEEK_RETRY_BACKOFF_BASE: int = 2
+    # Streaming (SSE): шаги с stream=True получают ответ по частям
+    DEEPSEEK_STREAMING_ENABLED: bool = True
+    DEEPSEEK_STREAM_READ_TIMEOUT: float = 30.0  # макс. пауза между чанками
+
+    # Провайдер LLM по умолчанию (llm_client_factory): deepseek | mock | cached | local |
+    # cassette
+    LLM_PROVIDER: str = "deepseek"
+    # local: OpenAI-совместимый сервер (заглушка для нагрузочных тестов, локальная модель)
+    LOCAL_LLM_BASE_URL: str = "http://localhost:8080/v1"
+    LOCAL_LLM_API_KEY: str = ""
+    LOCAL_LLM_MODEL: str = "local"
+    LOCAL_LLM_MAX_IN_FLIGHT: int = 64
+
+    # Общий лимитер LLM-вызовов (0 — без ограничения)
+    LLM_RATE_LIMIT_RPM: int = 120
+    LLM_RATE_LIMIT_TPM: int = 0
+    LLM_MAX_IN_FLIGHT: int = 16
+
+    # Hedged-вызовы для шагов с частыми ошибками JSON/схемы (hedged_client.py):
+    # step_name → число параллельных сэмплов (>= 2), побеждает первый валидный ответ
+    LLM_HEDGE_SAMPLES: dict[str, int] = {}
+    # step_name → задержка перед каждым следующим сэмплом: секунды или "p90" —
+    # перцентиль задержки шага (пока истории нет — новый сэмпл только после ошибки);
+    # шага нет — все сэмплы сразу
+    LLM_HEDGE_DELAY: dict[str, float | str] = {}
+
+    # LLM response cache (content-addressed: model + prompt + params + schema).
+    # По умолчанию кэшируются только детерминированные вызовы (temperature <=
+    # LLM_CACHE_MAX_TEMPERATURE): иначе повторная генерация того же профиля
+    # вернула бы тот же трек, а batch-прогоны CDV — нулевой разброс.
+    # Остальные вызовы — только с явным use_cache=True (ручной запуск шага)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.0
+    # Вне дерева исходников; "" — только память
+    LLM_CACHE_PATH: str = "~/.cache/nastavnik/llm_responses.sqlite3"
+    LLM_CACHE_TTL_SEC: int = 7 * 24 * 3600
+    LLM_CACHE_MEMORY_MAX_ENTRIES: int = 256
+    LLM_CACHE_DISK_MAX_ENTRIES: int = 5000
+
+    # Кассета обменов с LLM API (llm_cassette.py): record — дописывать каждый
+    # запрос/ответ в JSONL; replay — отвечать из кассеты без сети (кэш ответов
+    # выключен) с записанной задержкой × LLM_CASSETTE_TIME_SCALE (0 — сразу)
+    LLM_CASSETTE_MODE: str = "off"  # off | record | replay
+    LLM_CASSETTE_PATH: str = "ml/cassettes/llm_exchanges.jsonl"
+    # Каталог именованных кассет для провайдера cassette:<name> ("" — выключено)
+    LLM_CASSETTE_DIR: str = ""
+    LLM_CASSETTE_TIME_SCALE: float = 1.0
+
+    # Step log sink: очередь → батчи в POST /api/logs/steps:bulk, файлы в worker-потоке
+    STEP_LOG_QUEUE_SIZE: int = 1000
+    STEP_LOG_BATCH_SIZE: int = 50
+    STEP_LOG_FLUSH_INTERVAL_SEC: float = 0.2
+    STEP_LOG_FLUSH_TIMEOUT_SEC: float = 10.0  # ожидание доставки в конце pipeline / при shutdown
+
+    # B6 fan-out: один LLM-вызов на группу кластеров, неудачные группы повторяются
+    B6_CLUSTERS_PER_SHARD: int = 1
+    B6_SHARD_MAX_ATTEMPTS: int = 2  # поверх ретраев внутри chat_completion
+
+    # B7: план недель без LLM; дни — packer (LLM пишет только темы и цели недель)
+    # или LLM с параллельной детализацией диапазонов недель
+    B7_SCHEDULER: str = "packer"  # packer | llm
+    B7_WEEKS_PER_SHARD: int = 2  # llm: 0 — один streaming-вызов на всё расписание
+    B7_SHARD_MAX_ATTEMPTS: int = 2  # поверх ретраев внутри chat_completion
+
+    # B8: llm — все 22 проверки в LLM; hybrid — правила b8_rules + LLM только для
+    # семантических проверок; skip_llm_on_pass — hybrid, но без LLM, если правила прошли
+    B8_VALIDATION_MODE: str = "hybrid"
+    # Исправление критических провалов B8: перегенерация шагов-владельцев проверок
+    # и их потомков; раунд не начинается, если не укладывается в бюджет
+    B8_REPAIR_MAX_ROUNDS: int = 1  # 0 — без исправления
+    B8_REPAIR_TOKEN_BUDGET: int = 40000
+    B8_REPAIR_TIME_BUDGET_SEC: float = 180.0
+
+    # Batch одного профиля: шаг-развилка и его предки выполняются один раз на
+    # batch, треки расходятся после него (B1, B2_competencies, ...; "" — каждый
+    # трек выполняет все шаги)
+    BATCH_FORK_AFTER: str = ""
+
+    # Сериализация upstream-данных в промптах: pretty | minified | pruned | abbreviated
+    # (см. prompts/json_utils.py; сравнение — scripts/prompt_token_report.py)
+    PROMPT_JSON_MODE: str = "pruned"
 
     # ML service configuration
     ML_HOST: str = "0.0.0.0"
@@ -5,6 +5,9 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 from ml.src.services.deepseek_client import close_deepseek_client
+from ml.src.services.llm_cache import close_llm_cache
+from ml.src.services.llm_client_factory import close_llm_clients
+from ml.src.services.step_logger import close_step_logger
 
 
 @asynccontextmanager
@@ -13,8 +16,11 @@ async def lifespan(app: FastAPI):
     # Startup
     yield
 
-    # Shutdown: Close DeepSeek client
+    # Shutdown: доставить оставшиеся логи шагов, затем закрыть клиентов
+    await close_step_logger()
+    await close_llm_clients()
     await close_deepseek_client()
+    await close_llm_cache()
 
 
 # Create FastAPI app
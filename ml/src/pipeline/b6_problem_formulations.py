@@ -1,19 +1,37 @@
-"""B6: Problem Formulations (Lesson Blueprints)."""
+"""B6: Problem Formulations (Lesson Blueprints).
 
+Map-reduce: кластеры делятся на группы (settings.B6_CLUSTERS_PER_SHARD),
+по каждой группе — отдельный параллельный LLM-вызов. Повторяются только
+группы, ответ которых не покрыл свои кластеры; результаты сливаются
+в BlueprintsOutput в порядке кластеров B4.
+"""
+
+import asyncio
 import logging
+import time
 from typing import Any
 
+from ml.src.core.config import settings
 from ml.src.prompts.b6_prompt import get_b6_prompt
-from ml.src.schemas.pipeline_steps import BlueprintsOutput
-from ml.src.services.deepseek_client import DeepSeekClient
+from ml.src.schemas.pipeline_steps import BlueprintsOutput, LessonBlueprint
+from ml.src.services.deepseek_client import DeepSeekClient, DeepSeekError
 
 logger = logging.getLogger(__name__)
 
+# Бюджет ответа на один кластер; прежний вызов на все кластеры — 6000
+MAX_TOKENS_PER_CLUSTER = 2000
+MAX_TOKENS_PER_SHARD = 6000
+
+
+class B6ShardError(DeepSeekError):
+    """Ответ группы не содержит blueprint для всех её кластеров."""
+
 
 async def run_b6_problem_formulations(
     clusters: list[dict[str, Any]],
     units: dict[str, Any],
     deepseek_client: DeepSeekClient,
+    clusters_per_shard: int | None = None,
 ) -> tuple[BlueprintsOutput, dict[str, Any]]:
     """
     B6: Create PBL lesson blueprints for each cluster.
@@ -22,21 +40,118 @@ async def run_b6_problem_formulations(
         clusters: Cluster data from B4
         units: All units data from B4
         deepseek_client: DeepSeek API client
+        clusters_per_shard: Кластеров на один LLM-вызов (None — из settings)
 
     Returns:
         Tuple of (blueprints, metadata)
     """
     logger.info("Starting B6: Problem formulations")
+    start_time = time.time()
 
-    prompt = get_b6_prompt(clusters, units)
+    size = max(1, clusters_per_shard or settings.B6_CLUSTERS_PER_SHARD)
+    shards = [clusters[i:i + size] for i in range(0, len(clusters), size)]
 
-    result, metadata = await deepseek_client.chat_completion(
-        prompt=prompt,
-        response_model=BlueprintsOutput,
-        temperature=0.8,  # Higher creativity for problem design
-        max_tokens=6000,
-    )
+    tasks = [
+        asyncio.create_task(_run_shard(index, shard, units, deepseek_client))
+        for index, shard in enumerate(shards)
+    ]
+    try:
+        shard_results = await asyncio.gather(*tasks)
+    except BaseException:
+        # Группа исчерпала попытки — остальные вызовы больше не нужны
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    blueprints: list[LessonBlueprint] = []
+    shard_meta: list[dict[str, Any]] = []
+    for shard_blueprints, meta in shard_results:
+        blueprints.extend(shard_blueprints)
+        shard_meta.append(meta)
 
-    logger.info(f"B6 complete: {len(result.blueprints)} lesson blueprints created")
+    # Каждая группа нумерует свои blueprint'ы с bp1 — перенумеровать сквозным образом
+    for number, blueprint in enumerate(blueprints, start=1):
+        blueprint.id = f"bp{number}"
+
+    result = BlueprintsOutput(blueprints=blueprints)
+    metadata = {
+        "tokens_used": sum(meta["tokens_used"] or 0 for meta in shard_meta),
+        "duration_ms": (time.time() - start_time) * 1000,
+        "model": shard_meta[0].get("model") if shard_meta else None,
+        "streamed": False,
+        "shards": shard_meta,
+    }
+
+    logger.info(
+        f"B6 complete: {len(result.blueprints)} lesson blueprints created "
+        f"in {len(shards)} shard(s)"
+    )
 
     return result, metadata
+
+
+async def _run_shard(
+    index: int,
+    clusters: list[dict[str, Any]],
+    units: dict[str, Any],
+    deepseek_client: DeepSeekClient,
+) -> tuple[list[LessonBlueprint], dict[str, Any]]:
+    """Blueprint'ы одной группы кластеров — с повтором только этой группы."""
+    cluster_ids = [cluster.get("id") for cluster in clusters]
+    prompt = get_b6_prompt(clusters, units)
+    max_tokens = min(MAX_TOKENS_PER_SHARD, MAX_TOKENS_PER_CLUSTER * max(1, len(clusters)))
+    max_attempts = max(1, settings.B6_SHARD_MAX_ATTEMPTS)
+
+    tokens_used = 0
+    last_error: Exception | None = None
+    for attempt in range(1, max_attempts + 1):
+        try:
+            result, metadata = await deepseek_client.chat_completion(
+                prompt=prompt,
+                response_model=BlueprintsOutput,
+                temperature=0.8,  # Higher creativity for problem design
+                max_tokens=max_tokens,
+                # Повтор не должен вернуть тот же закэшированный ответ
+                use_cache=None if attempt == 1 else False,
+            )
+            tokens_used += metadata.get("tokens_used") or 0
+            blueprints = _select_shard_blueprints(result, cluster_ids)
+        except (DeepSeekError, ValueError) as e:
+            # ValueError покрывает pydantic ValidationError
+            last_error = e
+            logger.warning(
+                f"B6 shard {index + 1} ({', '.join(map(str, cluster_ids))}) "
+                f"attempt {attempt}/{max_attempts} failed: {e}"
+            )
+            continue
+
+        return blueprints, {
+            **metadata,
+            "tokens_used": tokens_used,
+            "shard": index,
+            "cluster_ids": cluster_ids,
+            "attempts": attempt,
+        }
+
+    raise last_error or B6ShardError(f"B6 shard {index + 1} failed")
+
+
+def _select_shard_blueprints(
+    result: BlueprintsOutput, cluster_ids: list[str]
+) -> list[LessonBlueprint]:
+    """
+    По одному blueprint на кластер группы, в порядке кластеров.
+
+    Raises:
+        B6ShardError: Для какого-то кластера группы blueprint не вернулся
+    """
+    by_cluster: dict[str, LessonBlueprint] = {}
+    for blueprint in result.blueprints:
+        if blueprint.cluster_id in cluster_ids:
+            by_cluster.setdefault(blueprint.cluster_id, blueprint)
+
+    missing = [cluster_id for cluster_id in cluster_ids if cluster_id not in by_cluster]
+    if missing:
+        raise B6ShardError(f"No blueprint for cluster(s): {', '.join(map(str, missing))}")
+    return [by_cluster[cluster_id] for cluster_id in cluster_ids]
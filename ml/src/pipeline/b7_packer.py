@@ -0,0 +1,145 @@
+"""B7 packer: детерминированная раскладка юнитов недели по дням (без LLM).
+
+Вход — план недель (b7_week_plan.allocate_weeks) и доступность учащегося:
+- schedule: минуты по дням недели (сумма урезается до weekly_hours);
+- practice_windows: короткие ежедневные окна — в них попадают
+  automation-юниты, которые в окна помещаются.
+Порядок юнитов сохраняется: следующий юнит никогда не ставится на день
+раньше предыдущего. Юнит, не помещающийся ни в один оставшийся день,
+ставится на день с наибольшим остатком — перегруз считается в overflow.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from ml.src.pipeline.b7_week_plan import DEFAULT_UNIT_MINUTES, WeekPlan, unit_index
+
+WEEK_DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+# Без schedule: weekly_hours делятся поровну на будни
+DEFAULT_STUDY_DAYS = WEEK_DAYS[:5]
+
+
+@dataclass
+class DaySlot:
+    """Доступное время одного дня недели."""
+
+    day_of_week: str
+    minutes: int
+    practice_minutes: int = 0
+
+
+@dataclass
+class PackedDay:
+    """Юниты одного дня после раскладки."""
+
+    day_of_week: str
+    learning_units: list[str] = field(default_factory=list)
+    total_minutes: int = 0
+
+
+@dataclass
+class PackedWeek:
+    """Дни одной недели и перегруз (минуты сверх доступного времени)."""
+
+    week_number: int
+    days: list[PackedDay]
+    overflow_minutes: int = 0
+
+
+def day_slots(schedule_info: dict[str, Any]) -> list[DaySlot]:
+    """
+    Доступное время по дням недели из schedule / practice_windows / weekly_hours.
+
+    Минуты schedule пропорционально урезаются, если их сумма больше
+    weekly_hours; practice_windows в weekly_hours не входят.
+    """
+    practice = sum(
+        int(window.get("duration_minutes") or 0)
+        for window in schedule_info.get("practice_windows") or []
+    )
+    weekly_minutes = int((schedule_info.get("weekly_hours") or 0) * 60)
+
+    available: dict[str, int] = {}
+    for entry in schedule_info.get("schedule") or []:
+        day = str(entry.get("day_of_week", "")).lower()
+        if day in WEEK_DAYS:
+            available[day] = available.get(day, 0) + int(entry.get("available_minutes") or 0)
+    if not any(available.values()):
+        per_day = (weekly_minutes or 5 * 60) // len(DEFAULT_STUDY_DAYS)
+        available = {day: per_day for day in DEFAULT_STUDY_DAYS}
+
+    total = sum(available.values())
+    scale = weekly_minutes / total if weekly_minutes and total > weekly_minutes else 1.0
+
+    return [
+        DaySlot(day, int(available.get(day, 0) * scale), practice)
+        for day in WEEK_DAYS
+        if available.get(day, 0) > 0 or practice > 0
+    ]
+
+
+def pack_schedule(
+    plans: list[WeekPlan],
+    learning_units: dict[str, Any] | None,
+    schedule_info: dict[str, Any],
+) -> list[PackedWeek]:
+    """
+    Разложить юниты каждой недели плана по дням.
+
+    Args:
+        plans: План недель (allocate_weeks)
+        learning_units: Output from B4 (estimated_minutes, automation_units)
+        schedule_info: schedule, practice_windows, weekly_hours учащегося
+
+    Returns:
+        Недели в порядке плана
+    """
+    units = unit_index(learning_units)
+    automation = {unit["id"] for unit in (learning_units or {}).get("automation_units", [])}
+    minutes = {
+        unit_id: int(unit.get("estimated_minutes") or DEFAULT_UNIT_MINUTES)
+        for unit_id, unit in units.items()
+    }
+    slots = day_slots(schedule_info)
+    return [pack_week(plan, minutes, automation, slots) for plan in plans]
+
+
+def pack_week(
+    plan: WeekPlan,
+    minutes: dict[str, int],
+    automation: set[str],
+    slots: list[DaySlot],
+) -> PackedWeek:
+    """Раскладка одной недели: по порядку юнитов, день за днём."""
+    days = [PackedDay(slot.day_of_week) for slot in slots]
+    remaining = [slot.minutes for slot in slots]
+    practice = [slot.practice_minutes for slot in slots]
+    overflow = 0
+
+    current = 0
+    for unit_id in plan.unit_ids:
+        unit_minutes = minutes.get(unit_id, DEFAULT_UNIT_MINUTES)
+        index = current
+        while index < len(days):
+            if unit_id in automation and unit_minutes <= practice[index]:
+                practice[index] -= unit_minutes
+                break
+            if unit_minutes <= remaining[index]:
+                remaining[index] -= unit_minutes
+                break
+            index += 1
+        else:
+            # Ни один оставшийся день не вмещает юнит — день с наибольшим остатком
+            index = max(range(current, len(days)), key=lambda i: (remaining[i], -i))
+            overflow += unit_minutes - max(0, remaining[index])
+            remaining[index] = max(0, remaining[index] - unit_minutes)
+
+        days[index].learning_units.append(unit_id)
+        days[index].total_minutes += unit_minutes
+        current = index
+
+    return PackedWeek(
+        week_number=plan.week_number,
+        days=[day for day in days if day.learning_units],
+        overflow_minutes=overflow,
+    )
@@ -1,14 +1,58 @@
-"""B7: Schedule Assembly."""
+"""B7: Schedule Assembly.
 
+Сначала unit_sequence детерминированно распределяется по неделям
+(b7_week_plan). Дальше — по settings.B7_SCHEDULER:
+- packer (по умолчанию): дни недель раскладывает b7_packer без LLM;
+  LLM только пишет темы и цели недель и, параллельно, общий каркас —
+  checkpoints, final_assessment, support_plan, progress_milestones;
+- llm: диапазоны недель (settings.B7_WEEKS_PER_SHARD) детализируются
+  параллельными LLM-вызовами (каждый ответ валидируется как TrackWeek),
+  одновременно с тем же вызовом общего каркаса. B7_WEEKS_PER_SHARD=0 —
+  прежний единый streaming-вызов на всё расписание.
+Повторяются только неудачные вызовы; результаты сливаются в ScheduleOutput.
+"""
+
+import asyncio
+import inspect
 import logging
+import time
+from dataclasses import asdict
 from typing import Any
 
-from ml.src.prompts.b7_prompt import get_b7_prompt
-from ml.src.schemas.pipeline_steps import ScheduleOutput
-from ml.src.services.deepseek_client import DeepSeekClient
+from ml.src.core.config import settings
+from ml.src.pipeline.b7_packer import pack_schedule
+from ml.src.pipeline.b7_week_plan import WeekPlan, allocate_weeks, unit_index
+from ml.src.prompts.b7_prompt import (
+    get_b7_frame_prompt,
+    get_b7_narratives_prompt,
+    get_b7_prompt,
+    get_b7_weeks_prompt,
+)
+from ml.src.schemas.pipeline_steps import (
+    ScheduleFrameOutput,
+    ScheduleNarrativesOutput,
+    ScheduleOutput,
+    ScheduleWeeksOutput,
+    TrackDay,
+    TrackWeek,
+    WeekNarrative,
+)
+from ml.src.services.deepseek_client import DeepSeekClient, DeepSeekError, ProgressCallback
 
 logger = logging.getLogger(__name__)
 
+# Бюджет ответа на одну неделю; прежний вызов на всё расписание — 8000
+MAX_TOKENS_PER_WEEK = 1500
+MAX_TOKENS_PER_SHARD = 8000
+MAX_TOKENS_FRAME = 3000
+# Тема и 2-4 цели одной недели (packer)
+MAX_TOKENS_NARRATIVE_PER_WEEK = 150
+B7_SCHEDULERS = ("packer", "llm")
+
+
+class B7ShardError(DeepSeekError):
+    """Ответ не покрывает все недели своего диапазона (или плана)."""
+
 
 async def run_b7_schedule(
     hierarchy: dict[str, Any],
@@ -16,6 +60,10 @@ async def run_b7_schedule(
     profile: dict[str, Any],
     total_weeks: int,
     deepseek_client: DeepSeekClient,
+    on_progress: ProgressCallback | None = None,
+    learning_units: dict[str, Any] | None = None,
+    weeks_per_shard: int | None = None,
+    scheduler: str | None = None,
 ) -> tuple[ScheduleOutput, dict[str, Any]]:
     """
     B7: Assemble weekly schedule with daily distribution.
@@ -26,6 +74,10 @@ async def run_b7_schedule(
         profile: Original profile (for schedule/availability)
         total_weeks: Target weeks
         deepseek_client: DeepSeek API client
+        on_progress: Called for each week/checkpoint as it is generated
+        learning_units: Output from B4 (оценки времени для распределения по неделям)
+        weeks_per_shard: Недель на один LLM-вызов (None — из settings, 0 — один вызов)
+        scheduler: packer | llm (None — settings.B7_SCHEDULER)
 
     Returns:
         Tuple of (schedule, metadata)
@@ -39,6 +91,21 @@ async def run_b7_schedule(
         "weekly_hours": profile.get("weekly_hours", 5),
     }
 
+    scheduler = scheduler or settings.B7_SCHEDULER
+    if scheduler not in B7_SCHEDULERS:
+        raise ValueError(f"Unknown B7 scheduler: {scheduler}")
+    if scheduler == "packer":
+        return await _run_packed(
+            hierarchy, learning_units, schedule_info, total_weeks, deepseek_client, on_progress,
+        )
+
+    size = settings.B7_WEEKS_PER_SHARD if weeks_per_shard is None else weeks_per_shard
+    if size > 0:
+        return await _run_sharded(
+            hierarchy, blueprints, learning_units, schedule_info, total_weeks,
+            deepseek_client, on_progress, size,
+        )
+
     prompt = get_b7_prompt(hierarchy, blueprints, schedule_info, total_weeks)
 
     result, metadata = await deepseek_client.chat_completion(
@@ -46,6 +113,8 @@ async def run_b7_schedule(
         response_model=ScheduleOutput,
         temperature=0.6,
         max_tokens=8000,
+        stream=True,  # Longest step: stream to report weeks and fail fast
+        on_progress=on_progress,
     )
 
     logger.info(
@@ -54,3 +123,377 @@ async def run_b7_schedule(
     )
 
     return result, metadata
+
+
+async def _run_sharded(
+    hierarchy: dict[str, Any],
+    blueprints: dict[str, Any],
+    learning_units: dict[str, Any] | None,
+    schedule_info: dict[str, Any],
+    total_weeks: int,
+    deepseek_client: DeepSeekClient,
+    on_progress: ProgressCallback | None,
+    weeks_per_shard: int,
+) -> tuple[ScheduleOutput, dict[str, Any]]:
+    """Стадия 1 — план недель, стадия 2 — параллельная детализация и общий каркас."""
+    start_time = time.time()
+
+    plans = allocate_weeks(hierarchy, learning_units, total_weeks)
+    plan_data = _week_plan_data(plans, learning_units)
+    shards = [
+        plan_data[i:i + weeks_per_shard] for i in range(0, len(plan_data), weeks_per_shard)
+    ]
+    problems = blueprints.get("blueprints", [])
+
+    tasks = [
+        asyncio.create_task(_run_week_shard(
+            index, shard, _shard_problems(problems, plans, shard), schedule_info,
+            total_weeks, deepseek_client, on_progress,
+        ))
+        for index, shard in enumerate(shards)
+    ]
+    tasks.append(asyncio.create_task(
+        _run_frame(plan_data, schedule_info, total_weeks, deepseek_client)
+    ))
+    *shard_results, (frame, frame_meta) = await _gather_or_cancel(tasks)
+
+    weeks: list[TrackWeek] = []
+    shard_meta: list[dict[str, Any]] = []
+    for shard_weeks, meta in shard_results:
+        weeks.extend(shard_weeks)
+        shard_meta.append(meta)
+
+    # Checkpoint недели — из общего каркаса
+    checkpoints = {checkpoint.week_number: checkpoint for checkpoint in frame.checkpoints}
+    for week in weeks:
+        week.checkpoint = checkpoints.get(week.week_number)
+
+    result = ScheduleOutput(
+        weeks=weeks,
+        total_weeks=len(weeks),
+        checkpoints=frame.checkpoints,
+        final_assessment=frame.final_assessment,
+        support_plan=frame.support_plan,
+        progress_milestones=frame.progress_milestones,
+    )
+    metadata = {
+        "tokens_used": sum(meta["tokens_used"] or 0 for meta in [*shard_meta, frame_meta]),
+        "duration_ms": (time.time() - start_time) * 1000,
+        "model": frame_meta.get("model"),
+        "streamed": False,
+        "week_plan": [asdict(plan) for plan in plans],
+        "shards": shard_meta,
+        "frame": frame_meta,
+    }
+
+    logger.info(
+        f"B7 complete: {result.total_weeks} weeks in {len(shards)} shard(s), "
+        f"{len(result.checkpoints)} checkpoints"
+    )
+
+    return result, metadata
+
+
+async def _run_packed(
+    hierarchy: dict[str, Any],
+    learning_units: dict[str, Any] | None,
+    schedule_info: dict[str, Any],
+    total_weeks: int,
+    deepseek_client: DeepSeekClient,
+    on_progress: ProgressCallback | None,
+) -> tuple[ScheduleOutput, dict[str, Any]]:
+    """Дни — packer без LLM; темы/цели недель и общий каркас — два параллельных вызова."""
+    start_time = time.time()
+
+    plans = allocate_weeks(hierarchy, learning_units, total_weeks)
+    plan_data = _week_plan_data(plans, learning_units)
+    packed = pack_schedule(plans, learning_units, schedule_info)
+    overflow = {week.week_number: week.overflow_minutes for week in packed if week.overflow_minutes}
+    if overflow:
+        logger.warning(f"B7 packer: weeks over learner's available time (minutes): {overflow}")
+
+    (narratives, narratives_meta), (frame, frame_meta) = await _gather_or_cancel([
+        asyncio.create_task(_run_narratives(plan_data, total_weeks, deepseek_client)),
+        asyncio.create_task(_run_frame(plan_data, schedule_info, total_weeks, deepseek_client)),
+    ])
+
+    checkpoints = {checkpoint.week_number: checkpoint for checkpoint in frame.checkpoints}
+    weeks: list[TrackWeek] = []
+    for plan, packed_week in zip(plans, packed):
+        narrative = narratives[plan.week_number]
+        week = TrackWeek(
+            week_number=plan.week_number,
+            level=plan.level,
+            theme=narrative.theme,
+            weekly_goals=narrative.weekly_goals,
+            days=[
+                TrackDay(
+                    day_of_week=day.day_of_week,
+                    learning_units=day.learning_units,
+                    total_minutes=day.total_minutes,
+                )
+                for day in packed_week.days
+            ],
+            checkpoint=checkpoints.get(plan.week_number),
+        )
+        weeks.append(week)
+        await _report(on_progress, {
+            "key": "weeks", "index": week.week_number - 1, "item": week.model_dump(),
+        })
+
+    result = ScheduleOutput(
+        weeks=weeks,
+        total_weeks=len(weeks),
+        checkpoints=frame.checkpoints,
+        final_assessment=frame.final_assessment,
+        support_plan=frame.support_plan,
+        progress_milestones=frame.progress_milestones,
+    )
+    metadata = {
+        "tokens_used": (narratives_meta["tokens_used"] or 0) + (frame_meta["tokens_used"] or 0),
+        "duration_ms": (time.time() - start_time) * 1000,
+        "model": frame_meta.get("model"),
+        "streamed": False,
+        "scheduler": "packer",
+        "week_plan": [asdict(plan) for plan in plans],
+        "overflow_minutes": overflow,
+        "narratives": narratives_meta,
+        "frame": frame_meta,
+    }
+
+    logger.info(
+        f"B7 complete: {result.total_weeks} weeks packed, "
+        f"{len(result.checkpoints)} checkpoints"
+    )
+
+    return result, metadata
+
+
+async def _run_narratives(
+    plans: list[dict[str, Any]],
+    total_weeks: int,
+    deepseek_client: DeepSeekClient,
+) -> tuple[dict[int, WeekNarrative], dict[str, Any]]:
+    """Темы и цели всех недель одним небольшим вызовом."""
+    result, metadata, attempt = await _complete_with_retries(
+        "B7 narratives",
+        deepseek_client,
+        prompt=get_b7_narratives_prompt(plans, total_weeks),
+        response_model=ScheduleNarrativesOutput,
+        max_tokens=min(
+            MAX_TOKENS_PER_SHARD, MAX_TOKENS_NARRATIVE_PER_WEEK * max(1, len(plans)) + 200
+        ),
+        select=lambda response: _select_narratives(response, plans),
+    )
+    return result, {**metadata, "attempts": attempt}
+
+
+async def _gather_or_cancel(tasks: list[asyncio.Task]) -> list[Any]:
+    """Результаты всех задач; если одна упала — остальные отменяются."""
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        # Вызов исчерпал попытки — остальные больше не нужны
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def _run_week_shard(
+    index: int,
+    plans: list[dict[str, Any]],
+    problems: list[dict[str, Any]],
+    schedule_info: dict[str, Any],
+    total_weeks: int,
+    deepseek_client: DeepSeekClient,
+    on_progress: ProgressCallback | None,
+) -> tuple[list[TrackWeek], dict[str, Any]]:
+    """Недели одного диапазона — с повтором только этого диапазона."""
+    week_numbers = [plan["week_number"] for plan in plans]
+    prompt = get_b7_weeks_prompt(plans, problems, schedule_info, total_weeks)
+    max_tokens = min(MAX_TOKENS_PER_SHARD, MAX_TOKENS_PER_WEEK * max(1, len(plans)))
+
+    result, metadata, attempt = await _complete_with_retries(
+        f"B7 weeks {week_numbers[0]}-{week_numbers[-1]}",
+        deepseek_client,
+        prompt=prompt,
+        response_model=ScheduleWeeksOutput,
+        max_tokens=max_tokens,
+        select=lambda response: _select_shard_weeks(response, plans),
+    )
+
+    for week in result:
+        await _report(on_progress, {
+            "key": "weeks", "index": week.week_number - 1, "item": week.model_dump(),
+        })
+
+    return result, {
+        **metadata,
+        "shard": index,
+        "week_numbers": week_numbers,
+        "attempts": attempt,
+    }
+
+
+async def _run_frame(
+    plans: list[dict[str, Any]],
+    schedule_info: dict[str, Any],
+    total_weeks: int,
+    deepseek_client: DeepSeekClient,
+) -> tuple[ScheduleFrameOutput, dict[str, Any]]:
+    """Checkpoints, final_assessment, support_plan и milestones всего трека."""
+    outline = [
+        {key: plan[key] for key in ("week_number", "level", "minutes", "units")}
+        for plan in plans
+    ]
+    result, metadata, attempt = await _complete_with_retries(
+        "B7 frame",
+        deepseek_client,
+        prompt=get_b7_frame_prompt(outline, schedule_info, total_weeks),
+        response_model=ScheduleFrameOutput,
+        max_tokens=MAX_TOKENS_FRAME,
+        select=lambda response: response,
+    )
+    return result, {**metadata, "attempts": attempt}
+
+
+async def _complete_with_retries(
+    label: str,
+    deepseek_client: DeepSeekClient,
+    prompt: str,
+    response_model: type,
+    max_tokens: int,
+    select: Any,
+) -> tuple[Any, dict[str, Any], int]:
+    """LLM-вызов с повтором (settings.B7_SHARD_MAX_ATTEMPTS); select проверяет ответ."""
+    max_attempts = max(1, settings.B7_SHARD_MAX_ATTEMPTS)
+
+    tokens_used = 0
+    last_error: Exception | None = None
+    for attempt in range(1, max_attempts + 1):
+        try:
+            response, metadata = await deepseek_client.chat_completion(
+                prompt=prompt,
+                response_model=response_model,
+                temperature=0.6,
+                max_tokens=max_tokens,
+                # Повтор не должен вернуть тот же закэшированный ответ
+                use_cache=None if attempt == 1 else False,
+            )
+            tokens_used += metadata.get("tokens_used") or 0
+            result = select(response)
+        except (DeepSeekError, ValueError) as e:
+            # ValueError покрывает pydantic ValidationError
+            last_error = e
+            logger.warning(f"{label} attempt {attempt}/{max_attempts} failed: {e}")
+            continue
+
+        return result, {**metadata, "tokens_used": tokens_used}, attempt
+
+    raise last_error or B7ShardError(f"{label} failed")
+
+
+def _select_shard_weeks(
+    result: ScheduleWeeksOutput, plans: list[dict[str, Any]]
+) -> list[TrackWeek]:
+    """
+    По одной неделе на каждую неделю диапазона, по порядку.
+
+    Raises:
+        B7ShardError: Какой-то недели диапазона в ответе нет
+    """
+    by_number: dict[int, TrackWeek] = {}
+    for week in result.weeks:
+        by_number.setdefault(week.week_number, week)
+
+    missing = [plan["week_number"] for plan in plans if plan["week_number"] not in by_number]
+    if missing:
+        raise B7ShardError(f"No schedule for week(s): {', '.join(map(str, missing))}")
+
+    weeks = []
+    for plan in plans:
+        week = by_number[plan["week_number"]]
+        planned = {unit["id"] for unit in plan["units"]}
+        scheduled = {unit_id for day in week.days for unit_id in day.learning_units}
+        if scheduled != planned:
+            # Не ошибка ответа: покрытие юнитов проверяет B8
+            logger.warning(
+                f"B7 week {plan['week_number']}: days differ from week plan "
+                f"(extra: {sorted(scheduled - planned)}, missing: {sorted(planned - scheduled)})"
+            )
+        week.level = plan["level"]
+        weeks.append(week)
+    return weeks
+
+
+def _select_narratives(
+    result: ScheduleNarrativesOutput, plans: list[dict[str, Any]]
+) -> dict[int, WeekNarrative]:
+    """
+    week_number → тема и цели; нужны все недели плана.
+
+    Raises:
+        B7ShardError: Для какой-то недели темы нет
+    """
+    by_number: dict[int, WeekNarrative] = {}
+    for narrative in result.weeks:
+        by_number.setdefault(narrative.week_number, narrative)
+
+    missing = [plan["week_number"] for plan in plans if plan["week_number"] not in by_number]
+    if missing:
+        raise B7ShardError(f"No theme for week(s): {', '.join(map(str, missing))}")
+    return by_number
+
+
+def _week_plan_data(
+    plans: list[WeekPlan], learning_units: dict[str, Any] | None
+) -> list[dict[str, Any]]:
+    """План недель для промптов: юниты с названием и временем."""
+    units = unit_index(learning_units)
+    data = []
+    for plan in plans:
+        data.append({
+            "week_number": plan.week_number,
+            "level": plan.level,
+            "minutes": plan.minutes,
+            "units": [
+                {
+                    "id": unit_id,
+                    "title": units.get(unit_id, {}).get("title"),
+                    "estimated_minutes": units.get(unit_id, {}).get("estimated_minutes"),
+                }
+                for unit_id in plan.unit_ids
+            ],
+        })
+    return data
+
+
+def _shard_problems(
+    problems: list[dict[str, Any]],
+    plans: list[WeekPlan],
+    shard: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Проблемные ситуации B6 только для кластеров недель диапазона."""
+    week_numbers = {plan["week_number"] for plan in shard}
+    cluster_ids = {
+        cluster_id
+        for plan in plans if plan.week_number in week_numbers
+        for cluster_id in plan.cluster_ids
+    }
+    return [
+        {
+            "cluster_id": problem.get("cluster_id"),
+            "problem_statement": (problem.get("problem_formulation") or {}).get("problem_statement"),
+        }
+        for problem in problems
+        if problem.get("cluster_id") in cluster_ids
+    ]
+
+
+async def _report(on_progress: ProgressCallback | None, event: dict[str, Any]) -> None:
+    if on_progress is None:
+        return
+    result = on_progress(event)
+    if inspect.isawaitable(result):
+        await result
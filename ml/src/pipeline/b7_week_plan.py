@@ -0,0 +1,138 @@
+"""B7 week plan: детерминированное распределение unit_sequence по неделям.
+
+Без LLM: порядок юнитов B5 сохраняется, недели нарезаются по накопленному
+estimated_minutes (B4) так, чтобы нагрузка была ровной. Уровень недели —
+уровень B5, которому принадлежит большая часть её минут.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+# Если юнита нет в B4 (или B4 не передан) — оценка по умолчанию
+DEFAULT_UNIT_MINUTES = 30
+
+_UNIT_KINDS = ("theory_units", "practice_units", "automation_units")
+
+
+@dataclass
+class WeekPlan:
+    """Юниты одной недели и её уровень (до раскладки по дням)."""
+
+    week_number: int
+    level: str
+    unit_ids: list[str] = field(default_factory=list)
+    minutes: int = 0
+    cluster_ids: list[str] = field(default_factory=list)
+
+
+def unit_index(learning_units: dict[str, Any] | None) -> dict[str, dict[str, Any]]:
+    """unit_id → юнит B4 (theory/practice/automation)."""
+    index: dict[str, dict[str, Any]] = {}
+    for kind in _UNIT_KINDS:
+        for unit in (learning_units or {}).get(kind, []):
+            index[unit["id"]] = unit
+    return index
+
+
+def unit_clusters(learning_units: dict[str, Any] | None) -> dict[str, str]:
+    """unit_id → id кластера B4."""
+    clusters: dict[str, str] = {}
+    for cluster in (learning_units or {}).get("clusters", []):
+        for kind in _UNIT_KINDS:
+            for unit_id in cluster.get(kind, []):
+                clusters.setdefault(unit_id, cluster["id"])
+    return clusters
+
+
+def allocate_weeks(
+    hierarchy: dict[str, Any],
+    learning_units: dict[str, Any] | None,
+    total_weeks: int,
+) -> list[WeekPlan]:
+    """
+    Разбить hierarchy.unit_sequence на total_weeks непрерывных отрезков.
+
+    Юнит попадает в неделю, пока середина его времени не выходит за
+    пропорциональную границу недели; каждой неделе достаётся хотя бы
+    один юнит, если юнитов не меньше, чем недель.
+
+    Args:
+        hierarchy: Output from B5
+        learning_units: Output from B4 (estimated_minutes, кластеры); None — равные оценки
+        total_weeks: Число недель
+
+    Returns:
+        total_weeks планов недель по порядку
+    """
+    total_weeks = max(1, total_weeks)
+    sequence: list[str] = list(hierarchy.get("unit_sequence", []))
+    units = unit_index(learning_units)
+    clusters = unit_clusters(learning_units)
+    levels = _unit_levels(hierarchy, clusters)
+
+    minutes = [
+        int(units.get(unit_id, {}).get("estimated_minutes") or DEFAULT_UNIT_MINUTES)
+        for unit_id in sequence
+    ]
+    total_minutes = sum(minutes) or 1
+
+    plans: list[WeekPlan] = []
+    position = 0
+    elapsed = 0
+    for week_index in range(total_weeks):
+        plan = WeekPlan(week_number=week_index + 1, level="")
+        boundary = total_minutes * (week_index + 1) / total_weeks
+        weeks_after = total_weeks - week_index - 1
+        while position < len(sequence):
+            fits = elapsed + minutes[position] / 2 <= boundary
+            spare = len(sequence) - position > weeks_after
+            if plan.unit_ids and not (weeks_after == 0 or (fits and spare)):
+                break
+            unit_id = sequence[position]
+            plan.unit_ids.append(unit_id)
+            plan.minutes += minutes[position]
+            cluster_id = clusters.get(unit_id)
+            if cluster_id and cluster_id not in plan.cluster_ids:
+                plan.cluster_ids.append(cluster_id)
+            elapsed += minutes[position]
+            position += 1
+        plans.append(plan)
+
+    _assign_levels(plans, levels, dict(zip(sequence, minutes)), hierarchy)
+    return plans
+
+
+def _unit_levels(hierarchy: dict[str, Any], clusters: dict[str, str]) -> dict[str, str]:
+    """unit_id → уровень B5 (через кластер юнита)."""
+    cluster_levels: dict[str, str] = {}
+    for level in hierarchy.get("levels", []):
+        for cluster_id in level.get("clusters", []):
+            cluster_levels.setdefault(cluster_id, level["level"])
+    return {
+        unit_id: cluster_levels[cluster_id]
+        for unit_id, cluster_id in clusters.items()
+        if cluster_id in cluster_levels
+    }
+
+
+def _assign_levels(
+    plans: list[WeekPlan],
+    levels: dict[str, str],
+    minutes: dict[str, int],
+    hierarchy: dict[str, Any],
+) -> None:
+    """Уровень недели — по большинству минут; без данных — уровень предыдущей недели."""
+    level_order = [level["level"] for level in hierarchy.get("levels", [])]
+    previous = level_order[0] if level_order else "foundational"
+    for plan in plans:
+        weights: dict[str, int] = {}
+        for unit_id in plan.unit_ids:
+            if unit_id in levels:
+                weights[levels[unit_id]] = weights.get(levels[unit_id], 0) + minutes[unit_id]
+        if weights:
+            # При равенстве — более ранний уровень иерархии
+            previous = max(
+                weights,
+                key=lambda name: (weights[name], -level_order.index(name) if name in level_order else 0),
+            )
+        plan.level = previous
@@ -0,0 +1,550 @@
+"""B8 rules: детерминированные проверки трека без LLM.
+
+Структурные проверки из 22 проверок B8 (ссылки на ID, покрытие, порядок,
+бюджеты времени, число недель) считаются в процессе за миллисекунды и
+возвращаются как ValidationCheck. LLM остаются только семантические
+проверки (SEMANTIC_CHECKS). Идеи — из scripts/validators
+(ReferenceValidator, SchemaValidator), но одна проверка = один
+ValidationCheck с именем из промпта B8.
+"""
+
+import logging
+from typing import Any, Callable
+
+from ml.src.schemas.pipeline_steps import ValidationCheck, ValidationResult
+
+logger = logging.getLogger(__name__)
+
+LEVEL_ORDER = ("foundational", "intermediate", "advanced", "integrative")
+# Допуск на бюджеты времени (оценки юнитов приблизительные)
+TIME_TOLERANCE = 1.1
+MIN_UNIT_MINUTES = 5
+MAX_UNIT_MINUTES = 240
+MAX_CHECKPOINT_GAP_WEEKS = 4
+# Сколько проблем перечислять в message
+MAX_LISTED_PROBLEMS = 5
+
+_UNIT_KINDS = {
+    "theory_units": ("knowledge_ids", "knowledge_items"),
+    "practice_units": ("skill_ids", "skill_items"),
+    "automation_units": ("habit_ids", "habit_items"),
+}
+
+# Проверки, которые остаются LLM: check_name → что проверить
+SEMANTIC_CHECKS: dict[str, str] = {
+    "success_criteria_addressed": "All success_criteria of the profile are addressed in the track",
+    "competencies_level_match": "Competencies align with the learner's effective level",
+    "content_completeness": "All content areas of the topic and key barriers are covered",
+    "adaptive_paths_complete": "FSM rules of every blueprint give complete adaptive flow paths",
+    "hypothesis_coverage": "Expected hypotheses cover likely learner responses",
+}
+
+# Шаг, чей результат исправляет проваленную проверку (для перегенерации после B8)
+CHECK_OWNERS: dict[str, str] = {
+    "outcomes_coverage": "B2_competencies",
+    "tasks_mapped": "B2_competencies",
+    "success_criteria_addressed": "B2_competencies",
+    "competencies_level_match": "B2_competencies",
+    "circular_dependencies": "B3_ksa_matrix",
+    "ksa_references": "B3_ksa_matrix",
+    "total_time_budget": "B4_learning_units",
+    "unit_time_realistic": "B4_learning_units",
+    "units_ksa_match": "B4_learning_units",
+    "content_completeness": "B4_learning_units",
+    "topological_order": "B5_hierarchy",
+    "unit_dependencies": "B5_hierarchy",
+    "level_progression": "B5_hierarchy",
+    "blueprint_cluster_match": "B6_problem_formulations",
+    "blueprints_have_fsm": "B6_problem_formulations",
+    "problem_formulations_defined": "B6_problem_formulations",
+    "adaptive_paths_complete": "B6_problem_formulations",
+    "hypothesis_coverage": "B6_problem_formulations",
+    "prerequisite_ordering": "B7_schedule",
+    "weekly_distribution": "B7_schedule",
+    "checkpoint_timing": "B7_schedule",
+    "schedule_hierarchy_match": "B7_schedule",
+}
+
+RuleCheck = Callable[[dict[str, Any], dict[str, Any]], list[str]]
+
+
+def run_rule_checks(
+    complete_track: dict[str, Any], profile: dict[str, Any]
+) -> list[ValidationCheck]:
+    """
+    Все детерминированные проверки трека.
+
+    Args:
+        complete_track: Complete track with all B1-B7 outputs
+        profile: Original profile
+
+    Returns:
+        По одному ValidationCheck на правило, в порядке RULE_CHECKS
+    """
+    checks = []
+    for check_name, (severity, rule, ok_message) in RULE_CHECKS.items():
+        try:
+            problems = rule(complete_track, profile)
+        except Exception as e:
+            # Неожиданная форма данных — не роняем B8, отмечаем проверку
+            logger.warning(f"B8 rule {check_name} failed to run: {e}")
+            checks.append(ValidationCheck(
+                check_name=check_name,
+                passed=False,
+                severity="warning",
+                message=f"Check could not run: {e}",
+            ))
+            continue
+        checks.append(ValidationCheck(
+            check_name=check_name,
+            passed=not problems,
+            severity=severity,
+            message=_problems_message(problems) if problems else ok_message,
+        ))
+    return checks
+
+
+def summarize_checks(checks: list[ValidationCheck], retry_count: int = 0) -> ValidationResult:
+    """ValidationResult по списку проверок (счётчики и статус — по правилам промпта B8)."""
+    critical = sum(1 for c in checks if not c.passed and c.severity == "critical")
+    warnings = sum(1 for c in checks if not c.passed and c.severity == "warning")
+    if critical:
+        final_status = "failed"
+    elif warnings:
+        final_status = "validated_with_warnings"
+    else:
+        final_status = "validated"
+    return ValidationResult(
+        overall_valid=critical == 0,
+        checks=checks,
+        critical_failures=critical,
+        warnings=warnings,
+        retry_count=retry_count,
+        final_status=final_status,
+    )
+
+
+def failed_checks_by_owner(
+    checks: list[ValidationCheck],
+    severities: tuple[str, ...] = ("critical", "warning"),
+) -> dict[str, list[str]]:
+    """
+    Проваленные проверки, сгруппированные по шагу-владельцу (CHECK_OWNERS).
+
+    Returns:
+        step_name → ["check_name: message", ...]; проверки без владельца пропускаются
+    """
+    by_owner: dict[str, list[str]] = {}
+    for check in checks:
+        owner = CHECK_OWNERS.get(check.check_name)
+        if owner and not check.passed and check.severity in severities:
+            by_owner.setdefault(owner, []).append(f"{check.check_name}: {check.message}")
+    return by_owner
+
+
+def _problems_message(problems: list[str]) -> str:
+    message = "; ".join(problems[:MAX_LISTED_PROBLEMS])
+    if len(problems) > MAX_LISTED_PROBLEMS:
+        message += f" (+{len(problems) - MAX_LISTED_PROBLEMS} more)"
+    return message
+
+
+# =============================================================================
+# Data helpers
+# =============================================================================
+
+
+def _units(track: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """unit_id → юнит B4 с полем kind."""
+    units = {}
+    for kind in _UNIT_KINDS:
+        for unit in track.get("learning_units", {}).get(kind, []):
+            units[unit["id"]] = {**unit, "kind": kind}
+    return units
+
+
+def _ksa_ids(track: dict[str, Any], key: str) -> set[str]:
+    return {item["id"] for item in track.get("ksa_matrix", {}).get(key, [])}
+
+
+def _schedule_order(track: dict[str, Any]) -> list[str]:
+    """Юниты расписания в порядке недель и дней."""
+    weeks = sorted(track.get("schedule", {}).get("weeks", []), key=lambda w: w["week_number"])
+    return [
+        unit_id
+        for week in weeks
+        for day in week.get("days", [])
+        for unit_id in day.get("learning_units", [])
+    ]
+
+
+def _first_positions(order: list[str], units: dict[str, dict[str, Any]]) -> dict[str, int]:
+    """KSA id → позиция первого юнита, который его покрывает."""
+    positions: dict[str, int] = {}
+    for position, unit_id in enumerate(order):
+        unit = units.get(unit_id)
+        if unit is None:
+            continue
+        ids_key = _UNIT_KINDS[unit["kind"]][0]
+        for ksa_id in unit.get(ids_key, []):
+            positions.setdefault(ksa_id, position)
+    return positions
+
+
+def _ksa_prerequisites(track: dict[str, Any]) -> list[tuple[str, str]]:
+    """(prerequisite, dependent) пары из B3: requires_* и dependency_graph."""
+    ksa = track.get("ksa_matrix", {})
+    pairs = []
+    for skill in ksa.get("skill_items", []):
+        pairs.extend((k_id, skill["id"]) for k_id in skill.get("requires_knowledge", []))
+    for habit in ksa.get("habit_items", []):
+        pairs.extend((s_id, habit["id"]) for s_id in habit.get("requires_skills", []))
+    for edge in ksa.get("dependency_graph", []):
+        if edge.get("dependency_type") == "prerequisite":
+            pairs.append((edge["from_id"], edge["to_id"]))
+    return pairs
+
+
+def _order_violations(order: list[str], track: dict[str, Any]) -> list[str]:
+    positions = _first_positions(order, _units(track))
+    return [
+        f"{dependent} is taught before its prerequisite {prerequisite}"
+        for prerequisite, dependent in dict.fromkeys(_ksa_prerequisites(track))
+        if prerequisite in positions and dependent in positions
+        and positions[dependent] < positions[prerequisite]
+    ]
+
+
+# =============================================================================
+# Coverage
+# =============================================================================
+
+
+def _outcomes_coverage(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    outcomes = profile.get("desired_outcomes") or []
+    covered = {
+        index
+        for indices in track.get("competency_set", {}).get("competency_outcome_map", {}).values()
+        for index in indices
+    }
+    problems = [
+        f"outcome {i} ({outcomes[i]!r}) has no competency"
+        for i in range(len(outcomes)) if i not in covered
+    ]
+    problems += [
+        f"unknown outcome index {i}" for i in sorted(covered) if not 0 <= i < len(outcomes)
+    ]
+    return problems
+
+
+def _tasks_mapped(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    mapped = {
+        task_id
+        for task_ids in track.get("competency_set", {}).get("competency_task_map", {}).values()
+        for task_id in task_ids
+    }
+    return [
+        f"target task {task['id']} is not mapped to a competency"
+        for task in profile.get("target_tasks") or []
+        if task.get("id") not in mapped
+    ]
+
+
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+def _circular_dependencies(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    graph: dict[str, list[str]] = {}
+    for prerequisite, dependent in _ksa_prerequisites(track):
+        graph.setdefault(prerequisite, []).append(dependent)
+
+    # Итеративный DFS: 1 — в стеке, 2 — обработан
+    state: dict[str, int] = {}
+    cycles = []
+    for root in graph:
+        if root in state:
+            continue
+        stack = [(root, iter(graph.get(root, [])))]
+        path = [root]
+        state[root] = 1
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[node] = 2
+                stack.pop()
+                path.pop()
+            elif state.get(child) == 1:
+                cycles.append(" → ".join(path[path.index(child):] + [child]))
+            elif child not in state:
+                state[child] = 1
+                stack.append((child, iter(graph.get(child, []))))
+                path.append(child)
+    return [f"cycle {cycle}" for cycle in cycles]
+
+
+def _prerequisite_ordering(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    return [f"schedule: {problem}" for problem in _order_violations(_schedule_order(track), track)]
+
+
+def _topological_order(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    sequence = track.get("hierarchy", {}).get("unit_sequence", [])
+    units = _units(track)
+    problems = [
+        f"unit_sequence: unknown unit {unit_id}" for unit_id in sequence if unit_id not in units
+    ]
+    problems += [
+        f"unit_sequence: {unit_id} appears {sequence.count(unit_id)} times"
+        for unit_id in dict.fromkeys(sequence) if sequence.count(unit_id) > 1
+    ]
+    problems += [
+        f"unit_sequence: missing unit {unit_id}" for unit_id in units if unit_id not in sequence
+    ]
+    return problems
+
+
+def _ksa_references(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    knowledge = _ksa_ids(track, "knowledge_items")
+    skills = _ksa_ids(track, "skill_items")
+    habits = _ksa_ids(track, "habit_items")
+    ksa = track.get("ksa_matrix", {})
+    problems = []
+
+    def _refs(owner: str, field: str, ids: list[str], valid: set[str]) -> None:
+        problems.extend(f"{owner}.{field}: unknown {ref}" for ref in ids if ref not in valid)
+
+    for item in ksa.get("knowledge_items", []):
+        _refs(item["id"], "required_for", item.get("required_for", []), skills | habits)
+    for item in ksa.get("skill_items", []):
+        _refs(item["id"], "requires_knowledge", item.get("requires_knowledge", []), knowledge)
+        _refs(item["id"], "required_for", item.get("required_for", []), habits)
+    for item in ksa.get("habit_items", []):
+        _refs(item["id"], "requires_skills", item.get("requires_skills", []), skills)
+    for edge in ksa.get("dependency_graph", []):
+        _refs(
+            "dependency_graph", "edge", [edge["from_id"], edge["to_id"]],
+            knowledge | skills | habits,
+        )
+
+    valid_by_key = {"knowledge_items": knowledge, "skill_items": skills, "habit_items": habits}
+    for unit_id, unit in _units(track).items():
+        ids_key, items_key = _UNIT_KINDS[unit["kind"]]
+        _refs(unit_id, ids_key, unit.get(ids_key, []), valid_by_key[items_key])
+    return problems
+
+
+def _unit_dependencies(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    sequence = track.get("hierarchy", {}).get("unit_sequence", [])
+    return [f"unit_sequence: {problem}" for problem in _order_violations(sequence, track)]
+
+
+# =============================================================================
+# Time
+# =============================================================================
+
+
+def _total_time_budget(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    budget = track.get("validated_profile", {}).get("total_time_budget_minutes") or 0
+    total = sum(unit.get("estimated_minutes") or 0 for unit in _units(track).values())
+    if budget and total > budget * TIME_TOLERANCE:
+        return [f"units need {total} min, budget is {budget} min"]
+    return []
+
+
+def _weekly_distribution(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    weekly_budget = track.get("validated_profile", {}).get("weekly_time_budget_minutes") or 0
+    available = {
+        str(entry.get("day_of_week", "")).lower(): entry.get("available_minutes") or 0
+        for entry in profile.get("schedule") or []
+    }
+    problems = []
+    for week in track.get("schedule", {}).get("weeks", []):
+        minutes = sum(day.get("total_minutes") or 0 for day in week.get("days", []))
+        if weekly_budget and minutes > weekly_budget * TIME_TOLERANCE:
+            problems.append(f"week {week['week_number']}: {minutes} min > {weekly_budget} min/week")
+        for day in week.get("days", []):
+            limit = available.get(str(day.get("day_of_week", "")).lower())
+            if limit is not None and (day.get("total_minutes") or 0) > limit * TIME_TOLERANCE:
+                problems.append(
+                    f"week {week['week_number']} {day['day_of_week']}: "
+                    f"{day['total_minutes']} min > {limit} min available"
+                )
+    return problems
+
+
+def _unit_time_realistic(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    return [
+        f"{unit_id}: {unit.get('estimated_minutes')} min"
+        for unit_id, unit in _units(track).items()
+        if not MIN_UNIT_MINUTES <= (unit.get("estimated_minutes") or 0) <= MAX_UNIT_MINUTES
+    ]
+
+
+def _checkpoint_timing(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    schedule = track.get("schedule", {})
+    total_weeks = schedule.get("total_weeks") or len(schedule.get("weeks", []))
+    weeks = sorted({c["week_number"] for c in schedule.get("checkpoints", [])})
+    problems = [
+        f"checkpoint in week {w} outside 1..{total_weeks}"
+        for w in weeks if not 1 <= w <= total_weeks
+    ]
+    if total_weeks <= MAX_CHECKPOINT_GAP_WEEKS:
+        return problems
+    previous = 0
+    for week in [w for w in weeks if 1 <= w <= total_weeks] + [total_weeks]:
+        if week - previous > MAX_CHECKPOINT_GAP_WEEKS:
+            problems.append(f"no checkpoint between weeks {previous + 1} and {week}")
+        previous = week
+    return problems
+
+
+# =============================================================================
+# Consistency
+# =============================================================================
+
+
+def _units_ksa_match(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    units = _units(track)
+    problems = []
+    for kind, (ids_key, items_key) in _UNIT_KINDS.items():
+        covered = {
+            ksa_id
+            for unit in units.values() if unit["kind"] == kind
+            for ksa_id in unit.get(ids_key, [])
+        }
+        problems += [
+            f"{items_key[:-6]} {ksa_id} has no {kind[:-6]} unit"
+            for ksa_id in sorted(_ksa_ids(track, items_key) - covered)
+        ]
+    return problems
+
+
+def _blueprint_cluster_match(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    clusters = {c["id"] for c in track.get("learning_units", {}).get("clusters", [])}
+    blueprints = track.get("lesson_blueprints", {}).get("blueprints", [])
+    with_blueprint = {bp.get("cluster_id") for bp in blueprints}
+    problems = [f"cluster {c} has no blueprint" for c in sorted(clusters - with_blueprint)]
+    problems += [
+        f"blueprint {bp['id']}: unknown cluster {bp.get('cluster_id')}"
+        for bp in blueprints if bp.get("cluster_id") not in clusters
+    ]
+    return problems
+
+
+def _schedule_hierarchy_match(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    hierarchy = track.get("hierarchy", {})
+    schedule = track.get("schedule", {})
+    weeks = schedule.get("weeks", [])
+    problems = []
+
+    numbers = [week["week_number"] for week in weeks]
+    if numbers != list(range(1, len(weeks) + 1)):
+        problems.append(f"week numbers {numbers} are not 1..{len(weeks)}")
+    if schedule.get("total_weeks") != len(weeks):
+        problems.append(f"total_weeks={schedule.get('total_weeks')} but {len(weeks)} weeks")
+    if hierarchy.get("total_weeks") and hierarchy["total_weeks"] != len(weeks):
+        problems.append(
+            f"hierarchy plans {hierarchy['total_weeks']} weeks, schedule has {len(weeks)}"
+        )
+
+    scheduled = _schedule_order(track)
+    sequence = hierarchy.get("unit_sequence", [])
+    problems += [f"unit {u} is not scheduled" for u in sequence if u not in scheduled]
+    problems += [
+        f"unknown unit {u} in schedule" for u in dict.fromkeys(scheduled) if u not in sequence
+    ]
+    problems += [
+        f"unit {u} scheduled {scheduled.count(u)} times"
+        for u in dict.fromkeys(scheduled) if scheduled.count(u) > 1
+    ]
+    return problems
+
+
+def _level_progression(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    problems = []
+    levels = [level.get("level") for level in track.get("hierarchy", {}).get("levels", [])]
+    weeks = sorted(track.get("schedule", {}).get("weeks", []), key=lambda w: w["week_number"])
+    week_levels = [(week["week_number"], week.get("level")) for week in weeks]
+    for name in [*levels, *(level for _, level in week_levels)]:
+        if name not in LEVEL_ORDER:
+            problems.append(f"unknown level {name!r}")
+    ranks = [LEVEL_ORDER.index(level) for level in levels if level in LEVEL_ORDER]
+    if ranks != sorted(ranks):
+        problems.append(f"hierarchy levels out of order: {levels}")
+    previous = -1
+    for week_number, level in week_levels:
+        if level in LEVEL_ORDER:
+            if LEVEL_ORDER.index(level) < previous:
+                problems.append(f"week {week_number} goes back to {level}")
+            previous = max(previous, LEVEL_ORDER.index(level))
+    return problems
+
+
+# =============================================================================
+# FSM readiness
+# =============================================================================
+
+
+def _blueprints_have_fsm(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    return [
+        f"blueprint {bp['id']} has no fsm_rules"
+        for bp in track.get("lesson_blueprints", {}).get("blueprints", [])
+        if not bp.get("fsm_rules")
+    ]
+
+
+def _problem_formulations_defined(track: dict[str, Any], profile: dict[str, Any]) -> list[str]:
+    problems = []
+    for bp in track.get("lesson_blueprints", {}).get("blueprints", []):
+        formulation = bp.get("problem_formulation") or {}
+        if not str(formulation.get("problem_statement") or "").strip():
+            problems.append(f"blueprint {bp['id']}: empty problem_statement")
+        if not formulation.get("expected_hypotheses"):
+            problems.append(f"blueprint {bp['id']}: no expected_hypotheses")
+    return problems
+
+
+# check_name → (severity, правило, сообщение при успехе); порядок — как в промпте B8
+RULE_CHECKS: dict[str, tuple[str, RuleCheck, str]] = {
+    "outcomes_coverage": (
+        "critical", _outcomes_coverage, "All desired outcomes are covered by competencies"
+    ),
+    "tasks_mapped": ("critical", _tasks_mapped, "All target tasks are mapped to competencies"),
+    "circular_dependencies": (
+        "critical", _circular_dependencies, "KSA dependency graph has no cycles"
+    ),
+    "prerequisite_ordering": (
+        "critical", _prerequisite_ordering, "Prerequisites are scheduled before dependent items"
+    ),
+    "topological_order": (
+        "critical", _topological_order, "unit_sequence lists every unit exactly once"
+    ),
+    "ksa_references": ("critical", _ksa_references, "All KSA references are valid"),
+    "unit_dependencies": (
+        "critical", _unit_dependencies, "unit_sequence respects KSA prerequisites"
+    ),
+    "total_time_budget": ("critical", _total_time_budget, "Total unit time fits the time budget"),
+    "weekly_distribution": (
+        "warning", _weekly_distribution, "Weekly and daily load fit learner availability"
+    ),
+    "unit_time_realistic": ("warning", _unit_time_realistic, "Unit time estimates are realistic"),
+    "checkpoint_timing": ("warning", _checkpoint_timing, "Checkpoints are at most 4 weeks apart"),
+    "units_ksa_match": (
+        "critical", _units_ksa_match, "Every KSA item is covered by a matching unit"
+    ),
+    "blueprint_cluster_match": (
+        "critical", _blueprint_cluster_match, "Every cluster has a blueprint"
+    ),
+    "schedule_hierarchy_match": (
+        "critical", _schedule_hierarchy_match, "Schedule contains every unit of unit_sequence once"
+    ),
+    "level_progression": (
+        "warning", _level_progression, "Levels progress from foundational to integrative"
+    ),
+    "blueprints_have_fsm": ("critical", _blueprints_have_fsm, "All blueprints have FSM rules"),
+    "problem_formulations_defined": (
+        "warning", _problem_formulations_defined, "All problem formulations are defined"
+    ),
+}
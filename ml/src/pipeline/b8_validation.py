@@ -1,20 +1,34 @@
-"""B8: Track Validation."""
+"""B8: Track Validation.
+
+Режимы (settings.B8_VALIDATION_MODE):
+- llm: все 22 проверки выполняет LLM (прежний промпт);
+- hybrid: структурные проверки — b8_rules в процессе, LLM получает только
+  семантические (SEMANTIC_CHECKS) с небольшим промптом;
+- skip_llm_on_pass: как hybrid, но без LLM-вызова, если все правила прошли.
+Итоговые счётчики и final_status считаются детерминированно.
+"""
 
 import logging
+import time
 from typing import Any
 
-from ml.src.prompts.b8_prompt import get_b8_prompt
-from ml.src.schemas.pipeline_steps import ValidationResult
+from ml.src.core.config import settings
+from ml.src.pipeline.b8_rules import SEMANTIC_CHECKS, run_rule_checks, summarize_checks
+from ml.src.prompts.b8_prompt import get_b8_prompt, get_b8_semantic_prompt
+from ml.src.schemas.pipeline_steps import SemanticChecksOutput, ValidationCheck, ValidationResult
 from ml.src.services.deepseek_client import DeepSeekClient
 
 logger = logging.getLogger(__name__)
 
+B8_VALIDATION_MODES = ("llm", "hybrid", "skip_llm_on_pass")
+
 
 async def run_b8_validation(
     complete_track: dict[str, Any],
     profile: dict[str, Any],
     deepseek_client: DeepSeekClient,
     max_retries: int = 3,
+    mode: str | None = None,
 ) -> tuple[ValidationResult, dict[str, Any]]:
     """
     B8: Validate the complete generated track.
@@ -26,28 +40,89 @@ async def run_b8_validation(
         profile: Original profile
         deepseek_client: DeepSeek API client
         max_retries: Max retry attempts for critical failures
+        mode: llm | hybrid | skip_llm_on_pass (None — settings.B8_VALIDATION_MODE)
 
     Returns:
         Tuple of (validation result, metadata)
     """
     logger.info("Starting B8: Track validation")
 
-    prompt = get_b8_prompt(complete_track, profile)
+    mode = mode or settings.B8_VALIDATION_MODE
+    if mode not in B8_VALIDATION_MODES:
+        raise ValueError(f"Unknown B8 validation mode: {mode}")
 
-    result, metadata = await deepseek_client.chat_completion(
-        prompt=prompt,
-        response_model=ValidationResult,
-        temperature=0.3,  # Lower temperature for validation
-        max_tokens=3000,
-    )
+    if mode == "llm":
+        prompt = get_b8_prompt(complete_track, profile)
+
+        result, metadata = await deepseek_client.chat_completion(
+            prompt=prompt,
+            response_model=ValidationResult,
+            temperature=0.3,  # Lower temperature for validation
+            max_tokens=3000,
+        )
+        _log_result(result)
+        return result, {**metadata, "mode": mode}
+
+    start_time = time.time()
+    rule_checks = run_rule_checks(complete_track, profile)
+    rules_ms = (time.time() - start_time) * 1000
+    rules_passed = all(check.passed for check in rule_checks)
 
+    metadata: dict[str, Any] = {
+        "tokens_used": 0,
+        "model": None,
+        "mode": mode,
+        "rule_checks": len(rule_checks),
+        "rules_duration_ms": rules_ms,
+        "llm_skipped": True,
+    }
+    semantic_checks: list[ValidationCheck] = []
+    if not (mode == "skip_llm_on_pass" and rules_passed):
+        response, llm_metadata = await deepseek_client.chat_completion(
+            prompt=get_b8_semantic_prompt(complete_track, profile, SEMANTIC_CHECKS),
+            response_model=SemanticChecksOutput,
+            temperature=0.3,  # Lower temperature for validation
+            max_tokens=1200,
+        )
+        semantic_checks = _select_semantic_checks(response)
+        metadata.update({**llm_metadata, "mode": mode, "llm_skipped": False})
+
+    result = summarize_checks(rule_checks + semantic_checks)
+    metadata["duration_ms"] = (time.time() - start_time) * 1000
+    _log_result(result)
+
+    # Критические провалы исправляет оркестратор: перегенерация шагов-владельцев
+    # (b8_rules.CHECK_OWNERS) в пределах бюджета B8_REPAIR_*
+
+    return result, metadata
+
+
+def _select_semantic_checks(response: SemanticChecksOutput) -> list[ValidationCheck]:
+    """По одной проверке на каждую из SEMANTIC_CHECKS; чужие имена отбрасываются."""
+    by_name: dict[str, ValidationCheck] = {}
+    for check in response.checks:
+        if check.check_name in SEMANTIC_CHECKS:
+            by_name.setdefault(check.check_name, check)
+
+    checks = []
+    for check_name in SEMANTIC_CHECKS:
+        check = by_name.get(check_name)
+        if check is None:
+            # LLM пропустил проверку — отмечаем, но статус трека не меняем
+            logger.warning(f"B8: LLM returned no result for {check_name}")
+            check = ValidationCheck(
+                check_name=check_name,
+                passed=False,
+                severity="info",
+                message="Check was not evaluated by the LLM",
+            )
+        checks.append(check)
+    return checks
+
+
+def _log_result(result: ValidationResult) -> None:
     logger.info(
         f"B8 complete: valid={result.overall_valid}, "
         f"critical={result.critical_failures}, warnings={result.warnings}, "
         f"status={result.final_status}"
     )
-
-    # Note: Retry logic would be implemented in the orchestrator (T040)
-    # if result.critical_failures > 0
-
-    return result, metadata
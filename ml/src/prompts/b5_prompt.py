@@ -4,7 +4,8 @@
 def get_b5_prompt(learning_units: dict, time_budget_minutes: int, estimated_weeks: int) -> str:
     """Generate prompt for B5: Organize units into levels and sequence."""
     from ml.src.prompts.json_utils import to_json
-    units_json = to_json(learning_units)
+    from ml.src.prompts.projections import B5_LEARNING_UNITS
+    units_json = to_json(learning_units, B5_LEARNING_UNITS)
     weekly_budget = time_budget_minutes // estimated_weeks if estimated_weeks > 0 else 0
 
     return f"""You are a curriculum architect organizing learning units into a progressive hierarchy.
@@ -6,8 +6,9 @@ def get_b7_prompt(
 ) -> str:
     """Generate prompt for B7: Assemble weekly schedule."""
     from ml.src.prompts.json_utils import to_json
-    hierarchy_json = to_json(hierarchy)
-    blueprints_json = to_json(blueprints)
+    from ml.src.prompts.projections import B7_BLUEPRINTS, B7_HIERARCHY
+    hierarchy_json = to_json(hierarchy, B7_HIERARCHY)
+    blueprints_json = to_json(blueprints, B7_BLUEPRINTS)
     schedule_json = to_json(schedule_info)
 
     return f"""You are a schedule designer creating a personalized weekly learning schedule.
@@ -116,3 +117,163 @@ CRITICAL RULES:
 
 Begin your response with {{ and end with }}
 """
+
+
+def get_b7_weeks_prompt(
+    week_plans: list, lesson_problems: list, schedule_info: dict, total_weeks: int
+) -> str:
+    """Generate prompt for sharded B7: expand a range of planned weeks into days."""
+    from ml.src.prompts.json_utils import to_json
+    week_plans_json = to_json(week_plans)
+    problems_json = to_json(lesson_problems)
+    schedule_json = to_json(schedule_info)
+    week_numbers = ", ".join(str(plan["week_number"]) for plan in week_plans)
+
+    return f"""You are a schedule designer detailing part of a personalized weekly learning schedule ({total_weeks} weeks in total).
+
+WEEK PLAN DATA (units are already assigned to weeks, in learning order):
+{week_plans_json}
+
+LESSON PROBLEMS DATA:
+{problems_json}
+
+LEARNER SCHEDULE DATA:
+{schedule_json}
+
+TASK: Detail ONLY weeks {week_numbers}. For each week distribute its units across the learner's available days.
+
+## Process Guidelines:
+- Keep the unit order of the week plan
+- Respect daily time limits from the learner schedule
+- Group related units together
+- Theme and goals follow from the week's units and lesson problems
+
+## OUTPUT FORMAT
+Return ONLY a valid JSON object (no markdown, no explanations):
+
+{{
+  "weeks": [
+    {{
+      "week_number": {week_plans[0]["week_number"] if week_plans else 1},
+      "level": "level from the week plan",
+      "theme": "Week theme description",
+      "weekly_goals": ["goal1", "goal2"],
+      "days": [
+        {{
+          "day_of_week": "Monday" | "Tuesday" | ... | "Sunday",
+          "learning_units": ["tu1", "pu1"],
+          "total_minutes": 90
+        }}
+      ],
+      "checkpoint": null
+    }}
+  ]
+}}
+
+CRITICAL RULES:
+1. Output MUST be valid JSON
+2. weeks array must contain exactly the weeks {week_numbers}, each with its week_number and level from the week plan
+3. Every unit of a week plan must appear in exactly one day of that week; do NOT use units of other weeks
+4. weekly_goals must be array of 2-4 strings
+5. days must be array of 1-7 day objects with day_of_week, learning_units, total_minutes
+6. checkpoint must be null (checkpoints are planned separately)
+7. Do NOT wrap JSON in markdown code blocks
+
+Begin your response with {{ and end with }}
+"""
+
+
+def get_b7_frame_prompt(week_plans: list, schedule_info: dict, total_weeks: int) -> str:
+    """Generate prompt for sharded B7: checkpoints, final assessment and support plan."""
+    from ml.src.prompts.json_utils import to_json
+    week_plans_json = to_json(week_plans)
+    schedule_json = to_json(schedule_info)
+
+    return f"""You are a schedule designer planning assessment and support for a personalized weekly learning schedule.
+
+WEEK PLAN DATA (units assigned to each of {total_weeks} weeks):
+{week_plans_json}
+
+LEARNER SCHEDULE DATA:
+{schedule_json}
+
+TASK: Plan track-wide checkpoints, the final assessment, the support plan and progress milestones. Weekly details are generated separately.
+
+## OUTPUT FORMAT
+Return ONLY a valid JSON object (no markdown, no explanations):
+
+{{
+  "checkpoints": [
+    {{
+      "week_number": 4,
+      "title": "Checkpoint 1",
+      "assessment_tasks": ["task1", "task2"]
+    }}
+  ],
+  "final_assessment": {{
+    "week": {total_weeks},
+    "tasks": ["final task 1"],
+    "criteria": ["criterion1"]
+  }},
+  "support_plan": {{
+    "scaffolding_techniques": ["technique1"],
+    "feedback_points": ["point1"],
+    "resources": ["resource1"]
+  }},
+  "progress_milestones": [
+    {{
+      "week": 2,
+      "title": "Milestone title",
+      "criteria": ["criterion1"]
+    }}
+  ]
+}}
+
+CRITICAL RULES:
+1. Output MUST be valid JSON
+2. ALL fields are REQUIRED - no field can be null or missing
+3. Add checkpoints every 2-4 weeks (approximately 2-4 checkpoints total), week_number between 1 and {total_weeks}
+4. Checkpoint tasks must assess the units of the weeks before the checkpoint
+5. final_assessment MUST have: week, tasks, criteria
+6. support_plan MUST have: scaffolding_techniques, feedback_points, resources (arrays of 2-5 strings each)
+7. progress_milestones must be array of 2-5 milestone objects with week, title, criteria
+8. Do NOT wrap JSON in markdown code blocks
+
+Begin your response with {{ and end with }}
+"""
+
+
+def get_b7_narratives_prompt(week_plans: list, total_weeks: int) -> str:
+    """Generate prompt for packed B7: themes and goals of already scheduled weeks."""
+    from ml.src.prompts.json_utils import to_json
+    week_plans_json = to_json(week_plans)
+
+    return f"""You are a schedule designer writing the weekly themes of a personalized learning schedule.
+
+WEEK PLAN DATA (units of each of {total_weeks} weeks, days are already scheduled):
+{week_plans_json}
+
+TASK: For every week write a short theme and 2-4 weekly goals that follow from the week's units.
+
+## OUTPUT FORMAT
+Return ONLY a valid JSON object (no markdown, no explanations):
+
+{{
+  "weeks": [
+    {{
+      "week_number": 1,
+      "theme": "Week theme description",
+      "weekly_goals": ["goal1", "goal2"]
+    }}
+  ]
+}}
+
+CRITICAL RULES:
+1. Output MUST be valid JSON
+2. weeks array must contain exactly {total_weeks} elements, week_number 1..{total_weeks}
+3. weekly_goals must be array of 2-4 strings
+4. Use the language of the unit titles
+5. Do NOT wrap JSON in markdown code blocks
+
+Begin your response with {{ and end with }}
+"""
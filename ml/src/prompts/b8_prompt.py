@@ -4,8 +4,9 @@
 def get_b8_prompt(complete_track: dict, profile: dict) -> str:
     """Generate prompt for B8: Validate the complete track."""
     from ml.src.prompts.json_utils import to_json
+    from ml.src.prompts.projections import B8_TRACK
     profile_json = to_json(profile)
-    track_json = to_json(complete_track)
+    track_json = to_json(complete_track, B8_TRACK)
 
     return f"""You are a quality assurance expert validating a generated learning track.
 
@@ -97,3 +98,52 @@ CRITICAL RULES:
 
 Begin your response with {{ and end with }}
 """
+
+
+def get_b8_semantic_prompt(complete_track: dict, profile: dict, checks: dict[str, str]) -> str:
+    """Generate prompt for B8: only the semantic checks left after rule-based validation."""
+    from ml.src.prompts.json_utils import to_json
+    from ml.src.prompts.projections import B8_SEMANTIC_PROFILE, B8_SEMANTIC_TRACK
+    profile_json = to_json(profile, B8_SEMANTIC_PROFILE)
+    track_json = to_json(complete_track, B8_SEMANTIC_TRACK)
+    checks_list = "\n".join(f"- {name}: {description}" for name, description in checks.items())
+
+    return f"""You are a quality assurance expert validating a generated learning track.
+Structural checks (IDs, coverage maps, ordering, time budgets) are already done; validate only the meaning.
+
+ORIGINAL PROFILE DATA:
+{profile_json}
+
+COMPLETE TRACK DATA:
+{track_json}
+
+TASK: Perform exactly these {len(checks)} checks:
+{checks_list}
+
+## Severity Levels:
+- **critical**: Must be fixed (track unusable)
+- **warning**: Should be reviewed (track usable but not optimal)
+- **info**: Enhancement suggestions
+
+## OUTPUT FORMAT
+Return ONLY a valid JSON object (no markdown, no explanations):
+
+{{
+  "checks": [
+    {{
+      "check_name": "{next(iter(checks), "check_name")}",
+      "passed": true | false,
+      "severity": "critical" | "warning" | "info",
+      "message": "Detailed check result message"
+    }}
+  ]
+}}
+
+CRITICAL RULES:
+1. Output MUST be valid JSON
+2. checks array must contain exactly {len(checks)} objects, one per check listed above, with that check_name
+3. message must be non-empty string describing the check result
+4. Do NOT wrap JSON in markdown code blocks
+
+Begin your response with {{ and end with }}
+"""
@@ -1,7 +1,32 @@
-"""JSON utilities for prompt serialization."""
+"""JSON utilities for prompt serialization.
+
+Режимы сериализации (settings.PROMPT_JSON_MODE), каждый следующий
+включает предыдущий:
+- pretty: indent=2 (исходный формат)
+- minified: без отступов и пробелов
+- pruned: minified + проекция — только поля, нужные промпту (prompts/projections.py)
+- abbreviated: pruned + сокращённые ключи с легендой перед JSON
+"""
 
 import json
-from typing import Any
+import re
+from collections import Counter
+from typing import Any, Union
+
+from ml.src.core.config import settings
+
+PROMPT_JSON_MODES = ("pretty", "minified", "pruned", "abbreviated")
+
+# True — значение целиком; dict — только перечисленные ключи
+# (для списков проекция применяется к каждому элементу)
+Projection = Union[bool, dict[str, "Projection"]]
+
+# Сокращаются только ключи-имена полей (snake_case без цифр), не ID вроде "c1"
+_ABBREVIABLE_KEY = re.compile(r"^[a-z]+(_[a-z]+)*$")
+# Приближение BPE: перевод строки с отступом и серии пробелов — отдельные токены,
+# слова режутся на куски по ~4 символа, "_" и пунктуация — по токену
+_TOKEN_PATTERN = re.compile(r"\s*\n\s*| {2,}|[^\W_]+|[^\w\s]|_", re.UNICODE)
+_CHARS_PER_WORD_TOKEN = 4
 
 
 class PydanticEncoder(json.JSONEncoder):
@@ -13,6 +38,131 @@ class PydanticEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
-def to_json(data: Any) -> str:
-    """Serialize data to JSON string, handling Pydantic models."""
-    return json.dumps(data, cls=PydanticEncoder, ensure_ascii=False, indent=2)
\ No newline at end of file
+def to_json(
+    data: Any,
+    projection: Projection | None = None,
+    mode: str | None = None,
+) -> str:
+    """
+    Serialize data to JSON string for a prompt, handling Pydantic models.
+
+    Args:
+        data: Данные (dict, list, Pydantic модели)
+        projection: Какие поля нужны промпту (применяется в режимах pruned/abbreviated)
+        mode: Режим сериализации; None — settings.PROMPT_JSON_MODE
+    """
+    mode = mode or settings.PROMPT_JSON_MODE
+    if mode not in PROMPT_JSON_MODES:
+        raise ValueError(f"Unknown prompt JSON mode: {mode}")
+
+    if mode == "pretty":
+        return json.dumps(data, cls=PydanticEncoder, ensure_ascii=False, indent=2)
+
+    if mode in ("pruned", "abbreviated") and projection is not None:
+        data = project(_plain(data), projection)
+
+    legend = ""
+    if mode == "abbreviated":
+        data, aliases = abbreviate_keys(_plain(data))
+        if aliases:
+            legend = "KEYS: " + ", ".join(f"{alias}={key}" for key, alias in aliases.items()) + "\n"
+
+    return legend + json.dumps(
+        data, cls=PydanticEncoder, ensure_ascii=False, separators=(",", ":")
+    )
+
+
+def project(data: Any, projection: Projection) -> Any:
+    """
+    Оставить в data только поля из projection.
+
+    Ключи projection, которых нет в data, пропускаются.
+    """
+    if projection is True:
+        return data
+    if isinstance(data, list):
+        return [project(item, projection) for item in data]
+    if isinstance(data, dict):
+        return {
+            key: project(data[key], sub)
+            for key, sub in projection.items()
+            if key in data and sub is not False
+        }
+    return data
+
+
+def abbreviate_keys(data: Any) -> tuple[Any, dict[str, str]]:
+    """
+    Заменить повторяющиеся длинные ключи короткими алиасами.
+
+    Ключ сокращается, только если экономия больше длины его записи в легенде.
+
+    Returns:
+        (данные с алиасами, {ключ: алиас} в порядке первого появления)
+    """
+    counts: Counter[str] = Counter()
+    _count_keys(data, counts)
+
+    aliases: dict[str, str] = {}
+    taken = set(counts)
+    for key, count in counts.items():
+        if not _ABBREVIABLE_KEY.match(key):
+            continue
+        alias = _make_alias(key, taken)
+        legend_cost = len(alias) + len(key) + 3  # "alias=key, "
+        if count * (len(key) - len(alias)) > legend_cost:
+            aliases[key] = alias
+            taken.add(alias)
+
+    return _rename_keys(data, aliases), aliases
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов (для сравнения режимов, не для биллинга)."""
+    tokens = 0
+    for match in _TOKEN_PATTERN.findall(text):
+        if match[0].isalnum():
+            tokens += -(-len(match) // _CHARS_PER_WORD_TOKEN)
+        else:
+            tokens += 1
+    return tokens
+
+
+def _plain(data: Any) -> Any:
+    """Pydantic модели → dict (рекурсивно)."""
+    if hasattr(data, "model_dump"):
+        return data.model_dump()
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_plain(item) for item in data]
+    return data
+
+
+def _count_keys(data: Any, counts: Counter) -> None:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            counts[key] += 1
+            _count_keys(value, counts)
+    elif isinstance(data, list):
+        for item in data:
+            _count_keys(item, counts)
+
+
+def _make_alias(key: str, taken: set[str]) -> str:
+    base = "".join(part[0] for part in key.split("_"))
+    if len(base) == 1:
+        base = key[:2]
+    alias, suffix = base, 2
+    while alias in taken:
+        alias = f"{base}{suffix}"
+        suffix += 1
+    return alias
+
+
+def _rename_keys(data: Any, aliases: dict[str, str]) -> Any:
+    if isinstance(data, dict):
+        return {aliases.get(key, key): _rename_keys(value, aliases) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_rename_keys(item, aliases) for item in data]
+    return data
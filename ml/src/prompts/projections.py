@@ -0,0 +1,117 @@
+"""Проекции upstream-данных для промптов.
+
+Каждая проекция перечисляет поля выхода предыдущих шагов, которые
+реально нужны инструкциям промпта. В режимах pruned/abbreviated
+(settings.PROMPT_JSON_MODE) остальное в промпт не попадает: тексты
+outline/description и списки заданий, которые шаг не использует.
+"""
+
+from ml.src.prompts.json_utils import Projection
+
+# B4 units без outline-текстов: для иерархии и расписания достаточно id, связей и времени
+_UNITS_CORE: dict[str, Projection] = {
+    "theory_units": {"id": True, "title": True, "knowledge_ids": True, "estimated_minutes": True},
+    "practice_units": {"id": True, "title": True, "skill_ids": True, "estimated_minutes": True},
+    "automation_units": {"id": True, "title": True, "habit_ids": True, "estimated_minutes": True},
+    "clusters": True,
+}
+
+# B5: группировка кластеров по уровням и топологическая сортировка юнитов
+B5_LEARNING_UNITS: Projection = _UNITS_CORE
+
+# B7: расписание строится по unit_sequence и уровням; из blueprint — только привязка к кластеру
+B7_HIERARCHY: Projection = True
+B7_BLUEPRINTS: Projection = {
+    "blueprints": {
+        "id": True,
+        "cluster_id": True,
+        "problem_formulation": {"problem_statement": True},
+    },
+}
+
+# B8: 22 проверки покрытия, зависимостей, времени, согласованности и FSM.
+# original_profile не нужен — профиль передаётся отдельной секцией.
+B8_TRACK: Projection = {
+    "validated_profile": {
+        "validation_status": True,
+        "validation_warnings": True,
+        "effective_level": True,
+        "estimated_weeks": True,
+        "weekly_time_budget_minutes": True,
+        "total_time_budget_minutes": True,
+    },
+    "competency_set": {
+        "competencies": {
+            "id": True,
+            "title": True,
+            "related_task_ids": True,
+            "related_outcome_indices": True,
+            "level": True,
+        },
+        "integral_competency_id": True,
+        "competency_task_map": True,
+        "competency_outcome_map": True,
+    },
+    "ksa_matrix": {
+        "knowledge_items": {"id": True, "title": True, "source": True, "required_for": True},
+        "skill_items": {
+            "id": True,
+            "title": True,
+            "source": True,
+            "requires_knowledge": True,
+            "required_for": True,
+        },
+        "habit_items": {"id": True, "title": True, "source": True, "requires_skills": True},
+        "dependency_graph": True,
+    },
+    "learning_units": _UNITS_CORE,
+    "hierarchy": True,
+    "lesson_blueprints": {
+        "blueprints": {
+            "id": True,
+            "cluster_id": True,
+            "problem_formulation": True,
+            "fsm_rules": True,
+        },
+    },
+    "schedule": {
+        "weeks": {"week_number": True, "level": True, "theme": True, "days": True, "checkpoint": True},
+        "total_weeks": True,
+        "checkpoints": True,
+        "final_assessment": True,
+        "progress_milestones": True,
+    },
+}
+
+# B8 semantic (после детерминированных проверок b8_rules): только смысловые поля —
+# тексты компетенций, названия юнитов, проблемные ситуации и FSM, темы недель
+B8_SEMANTIC_PROFILE: Projection = {
+    "topic": True,
+    "subject_area": True,
+    "experience_level": True,
+    "desired_outcomes": True,
+    "success_criteria": True,
+    "key_barriers": True,
+    "confusing_concepts": True,
+}
+B8_SEMANTIC_TRACK: Projection = {
+    "validated_profile": {"effective_level": True},
+    "competency_set": {"competencies": {"id": True, "title": True, "level": True}},
+    "learning_units": {
+        "theory_units": {"id": True, "title": True},
+        "practice_units": {"id": True, "title": True},
+        "automation_units": {"id": True, "title": True},
+    },
+    "lesson_blueprints": {
+        "blueprints": {
+            "id": True,
+            "cluster_id": True,
+            "problem_formulation": True,
+            "fsm_rules": True,
+        },
+    },
+    "schedule": {
+        "weeks": {"week_number": True, "theme": True, "weekly_goals": True},
+        "final_assessment": True,
+    },
+}
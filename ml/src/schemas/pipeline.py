@@ -10,6 +10,7 @@ class PipelineRunRequest(BaseModel):
     profile: dict[str, Any]
     track_id: str
     algorithm_version: str = "v1.0.0"
+    llm_provider: str | None = None  # llm_client_factory: deepseek, mock, cached, local, ...
 
 
 class StepLog(BaseModel):
@@ -19,6 +20,9 @@ class StepLog(BaseModel):
     tokens_used: int
     success: bool
     error_message: str | None = None
+    resumed: bool = False  # результат восстановлен из логов, шаг не выполнялся
+    shared: bool = False  # общий префикс batch: шаг выполнен один раз на все треки
+    repair_round: int = 0  # >0 — перегенерация после критических провалов B8
 
 
 class GenerationMetadata(BaseModel):
@@ -30,6 +34,9 @@ class GenerationMetadata(BaseModel):
     llm_calls_count: int
     total_tokens: int
     total_duration_sec: float
+    resumed_steps: list[str] = Field(default_factory=list)
+    shared_steps: list[str] = Field(default_factory=list)
+    repair_rounds: int = 0
 
 
 class PipelineRunResponse(BaseModel):
@@ -39,11 +46,21 @@ class PipelineRunResponse(BaseModel):
     validation_b8: dict[str, Any] | None
 
 
+class PipelineResumeRequest(PipelineRunRequest):
+    """Request to resume the pipeline from persisted step outputs."""
+    # step_name → step_output; None — читать ml/logs/<track_id>/step_*.json
+    step_outputs: dict[str, dict[str, Any]] | None = None
+    # Пересчитать этот шаг и всё, что от него зависит (B7 или B7_schedule)
+    from_step: str | None = None
+
+
 class PipelineBatchRequest(BaseModel):
     """Request to run batch pipeline for N tracks."""
     profile: dict[str, Any]
     track_ids: list[str]
     algorithm_version: str = "v1.0.0"
+    llm_provider: str | None = None
+    fork_after: str | None = None  # общий префикс до шага; None — BATCH_FORK_AFTER
 
 
 class PipelineBatchResponse(BaseModel):
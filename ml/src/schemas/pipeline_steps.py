@@ -253,6 +253,31 @@ class ScheduleOutput(BaseModel):
     progress_milestones: list[Milestone]
 
 
+class ScheduleWeeksOutput(BaseModel):
+    """Part of sharded B7: weeks of one week range."""
+    weeks: list[TrackWeek]
+
+
+class WeekNarrative(BaseModel):
+    """Theme and goals of a packed week (B7 packer)."""
+    week_number: int
+    theme: str
+    weekly_goals: list[str]
+
+
+class ScheduleNarrativesOutput(BaseModel):
+    """Part of packed B7: narrative fields of all weeks."""
+    weeks: list[WeekNarrative]
+
+
+class ScheduleFrameOutput(BaseModel):
+    """Part of sharded B7: track-wide checkpoints, assessment and support."""
+    checkpoints: list[Checkpoint]
+    final_assessment: dict
+    support_plan: SupportPlan
+    progress_milestones: list[Milestone]
+
+
 # ============================================================================
 # B8: Validation Result
 # ============================================================================
@@ -265,6 +290,11 @@ class ValidationCheck(BaseModel):
     message: str
 
 
+class SemanticChecksOutput(BaseModel):
+    """LLM part of B8: semantic checks not covered by rules."""
+    checks: list[ValidationCheck]
+
+
 class ValidationResult(BaseModel):
     """Output of B8: track validation."""
     overall_valid: bool
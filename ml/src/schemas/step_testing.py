@@ -16,6 +16,7 @@ class StepTestRequest(BaseModel):
         use_mock: Использовать MockLLMClient (True) или DeepSeekClient (False)
         inputs: Входные данные для шага (структура зависит от конкретного шага)
         step_name: Явное указание шага (B1_validate, B2_competencies, etc.) - используется для mock LLM
+        llm_provider: Провайдер LLM (llm_client_factory) при use_mock=False
     """
 
     use_mock: bool = Field(
@@ -30,6 +31,10 @@ class StepTestRequest(BaseModel):
         default=None,
         description="Явное указание шага для mock LLM (e.g., 'B1_validate', 'B2_competencies')",
     )
+    llm_provider: str | None = Field(
+        default=None,
+        description="Провайдер LLM при use_mock=False: deepseek, cached, local, replay:<track_id>",
+    )
 
 
 class StepTestResponse(BaseModel):
@@ -1,19 +1,27 @@
 """DeepSeek API client with retry logic and structured output."""
 
 import asyncio
+import inspect
 import json
 import logging
-from typing import Any, TypeVar
+from typing import Any, Awaitable, Callable, TypeVar
 
 import httpx
 from pydantic import BaseModel, ValidationError
 
 from ml.src.core.config import settings
+from ml.src.services.incremental_json import IncrementalJSONError, IncrementalJSONParser
+from ml.src.services.llm_cache import ResponseCache, get_llm_cache, make_cache_key
+from ml.src.services.llm_cassette import ReplayTransport, make_cassette_transport
+from ml.src.services.rate_limiter import LLMRateLimiter, get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T", bound=BaseModel)
 
+# Callback for streamed progress events: {"key", "index", "item"}
+ProgressCallback = Callable[[dict[str, Any]], Awaitable[None] | None]
+
 
 class DeepSeekError(Exception):
     """Base exception for DeepSeek API errors."""
@@ -22,18 +30,54 @@ class DeepSeekError(Exception):
 
 class DeepSeekRateLimitError(DeepSeekError):
     """Rate limit exceeded."""
-    pass
+
+    def __init__(self, message: str, retry_after: int = 5):
+        self.retry_after = retry_after
+        super().__init__(message)
 
 
 class DeepSeekClient:
     """Async client for DeepSeek API with retry logic."""
 
-    def __init__(self):
-        self.base_url = settings.DEEPSEEK_BASE_URL
-        self.api_key = settings.DEEPSEEK_API_KEY
-        self.model = settings.DEEPSEEK_MODEL
+    def __init__(
+        self,
+        cache: ResponseCache | None = None,
+        limiter: LLMRateLimiter | None = None,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        model: str | None = None,
+        cache_only: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """
+        Args:
+            cache: Response cache (defaults to the global cache from settings)
+            limiter: Rate limiter (defaults to the process-wide limiter)
+            base_url: OpenAI-compatible API URL (defaults to DEEPSEEK_BASE_URL)
+            api_key: API key (defaults to DEEPSEEK_API_KEY)
+            model: Model name (defaults to DEEPSEEK_MODEL)
+            cache_only: Answer only from the cache; a miss raises DeepSeekError
+            transport: HTTP transport (defaults to the LLM_CASSETTE_MODE cassette
+                transport, or the network). A replay transport disables the
+                default response cache so every call is served with cassette timing
+        """
+        self.base_url = base_url or settings.DEEPSEEK_BASE_URL
+        self.api_key = settings.DEEPSEEK_API_KEY if api_key is None else api_key
+        self.model = model or settings.DEEPSEEK_MODEL
+        self.cache_only = cache_only
         self.max_retries = settings.DEEPSEEK_MAX_RETRIES
         self.backoff_base = settings.DEEPSEEK_RETRY_BACKOFF_BASE
+        if transport is None:
+            transport = make_cassette_transport(
+                settings.LLM_CASSETTE_MODE,
+                settings.LLM_CASSETTE_PATH,
+                settings.LLM_CASSETTE_TIME_SCALE,
+            )
+        self.transport = transport
+        if cache is None and not isinstance(transport, ReplayTransport):
+            cache = get_llm_cache()
+        self.cache = cache
+        self.limiter = limiter if limiter is not None else get_rate_limiter()
 
         self.client = httpx.AsyncClient(
             base_url=self.base_url,
@@ -42,6 +86,7 @@ class DeepSeekClient:
                 "Content-Type": "application/json",
             },
             timeout=httpx.Timeout(120.0),  # 2 minutes timeout
+            transport=transport,
         )
 
     async def close(self):
@@ -54,6 +99,10 @@ class DeepSeekClient:
         response_model: type[T],
         temperature: float = 0.7,
         max_tokens: int = 4000,
+        use_cache: bool | None = None,
+        stream: bool = False,
+        on_progress: ProgressCallback | None = None,
+        max_attempts: int | None = None,
     ) -> tuple[T, dict[str, Any]]:
         """
         Make a chat completion request with structured output.
@@ -63,10 +112,20 @@ class DeepSeekClient:
             response_model: Pydantic model class for structured response
             temperature: Sampling temperature
             max_tokens: Maximum tokens in response
+            use_cache: Look up / store the response in the response cache.
+                None — only deterministic calls (temperature <=
+                LLM_CACHE_MAX_TEMPERATURE), otherwise a repeated profile would
+                get the same sampled track back; True — explicit opt-in
+            stream: Consume SSE deltas and parse JSON incrementally
+                (aborts early on malformed structure)
+            on_progress: Called for each item completed inside a top-level
+                array of the streamed JSON (stream mode only)
+            max_attempts: Attempts for this call (defaults to DEEPSEEK_MAX_RETRIES);
+                hedged calls make single attempts and retry with a new sample
 
         Returns:
             Tuple of (parsed_response, metadata)
-            metadata contains: tokens_used, duration_ms, raw_response
+            metadata contains: tokens_used, duration_ms, raw_response, cache
 
         Raises:
             DeepSeekError: On API errors
@@ -84,47 +143,88 @@ class DeepSeekClient:
             "max_tokens": max_tokens,
         }
 
+        if use_cache is None:
+            use_cache = temperature <= settings.LLM_CACHE_MAX_TEMPERATURE
+        cache = self.cache if use_cache or self.cache_only else None
+        cache_key = None
+        if cache is not None:
+            cache_key = make_cache_key(
+                self.model,
+                prompt,
+                {"temperature": temperature, "max_tokens": max_tokens},
+                response_model,
+            )
+            cached = await self._get_cached(cache, cache_key, response_model, start_time)
+            if cached is not None:
+                return cached
+        if self.cache_only:
+            raise DeepSeekError(f"No cached response for {response_model.__name__} (cache-only)")
+
+        stream = stream and settings.DEEPSEEK_STREAMING_ENABLED
+        # Rough estimate for the TPM bucket; reconciled with usage after the call
+        estimated_tokens = len(prompt) // 3 + max_tokens
+
         # Retry loop
+        max_attempts = max_attempts or self.max_retries
         last_error = None
-        for attempt in range(self.max_retries):
+        backoff = False
+        for attempt in range(max_attempts):
+            # Пауза перед повтором — после освобождения слота и резерва токенов
+            # лимитера, чтобы упавший вызов не держал их всё время backoff
+            if backoff:
+                await asyncio.sleep(self.backoff_base ** (attempt - 1))
+                backoff = False
+            lease = await self.limiter.acquire(estimated_tokens)
+            tokens_used = None
             try:
-                logger.info(f"DeepSeek API call attempt {attempt + 1}/{self.max_retries}")
-
-                response = await self.client.post("/chat/completions", json=request_data)
-
-                # Handle rate limiting
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get("Retry-After", "5"))
-                    logger.warning(f"Rate limited, retrying after {retry_after}s")
-                    await asyncio.sleep(retry_after)
-                    continue
+                logger.info(f"DeepSeek API call attempt {attempt + 1}/{max_attempts}")
+
+                if stream:
+                    content, tokens_used = await self._stream_completion(
+                        request_data, on_progress
+                    )
+                else:
+                    response = await self.client.post("/chat/completions", json=request_data)
+                    self.limiter.update_from_headers(response.headers)
+
+                    # Handle rate limiting: pause the shared limiter instead of
+                    # sleeping per call, so concurrent callers back off together
+                    if response.status_code == 429:
+                        retry_after = int(response.headers.get("Retry-After", "5"))
+                        self.limiter.on_rate_limited(retry_after)
+                        last_error = DeepSeekRateLimitError(
+                            f"Rate limit exceeded (429), retry after {retry_after}s", retry_after
+                        )
+                        continue
 
-                # Handle server errors
-                if response.status_code >= 500:
-                    logger.warning(f"Server error {response.status_code}, retrying...")
-                    await asyncio.sleep(self.backoff_base ** attempt)
-                    continue
+                    # Handle server errors
+                    if response.status_code >= 500:
+                        logger.warning(f"Server error {response.status_code}, retrying...")
+                        last_error = DeepSeekError(f"Server error {response.status_code}")
+                        backoff = True
+                        continue
 
-                # Check for client errors
-                response.raise_for_status()
+                    # Check for client errors
+                    response.raise_for_status()
 
-                # Parse response
-                response_json = response.json()
-                content = response_json["choices"][0]["message"]["content"]
+                    # Parse response
+                    response_json = response.json()
+                    content = response_json["choices"][0]["message"]["content"]
+                    tokens_used = response_json.get("usage", {}).get("total_tokens", 0)
 
-                # Extract JSON from markdown code blocks if present
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0].strip()
+                    # Extract JSON from markdown code blocks if present
+                    if "```json" in content:
+                        content = content.split("```json")[1].split("```")[0].strip()
+                    elif "```" in content:
+                        content = content.split("```")[1].split("```")[0].strip()
 
                 # Parse as JSON
                 try:
                     parsed_json = json.loads(content)
                 except json.JSONDecodeError as e:
                     logger.error(f"Invalid JSON in response: {content[:200]}")
-                    if attempt < self.max_retries - 1:
-                        await asyncio.sleep(self.backoff_base ** attempt)
+                    if attempt < max_attempts - 1:
+                        backoff = True
                         continue
                     raise DeepSeekError(f"Invalid JSON in response: {e}")
 
@@ -133,41 +233,61 @@ class DeepSeekClient:
 
                 # Collect metadata
                 duration_ms = (time.time() - start_time) * 1000
-                tokens_used = response_json.get("usage", {}).get("total_tokens", 0)
 
                 metadata = {
                     "tokens_used": tokens_used,
                     "duration_ms": duration_ms,
                     "raw_response": content,
                     "model": self.model,
+                    "streamed": stream,
                 }
 
+                self.limiter.on_success()
+                if cache is not None:
+                    await cache.set(
+                        cache_key,
+                        {"content": content, "tokens_used": tokens_used, "model": self.model},
+                    )
+                    metadata["cache"] = {"hit": False, "tier": None, **cache.get_stats()}
+
                 logger.info(
                     f"DeepSeek API success: {tokens_used} tokens, {duration_ms:.0f}ms"
                 )
 
                 return validated_response, metadata
 
+            except DeepSeekRateLimitError as e:
+                last_error = e
+                self.limiter.on_rate_limited(e.retry_after)
+                continue
+
+            except IncrementalJSONError as e:
+                logger.error(f"Malformed streamed JSON, aborting attempt: {e}")
+                last_error = DeepSeekError(f"Invalid JSON in response: {e}")
+                if attempt < max_attempts - 1:
+                    backoff = True
+                    continue
+
             except httpx.TimeoutException as e:
                 logger.warning(f"Request timeout on attempt {attempt + 1}")
                 last_error = DeepSeekError(f"Request timeout: {e}")
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.backoff_base ** attempt)
+                if attempt < max_attempts - 1:
+                    backoff = True
                     continue
 
             except httpx.HTTPStatusError as e:
                 logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
                 last_error = DeepSeekError(f"HTTP error: {e}")
-                if attempt < self.max_retries - 1 and e.response.status_code >= 500:
-                    await asyncio.sleep(self.backoff_base ** attempt)
+                if attempt < max_attempts - 1 and e.response.status_code >= 500:
+                    backoff = True
                     continue
                 break  # Don't retry client errors
 
             except ValidationError as e:
                 logger.error(f"Response validation error: {e}")
                 last_error = e
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(self.backoff_base ** attempt)
+                if attempt < max_attempts - 1:
+                    backoff = True
                     continue
 
             except Exception as e:
@@ -175,9 +295,108 @@ class DeepSeekClient:
                 last_error = DeepSeekError(f"Unexpected error: {e}")
                 break
 
+            finally:
+                lease.release(tokens_used)
+
         # All retries exhausted
         raise last_error or DeepSeekError("All retry attempts failed")
 
+    async def _stream_completion(
+        self,
+        request_data: dict[str, Any],
+        on_progress: ProgressCallback | None,
+    ) -> tuple[str, int]:
+        """
+        Run a streamed completion (SSE) and parse the JSON as it arrives.
+
+        Returns:
+            Tuple of (root JSON text, total tokens)
+
+        Raises:
+            DeepSeekRateLimitError: On 429
+            httpx.HTTPStatusError: On other error statuses
+            IncrementalJSONError: As soon as the structure is malformed
+        """
+        parser = IncrementalJSONParser()
+        tokens_used = 0
+
+        async with self.client.stream(
+            "POST",
+            "/chat/completions",
+            json={**request_data, "stream": True, "stream_options": {"include_usage": True}},
+            timeout=httpx.Timeout(120.0, read=settings.DEEPSEEK_STREAM_READ_TIMEOUT),
+        ) as response:
+            self.limiter.update_from_headers(response.headers)
+            if response.status_code == 429:
+                raise DeepSeekRateLimitError(
+                    "Rate limited",
+                    retry_after=int(response.headers.get("Retry-After", "5")),
+                )
+            if response.status_code >= 400:
+                await response.aread()
+                response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = json.loads(data)
+                usage = chunk.get("usage") or {}
+                tokens_used = usage.get("total_tokens", tokens_used)
+
+                for choice in chunk.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if not delta:
+                        continue
+                    for event in parser.feed(delta):
+                        if on_progress is not None:
+                            result = on_progress(event)
+                            if inspect.isawaitable(result):
+                                await result
+
+        parser.finish()
+        return parser.json_text, tokens_used
+
+    async def _get_cached(
+        self,
+        cache: ResponseCache,
+        cache_key: str,
+        response_model: type[T],
+        start_time: float,
+    ) -> tuple[T, dict[str, Any]] | None:
+        """Return (response, metadata) from cache, or None on miss."""
+        import time
+
+        entry = await cache.get(cache_key)
+        if entry is None:
+            return None
+
+        try:
+            validated_response = response_model.model_validate(json.loads(entry["content"]))
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Discarding unusable cached response: {e}")
+            return None
+
+        duration_ms = (time.time() - start_time) * 1000
+        metadata = {
+            # Ответ из кэша не тратит токены; исходный расход — в cache.saved_tokens
+            "tokens_used": 0,
+            "duration_ms": duration_ms,
+            "raw_response": entry["content"],
+            "model": entry.get("model", self.model),
+            "cache": {
+                "hit": True,
+                "tier": entry.get("cache_tier"),
+                "saved_tokens": entry.get("tokens_used", 0),
+                **cache.get_stats(),
+            },
+        }
+        logger.info(f"DeepSeek cache hit ({entry.get('cache_tier')}): {duration_ms:.0f}ms")
+        return validated_response, metadata
+
 
 # Global client instance
 _client: DeepSeekClient | None = None
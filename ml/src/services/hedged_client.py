@@ -0,0 +1,219 @@
+"""Hedged LLM requests: parallel samples of one call, first valid response wins.
+
+Для шагов с частыми ошибками JSON/схемы последовательные ретраи стоят
+полного round-trip и backoff на каждую ошибку. HedgedClient запускает
+несколько сэмплов одного вызова (сразу или с задержкой) и возвращает
+первый ответ, прошедший response_model; остальные отменяются. Каждый
+сэмпл — одна попытка, на место упавшего сразу запускается новый (не больше
+samples + DEEPSEEK_MAX_RETRIES - 1 сэмплов на вызов).
+
+Стоимость: токены проигравших сэмплов не возвращаются API, поэтому в
+tokens_used добавляется оценка по токенам победителя (упавший сэмпл —
+полный ответ, отменённый — доля по времени работы); детали в metadata["hedge"].
+"""
+
+import asyncio
+import logging
+import re
+from collections import defaultdict, deque
+from typing import Any
+
+from ml.src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_HISTORY_SIZE = 200
+_MIN_HISTORY = 10
+_PERCENTILE_RE = re.compile(r"^p(\d{1,2})$")
+
+# step_name → длительности успешных сэмплов (сек) для задержки "pNN"
+_latency_history: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=_HISTORY_SIZE))
+_stats = {"calls": 0, "samples": 0, "hedged_calls": 0, "extra_tokens_estimate": 0}
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class HedgedClient:
+    """
+    LLM-клиент, который отправляет вызов несколькими сэмплами параллельно.
+
+    Сэмплы после первого не берут ответ из кэша (одинаковый ответ не даёт
+    второго шанса) и не получают on_progress.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        samples: int = 2,
+        hedge_delay: float | str | None = None,
+        step_name: str | None = None,
+    ):
+        """
+        Args:
+            client: Wrapped LLM client
+            samples: Max concurrent samples per call
+            hedge_delay: Seconds before each next sample, "pNN" — percentile of
+                the step's sample latency, None — all samples at once
+            step_name: Step whose latency history drives "pNN" delays
+
+        Raises:
+            ValueError: Malformed hedge_delay
+        """
+        if isinstance(hedge_delay, str) and not _PERCENTILE_RE.match(hedge_delay):
+            raise ValueError(f"Hedge delay must be seconds or 'pNN', got {hedge_delay!r}")
+        self._client = client
+        self.samples = max(1, samples)
+        self.hedge_delay = hedge_delay
+        self.step_name = step_name
+
+    def _delay(self) -> float | None:
+        """Задержка перед следующим сэмплом; None — только после ошибки."""
+        if self.hedge_delay is None:
+            return 0.0
+        if not isinstance(self.hedge_delay, str):
+            return float(self.hedge_delay)
+        history = _latency_history[self.step_name or ""]
+        if len(history) < _MIN_HISTORY:
+            return None
+        return _percentile(list(history), float(self.hedge_delay[1:]))
+
+    async def chat_completion(self, prompt: str, response_model: Any, *args, **kwargs):
+        """
+        Run samples of the call until one returns a validated response.
+
+        Raises:
+            Exception: Error of the last sample when every sample failed
+        """
+        loop = asyncio.get_running_loop()
+        max_samples = self.samples + settings.DEEPSEEK_MAX_RETRIES - 1
+        delay = self._delay()
+        running: dict[asyncio.Task, float] = {}
+        launched = 0
+        failed = 0
+        errors: list[BaseException] = []
+
+        def launch() -> None:
+            nonlocal launched
+            sample_kwargs = {**kwargs, "max_attempts": 1}
+            if launched:
+                # Без кэша (тот же ответ) и без on_progress (дубли событий)
+                sample_kwargs["use_cache"] = False
+                sample_kwargs.pop("on_progress", None)
+            task = asyncio.create_task(
+                self._client.chat_completion(prompt, response_model, *args, **sample_kwargs)
+            )
+            running[task] = loop.time()
+            launched += 1
+
+        launch()
+        next_hedge_at = loop.time() + (delay or 0.0)
+        try:
+            while running:
+                if delay == 0.0:
+                    while launched < self.samples:
+                        launch()
+                timeout = None
+                if delay is not None and launched < self.samples:
+                    timeout = max(0.0, next_hedge_at - loop.time())
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()
+                    next_hedge_at = loop.time() + delay
+                    continue
+
+                # Завершившиеся одновременно: сначала учитываем ошибки, побеждает
+                # самый ранний валидный сэмпл
+                winner = None
+                for task in sorted(done, key=running.__getitem__):
+                    started_at = running.pop(task)
+                    if task.exception() is None:
+                        winner = winner or (task, started_at)
+                        continue
+                    failed += 1
+                    errors.append(task.exception())
+                    logger.warning(
+                        f"Hedged sample {failed}/{launched} of {response_model.__name__} "
+                        f"failed: {task.exception()}"
+                    )
+                if winner is not None:
+                    return self._won(*winner, launched, failed, running, loop)
+                for _ in range(min(len(done), max_samples - launched)):
+                    launch()
+            raise errors[-1]
+        finally:
+            _stats["calls"] += 1
+            _stats["samples"] += launched
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    def _won(
+        self,
+        task: asyncio.Task,
+        started_at: float,
+        launched: int,
+        failed: int,
+        running: dict[asyncio.Task, float],
+        loop: asyncio.AbstractEventLoop,
+    ) -> tuple[Any, dict[str, Any]]:
+        """Результат победителя с учётом стоимости остальных сэмплов."""
+        result, metadata = task.result()
+        now = loop.time()
+        duration = now - started_at
+        winner_tokens = metadata.get("tokens_used") or 0
+        if not (metadata.get("cache") or {}).get("hit"):
+            _latency_history[self.step_name or ""].append(duration)
+
+        cancelled_share = sum(
+            min(1.0, (now - sample_start) / duration) if duration > 0 else 0.0
+            for sample_start in running.values()
+        )
+        extra_tokens = round(winner_tokens * (failed + cancelled_share))
+        _stats["extra_tokens_estimate"] += extra_tokens
+        if launched > 1:
+            _stats["hedged_calls"] += 1
+
+        metadata = {
+            **metadata,
+            "tokens_used": winner_tokens + extra_tokens,
+            "hedge": {
+                "samples": launched,
+                "failed": failed,
+                "cancelled": len(running),
+                "winner_tokens": winner_tokens,
+                "extra_tokens_estimate": extra_tokens,
+            },
+        }
+        if launched > 1:
+            logger.info(
+                f"Hedged {self.step_name or 'call'}: {launched} samples, {failed} failed, "
+                f"~{extra_tokens} extra tokens"
+            )
+        return result, metadata
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def hedge_for_step(client: Any, step_name: str) -> Any:
+    """
+    Обернуть клиент в HedgedClient, если для шага заданы сэмплы (LLM_HEDGE_SAMPLES).
+
+    Returns:
+        HedgedClient или исходный клиент
+    """
+    samples = settings.LLM_HEDGE_SAMPLES.get(step_name, 1)
+    if samples < 2:
+        return client
+    return HedgedClient(client, samples, settings.LLM_HEDGE_DELAY.get(step_name), step_name)
+
+
+def get_hedge_stats() -> dict[str, int]:
+    """Счётчики hedged-вызовов процесса (вызовы, сэмплы, оценка лишних токенов)."""
+    return dict(_stats)
@@ -0,0 +1,160 @@
+"""Incremental JSON parser for streamed LLM responses."""
+
+import json
+from typing import Any
+
+_WHITESPACE = " \t\r\n"
+# Символы, допустимые вне строк: структура, числа, true/false/null
+_ALLOWED_OUTSIDE_STRINGS = set(_WHITESPACE + "{}[],:" + "0123456789+-.eE" + "truefalsn")
+_CLOSING = {"}": "{", "]": "["}
+
+
+class IncrementalJSONError(ValueError):
+    """Streamed content is not (and cannot become) valid JSON."""
+    pass
+
+
+class IncrementalJSONParser:
+    """
+    Structural JSON scanner fed with text chunks as they arrive.
+
+    Skips a markdown fence / preamble before the root value, detects malformed
+    structure as soon as it appears (mismatched brackets, stray characters)
+    and reports every object/array item completed inside a top-level array
+    (e.g. each of ScheduleOutput.weeks) as a progress event.
+    """
+
+    def __init__(self, max_preamble_chars: int = 2000):
+        """
+        Args:
+            max_preamble_chars: How much text may precede the root value
+        """
+        self.max_preamble_chars = max_preamble_chars
+        self._text: list[str] = []
+        self._length = 0
+        self._preamble = 0
+        self._started = False
+        self._done = False
+
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: str | None = None
+        self._current_key: str | None = None
+        self._array_key: str | None = None
+        self._item_start: int | None = None
+        self._item_index = 0
+
+    @property
+    def done(self) -> bool:
+        """Root value is complete."""
+        return self._done
+
+    @property
+    def json_text(self) -> str:
+        """Text of the root JSON value received so far."""
+        return "".join(self._text)
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        """
+        Consume a chunk of streamed text.
+
+        Returns:
+            Progress events: {"key", "index", "item"} for each completed item
+
+        Raises:
+            IncrementalJSONError: On malformed structure
+        """
+        events: list[dict[str, Any]] = []
+        for ch in chunk:
+            if self._done:
+                break
+            if not self._started:
+                if ch in "{[":
+                    self._started = True
+                else:
+                    self._preamble += 1
+                    if self._preamble > self.max_preamble_chars:
+                        raise IncrementalJSONError("No JSON value found at start of response")
+                    continue
+
+            offset = self._length
+            self._text.append(ch)
+            self._length += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = json.loads(
+                            "".join(self._text[self._string_start:offset + 1])
+                        )
+                continue
+
+            if ch not in _ALLOWED_OUTSIDE_STRINGS and ch != '"':
+                raise IncrementalJSONError(
+                    f"Unexpected character {ch!r} at offset {offset}"
+                )
+
+            depth = len(self._stack)
+            if depth == 2 and self._array_key is not None and self._stack[1] == "[":
+                self._track_item_start(ch, offset)
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = offset
+            elif ch == ":" and depth == 1:
+                self._current_key = self._last_string
+            elif ch in "{[":
+                if depth == 1 and ch == "[" and self._stack[0] == "{":
+                    self._array_key = self._current_key
+                    self._item_index = 0
+                self._stack.append(ch)
+            elif ch in "}]":
+                if not self._stack or self._stack[-1] != _CLOSING[ch]:
+                    raise IncrementalJSONError(
+                        f"Mismatched {ch!r} at offset {offset}"
+                    )
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 2 and self._item_start is not None:
+                    events.append(self._complete_item(offset + 1))
+                elif depth == 1:
+                    self._array_key = None
+                    self._item_start = None
+                elif depth == 0:
+                    self._done = True
+
+        return events
+
+    def _track_item_start(self, ch: str, offset: int) -> None:
+        if self._item_start is None and ch in "{[":
+            self._item_start = offset
+
+    def _complete_item(self, end: int) -> dict[str, Any]:
+        item = json.loads("".join(self._text[self._item_start:end]))
+        event = {"key": self._array_key, "index": self._item_index, "item": item}
+        self._item_index += 1
+        self._item_start = None
+        return event
+
+    def finish(self) -> Any:
+        """
+        Parse the complete root value.
+
+        Raises:
+            IncrementalJSONError: If the stream ended before the value closed
+        """
+        if not self._done:
+            raise IncrementalJSONError(
+                f"Response truncated: {len(self._stack)} unclosed container(s)"
+            )
+        try:
+            return json.loads(self.json_text)
+        except json.JSONDecodeError as e:
+            raise IncrementalJSONError(f"Invalid JSON in response: {e}") from e
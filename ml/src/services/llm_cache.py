@@ -0,0 +1,247 @@
+"""Content-addressed cache for LLM responses (in-memory LRU + SQLite on disk)."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from ml.src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    model: str,
+    prompt: str,
+    params: dict[str, Any],
+    response_model: type[BaseModel],
+) -> str:
+    """
+    Build a content-addressed cache key.
+
+    Key = sha256 of (model, prompt, sampling params, response_model JSON schema),
+    so changing the prompt, the params or the schema invalidates the entry.
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "prompt": prompt,
+            "params": params,
+            "schema": response_model.model_json_schema(),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Interface for LLM response caches used by DeepSeekClient."""
+
+    @abstractmethod
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Return cached entry or None."""
+
+    @abstractmethod
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store entry."""
+
+    def get_stats(self) -> dict[str, Any]:
+        """Hit/miss counters."""
+        return {}
+
+    async def close(self) -> None:
+        """Release resources."""
+
+
+class _SQLiteStore:
+    """Persistent tier: one SQLite table, accessed from worker threads."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, ttl_sec: float) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if ttl_sec and now - created_at > ttl_sec:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return json.loads(value)
+
+    def set(self, key: str, value: dict[str, Any], ttl_sec: float, max_entries: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if ttl_sec:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE created_at < ?", (now - ttl_sec,)
+                )
+            if max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,),
+                )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LLMResponseCache(ResponseCache):
+    """
+    Two-tier cache: in-memory LRU in front of an SQLite store.
+
+    Both tiers honour TTL; the memory tier is bounded by entry count (LRU),
+    the disk tier by entry count (least recently accessed evicted first).
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        ttl_sec: float = 7 * 24 * 3600,
+        memory_max_entries: int = 256,
+        disk_max_entries: int = 5000,
+    ):
+        """
+        Args:
+            path: SQLite file for the persistent tier (None — memory only)
+            ttl_sec: Entry lifetime in seconds (0 — no expiry)
+            memory_max_entries: LRU capacity of the memory tier
+            disk_max_entries: Capacity of the disk tier (0 — unbounded)
+        """
+        self.ttl_sec = ttl_sec
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+        self._memory: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._disk = _SQLiteStore(Path(path).expanduser()) if path else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl_sec) and time.time() - created_at > self.ttl_sec
+
+    def _remember(self, key: str, value: dict[str, Any]) -> None:
+        self._memory[key] = (time.time(), value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        entry = self._memory.get(key)
+        if entry is not None:
+            created_at, value = entry
+            if not self._expired(created_at):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return {**value, "cache_tier": "memory"}
+            del self._memory[key]
+
+        if self._disk is not None:
+            try:
+                value = await asyncio.to_thread(self._disk.get, key, self.ttl_sec)
+            except Exception as e:
+                logger.warning(f"LLM cache disk read failed: {e}")
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                self.disk_hits += 1
+                return {**value, "cache_tier": "disk"}
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        self._remember(key, value)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(
+                    self._disk.set, key, value, self.ttl_sec, self.disk_max_entries
+                )
+            except Exception as e:
+                logger.warning(f"LLM cache disk write failed: {e}")
+
+    def get_stats(self) -> dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    async def close(self) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+
+# Global cache instance
+_cache: LLMResponseCache | None = None
+
+
+def get_llm_cache() -> LLMResponseCache | None:
+    """Get or create global LLM response cache (None if disabled in settings)."""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = LLMResponseCache(
+            path=settings.LLM_CACHE_PATH or None,
+            ttl_sec=settings.LLM_CACHE_TTL_SEC,
+            memory_max_entries=settings.LLM_CACHE_MEMORY_MAX_ENTRIES,
+            disk_max_entries=settings.LLM_CACHE_DISK_MAX_ENTRIES,
+        )
+    return _cache
+
+
+async def close_llm_cache():
+    """Close global LLM response cache."""
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
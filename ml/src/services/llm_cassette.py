@@ -0,0 +1,222 @@
+"""Record-and-replay HTTP transport for LLM API exchanges (cassettes).
+
+Запись: RecordingTransport оборачивает обычный транспорт httpx и дописывает
+каждый обмен с /chat/completions в JSONL-кассету (одна строка — один обмен):
+ключ запроса, хэш промпта, параметры, сырое тело ответа (JSON или SSE),
+usage и задержка.
+
+Воспроизведение: ReplayTransport отвечает из кассеты без сети, с исходной
+задержкой, умноженной на time_scale (0 — сразу). Одинаковые запросы
+получают записанные ответы по очереди (по кругу). Запроса нет в кассете —
+404, DeepSeekClient превращает его в DeepSeekError без повторов.
+
+DeepSeekClient работает поверх транспорта как обычно (лимитер, ретраи,
+streaming-парсер), поэтому прогон по кассете нагружает тот же код.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+def request_key(body: dict[str, Any]) -> str:
+    """Ключ обмена: sha256 канонического JSON тела запроса."""
+    canonical = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def prompt_hash(body: dict[str, Any]) -> str:
+    """sha256 текста сообщений (одинаков для запросов с разными параметрами)."""
+    text = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _usage(body_text: str, streamed: bool) -> dict[str, Any]:
+    """usage из JSON-ответа или из последнего SSE-чанка с usage."""
+    try:
+        if not streamed:
+            return json.loads(body_text).get("usage") or {}
+        usage: dict[str, Any] = {}
+        for line in body_text.splitlines():
+            data = line[len("data:"):].strip() if line.startswith("data:") else ""
+            if data and data != "[DONE]":
+                usage = json.loads(data).get("usage") or usage
+        return usage
+    except (json.JSONDecodeError, AttributeError):
+        return {}
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Тело ответа, которое копится по мере чтения и записывается при закрытии."""
+
+    def __init__(self, inner: httpx.AsyncByteStream, on_complete: Callable[[bytes], Any]):
+        self._inner = inner
+        self._on_complete = on_complete
+        self._chunks: list[bytes] = []
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._inner:
+            self._chunks.append(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+        await self._on_complete(b"".join(self._chunks))
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Транспорт, записывающий обмены с LLM API в кассету (append-only JSONL)."""
+
+    def __init__(self, path: str | Path, inner: httpx.AsyncBaseTransport | None = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._inner = inner or httpx.AsyncHTTPTransport()
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(await request.aread() or b"{}")
+        # Несжатое тело: в кассету пишется то, что увидит клиент
+        request.headers["Accept-Encoding"] = "identity"
+        start = time.perf_counter()
+        response = await self._inner.handle_async_request(request)
+        first_byte_ms = (time.perf_counter() - start) * 1000
+
+        async def _record(content: bytes) -> None:
+            entry = {
+                "key": request_key(body),
+                "prompt_hash": prompt_hash(body),
+                "params": {k: v for k, v in body.items() if k != "messages"},
+                "status_code": response.status_code,
+                "headers": {
+                    name: value for name, value in response.headers.items()
+                    if name.lower() in ("content-type", "retry-after")
+                    or name.lower().startswith("x-ratelimit-")
+                },
+                "body": content.decode("utf-8", errors="replace"),
+                "usage": _usage(content.decode("utf-8", errors="replace"), body.get("stream")),
+                "first_byte_ms": round(first_byte_ms, 1),
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+                "recorded_at": datetime.utcnow().isoformat(),
+            }
+            await asyncio.to_thread(self._append, entry)
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, _record),
+            extensions=response.extensions,
+        )
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+        self.recorded += 1
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Транспорт, отвечающий из кассеты с исходной (масштабированной) задержкой."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        time_scale: float = 1.0,
+        entries: dict[str, list[dict[str, Any]]] | None = None,
+    ):
+        """
+        Args:
+            path: Файл кассеты (JSONL)
+            time_scale: Множитель записанной задержки (0 — отвечать сразу)
+            entries: Уже прочитанная кассета (ReplayTransport.load); None —
+                прочитать файл сейчас
+        """
+        self.path = Path(path)
+        self.time_scale = time_scale
+        self._entries = self._read_entries(self.path) if entries is None else entries
+        self._served: dict[str, int] = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        logger.info(
+            f"Cassette {self.path}: {sum(map(len, self._entries.values()))} exchanges, "
+            f"{len(self._entries)} distinct requests"
+        )
+
+    @classmethod
+    async def load(cls, path: str | Path, time_scale: float = 1.0) -> "ReplayTransport":
+        """Прочитать кассету в worker-потоке (не блокируя event loop)."""
+        entries = await asyncio.to_thread(cls._read_entries, Path(path))
+        return cls(path, time_scale, entries=entries)
+
+    @staticmethod
+    def _read_entries(path: Path) -> dict[str, list[dict[str, Any]]]:
+        entries: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Обрыв записи в конце кассеты — пропускаем строку
+                    logger.warning(f"Skipping malformed cassette line {path}:{line_number}")
+                    continue
+                entries[entry["key"]].append(entry)
+        return entries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(json.loads(await request.aread() or b"{}"))
+        entries = self._entries.get(key)
+        if not entries:
+            self.misses += 1
+            return httpx.Response(
+                404, json={"error": {"message": f"Request {key[:12]} is not in the cassette"}}
+            )
+
+        entry = entries[self._served[key] % len(entries)]
+        self._served[key] += 1
+        self.hits += 1
+        if self.time_scale > 0:
+            await asyncio.sleep(entry["latency_ms"] * self.time_scale / 1000)
+        return httpx.Response(
+            entry["status_code"],
+            headers=entry.get("headers") or {},
+            content=entry["body"].encode("utf-8"),
+        )
+
+    def get_stats(self) -> dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "requests": len(self._entries)}
+
+
+def make_cassette_transport(
+    mode: str, path: str | Path, time_scale: float = 1.0
+) -> httpx.AsyncBaseTransport | None:
+    """
+    Транспорт для режима кассеты (settings.LLM_CASSETTE_MODE).
+
+    Returns:
+        RecordingTransport / ReplayTransport, None для off
+    """
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"Unknown cassette mode: {mode}")
+    if mode == "record":
+        return RecordingTransport(path)
+    if mode == "replay":
+        return ReplayTransport(path, time_scale)
+    return None
@@ -1,39 +1,261 @@
-"""Factory for LLM clients - supports real and mock modes."""
+"""Registry of LLM client providers (real, mock, cached, replay, local, cassette).
 
+Клиент выбирается по спецификации провайдера:
+- deepseek — DeepSeekClient (API, кэш ответов, общий лимитер);
+- mock — MockLLMClient на fixtures;
+- cached — DeepSeekClient, который отвечает только из кэша ответов
+  (промах — DeepSeekError, в API не ходит);
+- replay:<track_id> — результаты шагов трека из ml/logs/<track_id>;
+- local — OpenAI-совместимый сервер (LOCAL_LLM_BASE_URL), например заглушка
+  для нагрузочного теста;
+- cassette[:<name>] — DeepSeekClient, который отвечает из кассеты обменов
+  (llm_cassette.py) с записанной задержкой: LLM_CASSETTE_PATH или
+  <LLM_CASSETTE_DIR>/<name>.jsonl.
+Клиенты без аргумента общие на процесс: создаются при первом запросе и
+переиспользуются (HTTP-пул, кэш, fixtures). Спецификация с аргументом приходит
+и из тела HTTP-запроса, поэтому общий клиент на каждое значение не заводится;
+аргумент принимают только провайдеры, зарегистрированные с takes_argument=True.
+Исключение — cassette:<name>: имена ограничены файлами LLM_CASSETTE_DIR, и
+клиент общий на файл кассеты (очередь ответов, общий лимитер).
+"""
+
+import asyncio
 import logging
 import os
-from typing import Any
+import re
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Protocol, TypeVar
+
+from pydantic import BaseModel
+
+from ml.src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T", bound=BaseModel)
+
+
+class LLMClient(Protocol):
+    """Интерфейс, который шаги B1-B8 ожидают от LLM-клиента."""
+
+    async def chat_completion(
+        self,
+        prompt: str,
+        response_model: type[T],
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        **kwargs: Any,
+    ) -> tuple[T, dict[str, Any]]:
+        ...
+
 
-async def get_llm_client(mock_mode: bool | None = None) -> Any:
+ProviderFactory = Callable[[str | None], Awaitable[LLMClient]]
+
+_providers: dict[str, ProviderFactory] = {}
+_clients: dict[str, LLMClient] = {}
+# Провайдеры, принимающие аргумент после ":" (replay:<track_id>, cassette:<name>)
+_argument_providers: set[str] = set()
+# Провайдеры, которые не кэшируются и без аргумента
+_UNSHARED_PROVIDERS = {"replay"}
+# Общий лимитер и блокировка создания клиентов кассет
+_cassette_limiter: Any = None
+_cassette_lock = asyncio.Lock()
+_CASSETTE_NAME_RE = re.compile(r"^[\w-]+(\.[\w-]+)*$")
+# Синглтоны своих модулей — закрываются ими (close_deepseek_client)
+_MODULE_OWNED_PROVIDERS = {"deepseek", "mock"}
+
+
+def register_llm_provider(
+    name: str,
+    factory: ProviderFactory,
+    takes_argument: bool = False,
+) -> None:
     """
-    Get LLM client (real DeepSeek or mock).
+    Зарегистрировать провайдера.
 
     Args:
-        mock_mode: Force mock mode (True) or real mode (False).
-                   If None, reads from MOCK_LLM environment variable.
+        name: Имя провайдера (часть спецификации до ":")
+        factory: async (аргумент после ":" или None) -> клиент
+        takes_argument: Провайдер принимает аргумент после ":"
+    """
+    _providers[name] = factory
+    if takes_argument:
+        _argument_providers.add(name)
+    else:
+        _argument_providers.discard(name)
+
+
+def llm_providers() -> list[str]:
+    """Имена зарегистрированных провайдеров."""
+    return list(_providers)
+
+
+async def get_llm_client(provider: str | None = None, mock_mode: bool | None = None) -> Any:
+    """
+    Get a shared LLM client for a provider spec.
+
+    Args:
+        provider: "deepseek", "mock", "cached", "local", "replay:<track_id>",
+            "cassette[:<name>]", ...
+            None — settings.LLM_PROVIDER (mock при MOCK_LLM=true)
+        mock_mode: Force mock mode (True) or the default real provider (False).
+            Kept for callers that only switch between mock and real.
 
     Returns:
-        DeepSeekClient or MockLLMClient instance
+        Client with DeepSeekClient-compatible chat_completion
+
+    Raises:
+        ValueError: Unknown provider or an argument the provider does not take
     """
-    # Determine mode
-    if mock_mode is None:
-        mock_mode = os.getenv("MOCK_LLM", "false").lower() in ("true", "1", "yes")
+    if provider is None:
+        if mock_mode is None:
+            mock_mode = is_mock_mode()
+        provider = "mock" if mock_mode else settings.LLM_PROVIDER
 
-    if mock_mode:
-        logger.info("🎭 Using MockLLMClient (no real API calls)")
-        from ml.src.services.mock_llm_client import get_mock_client
+    name, _, argument = provider.partition(":")
+    factory = _providers.get(name)
+    if factory is None:
+        raise ValueError(f"Unknown LLM provider: {provider} (available: {llm_providers()})")
 
-        return get_mock_client()
-    else:
-        logger.info("🌐 Using DeepSeekClient (real API calls)")
-        from ml.src.services.deepseek_client import get_deepseek_client
+    if argument and name not in _argument_providers:
+        raise ValueError(f"LLM provider {name} takes no argument: {provider}")
 
-        return await get_deepseek_client()
+    # Аргумент — из запроса: общий клиент на каждое значение рос бы без предела
+    if argument or name in _UNSHARED_PROVIDERS:
+        return await factory(argument or None)
+    client = _clients.get(name)
+    if client is None:
+        logger.info(f"Creating shared LLM client: {name}")
+        client = await factory(None)
+        _clients[name] = client
+    return client
+
+
+async def close_llm_clients() -> None:
+    """Close shared clients (HTTP pools) — on service shutdown."""
+    # Один клиент может лежать под двумя ключами (cassette и cassette:<путь>)
+    clients = list({
+        id(client): client for name, client in _clients.items()
+        if name not in _MODULE_OWNED_PROVIDERS
+    }.values())
+    _clients.clear()
+    for client in clients:
+        close = getattr(client, "close", None)
+        if close is not None:
+            await close()
 
 
 def is_mock_mode() -> bool:
     """Check if mock mode is enabled via environment variable."""
     return os.getenv("MOCK_LLM", "false").lower() in ("true", "1", "yes")
+
+
+# =============================================================================
+# Built-in providers
+# =============================================================================
+
+
+async def _deepseek(argument: str | None) -> LLMClient:
+    from ml.src.services.deepseek_client import get_deepseek_client
+
+    return await get_deepseek_client()
+
+
+async def _mock(argument: str | None) -> LLMClient:
+    from ml.src.services.mock_llm_client import get_mock_client
+
+    return get_mock_client()
+
+
+async def _cached(argument: str | None) -> LLMClient:
+    from ml.src.services.deepseek_client import DeepSeekClient
+    from ml.src.services.llm_cache import LLMResponseCache, get_llm_cache
+
+    cache = get_llm_cache() or LLMResponseCache(
+        path=settings.LLM_CACHE_PATH or None,
+        ttl_sec=settings.LLM_CACHE_TTL_SEC,
+        memory_max_entries=settings.LLM_CACHE_MEMORY_MAX_ENTRIES,
+        disk_max_entries=settings.LLM_CACHE_DISK_MAX_ENTRIES,
+    )
+    return DeepSeekClient(cache=cache, cache_only=True)
+
+
+async def _replay(argument: str | None) -> LLMClient:
+    from uuid import UUID
+
+    from ml.src.services.replay_llm_client import ReplayLLMClient
+    from ml.src.services.step_logger import get_step_logger
+
+    if not argument:
+        raise ValueError("Replay provider needs a track id: replay:<track_id>")
+    step_logger = await get_step_logger()
+    step_outputs = await asyncio.to_thread(step_logger.load_step_outputs, UUID(argument))
+    return ReplayLLMClient(step_outputs)
+
+
+async def _local(argument: str | None) -> LLMClient:
+    from ml.src.services.deepseek_client import DeepSeekClient
+    from ml.src.services.rate_limiter import LLMRateLimiter
+
+    # Свой лимитер: локальный сервер не делит квоты DeepSeek API
+    return DeepSeekClient(
+        base_url=settings.LOCAL_LLM_BASE_URL,
+        api_key=settings.LOCAL_LLM_API_KEY,
+        model=settings.LOCAL_LLM_MODEL,
+        limiter=LLMRateLimiter(max_in_flight=settings.LOCAL_LLM_MAX_IN_FLIGHT),
+    )
+
+
+def resolve_cassette(name: str | None) -> Path:
+    """
+    Файл кассеты провайдера cassette[:<name>].
+
+    Имя приходит из запроса, поэтому читаются только файлы
+    <LLM_CASSETTE_DIR>/<name>.jsonl; без имени — LLM_CASSETTE_PATH.
+
+    Raises:
+        ValueError: Named cassettes disabled, malformed name or missing file
+    """
+    if not name:
+        return Path(settings.LLM_CASSETTE_PATH)
+    if not settings.LLM_CASSETTE_DIR:
+        raise ValueError("Named cassettes are disabled (LLM_CASSETTE_DIR is not set)")
+    if not _CASSETTE_NAME_RE.match(name):
+        raise ValueError(f"Invalid cassette name: {name!r}")
+    directory = Path(settings.LLM_CASSETTE_DIR).resolve()
+    path = (directory / f"{name}.jsonl").resolve()
+    if path.parent != directory or not path.is_file():
+        raise ValueError(f"Unknown cassette: {name}")
+    return path
+
+
+async def _cassette(argument: str | None) -> LLMClient:
+    """
+    Клиент кассеты: один на файл (в _clients под ключом cassette:<путь>),
+    все клиенты кассет делят один лимитер.
+    """
+    from ml.src.services.deepseek_client import DeepSeekClient
+    from ml.src.services.llm_cassette import ReplayTransport
+    from ml.src.services.rate_limiter import LLMRateLimiter
+
+    global _cassette_limiter
+    path = resolve_cassette(argument)
+    key = f"cassette:{path}"
+    async with _cassette_lock:
+        client = _clients.get(key)
+        if client is None:
+            if _cassette_limiter is None:
+                # Параллелизм как у API, но без квот RPM/TPM: время ответа задаёт кассета
+                _cassette_limiter = LLMRateLimiter(max_in_flight=settings.LLM_MAX_IN_FLIGHT)
+            transport = await ReplayTransport.load(path, settings.LLM_CASSETTE_TIME_SCALE)
+            client = DeepSeekClient(transport=transport, limiter=_cassette_limiter)
+            _clients[key] = client
+    return client
+
+
+register_llm_provider("deepseek", _deepseek)
+register_llm_provider("mock", _mock)
+register_llm_provider("cached", _cached)
+register_llm_provider("replay", _replay, takes_argument=True)
+register_llm_provider("local", _local)
+register_llm_provider("cassette", _cassette, takes_argument=True)
@@ -16,6 +16,7 @@ from ml.src.schemas.pipeline_steps import (
     ValidationResult,
 )
 from ml.src.services.llm_client_factory import get_llm_client
+from ml.src.services.rate_limiter import priority_lane
 
 logger = logging.getLogger(__name__)
 
@@ -98,8 +99,13 @@ async def execute_step(
         }
         if use_mock:
             kwargs["step_name"] = step_name
+        else:
+            # Повторный ручной запуск того же промпта — из кэша ответов
+            kwargs["use_cache"] = True
 
-        result, metadata = await client.chat_completion(**kwargs)
+        # Ручной запуск — интерактивная полоса, впереди batch-генерации
+        with priority_lane("interactive"):
+            result, metadata = await client.chat_completion(**kwargs)
         duration_ms = (time.time() - start_time) * 1000
 
         parsed = result.model_dump() if hasattr(result, "model_dump") else result
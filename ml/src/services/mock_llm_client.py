@@ -19,6 +19,7 @@ class MockLLMClient:
         self,
         fixtures_dir: str = "tests/fixtures/mock_responses",
         fixed_step_name: str | None = None,
+        fixtures: dict[str, Any] | None = None,
     ):
         """
         Initialize mock client.
@@ -26,12 +27,17 @@ class MockLLMClient:
         Args:
             fixtures_dir: Directory with mock JSON responses for B1-B8
             fixed_step_name: If set, always use this step instead of auto-detection
+            fixtures: Already loaded fixtures (step_name → response); skips reading files
         """
         self.fixtures_dir = Path(fixtures_dir)
         self.call_count = 0
         self.total_tokens = 0
         self.fixed_step_name = fixed_step_name
 
+        if fixtures is not None:
+            self.fixtures = fixtures
+            return
+
         # Load all fixtures
         self.fixtures = {}
         for step_file in self.fixtures_dir.glob("*.json"):
@@ -41,6 +47,14 @@ class MockLLMClient:
 
         logger.info(f"MockLLMClient initialized with {len(self.fixtures)} fixtures")
 
+    def with_fixed_step(self, step_name: str | None) -> "MockLLMClient":
+        """Client that always answers as step_name, sharing the loaded fixtures."""
+        return MockLLMClient(
+            fixtures_dir=str(self.fixtures_dir),
+            fixed_step_name=step_name,
+            fixtures=self.fixtures,
+        )
+
     async def complete(
         self,
         prompt: str,
@@ -115,6 +129,9 @@ class MockLLMClient:
         temperature: float = 0.7,
         max_tokens: int = 4000,
         step_name: str | None = None,
+        stream: bool = False,
+        on_progress: Any = None,
+        **kwargs,
     ) -> tuple[T, dict[str, Any]]:
         """
         Mock chat completion with structured output (compatible with DeepSeekClient).
@@ -125,6 +142,8 @@ class MockLLMClient:
             temperature: Sampling temperature (ignored in mock)
             max_tokens: Maximum tokens in response (ignored in mock)
             step_name: Explicit step name (e.g., 'B1_validate') - if None, will auto-detect
+            stream: Emit progress events like the streaming DeepSeekClient
+            on_progress: Progress callback (stream mode only)
 
         Returns:
             Tuple of (parsed_response, metadata)
@@ -149,6 +168,9 @@ class MockLLMClient:
         # Validate against Pydantic model
         validated_response = response_model.model_validate(response_data)
 
+        if stream and on_progress is not None:
+            await self._emit_progress(response_data, on_progress)
+
         # Simulate token usage
         input_tokens = len(prompt.split()) * 1.3
         output_tokens = len(json.dumps(response_data).split()) * 1.3
@@ -164,6 +186,7 @@ class MockLLMClient:
             "duration_ms": duration_ms,
             "raw_response": json.dumps(response_data, ensure_ascii=False),
             "model": "mock-llm",
+            "step_name": step_name,
         }
 
         logger.info(
@@ -173,6 +196,20 @@ class MockLLMClient:
 
         return validated_response, metadata
 
+    @staticmethod
+    async def _emit_progress(response_data: dict[str, Any], on_progress: Any) -> None:
+        """Emit {"key", "index", "item"} events for items of top-level arrays."""
+        import inspect
+
+        for key, value in response_data.items():
+            if not isinstance(value, list):
+                continue
+            for index, item in enumerate(value):
+                if isinstance(item, (dict, list)):
+                    result = on_progress({"key": key, "index": index, "item": item})
+                    if inspect.isawaitable(result):
+                        await result
+
     def _detect_step(self, prompt: str) -> str:
         """
         Detect which pipeline step based on prompt keywords.
@@ -1,14 +1,19 @@
 """Pipeline orchestrator - coordinates B1-B8 execution."""
 
 import asyncio
+import copy
 import logging
 import time
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
 from datetime import datetime
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable
 from uuid import UUID
 
 import httpx
+from pydantic import BaseModel, ValidationError
 
+from ml.src.core.config import settings
 from ml.src.pipeline import (
     b1_validate,
     b2_competencies,
@@ -19,9 +24,21 @@ from ml.src.pipeline import (
     b7_schedule,
     b8_validation,
 )
+from ml.src.pipeline.b8_rules import failed_checks_by_owner
 from ml.src.schemas.pipeline import GenerationMetadata, StepLog
-from ml.src.schemas.pipeline_steps import PersonalizedTrack
-from ml.src.services.deepseek_client import get_deepseek_client
+from ml.src.schemas.pipeline_steps import (
+    BlueprintsOutput,
+    CompetencySet,
+    HierarchyOutput,
+    KSAMatrix,
+    LearningUnitsOutput,
+    ScheduleOutput,
+    ValidatedStudentProfile,
+    ValidationResult,
+)
+from ml.src.services.hedged_client import hedge_for_step
+from ml.src.services.llm_client_factory import get_llm_client
+from ml.src.services.rate_limiter import priority_lane
 from ml.src.services.step_logger import get_step_logger
 
 logger = logging.getLogger(__name__)
@@ -40,6 +57,10 @@ STEP_DESCRIPTIONS = {
 # URL бэкенда для проверки статуса отмены
 BACKEND_URL = "http://backend:8000"
 
+# Трек, который генерирует текущая задача (наследуется задачами шагов):
+# LLM-клиенты и бенчмарки сопоставляют вызовы трекам
+current_track_id: ContextVar[UUID | None] = ContextVar("current_track_id", default=None)
+
 
 class PipelineError(Exception):
     """Pipeline execution error."""
@@ -98,20 +119,342 @@ async def _check_cancelled(track_id: UUID) -> bool:
     return False
 
 
+# Граф зависимостей шагов (совпадает с backend manual_service.STEP_DEPENDENCIES).
+# Шаг запускается, как только завершены все его зависимости — B5 и B6
+# зависят только от B4 (и B1), поэтому выполняются параллельно.
+STEP_DEPENDENCIES: dict[str, list[str]] = {
+    "B1_validate": [],
+    "B2_competencies": ["B1_validate"],
+    "B3_ksa_matrix": ["B2_competencies"],
+    "B4_learning_units": ["B3_ksa_matrix"],
+    "B5_hierarchy": ["B4_learning_units", "B1_validate"],
+    "B6_problem_formulations": ["B4_learning_units"],
+    "B7_schedule": ["B5_hierarchy", "B6_problem_formulations"],
+    "B8_validation": [
+        "B1_validate", "B2_competencies", "B3_ksa_matrix",
+        "B4_learning_units", "B5_hierarchy", "B6_problem_formulations",
+        "B7_schedule",
+    ],
+}
+
+# Ключ в intermediate_results, куда шаг кладёт свой результат
+STEP_RESULT_KEYS: dict[str, str] = {
+    "B1_validate": "validated_profile",
+    "B2_competencies": "competency_set",
+    "B3_ksa_matrix": "ksa_matrix",
+    "B4_learning_units": "learning_units",
+    "B5_hierarchy": "hierarchy",
+    "B6_problem_formulations": "lesson_blueprints",
+    "B7_schedule": "schedule",
+    "B8_validation": "validation",
+}
+
+StepRunner = Callable[
+    [dict[str, Any], dict[str, Any], Any], Awaitable[tuple[BaseModel, dict[str, Any]]]
+]
+
+
+@dataclass(frozen=True)
+class PipelineStep:
+    """Узел графа pipeline: шаг, его входы, функция запуска и схема результата."""
+
+    short_name: str
+    step_name: str
+    run: StepRunner
+    response_model: type[BaseModel]
+
+    @property
+    def depends_on(self) -> tuple[str, ...]:
+        return tuple(STEP_DEPENDENCIES[self.step_name])
+
+    @property
+    def result_key(self) -> str:
+        return STEP_RESULT_KEYS[self.step_name]
+
+    @property
+    def step_num(self) -> int:
+        return PIPELINE_STEP_NAMES.index(self.step_name) + 1
+
+
+# =============================================================================
+# Step runners: (profile, intermediate_results, llm_client) -> (result, meta)
+# =============================================================================
+
+
+async def _run_b1(profile: dict, results: dict, client: Any):
+    return await b1_validate.run_b1_validate(profile, client)
+
+
+async def _run_b2(profile: dict, results: dict, client: Any):
+    return await b2_competencies.run_b2_competencies(results["validated_profile"], client)
+
+
+async def _run_b3(profile: dict, results: dict, client: Any):
+    return await b3_ksa_matrix.run_b3_ksa_matrix(profile, results["competency_set"], client)
+
+
+async def _run_b4(profile: dict, results: dict, client: Any):
+    return await b4_learning_units.run_b4_learning_units(results["ksa_matrix"], client)
+
+
+async def _run_b5(profile: dict, results: dict, client: Any):
+    validated_profile = results["validated_profile"]
+    return await b5_hierarchy.run_b5_hierarchy(
+        results["learning_units"],
+        validated_profile["total_time_budget_minutes"],
+        validated_profile["estimated_weeks"],
+        client,
+    )
+
+
+async def _run_b6(profile: dict, results: dict, client: Any):
+    return await b6_problem_formulations.run_b6_problem_formulations(
+        results["learning_units"]["clusters"],
+        results["learning_units"],
+        client,
+    )
+
+
+async def _run_b7(profile: dict, results: dict, client: Any):
+    total_weeks = results["hierarchy"]["total_weeks"]
+
+    def _on_progress(event: dict[str, Any]) -> None:
+        if event["key"] == "weeks":
+            logger.info(f"B7: week {event['index'] + 1}/{total_weeks} generated")
+
+    return await b7_schedule.run_b7_schedule(
+        results["hierarchy"],
+        results["lesson_blueprints"],
+        profile,
+        total_weeks,
+        client,
+        on_progress=_on_progress,
+        # B4 — предок B7 в графе: оценки времени для плана недель
+        learning_units=results.get("learning_units"),
+    )
+
+
+async def _run_b8(profile: dict, results: dict, client: Any):
+    complete_track_data = {
+        key: results[key] for key in TRACK_DATA_KEYS if key != "validation"
+    }
+    return await b8_validation.run_b8_validation(complete_track_data, profile, client)
+
+
+PIPELINE_STEPS: list[PipelineStep] = [
+    PipelineStep("B1", "B1_validate", _run_b1, ValidatedStudentProfile),
+    PipelineStep("B2", "B2_competencies", _run_b2, CompetencySet),
+    PipelineStep("B3", "B3_ksa_matrix", _run_b3, KSAMatrix),
+    PipelineStep("B4", "B4_learning_units", _run_b4, LearningUnitsOutput),
+    PipelineStep("B5", "B5_hierarchy", _run_b5, HierarchyOutput),
+    PipelineStep("B6", "B6_problem_formulations", _run_b6, BlueprintsOutput),
+    PipelineStep("B7", "B7_schedule", _run_b7, ScheduleOutput),
+    PipelineStep("B8", "B8_validation", _run_b8, ValidationResult),
+]
+PIPELINE_STEP_NAMES = [s.step_name for s in PIPELINE_STEPS]
+TRACK_DATA_KEYS = [STEP_RESULT_KEYS[name] for name in PIPELINE_STEP_NAMES]
+
+
+def resolve_step_name(step: str) -> str:
+    """B7 / B7_schedule → B7_schedule."""
+    for pipeline_step in PIPELINE_STEPS:
+        if step in (pipeline_step.short_name, pipeline_step.step_name):
+            return pipeline_step.step_name
+    raise ValueError(f"Unknown pipeline step: {step}")
+
+
+def downstream_steps(step_name: str) -> set[str]:
+    """Шаг и все шаги, транзитивно зависящие от него."""
+    affected = {step_name}
+    for name in PIPELINE_STEP_NAMES:
+        if any(dep in affected for dep in STEP_DEPENDENCIES[name]):
+            affected.add(name)
+    return affected
+
+
+def plan_repair(validation: dict[str, Any]) -> tuple[set[str], dict[str, list[str]]]:
+    """
+    Что перегенерировать после B8: владельцы критических проверок и их потомки.
+
+    Args:
+        validation: Результат B8 (ValidationResult.model_dump())
+
+    Returns:
+        (step_name шагов для перегенерации, step_name → проваленные проверки шага)
+    """
+    checks = ValidationResult.model_validate(validation).checks
+    owners = failed_checks_by_owner(checks, severities=("critical",))
+    regenerate: set[str] = set()
+    for owner in owners:
+        regenerate |= downstream_steps(owner)
+    constraints = {
+        step_name: failures
+        for step_name, failures in failed_checks_by_owner(checks).items()
+        if step_name in regenerate
+    }
+    return regenerate, constraints
+
+
+class ConstrainedClient:
+    """
+    LLM-клиент для перегенерации шага: дописывает к промпту проваленные
+    проверки B8 и не берёт ответ из кэша (иначе вернётся тот же результат).
+    """
+
+    def __init__(self, client: Any, constraints: list[str]):
+        self._client = client
+        self.constraints = constraints
+
+    async def chat_completion(self, prompt: str, response_model: Any, *args, **kwargs):
+        failures = "\n".join(f"- {failure}" for failure in self.constraints)
+        prompt = (
+            f"{prompt}\n\n## CORRECTIONS REQUIRED\n"
+            f"The previous output of this step failed these track checks. "
+            f"The new output MUST fix them:\n{failures}\n"
+        )
+        kwargs["use_cache"] = False
+        return await self._client.chat_completion(prompt, response_model, *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def select_resumable_outputs(
+    step_outputs: dict[str, Any],
+    from_step: str | None = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    Выбрать сохранённые результаты шагов, которые можно переиспользовать.
+
+    Результат переиспользуется, только если он проходит схему шага и все
+    его зависимости тоже переиспользуются. from_step и всё, что от него
+    зависит, пересчитываются заново.
+
+    Args:
+        step_outputs: step_name → step_output (generation_logs / ml/logs)
+        from_step: Шаг, с которого пересчитывать принудительно
+
+    Returns:
+        step_name → валидированный step_output
+    """
+    invalidated = downstream_steps(resolve_step_name(from_step)) if from_step else set()
+    reusable: dict[str, dict[str, Any]] = {}
+    for step in PIPELINE_STEPS:
+        output = step_outputs.get(step.step_name)
+        if output is None or step.step_name in invalidated:
+            continue
+        if not all(dep in reusable for dep in step.depends_on):
+            continue
+        try:
+            reusable[step.step_name] = step.response_model.model_validate(output).model_dump()
+        except ValidationError as e:
+            logger.warning(f"Persisted output of {step.step_name} is invalid, recomputing: {e}")
+    return reusable
+
+
+@dataclass(frozen=True)
+class SharedStepResult:
+    """Результат шага общего префикса batch (выполнен один раз на все треки)."""
+
+    output: dict[str, Any]
+    duration_sec: float
+    tokens_used: int
+    llm_calls: list[dict[str, Any]]
+
+
+def shared_prefix_steps(fork_after: str) -> list[PipelineStep]:
+    """Шаг-развилка batch и все его предки (в порядке PIPELINE_STEPS)."""
+    needed = {resolve_step_name(fork_after)}
+    for step in reversed(PIPELINE_STEPS):
+        if step.step_name in needed:
+            needed.update(step.depends_on)
+    return [step for step in PIPELINE_STEPS if step.step_name in needed]
+
+
+async def _run_step_graph(
+    steps: list[PipelineStep],
+    track_id: UUID,
+    run_node: Callable[[PipelineStep], Awaitable[None]],
+    completed: list[str],
+    already_done: set[str] | None = None,
+) -> None:
+    """
+    Выполнить граф шагов: все шаги с готовыми зависимостями запускаются
+    одновременно, следующий «слой» стартует по мере завершения предыдущих.
+
+    Перед запуском каждого узла проверяется отмена. При ошибке или отмене
+    остальные выполняющиеся узлы отменяются.
+
+    Args:
+        steps: Узлы графа
+        track_id: UUID трека (для проверки отмены)
+        run_node: Корутина выполнения одного узла
+        completed: Короткие имена завершённых шагов (дополняется по ходу)
+        already_done: Шаги вне графа, чьи результаты уже есть (resume)
+    """
+    done: set[str] = set(already_done or ())
+    pending = {step.step_name: step for step in steps if step.step_name not in done}
+    running: dict[asyncio.Task, PipelineStep] = {}
+
+    try:
+        while pending or running:
+            ready = [
+                step for step in pending.values()
+                if all(dep in done for dep in step.depends_on)
+            ]
+            for step in ready:
+                if await _check_cancelled(track_id):
+                    print(f"[{track_id}] ⚠ Отмена обнаружена перед {step.short_name}", flush=True)
+                    raise PipelineCancelled(list(completed))
+                del pending[step.step_name]
+                running[asyncio.create_task(run_node(step))] = step
+
+            if not running:
+                raise PipelineError(
+                    "scheduler",
+                    f"Unresolvable step dependencies: {sorted(pending)}",
+                )
+
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                step = running.pop(task)
+                task.result()
+                done.add(step.step_name)
+                completed.append(step.short_name)
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+
 async def run_pipeline(
     profile: dict[str, Any],
     track_id: UUID,
     algorithm_version: str = "v1.0.0",
+    resume_from: dict[str, dict[str, Any]] | None = None,
+    llm_client: Any = None,
+    shared_from: dict[str, SharedStepResult] | None = None,
 ) -> dict[str, Any]:
     """
     Run the complete B1-B8 pipeline.
 
-    Между шагами проверяет отмену через backend API.
+    Шаги выполняются как граф зависимостей (STEP_DEPENDENCIES): независимые
+    шаги (B5 и B6) идут параллельно. Перед запуском каждого шага
+    проверяет отмену через backend API. При критических провалах B8
+    перегенерирует шаги-владельцы проверок (plan_repair, B8_REPAIR_*).
 
     Args:
         profile: Student profile (validated JSON)
         track_id: UUID for this track generation
         algorithm_version: Algorithm version identifier
+        resume_from: Результаты уже выполненных шагов (step_name → output,
+            см. select_resumable_outputs) — эти шаги не перезапускаются
+        llm_client: LLM-клиент с интерфейсом DeepSeekClient.chat_completion
+            (None — get_llm_client(): DeepSeek или MockLLMClient при MOCK_LLM)
+        shared_from: Общий префикс batch (step_name → SharedStepResult, см.
+            iter_pipeline_batch) — шаги не выполняются, результат пишется
+            в логи шагов трека
 
     Returns:
         Complete PersonalizedTrack data with metadata
@@ -123,7 +466,7 @@ async def run_pipeline(
     start_time = time.time()
     started_at = datetime.utcnow().isoformat()
 
-    deepseek_client = await get_deepseek_client()
+    deepseek_client = llm_client or await get_llm_client()
     step_logger = await get_step_logger()
 
     steps_log: list[StepLog] = []
@@ -131,152 +474,215 @@ async def run_pipeline(
     completed_step_names: list[str] = []
 
     # Storage for intermediate results
-    intermediate_results = {}
+    intermediate_results: dict[str, Any] = {}
+
+    # Resume: восстановить результаты выполненных шагов
+    resumed_steps: list[str] = []
+    shared_steps: list[str] = []
+    for step in PIPELINE_STEPS:
+        if shared_from and step.step_name in shared_from:
+            shared = shared_from[step.step_name]
+            # Копия: треки не должны видеть изменения результата друг друга
+            intermediate_results[step.result_key] = copy.deepcopy(shared.output)
+            shared_steps.append(step.step_name)
+            completed_step_names.append(step.short_name)
+            total_tokens += shared.tokens_used
+            steps_log.append(
+                StepLog(
+                    step_name=step.step_name,
+                    duration_sec=shared.duration_sec,
+                    tokens_used=shared.tokens_used,
+                    success=True,
+                    shared=True,
+                )
+            )
+        elif resume_from and step.step_name in resume_from:
+            intermediate_results[step.result_key] = resume_from[step.step_name]
+            resumed_steps.append(step.step_name)
+            completed_step_names.append(step.short_name)
+            steps_log.append(
+                StepLog(
+                    step_name=step.step_name,
+                    duration_sec=0.0,
+                    tokens_used=0,
+                    success=True,
+                    resumed=True,
+                )
+            )
 
     topic = profile.get("topic", "unknown")
     print(f"\n{'='*70}", flush=True)
     print(f"[{track_id}] Pipeline B1-B8: генерация трека", flush=True)
     print(f"[{track_id}] Тема: {topic}", flush=True)
-    print(f"{'='*70}", flush=True)
-
-    # Define pipeline steps
-    async def _run_b1():
-        b1_result, b1_meta = await b1_validate.run_b1_validate(
-            profile, deepseek_client
-        )
-        intermediate_results["validated_profile"] = b1_result.model_dump()
-        return b1_result, b1_meta, [b1_meta]
-
-    async def _run_b2():
-        b2_result, b2_meta = await b2_competencies.run_b2_competencies(
-            intermediate_results["validated_profile"], deepseek_client
-        )
-        intermediate_results["competency_set"] = b2_result.model_dump()
-        return b2_result, b2_meta, [b2_meta]
-
-    async def _run_b3():
-        b3_result, b3_meta = await b3_ksa_matrix.run_b3_ksa_matrix(
-            profile,
-            intermediate_results["competency_set"],
-            deepseek_client,
+    if resumed_steps:
+        print(
+            f"[{track_id}] Resume: {len(resumed_steps)}/8 шагов восстановлено "
+            f"({', '.join(completed_step_names)})",
+            flush=True,
         )
-        intermediate_results["ksa_matrix"] = b3_result.model_dump()
-        return b3_result, b3_meta, [b3_meta]
+    if shared_steps:
+        print(f"[{track_id}] Общий префикс batch: {', '.join(shared_steps)}", flush=True)
+    print(f"{'='*70}", flush=True)
 
-    async def _run_b4():
-        b4_result, b4_meta = await b4_learning_units.run_b4_learning_units(
-            intermediate_results["ksa_matrix"], deepseek_client
-        )
-        intermediate_results["learning_units"] = b4_result.model_dump()
-        return b4_result, b4_meta, [b4_meta]
-
-    async def _run_b5():
-        nonlocal b1_result_ref, b5_result_ref
-        b5_result, b5_meta = await b5_hierarchy.run_b5_hierarchy(
-            intermediate_results["learning_units"],
-            b1_result_ref.total_time_budget_minutes,
-            b1_result_ref.estimated_weeks,
-            deepseek_client,
-        )
-        b5_result_ref = b5_result
-        intermediate_results["hierarchy"] = b5_result.model_dump()
-        return b5_result, b5_meta, [b5_meta]
-
-    async def _run_b6():
-        b6_result, b6_meta = await b6_problem_formulations.run_b6_problem_formulations(
-            intermediate_results["learning_units"]["clusters"],
-            intermediate_results["learning_units"],
-            deepseek_client,
-        )
-        intermediate_results["lesson_blueprints"] = b6_result.model_dump()
-        return b6_result, b6_meta, [b6_meta]
-
-    async def _run_b7():
-        b7_result, b7_meta = await b7_schedule.run_b7_schedule(
-            intermediate_results["hierarchy"],
-            intermediate_results["lesson_blueprints"],
-            profile,
-            b5_result_ref.total_weeks,
-            deepseek_client,
-        )
-        intermediate_results["schedule"] = b7_result.model_dump()
-        return b7_result, b7_meta, [b7_meta]
-
-    async def _run_b8():
-        complete_track_data = {
-            "validated_profile": intermediate_results["validated_profile"],
-            "competency_set": intermediate_results["competency_set"],
-            "ksa_matrix": intermediate_results["ksa_matrix"],
-            "learning_units": intermediate_results["learning_units"],
-            "hierarchy": intermediate_results["hierarchy"],
-            "lesson_blueprints": intermediate_results["lesson_blueprints"],
-            "schedule": intermediate_results["schedule"],
-        }
-        b8_result, b8_meta = await b8_validation.run_b8_validation(
-            complete_track_data, profile, deepseek_client
-        )
-        intermediate_results["validation"] = b8_result.model_dump()
-        return b8_result, b8_meta, [b8_meta]
-
-    # Refs needed across steps
-    b1_result_ref = None
-    b5_result_ref = None
-
-    steps = [
-        ("B1", "B1_validate", _run_b1),
-        ("B2", "B2_competencies", _run_b2),
-        ("B3", "B3_ksa_matrix", _run_b3),
-        ("B4", "B4_learning_units", _run_b4),
-        ("B5", "B5_hierarchy", _run_b5),
-        ("B6", "B6_problem_formulations", _run_b6),
-        ("B7", "B7_schedule", _run_b7),
-        ("B8", "B8_validation", _run_b8),
-    ]
+    async def _run_node(
+        step: PipelineStep,
+        results: dict[str, Any] | None = None,
+        client: Any = None,
+        pending_logs: list[dict[str, Any]] | None = None,
+        repair_round: int = 0,
+    ) -> None:
+        nonlocal total_tokens
+        results = intermediate_results if results is None else results
 
-    try:
-        for step_num, (short_name, step_name, step_fn) in enumerate(steps, 1):
-            # Проверить отмену перед каждым шагом
-            if await _check_cancelled(track_id):
-                print(f"[{track_id}] ⚠ Отмена обнаружена перед {short_name}", flush=True)
-                raise PipelineCancelled(completed_step_names)
+        _log_start(track_id, step.short_name, step.step_num)
+        step_start = time.time()
 
-            _log_start(track_id, short_name, step_num)
-            step_start = time.time()
-
-            try:
-                result, meta, llm_calls = await step_fn()
-                step_duration = time.time() - step_start
-                step_tokens = meta["tokens_used"]
-                total_tokens += step_tokens
-
-                # Save b1_result ref for b5
-                if short_name == "B1":
-                    b1_result_ref = result
-
-                await step_logger.log_step(
-                    track_id=track_id,
-                    step_name=step_name,
-                    step_output=result.model_dump() if hasattr(result, "model_dump") else result,
-                    llm_calls=llm_calls,
+        try:
+            step_client = hedge_for_step(client or deepseek_client, step.step_name)
+            result, meta = await step.run(profile, results, step_client)
+            step_duration = time.time() - step_start
+            step_tokens = meta["tokens_used"]
+            total_tokens += step_tokens
+
+            step_output = result.model_dump()
+            results[step.result_key] = step_output
+
+            log_entry = {
+                "track_id": track_id,
+                "step_name": step.step_name,
+                "step_output": step_output,
+                "llm_calls": [meta],
+                "duration_sec": step_duration,
+            }
+            if pending_logs is None:
+                await step_logger.log_step(**log_entry)
+            else:
+                # Раунд исправления: в логи шагов — только если результат принят
+                pending_logs.append(log_entry)
+
+            steps_log.append(
+                StepLog(
+                    step_name=step.step_name,
                     duration_sec=step_duration,
+                    tokens_used=step_tokens,
+                    success=True,
+                    repair_round=repair_round,
                 )
+            )
+            _log_done(track_id, step.short_name, step.step_num, step_duration, step_tokens)
 
-                steps_log.append(
-                    StepLog(
-                        step_name=step_name,
-                        duration_sec=step_duration,
-                        tokens_used=step_tokens,
-                        success=True,
-                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _log_fail(track_id, step.short_name, step.step_num, e)
+            raise PipelineError(step.step_name, str(e))
+
+    async def _repair_track() -> int:
+        """
+        Перегенерация шагов-владельцев критических проверок B8 и их потомков.
+
+        Раунд выполняется на копии результатов и принимается, только если
+        новая валидация лучше. Раунд не начинается, если его оценка (токены
+        прошлого запуска тех же шагов) не укладывается в оставшийся бюджет;
+        по истечении времени раунд отменяется.
+
+        Returns:
+            Число выполненных раундов
+        """
+        repair_start = time.time()
+        repair_tokens = 0
+        rounds = 0
+        while rounds < settings.B8_REPAIR_MAX_ROUNDS:
+            validation = intermediate_results["validation"]
+            if not validation["critical_failures"]:
+                break
+            regenerate, constraints = plan_repair(validation)
+            if not regenerate:
+                break
+
+            last_tokens = {log.step_name: log.tokens_used for log in steps_log}
+            estimate = sum(last_tokens.get(step_name, 0) for step_name in regenerate)
+            time_left = settings.B8_REPAIR_TIME_BUDGET_SEC - (time.time() - repair_start)
+            if repair_tokens + estimate > settings.B8_REPAIR_TOKEN_BUDGET or time_left <= 0:
+                print(
+                    f"[{track_id}] B8 repair: бюджет исчерпан "
+                    f"({repair_tokens}+~{estimate} tokens, {time_left:.0f}s left)",
+                    flush=True,
                 )
-                completed_step_names.append(short_name)
-                _log_done(track_id, short_name, step_num, step_duration, step_tokens)
+                break
+
+            rounds += 1
+            round_steps = [step for step in PIPELINE_STEPS if step.step_name in regenerate]
+            print(
+                f"[{track_id}] ↻ B8 repair {rounds}: "
+                f"{', '.join(step.short_name for step in round_steps)}",
+                flush=True,
+            )
+            round_results = dict(intermediate_results)
+            round_logs: list[dict[str, Any]] = []
+            tokens_before = total_tokens
+
+            def _run_repair_node(step: PipelineStep) -> Awaitable[None]:
+                client = deepseek_client
+                if step.step_name in constraints:
+                    client = ConstrainedClient(deepseek_client, constraints[step.step_name])
+                return _run_node(step, round_results, client, round_logs, rounds)
 
-            except PipelineCancelled:
-                raise
-            except Exception as e:
-                _log_fail(track_id, short_name, step_num, e)
-                raise PipelineError(step_name, str(e))
+            try:
+                await asyncio.wait_for(
+                    _run_step_graph(
+                        round_steps, track_id, _run_repair_node, [],
+                        already_done=set(PIPELINE_STEP_NAMES) - regenerate,
+                    ),
+                    timeout=time_left,
+                )
+            except asyncio.TimeoutError:
+                print(f"[{track_id}] B8 repair {rounds}: превышен бюджет времени", flush=True)
+                break
+            except PipelineError as e:
+                # Трек уже собран — неудачное исправление его не роняет
+                logger.warning(f"B8 repair round {rounds} failed: {e}")
+                break
+            finally:
+                repair_tokens += total_tokens - tokens_before
+
+            new_validation = round_results["validation"]
+            old_score = (validation["critical_failures"], validation["warnings"])
+            new_score = (new_validation["critical_failures"], new_validation["warnings"])
+            if new_score < old_score:
+                intermediate_results.update(round_results)
+                for log_entry in round_logs:
+                    await step_logger.log_step(**log_entry)
+            print(
+                f"[{track_id}] B8 repair {rounds}: critical/warnings {old_score} → "
+                f"{new_score}, {'принято' if new_score < old_score else 'отклонено'}",
+                flush=True,
+            )
+
+        if rounds:
+            intermediate_results["validation"] = {
+                **intermediate_results["validation"], "retry_count": rounds,
+            }
+        return rounds
+
+    track_token = current_track_id.set(track_id)
+    try:
+        # Общий префикс — в логи шагов трека (resume трека не пересчитает его)
+        for step_name in shared_steps:
+            shared = shared_from[step_name]
+            await step_logger.log_step(
+                track_id=track_id,
+                step_name=step_name,
+                step_output=shared.output,
+                llm_calls=shared.llm_calls,
+                duration_sec=shared.duration_sec,
+            )
+
+        await _run_step_graph(
+            PIPELINE_STEPS, track_id, _run_node, completed_step_names,
+            already_done=set(resumed_steps) | set(shared_steps),
+        )
+        repair_rounds = await _repair_track()
 
         # =====================================================================
         # Assemble Final Track
@@ -284,26 +690,25 @@ async def run_pipeline(
         finished_at = datetime.utcnow().isoformat()
         total_duration = time.time() - start_time
 
+        steps_log.sort(
+            key=lambda log: (log.repair_round, PIPELINE_STEP_NAMES.index(log.step_name))
+        )
         metadata = GenerationMetadata(
             algorithm_version=algorithm_version,
             started_at=started_at,
             finished_at=finished_at,
             steps_log=steps_log,
-            llm_calls_count=len(steps_log),
+            llm_calls_count=len(steps_log) - len(resumed_steps) - sum(
+                1 for step_name in shared_steps if not shared_from[step_name].llm_calls
+            ),
             total_tokens=total_tokens,
             total_duration_sec=total_duration,
+            resumed_steps=resumed_steps,
+            shared_steps=shared_steps,
+            repair_rounds=repair_rounds,
         )
 
-        track_data = {
-            "validated_profile": intermediate_results["validated_profile"],
-            "competency_set": intermediate_results["competency_set"],
-            "ksa_matrix": intermediate_results["ksa_matrix"],
-            "learning_units": intermediate_results["learning_units"],
-            "hierarchy": intermediate_results["hierarchy"],
-            "lesson_blueprints": intermediate_results["lesson_blueprints"],
-            "schedule": intermediate_results["schedule"],
-            "validation": intermediate_results["validation"],
-        }
+        track_data = {key: intermediate_results[key] for key in TRACK_DATA_KEYS}
 
         print(f"\n{'='*70}", flush=True)
         print(
@@ -333,30 +738,158 @@ async def run_pipeline(
         total_duration = time.time() - start_time
         print(
             f"\n[{track_id}] Pipeline ПРЕРВАН после {total_duration:.1f}s, "
-            f"{total_tokens} tokens, {len(steps_log)}/8 шагов завершено",
+            f"{total_tokens} tokens, {len(completed_step_names)}/8 шагов завершено",
             flush=True,
         )
         raise
     except Exception as e:
         logger.error(f"Unexpected pipeline error: {e}")
         raise PipelineError("unknown", f"Unexpected error: {e}")
+    finally:
+        # Логи шагов должны дойти до backend раньше, чем он получит ответ
+        await step_logger.flush(track_id, settings.STEP_LOG_FLUSH_TIMEOUT_SEC)
+        current_track_id.reset(track_token)
+
+
+async def _run_shared_prefix(
+    profile: dict[str, Any],
+    steps: list[PipelineStep],
+    lead_track_id: UUID,
+    client: Any,
+) -> dict[str, SharedStepResult]:
+    """
+    Выполнить шаги общего префикса batch один раз (от имени первого трека).
+
+    Returns:
+        step_name → SharedStepResult
+    """
+    results: dict[str, Any] = {}
+    shared: dict[str, SharedStepResult] = {}
+
+    async def _run_node(step: PipelineStep) -> None:
+        _log_start(lead_track_id, step.short_name, step.step_num)
+        step_start = time.time()
+        result, meta = await step.run(profile, results, hedge_for_step(client, step.step_name))
+        step_duration = time.time() - step_start
+        results[step.result_key] = result.model_dump()
+        shared[step.step_name] = SharedStepResult(
+            output=results[step.result_key],
+            duration_sec=step_duration,
+            tokens_used=meta["tokens_used"],
+            llm_calls=[meta],
+        )
+        _log_done(
+            lead_track_id, step.short_name, step.step_num, step_duration, meta["tokens_used"]
+        )
+
+    track_token = current_track_id.set(lead_track_id)
+    try:
+        with priority_lane("batch"):
+            await _run_step_graph(steps, lead_track_id, _run_node, [])
+    finally:
+        current_track_id.reset(track_token)
+    return shared
+
+
+async def iter_pipeline_batch(
+    profile: dict[str, Any],
+    track_ids: list[UUID],
+    algorithm_version: str = "v1.0.0",
+    llm_client: Any = None,
+    fork_after: str | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Run B1-B8 pipeline for N tracks, yielding each result as soon as it finishes.
+
+    Треки выполняются параллельно; результат трека отдаётся сразу после его
+    завершения, не дожидаясь остальных. Если потребитель перестал читать
+    (генератор закрыт — например, клиент отключился), незавершённые треки
+    отменяются.
+
+    С развилкой (fork_after) шаг-развилка и его предки выполняются один раз,
+    треки продолжают с их результатов. Токены общих шагов учитываются в
+    первом треке, у остальных шаги помечены shared без токенов. Если общий
+    префикс не удался, треки выполняются независимо.
+
+    Args:
+        profile: Student profile (validated JSON)
+        track_ids: List of track UUIDs
+        algorithm_version: Algorithm version identifier
+        llm_client: Общий LLM-клиент треков (см. run_pipeline)
+        fork_after: Шаг-развилка (B1, B2_competencies, ...); None —
+            BATCH_FORK_AFTER, "" — без общего префикса
+
+    Raises:
+        ValueError: Unknown fork_after step
+
+    Yields:
+        {"index", "track_id", ...result} — в порядке завершения; ошибка трека —
+        status="failed" + error, отмена — status="cancelled"
+    """
+    fork_after = settings.BATCH_FORK_AFTER if fork_after is None else fork_after
+    prefix_steps = shared_prefix_steps(fork_after) if fork_after else []
+    llm_client = llm_client or await get_llm_client()
+
+    shared: dict[str, SharedStepResult] = {}
+    if prefix_steps and len(track_ids) > 1:
+        try:
+            shared = await _run_shared_prefix(profile, prefix_steps, track_ids[0], llm_client)
+        except Exception as e:
+            logger.warning(f"Shared batch prefix failed, running tracks independently: {e}")
+
+    def _shared_for(index: int) -> dict[str, SharedStepResult] | None:
+        if not shared:
+            return None
+        if index == 0:
+            return shared
+        return {name: replace(r, tokens_used=0, llm_calls=[]) for name, r in shared.items()}
+
+    # LLM-вызовы идут в batch-полосе общего лимитера (см. rate_limiter).
+    async def _run_single(index: int, tid: UUID) -> dict[str, Any]:
+        head = {"index": index, "track_id": str(tid)}
+        try:
+            with priority_lane("batch"):
+                result = await run_pipeline(
+                    profile, tid, algorithm_version, llm_client=llm_client,
+                    shared_from=_shared_for(index),
+                )
+            return {**head, **result}
+        except PipelineCancelled as e:
+            return {**head, "status": "cancelled", "completed_steps": e.completed_steps}
+        except PipelineError as e:
+            return {**head, "status": "failed", "error": str(e)}
+        except Exception as e:
+            return {**head, "status": "failed", "error": str(e)}
+
+    tasks = [asyncio.create_task(_run_single(i, tid)) for i, tid in enumerate(track_ids)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 async def run_pipeline_batch(
     profile: dict[str, Any],
     track_ids: list[UUID],
     algorithm_version: str = "v1.0.0",
+    llm_client: Any = None,
+    fork_after: str | None = None,
 ) -> dict[str, Any]:
     """
     Run B1-B8 pipeline for N tracks (batch mode).
 
-    Для каждого шага запускает N генераций параллельно (asyncio.gather),
-    после каждого шага логирует результаты для всех треков.
+    Запускает N генераций параллельно (iter_pipeline_batch) и собирает
+    результаты в порядке track_ids.
 
     Args:
         profile: Student profile (validated JSON)
         track_ids: List of track UUIDs
         algorithm_version: Algorithm version identifier
+        llm_client: Общий LLM-клиент треков (см. run_pipeline)
+        fork_after: Шаг-развилка общего префикса (см. iter_pipeline_batch)
 
     Returns:
         {"results": [result_per_track]}
@@ -369,23 +902,11 @@ async def run_pipeline_batch(
     print(f"Track IDs: {[str(t) for t in track_ids]}", flush=True)
     print(f"{'='*70}", flush=True)
 
-    # Запустить каждый pipeline параллельно через asyncio.gather
-    async def _run_single(index: int, tid: UUID) -> dict[str, Any]:
-        try:
-            result = await run_pipeline(profile, tid, algorithm_version)
-            return {"index": index, **result}
-        except PipelineCancelled as e:
-            return {"index": index, "status": "cancelled", "completed_steps": e.completed_steps}
-        except PipelineError as e:
-            return {"index": index, "status": "failed", "error": str(e)}
-        except Exception as e:
-            return {"index": index, "status": "failed", "error": str(e)}
-
-    tasks = [_run_single(i, tid) for i, tid in enumerate(track_ids)]
-    completed = await asyncio.gather(*tasks, return_exceptions=False)
-
-    for res in completed:
+    async for res in iter_pipeline_batch(
+        profile, track_ids, algorithm_version, llm_client, fork_after
+    ):
         idx = res.pop("index", 0)
+        res.pop("track_id", None)
         results[idx] = res
 
     print(f"\n{'='*70}", flush=True)
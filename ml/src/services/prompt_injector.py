@@ -10,6 +10,7 @@ import re
 from typing import Any
 
 from ml.src.prompts.json_utils import to_json
+from ml.src.prompts.projections import B5_LEARNING_UNITS, B7_BLUEPRINTS, B7_HIERARCHY, B8_TRACK
 
 logger = logging.getLogger(__name__)
 
@@ -149,7 +150,7 @@ def _inject_b4(text: str, profile: dict, input_data: dict) -> str:
 
 def _inject_b5(text: str, profile: dict, input_data: dict) -> str:
     b4 = input_data.get("B4_learning_units", {})
-    text = _replace_section(text, "LEARNING UNITS & CLUSTERS DATA:", "TIME CONSTRAINTS:", to_json(b4))
+    text = _replace_section(text, "LEARNING UNITS & CLUSTERS DATA:", "TIME CONSTRAINTS:", to_json(b4, B5_LEARNING_UNITS))
 
     b1 = input_data.get("B1_validate", {})
     time_budget = b1.get("weekly_time_budget_minutes") or profile.get("weekly_hours", 5) * 60
@@ -172,10 +173,10 @@ def _inject_b6(text: str, profile: dict, input_data: dict) -> str:
 
 def _inject_b7(text: str, profile: dict, input_data: dict) -> str:
     b5 = input_data.get("B5_hierarchy", {})
-    text = _replace_section(text, "HIERARCHY & SEQUENCING DATA:", "LESSON BLUEPRINTS DATA:", to_json(b5))
+    text = _replace_section(text, "HIERARCHY & SEQUENCING DATA:", "LESSON BLUEPRINTS DATA:", to_json(b5, B7_HIERARCHY))
 
     b6 = input_data.get("B6_problem_formulations", {})
-    text = _replace_section(text, "LESSON BLUEPRINTS DATA:", "LEARNER SCHEDULE DATA:", to_json(b6))
+    text = _replace_section(text, "LESSON BLUEPRINTS DATA:", "LEARNER SCHEDULE DATA:", to_json(b6, B7_BLUEPRINTS))
 
     schedule_info = {"weekly_hours": profile.get("weekly_hours", 5)}
     text = _replace_section(text, "LEARNER SCHEDULE DATA:", "TARGET:", to_json(schedule_info))
@@ -189,14 +190,22 @@ def _inject_b8(text: str, profile: dict, input_data: dict) -> str:
     text = _replace_section(text, "ORIGINAL PROFILE DATA:", "COMPLETE TRACK DATA:", to_json(profile))
 
     complete_track = {}
-    for dep_step in [
-        "B1_validate", "B2_competencies", "B3_ksa_matrix",
-        "B4_learning_units", "B5_hierarchy", "B6_problem_formulations",
-        "B7_schedule",
+    projection = {}
+    for dep_step, result_key in [
+        ("B1_validate", "validated_profile"),
+        ("B2_competencies", "competency_set"),
+        ("B3_ksa_matrix", "ksa_matrix"),
+        ("B4_learning_units", "learning_units"),
+        ("B5_hierarchy", "hierarchy"),
+        ("B6_problem_formulations", "lesson_blueprints"),
+        ("B7_schedule", "schedule"),
     ]:
         if dep_step in input_data:
             complete_track[dep_step] = input_data[dep_step]
-    text = _replace_section(text, "COMPLETE TRACK DATA:", "TASK:", to_json(complete_track))
+            projection[dep_step] = B8_TRACK[result_key]
+    text = _replace_section(
+        text, "COMPLETE TRACK DATA:", "TASK:", to_json(complete_track, projection)
+    )
     return text
 
 
@@ -0,0 +1,283 @@
+"""Global rate limiter and concurrency governor for LLM API calls."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, Mapping
+
+from ml.src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Приоритетные полосы: меньше — раньше. Ручной режим идёт впереди batch-генерации.
+LANE_PRIORITIES: dict[str, int] = {
+    "interactive": 0,
+    "pipeline": 1,
+    "batch": 2,
+}
+
+_current_lane: ContextVar[str] = ContextVar("llm_priority_lane", default="pipeline")
+
+
+@contextmanager
+def priority_lane(lane: str) -> Iterator[None]:
+    """Run LLM calls made inside this block (and tasks it spawns) in the given lane."""
+    if lane not in LANE_PRIORITIES:
+        raise ValueError(f"Unknown priority lane: {lane}")
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def current_lane() -> str:
+    """Priority lane of the current context."""
+    return _current_lane.get()
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+
+def parse_reset(value: str | None) -> float | None:
+    """Parse x-ratelimit-reset-* values: "1s", "6m0s", "20ms" or plain seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    multipliers = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(num) * multipliers[unit] for num, unit in parts)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: float, capacity: float | None = None, clock=time.monotonic):
+        self.per_minute = per_minute
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    def _refill(self, scale: float) -> None:
+        now = self._clock()
+        rate = self.per_minute * scale / 60.0
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, scale: float = 1.0) -> float:
+        """Seconds until `amount` can be taken (0 if available now)."""
+        if not self.enabled:
+            return 0.0
+        self._refill(scale)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / (self.per_minute * scale / 60.0)
+
+    def consume(self, amount: float) -> None:
+        """Take tokens (may go negative for oversized requests)."""
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimitLease:
+    """Admission granted by LLMRateLimiter; release exactly once."""
+
+    def __init__(self, limiter: "LLMRateLimiter", estimated_tokens: int):
+        self._limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self._released = False
+
+    def release(self, tokens_used: int | None = None) -> None:
+        """Free the in-flight slot and reconcile the token estimate with actual usage."""
+        if self._released:
+            return
+        self._released = True
+        if tokens_used is not None:
+            self._limiter.tpm.consume(tokens_used - self.estimated_tokens)
+        self._limiter._release_slot()
+
+
+class LLMRateLimiter:
+    """
+    Shared limiter for all LLM calls of the process.
+
+    - requests-per-minute and tokens-per-minute token buckets;
+    - max in-flight requests, granted in priority-lane order;
+    - adapts to 429 (global pause + multiplicative rate decrease, slow recovery)
+      and to x-ratelimit-remaining-* / x-ratelimit-reset-* headers.
+
+    A limit of 0 disables that dimension.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_in_flight: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ):
+        self.rpm = TokenBucket(requests_per_minute, clock=clock)
+        self.tpm = TokenBucket(tokens_per_minute, clock=clock)
+        self.max_in_flight = max_in_flight
+        self._clock = clock
+        self._sleep = sleep
+
+        self._in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._budget_lock = asyncio.Lock()
+        self._paused_until = 0.0
+        self._rate_scale = 1.0
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.throttled_sec = 0.0
+        self.peak_in_flight = 0
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    async def acquire(self, estimated_tokens: int = 0, lane: str | None = None) -> RateLimitLease:
+        """
+        Wait for an in-flight slot and RPM/TPM budget.
+
+        Args:
+            estimated_tokens: Expected prompt + completion tokens
+            lane: Priority lane (defaults to the lane of the current context)
+        """
+        priority = LANE_PRIORITIES[lane or current_lane()]
+        await self._acquire_slot(priority)
+        try:
+            await self._wait_for_budget(estimated_tokens)
+        except BaseException:
+            self._release_slot()
+            raise
+        self.requests += 1
+        return RateLimitLease(self, estimated_tokens)
+
+    async def _acquire_slot(self, priority: int) -> None:
+        if self.max_in_flight <= 0 or (
+            self._in_flight < self.max_in_flight and not self._waiters
+        ):
+            self._take_slot()
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже передан нам — вернуть его
+                self._release_slot()
+            else:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _take_slot(self) -> None:
+        self._in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+
+    def _release_slot(self) -> None:
+        self._in_flight -= 1
+        while self._waiters and (self.max_in_flight <= 0 or self._in_flight < self.max_in_flight):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._take_slot()
+            future.set_result(None)
+
+    async def _wait_for_budget(self, estimated_tokens: int) -> None:
+        async with self._budget_lock:
+            while True:
+                wait = max(
+                    self._paused_until - self._clock(),
+                    self.rpm.wait_time(1, self._rate_scale),
+                    self.tpm.wait_time(estimated_tokens, self._rate_scale),
+                )
+                if wait <= 0:
+                    self.rpm.consume(1)
+                    self.tpm.consume(estimated_tokens)
+                    return
+                self.throttled_sec += wait
+                await self._sleep(wait)
+
+    # ------------------------------------------------------------------
+    # Feedback from the provider
+    # ------------------------------------------------------------------
+
+    def on_rate_limited(self, retry_after: float) -> None:
+        """429 received: pause every caller and halve the effective rate."""
+        self.rate_limited += 1
+        self._paused_until = max(self._paused_until, self._clock() + retry_after)
+        self._rate_scale = max(0.1, self._rate_scale * 0.5)
+        logger.warning(
+            f"LLM rate limited: pausing all calls for {retry_after}s, "
+            f"rate scale {self._rate_scale:.2f}"
+        )
+
+    def on_success(self) -> None:
+        """Successful call: recover the effective rate additively."""
+        self._rate_scale = min(1.0, self._rate_scale + 0.05)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Pause until reset when x-ratelimit-remaining-* reaches zero."""
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                exhausted = float(remaining) <= 0
+            except ValueError:
+                continue
+            reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+            if exhausted and reset:
+                self._paused_until = max(self._paused_until, self._clock() + reset)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Backpressure counters."""
+        return {
+            "requests": self.requests,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "waiting": len(self._waiters),
+            "rate_limited": self.rate_limited,
+            "throttled_sec": round(self.throttled_sec, 3),
+            "rate_scale": self._rate_scale,
+        }
+
+
+# Global limiter instance
+_limiter: LLMRateLimiter | None = None
+
+
+def get_rate_limiter() -> LLMRateLimiter:
+    """Get or create the process-wide LLM rate limiter."""
+    global _limiter
+    if _limiter is None:
+        _limiter = LLMRateLimiter(
+            requests_per_minute=settings.LLM_RATE_LIMIT_RPM,
+            tokens_per_minute=settings.LLM_RATE_LIMIT_TPM,
+            max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+        )
+    return _limiter
@@ -0,0 +1,63 @@
+"""Replay LLM client: answers with step outputs of an earlier track run."""
+
+import json
+import logging
+from typing import Any, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class ReplayLLMClient:
+    """
+    Воспроизводит трек по сохранённым результатам шагов (ml/logs/<track_id>).
+
+    Ответ — результат шага, который проходит схему запроса. Шаги
+    перебираются от последнего к первому, поэтому частичные схемы
+    (шарды B6/B7, семантические проверки B8) получают нужный шаг.
+    """
+
+    def __init__(self, step_outputs: dict[str, dict[str, Any]]):
+        """
+        Args:
+            step_outputs: step_name → step_output (StepLogger.load_step_outputs)
+        """
+        self.step_outputs = step_outputs
+        self.call_count = 0
+
+    async def chat_completion(
+        self,
+        prompt: str,
+        response_model: type[T],
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        **kwargs,
+    ) -> tuple[T, dict[str, Any]]:
+        """
+        Replay the logged output that matches response_model.
+
+        Raises:
+            ValueError: No logged step output matches the schema
+        """
+        for step_name in sorted(self.step_outputs, reverse=True):
+            output = self.step_outputs[step_name]
+            try:
+                result = response_model.model_validate(output)
+            except ValidationError:
+                continue
+            self.call_count += 1
+            logger.info(f"Replay: {response_model.__name__} from {step_name}")
+            return result, {
+                "tokens_used": 0,
+                "duration_ms": 0.0,
+                "raw_response": json.dumps(output, ensure_ascii=False),
+                "model": "replay",
+                "step_name": step_name,
+            }
+        raise ValueError(
+            f"No logged step output matches {response_model.__name__} "
+            f"(logged steps: {sorted(self.step_outputs)})"
+        )
@@ -4,25 +4,75 @@ import asyncio
 import json
 import logging
 import os
+import time
 from pathlib import Path
 from typing import Any
 from uuid import UUID
 
 import httpx
 
+from ml.src.core.config import settings
+
 logger = logging.getLogger(__name__)
 
+# Локальные копии логов шагов: ml/logs/<track_id>/step_<step_name>.json
+LOG_DIR = Path("ml/logs")
+
 
 class StepLogger:
-    """Logger for pipeline steps - saves to backend and optionally to files."""
+    """
+    Logger for pipeline steps - saves to backend and optionally to files.
+
+    log_step only enqueues the log: a background sink delivers batches to
+    POST /api/logs/steps:bulk and writes files in a worker thread, so logging
+    stays off the critical path of the pipeline. The queue is bounded —
+    when it is full, log_step waits (backpressure, counted in get_stats).
+    flush(track_id) waits only for that track's logs, not for the whole queue.
+    """
 
-    def __init__(self, backend_url: str = "http://backend:8000"):
+    def __init__(
+        self,
+        backend_url: str = "http://backend:8000",
+        queue_size: int | None = None,
+        batch_size: int | None = None,
+        flush_interval_sec: float | None = None,
+    ):
         self.backend_url = backend_url
         self.disable_backend = os.getenv("DISABLE_BACKEND_LOGGING", "false").lower() == "true"
         self.client = httpx.AsyncClient(base_url=backend_url, timeout=30.0) if not self.disable_backend else None
+        self.queue_size = queue_size or settings.STEP_LOG_QUEUE_SIZE
+        self.batch_size = batch_size or settings.STEP_LOG_BATCH_SIZE
+        self.flush_interval_sec = (
+            settings.STEP_LOG_FLUSH_INTERVAL_SEC if flush_interval_sec is None else flush_interval_sec
+        )
+        self.max_attempts = 3
+
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=self.queue_size)
+        self._sink: asyncio.Task | None = None
+        # track_id → логи в очереди / в доставке; Event — ожидающие flush(track_id)
+        self._pending: dict[str, int] = {}
+        self._drained: dict[str, asyncio.Event] = {}
+
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.batches = 0
+        self.files_written = 0
+        self.producer_waits = 0
+        self.producer_wait_sec = 0.0
+        self.peak_queued = 0
+        self.last_error: str | None = None
 
     async def close(self):
-        """Close the HTTP client."""
+        """Flush pending logs, stop the sink and close the HTTP client."""
+        if not await self.flush(timeout=settings.STEP_LOG_FLUSH_TIMEOUT_SEC):
+            logger.error(
+                f"Step log sink closed with {self._queue.qsize()} undelivered log(s)"
+            )
+        if self._sink is not None:
+            self._sink.cancel()
+            await asyncio.gather(self._sink, return_exceptions=True)
+            self._sink = None
         if self.client:
             await self.client.aclose()
 
@@ -37,7 +87,7 @@ class StepLogger:
         save_to_file: bool = True,
     ) -> bool:
         """
-        Log a pipeline step result.
+        Log a pipeline step result (non-blocking: delivered by the sink).
 
         Args:
             track_id: ID of the track being generated
@@ -49,7 +99,7 @@ class StepLogger:
             save_to_file: Whether to also save to local file
 
         Returns:
-            True if successfully logged
+            True if the log was queued
         """
         # Prepare log data
         log_data = {
@@ -60,34 +110,194 @@ class StepLogger:
             "step_duration_sec": duration_sec,
             "error_message": error_message,
         }
+        item = {"log": log_data, "save_to_file": save_to_file}
+
+        self._ensure_sink()
+        self._pending[log_data["track_id"]] = self._pending.get(log_data["track_id"], 0) + 1
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Backpressure: sink не успевает — ждём место в очереди
+            self.producer_waits += 1
+            wait_start = time.monotonic()
+            await self._queue.put(item)
+            self.producer_wait_sec += time.monotonic() - wait_start
+
+        self.enqueued += 1
+        self.peak_queued = max(self.peak_queued, self._queue.qsize())
+        return True
+
+    async def flush(self, track_id: UUID | None = None, timeout: float | None = None) -> bool:
+        """
+        Wait until queued logs are delivered (or given up on).
+
+        Args:
+            track_id: Wait only for this track's logs (None — the whole queue,
+                used on shutdown)
+            timeout: Seconds to wait
+
+        Returns:
+            False if the timeout expired first
+        """
+        if track_id is None:
+            if self._sink is None and self._queue.empty():
+                return True
+            waiter = self._queue.join()
+        else:
+            key = str(track_id)
+            if not self._pending.get(key):
+                return True
+            waiter = self._drained.setdefault(key, asyncio.Event()).wait()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            pending = self._queue.qsize() if track_id is None else self._pending.get(key, 0)
+            logger.warning(f"Step log flush timed out, {pending} log(s) pending")
+            return False
+
+    def get_stats(self) -> dict[str, Any]:
+        """Sink throughput and backpressure counters."""
+        return {
+            "queued": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "peak_queued": self.peak_queued,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "batches": self.batches,
+            "files_written": self.files_written,
+            "producer_waits": self.producer_waits,
+            "producer_wait_sec": round(self.producer_wait_sec, 3),
+            "last_error": self.last_error,
+        }
+
+    # ------------------------------------------------------------------
+    # Sink
+    # ------------------------------------------------------------------
+
+    def _ensure_sink(self) -> None:
+        if self._sink is None or self._sink.done():
+            self._sink = asyncio.create_task(self._run_sink(), name="step-log-sink")
+
+    async def _run_sink(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval_sec
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
 
-        # Try to send to backend (unless disabled)
-        if not self.disable_backend:
             try:
-                response = await self.client.post("/api/logs/step", json=log_data)
-                response.raise_for_status()
-                logger.info(f"Successfully logged step {step_name} for track {track_id}")
+                await self._deliver(batch)
             except Exception as e:
-                logger.error(f"Failed to log step {step_name} to backend: {e}")
-                # Continue anyway - file logging might still work
+                logger.error(f"Step log sink error: {e}")
+            finally:
+                for item in batch:
+                    self._queue.task_done()
+                    self._mark_done(item["log"]["track_id"])
+
+    def _mark_done(self, track_id: str) -> None:
+        """Лог трека доставлен (или отброшен): разбудить flush, если логов не осталось."""
+        left = self._pending.get(track_id, 0) - 1
+        if left > 0:
+            self._pending[track_id] = left
+            return
+        self._pending.pop(track_id, None)
+        event = self._drained.pop(track_id, None)
+        if event is not None:
+            event.set()
+
+    async def _deliver(self, batch: list[dict[str, Any]]) -> None:
+        logs = [item["log"] for item in batch]
+        file_logs = [item["log"] for item in batch if item["save_to_file"]]
+
+        jobs = []
+        if file_logs:
+            jobs.append(asyncio.to_thread(self._write_files, file_logs))
+        if not self.disable_backend:
+            jobs.append(self._send(logs))
         else:
-            logger.debug(f"Backend logging disabled, skipping step {step_name}")
+            logger.debug(f"Backend logging disabled, skipping {len(logs)} step log(s)")
+        await asyncio.gather(*jobs)
+        self.batches += 1
+
+    async def _send(self, logs: list[dict[str, Any]]) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = await self.client.post("/api/logs/steps:bulk", json=logs)
+                if response.status_code in (404, 405):
+                    # Backend без bulk endpoint — по одному
+                    for log_data in logs:
+                        single = await self.client.post("/api/logs/step", json=log_data)
+                        single.raise_for_status()
+                else:
+                    response.raise_for_status()
+                self.delivered += len(logs)
+                logger.info(f"Delivered {len(logs)} step log(s) to backend")
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                if attempt == self.max_attempts:
+                    self.failed += len(logs)
+                    logger.error(f"Failed to log {len(logs)} step(s) to backend: {e}")
+                    return
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
 
-        # Optionally save to file
-        if save_to_file:
+    def _write_files(self, logs: list[dict[str, Any]]) -> None:
+        """Blocking file writes — runs in a worker thread."""
+        for log_data in logs:
             try:
-                log_dir = Path("ml/logs") / str(track_id)
+                log_dir = LOG_DIR / log_data["track_id"]
                 log_dir.mkdir(parents=True, exist_ok=True)
 
-                log_file = log_dir / f"step_{step_name}.json"
+                log_file = log_dir / f"step_{log_data['step_name']}.json"
                 with open(log_file, "w", encoding="utf-8") as f:
                     json.dump(log_data, f, indent=2, ensure_ascii=False)
 
+                self.files_written += 1
                 logger.info(f"Saved step log to {log_file}")
             except Exception as e:
                 logger.error(f"Failed to save step log to file: {e}")
 
-        return True
+    def load_step_outputs(self, track_id: UUID) -> dict[str, dict[str, Any]]:
+        """
+        Read successful step outputs saved to files for a track.
+
+        Args:
+            track_id: ID of the track
+
+        Returns:
+            step_name → step_output (steps logged with an error are skipped)
+        """
+        outputs: dict[str, dict[str, Any]] = {}
+        log_dir = LOG_DIR / str(track_id)
+        if not log_dir.is_dir():
+            return outputs
+
+        for log_file in sorted(log_dir.glob("step_*.json")):
+            try:
+                with open(log_file, encoding="utf-8") as f:
+                    log_data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Skipping unreadable step log {log_file}: {e}")
+                continue
+            if log_data.get("error_message") or not log_data.get("step_output"):
+                continue
+            outputs[log_data["step_name"]] = log_data["step_output"]
+
+        return outputs
 
 
 # Global logger instance
@@ -103,7 +313,7 @@ async def get_step_logger() -> StepLogger:
 
 
 async def close_step_logger():
-    """Close global step logger."""
+    """Flush and close global step logger."""
     global _step_logger
     if _step_logger is not None:
         await _step_logger.close()
@@ -0,0 +1,117 @@
+"""
+Тесты для B6 map-reduce: параллельные вызовы по кластерам, повтор только
+неудачных групп, слияние в BlueprintsOutput.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from ml.src.pipeline.b6_problem_formulations import run_b6_problem_formulations
+from ml.src.schemas.pipeline_steps import BlueprintsOutput
+from ml.src.services.deepseek_client import DeepSeekError
+
+
+def _blueprint(cluster_id: str, bp_id: str = "bp1") -> dict:
+    return {
+        "id": bp_id,
+        "cluster_id": cluster_id,
+        "problem_formulation": {"problem_statement": f"Problem {cluster_id}", "expected_hypotheses": ["h"]},
+        "knowledge_infusions": ["ki"],
+        "practice_tasks": ["t"],
+        "contradictions": ["c"],
+        "synthesis_tasks": ["s"],
+        "reflection_questions": ["q"],
+        "fsm_rules": {"a": "b"},
+    }
+
+
+def _clusters(*ids: str) -> list[dict]:
+    return [
+        {"id": cid, "title": f"Cluster {cid}", "theory_units": [], "practice_units": [],
+         "automation_units": [], "total_minutes": 60}
+        for cid in ids
+    ]
+
+
+class FakeClient:
+    """Отвечает blueprint'ами для кластеров из промпта; сценарий ответов — по кластеру."""
+
+    def __init__(self, script: dict[str, list] | None = None, delay: float = 0.0):
+        self.script = script or {}
+        self.delay = delay
+        self.calls: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat_completion(self, prompt, response_model, **kwargs):
+        section = prompt.split("CLUSTERS DATA:\n", 1)[1].split("\n\nTASK:", 1)[0]
+        cluster_ids = [cluster["id"] for cluster in json.loads(section)]
+        self.calls.append({"cluster_ids": cluster_ids, **kwargs})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            queued = self.script.get(cluster_ids[0])
+            outcome = queued.pop(0) if queued else None
+            if isinstance(outcome, Exception):
+                raise outcome
+            blueprints = outcome if outcome is not None else [_blueprint(cid) for cid in cluster_ids]
+            return response_model.model_validate({"blueprints": blueprints}), {"tokens_used": 100, "model": "fake"}
+        finally:
+            self.in_flight -= 1
+
+
+class TestB6FanOut:
+    """Тесты run_b6_problem_formulations."""
+
+    async def test_one_concurrent_call_per_cluster(self):
+        client = FakeClient(delay=0.01)
+
+        result, metadata = await run_b6_problem_formulations(_clusters("c1", "c2", "c3"), {}, client, 1)
+
+        assert isinstance(result, BlueprintsOutput)
+        assert client.max_in_flight == 3
+        assert [bp.cluster_id for bp in result.blueprints] == ["c1", "c2", "c3"]
+        assert [bp.id for bp in result.blueprints] == ["bp1", "bp2", "bp3"]
+        assert metadata["tokens_used"] == 300
+        assert len(metadata["shards"]) == 3
+
+    async def test_groups_of_clusters(self):
+        client = FakeClient()
+
+        result, _ = await run_b6_problem_formulations(_clusters("c1", "c2", "c3"), {}, client, 2)
+
+        assert [call["cluster_ids"] for call in client.calls] == [["c1", "c2"], ["c3"]]
+        assert len(result.blueprints) == 3
+
+    async def test_only_failed_shard_retried_without_cache(self):
+        # c2: первый ответ без blueprint для своего кластера
+        client = FakeClient(script={"c2": [[_blueprint("c9")]]})
+
+        result, metadata = await run_b6_problem_formulations(_clusters("c1", "c2"), {}, client, 1)
+
+        assert [call["cluster_ids"] for call in client.calls].count(["c2"]) == 2
+        assert [call["cluster_ids"] for call in client.calls].count(["c1"]) == 1
+        retry = [call for call in client.calls if call["cluster_ids"] == ["c2"]][1]
+        assert retry["use_cache"] is False
+        assert metadata["shards"][1]["attempts"] == 2
+        assert metadata["tokens_used"] == 300
+        assert [bp.cluster_id for bp in result.blueprints] == ["c1", "c2"]
+
+    async def test_exhausted_shard_fails_step_and_cancels_others(self):
+        client = FakeClient(script={"c1": [DeepSeekError("boom"), DeepSeekError("boom")]})
+        slow = FakeClient(delay=10)
+        calls = {"c1": client, "c2": slow}
+
+        class Router:
+            async def chat_completion(self, prompt, response_model, **kwargs):
+                target = calls["c1"] if '"c1"' in prompt else calls["c2"]
+                return await target.chat_completion(prompt, response_model, **kwargs)
+
+        with pytest.raises(DeepSeekError, match="boom"):
+            await asyncio.wait_for(
+                run_b6_problem_formulations(_clusters("c1", "c2"), {}, Router(), 1), timeout=1.0
+            )
+        assert slow.in_flight == 0
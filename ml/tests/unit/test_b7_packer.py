@@ -0,0 +1,133 @@
+"""
+Тесты для B7 packer: доступное время по дням, раскладка юнитов по дням
+без LLM и packed-режим run_b7_schedule (LLM — только темы и каркас).
+"""
+
+from ml.src.pipeline.b7_packer import DaySlot, day_slots, pack_week
+from ml.src.pipeline.b7_schedule import run_b7_schedule
+from ml.src.pipeline.b7_week_plan import WeekPlan
+from ml.src.schemas.pipeline_steps import ScheduleFrameOutput
+
+from .test_b7_sharding import BLUEPRINTS, FRAME, HIERARCHY, LEARNING_UNITS
+
+SCHEDULE_INFO = {
+    "schedule": [
+        {"day_of_week": "monday", "available_minutes": 120},
+        {"day_of_week": "wednesday", "available_minutes": 120},
+        {"day_of_week": "saturday", "available_minutes": 180},
+    ],
+    "practice_windows": [],
+    "weekly_hours": 7,
+}
+
+
+def _plan(*unit_ids: str) -> WeekPlan:
+    return WeekPlan(week_number=1, level="foundational", unit_ids=list(unit_ids))
+
+
+class NarrativeClient:
+    """Темы для всех недель из промпта и FRAME; запоминает response_model вызовов."""
+
+    def __init__(self):
+        self.calls: list[type] = []
+
+    async def chat_completion(self, prompt, response_model, **kwargs):
+        self.calls.append(response_model)
+        if response_model is ScheduleFrameOutput:
+            return response_model.model_validate(FRAME), {"tokens_used": 50, "model": "fake"}
+        weeks = [
+            {"week_number": number, "theme": f"Theme {number}", "weekly_goals": ["g1", "g2"]}
+            for number in range(1, HIERARCHY["total_weeks"] + 1)
+        ]
+        return response_model.model_validate({"weeks": weeks}), {"tokens_used": 30, "model": "fake"}
+
+
+class TestDaySlots:
+    """Тесты day_slots."""
+
+    def test_schedule_scaled_down_to_weekly_hours(self):
+        slots = day_slots({**SCHEDULE_INFO, "weekly_hours": 3.5})
+        assert [(slot.day_of_week, slot.minutes) for slot in slots] == [
+            ("monday", 60), ("wednesday", 60), ("saturday", 90),
+        ]
+
+    def test_without_schedule_weekly_hours_split_over_weekdays(self):
+        slots = day_slots({"weekly_hours": 5})
+        assert [slot.minutes for slot in slots] == [60] * 5
+        assert slots[-1].day_of_week == "friday"
+
+    def test_practice_windows_add_daily_practice_time(self):
+        slots = day_slots({
+            **SCHEDULE_INFO,
+            "practice_windows": [{"duration_minutes": 15}, {"duration_minutes": 10}],
+        })
+        assert len(slots) == 7
+        assert {slot.practice_minutes for slot in slots} == {25}
+        assert next(slot for slot in slots if slot.day_of_week == "tuesday").minutes == 0
+
+
+class TestPackWeek:
+    """Тесты pack_week."""
+
+    def test_respects_daily_limits_and_order(self):
+        slots = [DaySlot("monday", 60), DaySlot("tuesday", 60), DaySlot("saturday", 120)]
+        minutes = {"a": 30, "b": 30, "c": 40, "d": 90, "e": 20}
+
+        week = pack_week(_plan("a", "b", "c", "d", "e"), minutes, set(), slots)
+
+        assert [(day.day_of_week, day.learning_units, day.total_minutes) for day in week.days] == [
+            ("monday", ["a", "b"], 60),
+            ("tuesday", ["c"], 40),
+            ("saturday", ["d", "e"], 110),
+        ]
+        assert week.overflow_minutes == 0
+
+    def test_automation_unit_goes_to_practice_window(self):
+        slots = [DaySlot("monday", 30, practice_minutes=15), DaySlot("tuesday", 30, practice_minutes=15)]
+        minutes = {"tu": 30, "au": 10}
+
+        week = pack_week(_plan("tu", "au"), minutes, {"au"}, slots)
+
+        assert [day.learning_units for day in week.days] == [["tu", "au"]]
+
+    def test_oversized_unit_counted_as_overflow(self):
+        slots = [DaySlot("monday", 40), DaySlot("tuesday", 30)]
+
+        week = pack_week(_plan("a", "big"), {"a": 20, "big": 70}, set(), slots)
+
+        assert [day.learning_units for day in week.days] == [["a"], ["big"]]
+        assert week.overflow_minutes == 40
+
+
+class TestB7Packed:
+    """Тесты run_b7_schedule в режиме packer."""
+
+    async def test_days_packed_without_llm_and_merged_with_narratives(self):
+        client = NarrativeClient()
+
+        result, metadata = await run_b7_schedule(
+            HIERARCHY, BLUEPRINTS, SCHEDULE_INFO, 4, client,
+            learning_units=LEARNING_UNITS, scheduler="packer",
+        )
+
+        assert sorted(model.__name__ for model in client.calls) == [
+            "ScheduleFrameOutput", "ScheduleNarrativesOutput",
+        ]
+        assert [week.theme for week in result.weeks] == ["Theme 1", "Theme 2", "Theme 3", "Theme 4"]
+        assert [
+            [day.learning_units for day in week.days] for week in result.weeks
+        ] == [[["tu1", "pu1"]], [["tu2"], ["pu2"]], [["tu3"]], [["pu3"]]]
+        assert result.weeks[1].checkpoint.title == "CP"
+        assert metadata["tokens_used"] == 80
+        assert metadata["overflow_minutes"] == {}
+
+    async def test_schedule_is_reproducible(self):
+        first, _ = await run_b7_schedule(
+            HIERARCHY, BLUEPRINTS, SCHEDULE_INFO, 4, NarrativeClient(),
+            learning_units=LEARNING_UNITS, scheduler="packer",
+        )
+        second, _ = await run_b7_schedule(
+            HIERARCHY, BLUEPRINTS, SCHEDULE_INFO, 4, NarrativeClient(),
+            learning_units=LEARNING_UNITS, scheduler="packer",
+        )
+        assert first.model_dump() == second.model_dump()
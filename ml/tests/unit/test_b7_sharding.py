@@ -0,0 +1,191 @@
+"""
+Тесты для B7 в две стадии: детерминированный план недель, параллельная
+детализация диапазонов недель, общий каркас и слияние в ScheduleOutput.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from ml.src.pipeline.b7_schedule import run_b7_schedule
+from ml.src.pipeline.b7_week_plan import allocate_weeks
+from ml.src.schemas.pipeline_steps import ScheduleFrameOutput, ScheduleOutput
+from ml.src.services.deepseek_client import DeepSeekError
+
+HIERARCHY = {
+    "levels": [
+        {"level": "foundational", "clusters": ["c1"], "estimated_weeks": 2},
+        {"level": "advanced", "clusters": ["c2"], "estimated_weeks": 2},
+    ],
+    "unit_sequence": ["tu1", "pu1", "tu2", "pu2", "tu3", "pu3"],
+    "time_compression_applied": False,
+    "total_weeks": 4,
+}
+
+LEARNING_UNITS = {
+    "theory_units": [
+        {"id": "tu1", "title": "T1", "estimated_minutes": 60},
+        {"id": "tu2", "title": "T2", "estimated_minutes": 60},
+        {"id": "tu3", "title": "T3", "estimated_minutes": 60},
+    ],
+    "practice_units": [
+        {"id": "pu1", "title": "P1", "estimated_minutes": 60},
+        {"id": "pu2", "title": "P2", "estimated_minutes": 120},
+        {"id": "pu3", "title": "P3", "estimated_minutes": 120},
+    ],
+    "automation_units": [],
+    "clusters": [
+        {"id": "c1", "theory_units": ["tu1", "tu2"], "practice_units": ["pu1"], "automation_units": []},
+        {"id": "c2", "theory_units": ["tu3"], "practice_units": ["pu2", "pu3"], "automation_units": []},
+    ],
+}
+
+BLUEPRINTS = {
+    "blueprints": [
+        {"id": "bp1", "cluster_id": "c1", "problem_formulation": {"problem_statement": "Problem c1"}},
+        {"id": "bp2", "cluster_id": "c2", "problem_formulation": {"problem_statement": "Problem c2"}},
+    ]
+}
+
+FRAME = {
+    "checkpoints": [{"week_number": 2, "title": "CP", "assessment_tasks": ["t"]}],
+    "final_assessment": {"week": 4, "tasks": ["final"], "criteria": ["c"]},
+    "support_plan": {"scaffolding_techniques": ["s"], "feedback_points": ["f"], "resources": ["r"]},
+    "progress_milestones": [{"week": 2, "title": "M", "criteria": ["c"]}],
+}
+
+
+def _week(plan: dict) -> dict:
+    return {
+        "week_number": plan["week_number"],
+        "level": "wrong-level",
+        "theme": f"Week {plan['week_number']}",
+        "weekly_goals": ["g1", "g2"],
+        "days": [{
+            "day_of_week": "Monday",
+            "learning_units": [unit["id"] for unit in plan["units"]],
+            "total_minutes": plan["minutes"],
+        }],
+        "checkpoint": None,
+    }
+
+
+class FakeClient:
+    """Неделя — по плану из промпта, каркас — FRAME; сценарий ответов — по первой неделе диапазона."""
+
+    def __init__(self, script: dict[int, list] | None = None, delay: float = 0.0):
+        self.script = script or {}
+        self.delay = delay
+        self.calls: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat_completion(self, prompt, response_model, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if response_model is ScheduleFrameOutput:
+                self.calls.append({"frame": True, **kwargs})
+                return response_model.model_validate(FRAME), {"tokens_used": 50, "model": "fake"}
+
+            section = prompt.split("WEEK PLAN DATA", 1)[1].split(":\n", 1)[1].split("\n\n", 1)[0]
+            plans = json.loads(section)
+            week_numbers = [plan["week_number"] for plan in plans]
+            self.calls.append({"week_numbers": week_numbers, **kwargs})
+            queued = self.script.get(week_numbers[0])
+            outcome = queued.pop(0) if queued else None
+            if isinstance(outcome, Exception):
+                raise outcome
+            weeks = outcome if outcome is not None else [_week(plan) for plan in plans]
+            return response_model.model_validate({"weeks": weeks}), {"tokens_used": 100, "model": "fake"}
+        finally:
+            self.in_flight -= 1
+
+
+class TestWeekPlan:
+    """Тесты allocate_weeks."""
+
+    def test_balanced_by_minutes_in_sequence_order(self):
+        plans = allocate_weeks(HIERARCHY, LEARNING_UNITS, 4)
+
+        assert [plan.unit_ids for plan in plans] == [["tu1", "pu1"], ["tu2", "pu2"], ["tu3"], ["pu3"]]
+        assert [plan.minutes for plan in plans] == [120, 180, 60, 120]
+        # неделя 2: 60 мин foundational против 120 мин advanced
+        assert [plan.level for plan in plans] == ["foundational", "advanced", "advanced", "advanced"]
+        assert plans[1].cluster_ids == ["c1", "c2"]
+
+    def test_every_week_gets_a_unit(self):
+        hierarchy = {**HIERARCHY, "unit_sequence": ["tu1", "pu2", "pu3"]}
+        plans = allocate_weeks(hierarchy, LEARNING_UNITS, 3)
+        assert [plan.unit_ids for plan in plans] == [["tu1"], ["pu2"], ["pu3"]]
+
+    def test_without_learning_units_uses_default_minutes(self):
+        plans = allocate_weeks(HIERARCHY, None, 3)
+        assert [len(plan.unit_ids) for plan in plans] == [2, 2, 2]
+        assert {plan.level for plan in plans} == {"foundational"}
+
+
+class TestB7Sharded:
+    """Тесты run_b7_schedule с диапазонами недель."""
+
+    async def test_week_ranges_run_concurrently_and_merge(self):
+        client = FakeClient(delay=0.01)
+        progress: list[int] = []
+
+        result, metadata = await run_b7_schedule(
+            HIERARCHY, BLUEPRINTS, {"weekly_hours": 5}, 4, client,
+            on_progress=lambda event: progress.append(event["index"]),
+            learning_units=LEARNING_UNITS, weeks_per_shard=2, scheduler="llm",
+        )
+
+        assert isinstance(result, ScheduleOutput)
+        assert client.max_in_flight == 3  # 2 диапазона + каркас
+        assert [week.week_number for week in result.weeks] == [1, 2, 3, 4]
+        assert result.weeks[0].level == "foundational"  # уровень — из плана
+        assert result.weeks[1].checkpoint.title == "CP"
+        assert result.weeks[0].checkpoint is None
+        assert result.support_plan.resources == ["r"]
+        assert sorted(progress) == [0, 1, 2, 3]
+        assert metadata["tokens_used"] == 250
+        assert [meta["week_numbers"] for meta in metadata["shards"]] == [[1, 2], [3, 4]]
+
+    async def test_only_failed_range_is_retried(self):
+        client = FakeClient(script={3: [[]]})  # первый ответ без недель 3-4
+
+        result, metadata = await run_b7_schedule(
+            HIERARCHY, BLUEPRINTS, {}, 4, client,
+            learning_units=LEARNING_UNITS, weeks_per_shard=2, scheduler="llm",
+        )
+
+        range_calls = [call for call in client.calls if "week_numbers" in call]
+        assert [call["week_numbers"] for call in range_calls].count([3, 4]) == 2
+        assert [call["week_numbers"] for call in range_calls].count([1, 2]) == 1
+        retry = [call for call in range_calls if call["week_numbers"] == [3, 4]][1]
+        assert retry["use_cache"] is False
+        assert [meta["attempts"] for meta in metadata["shards"]] == [1, 2]
+        assert len(result.weeks) == 4
+
+    async def test_range_failure_after_retries_raises(self):
+        client = FakeClient(script={1: [DeepSeekError("boom"), DeepSeekError("boom")]})
+
+        with pytest.raises(DeepSeekError):
+            await run_b7_schedule(
+                HIERARCHY, BLUEPRINTS, {}, 4, client,
+                learning_units=LEARNING_UNITS, weeks_per_shard=2, scheduler="llm",
+            )
+
+    async def test_zero_weeks_per_shard_keeps_single_call(self):
+        calls = []
+
+        class SingleClient:
+            async def chat_completion(self, prompt, response_model, **kwargs):
+                calls.append(response_model)
+                weeks = [_week({"week_number": 1, "units": [], "minutes": 0})]
+                return response_model.model_validate({"weeks": weeks, "total_weeks": 1, **FRAME}), {}
+
+        await run_b7_schedule(
+            HIERARCHY, BLUEPRINTS, {}, 1, SingleClient(), weeks_per_shard=0, scheduler="llm",
+        )
+        assert calls == [ScheduleOutput]
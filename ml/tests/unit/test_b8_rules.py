@@ -0,0 +1,197 @@
+"""
+Тесты для B8 rules: детерминированные проверки трека и режимы
+run_b8_validation (hybrid / skip_llm_on_pass).
+"""
+
+import copy
+
+from ml.src.pipeline.b8_rules import RULE_CHECKS, SEMANTIC_CHECKS, run_rule_checks
+from ml.src.pipeline.b8_validation import run_b8_validation
+
+PROFILE = {
+    "desired_outcomes": ["Outcome A", "Outcome B"],
+    "target_tasks": [{"id": "t1"}, {"id": "t2"}],
+    "schedule": [
+        {"day_of_week": "monday", "available_minutes": 60},
+        {"day_of_week": "saturday", "available_minutes": 120},
+    ],
+}
+
+TRACK = {
+    "validated_profile": {
+        "effective_level": "beginner",
+        "weekly_time_budget_minutes": 180,
+        "total_time_budget_minutes": 360,
+    },
+    "competency_set": {
+        "competencies": [{"id": "c1", "title": "C1", "level": "foundational"}],
+        "competency_task_map": {"c1": ["t1", "t2"]},
+        "competency_outcome_map": {"c1": [0, 1]},
+    },
+    "ksa_matrix": {
+        "knowledge_items": [{"id": "k1", "required_for": ["s1"]}],
+        "skill_items": [{"id": "s1", "requires_knowledge": ["k1"], "required_for": ["h1"]}],
+        "habit_items": [{"id": "h1", "requires_skills": ["s1"]}],
+        "dependency_graph": [{"from_id": "k1", "to_id": "s1", "dependency_type": "prerequisite"}],
+    },
+    "learning_units": {
+        "theory_units": [{"id": "tu1", "knowledge_ids": ["k1"], "estimated_minutes": 60}],
+        "practice_units": [{"id": "pu1", "skill_ids": ["s1"], "estimated_minutes": 90}],
+        "automation_units": [{"id": "au1", "habit_ids": ["h1"], "estimated_minutes": 30}],
+        "clusters": [{
+            "id": "cluster1",
+            "theory_units": ["tu1"],
+            "practice_units": ["pu1"],
+            "automation_units": ["au1"],
+        }],
+    },
+    "hierarchy": {
+        "levels": [{"level": "foundational", "clusters": ["cluster1"]}],
+        "unit_sequence": ["tu1", "pu1", "au1"],
+        "total_weeks": 2,
+    },
+    "lesson_blueprints": {
+        "blueprints": [{
+            "id": "bp1",
+            "cluster_id": "cluster1",
+            "problem_formulation": {"problem_statement": "P", "expected_hypotheses": ["h"]},
+            "fsm_rules": {"start": "explore"},
+        }],
+    },
+    "schedule": {
+        "weeks": [
+            {"week_number": 1, "level": "foundational", "days": [
+                {"day_of_week": "monday", "learning_units": ["tu1"], "total_minutes": 60},
+            ]},
+            {"week_number": 2, "level": "foundational", "days": [
+                {"day_of_week": "saturday", "learning_units": ["pu1", "au1"], "total_minutes": 120},
+            ]},
+        ],
+        "total_weeks": 2,
+        "checkpoints": [{"week_number": 2, "title": "CP", "assessment_tasks": ["t"]}],
+    },
+}
+
+
+def _failed(track: dict, profile: dict = PROFILE) -> dict[str, str]:
+    return {c.check_name: c.message for c in run_rule_checks(track, profile) if not c.passed}
+
+
+class FakeClient:
+    """Отвечает на семантический промпт; запоминает промпты."""
+
+    def __init__(self, checks: list[dict] | None = None):
+        self.prompts: list[str] = []
+        self.checks = checks
+
+    async def chat_completion(self, prompt, response_model, **kwargs):
+        self.prompts.append(prompt)
+        checks = self.checks if self.checks is not None else [
+            {"check_name": name, "passed": True, "severity": "warning", "message": "ok"}
+            for name in SEMANTIC_CHECKS
+        ]
+        return response_model.model_validate({"checks": checks}), {"tokens_used": 40, "model": "fake"}
+
+
+class TestRuleChecks:
+    """Тесты run_rule_checks."""
+
+    def test_consistent_track_passes_all_rules(self):
+        checks = run_rule_checks(TRACK, PROFILE)
+
+        assert [c.check_name for c in checks] == list(RULE_CHECKS)
+        assert _failed(TRACK) == {}
+        assert not set(RULE_CHECKS) & set(SEMANTIC_CHECKS)
+        assert len(RULE_CHECKS) + len(SEMANTIC_CHECKS) == 22
+
+    def test_broken_references_and_coverage(self):
+        track = copy.deepcopy(TRACK)
+        track["ksa_matrix"]["skill_items"][0]["requires_knowledge"].append("k9")
+        track["competency_set"]["competency_task_map"] = {"c1": ["t1"]}
+        track["lesson_blueprints"]["blueprints"][0]["fsm_rules"] = {}
+
+        failed = _failed(track)
+
+        assert "s1.requires_knowledge: unknown k9" in failed["ksa_references"]
+        assert "t2" in failed["tasks_mapped"]
+        assert "bp1" in failed["blueprints_have_fsm"]
+
+    def test_cycle_and_order_violations(self):
+        track = copy.deepcopy(TRACK)
+        track["ksa_matrix"]["dependency_graph"].append(
+            {"from_id": "s1", "to_id": "k1", "dependency_type": "prerequisite"}
+        )
+        track["hierarchy"]["unit_sequence"] = ["pu1", "tu1", "au1"]
+
+        failed = _failed(track)
+
+        assert "k1 → s1 → k1" in failed["circular_dependencies"]
+        assert "s1 is taught before its prerequisite k1" in failed["unit_dependencies"]
+
+    def test_schedule_structure_and_time(self):
+        track = copy.deepcopy(TRACK)
+        week = track["schedule"]["weeks"][1]
+        week["days"][0]["learning_units"] = ["pu1", "pu1", "x1"]
+        week["days"][0]["total_minutes"] = 300
+
+        failed = _failed(track)
+
+        assert "unit au1 is not scheduled" in failed["schedule_hierarchy_match"]
+        assert "unknown unit x1" in failed["schedule_hierarchy_match"]
+        assert "pu1 scheduled 2 times" in failed["schedule_hierarchy_match"]
+        assert "300 min > 120 min available" in failed["weekly_distribution"]
+
+    def test_rule_crash_reported_as_warning(self):
+        track = copy.deepcopy(TRACK)
+        track["schedule"]["weeks"][0].pop("week_number")
+
+        checks = {c.check_name: c for c in run_rule_checks(track, PROFILE)}
+
+        assert not checks["prerequisite_ordering"].passed
+        assert checks["prerequisite_ordering"].severity == "warning"
+        assert checks["prerequisite_ordering"].message.startswith("Check could not run")
+
+
+class TestB8Modes:
+    """Тесты run_b8_validation в режимах с правилами."""
+
+    async def test_hybrid_sends_only_semantic_checks(self):
+        client = FakeClient()
+
+        result, metadata = await run_b8_validation(TRACK, PROFILE, client, mode="hybrid")
+
+        assert len(client.prompts) == 1
+        assert "adaptive_paths_complete" in client.prompts[0]
+        assert "ksa_references" not in client.prompts[0]
+        assert len(result.checks) == 22
+        assert result.final_status == "validated"
+        assert metadata["tokens_used"] == 40
+        assert metadata["llm_skipped"] is False
+
+    async def test_skip_llm_when_rules_pass(self):
+        client = FakeClient()
+
+        result, metadata = await run_b8_validation(TRACK, PROFILE, client, mode="skip_llm_on_pass")
+
+        assert client.prompts == []
+        assert metadata["llm_skipped"] is True
+        assert metadata["tokens_used"] == 0
+        assert len(result.checks) == len(RULE_CHECKS)
+        assert result.overall_valid
+
+    async def test_failed_rules_counted_and_llm_still_called(self):
+        track = copy.deepcopy(TRACK)
+        track["lesson_blueprints"]["blueprints"] = []
+        client = FakeClient(checks=[
+            {"check_name": "hypothesis_coverage", "passed": False, "severity": "warning", "message": "m"},
+            {"check_name": "ksa_references", "passed": False, "severity": "critical", "message": "dup"},
+        ])
+
+        result, _ = await run_b8_validation(track, PROFILE, client, mode="skip_llm_on_pass")
+
+        assert len(client.prompts) == 1
+        assert result.final_status == "failed"
+        assert result.critical_failures == 1  # blueprint_cluster_match; чужой ksa_references отброшен
+        assert result.warnings == 1  # hypothesis_coverage
+        not_evaluated = [c for c in result.checks if c.message == "Check was not evaluated by the LLM"]
+        assert len(not_evaluated) == len(SEMANTIC_CHECKS) - 1
@@ -0,0 +1,100 @@
+"""
+Тесты для benchmarks: модель задержки LLM-заглушки, метрики и прогон сценария.
+"""
+
+import json
+import random
+
+import pytest
+
+from ml.benchmarks.llm_stub import (
+    CallRecord,
+    LatencyLLMClient,
+    StepLatency,
+    load_latency_profile,
+)
+from ml.benchmarks.metrics import distribution, llm_critical_path_ms, percentile
+from ml.benchmarks.run_benchmark import DEFAULT_PROFILE, isolated_pipeline, run_scenario
+from ml.src.schemas.pipeline_steps import ValidatedStudentProfile
+from ml.src.services.deepseek_client import DeepSeekError
+from ml.src.services.step_logger import close_step_logger
+
+
+def _call(step_name: str, latency_ms: float) -> CallRecord:
+    return CallRecord("t", step_name, latency_ms, 10, False)
+
+
+class TestMetrics:
+    """Тесты перцентилей и критического пути."""
+
+    def test_percentile_interpolates(self):
+        values = [float(v) for v in range(1, 101)]
+
+        assert percentile(values, 50) == pytest.approx(50.5)
+        assert percentile(values, 99) == pytest.approx(99.01)
+        assert percentile([], 95) == 0.0
+        assert distribution([2.0, 4.0])["mean"] == 3.0
+
+    def test_critical_path_takes_slowest_parallel_branch(self):
+        calls = [_call(name, 100) for name in (
+            "B1_validate", "B2_competencies", "B3_ksa_matrix", "B4_learning_units",
+            "B7_schedule", "B8_validation",
+        )]
+        calls += [_call("B5_hierarchy", 50), _call("B6_problem_formulations", 300)]
+        # Шарды B6 идут параллельно — учитывается самый долгий
+        calls.append(_call("B6_problem_formulations", 200))
+
+        assert llm_critical_path_ms(calls) == 900
+
+
+class TestLatencyStub:
+    """Тесты LatencyLLMClient."""
+
+    def test_sample_includes_generation_time(self):
+        latency = StepLatency(ttft_ms=100, ttft_sigma=0, tokens_per_sec=50)
+
+        assert latency.sample_ms(random.Random(0), output_tokens=100) == pytest.approx(2100)
+
+    def test_profile_overrides_default(self, tmp_path):
+        path = tmp_path / "latency.json"
+        path.write_text(json.dumps({
+            "default": {"ttft_ms": 500, "error_rate": 0.1},
+            "steps": {"B7_schedule": {"ttft_ms": 2000}},
+        }))
+
+        default, steps = load_latency_profile(path)
+
+        assert default.ttft_ms == 500
+        assert steps["B7_schedule"].ttft_ms == 2000
+        assert steps["B7_schedule"].error_rate == 0.1
+
+    async def test_failure_recorded_and_raised(self):
+        client = LatencyLLMClient(StepLatency(ttft_ms=0, tokens_per_sec=0, error_rate=1.0))
+
+        with pytest.raises(DeepSeekError, match="B1_validate"):
+            await client.chat_completion("any prompt", ValidatedStudentProfile)
+
+        assert client.calls[0].failed
+        assert client.calls[0].step_name == "B1_validate"
+
+
+class TestScenario:
+    """Прогон run_pipeline / run_pipeline_batch на заглушке без задержек."""
+
+    @pytest.mark.parametrize("mode", ["pipeline", "batch"])
+    async def test_scenario_reports_metrics(self, mode, tmp_path):
+        client = LatencyLLMClient(StepLatency(ttft_ms=0, tokens_per_sec=0))
+        profile = json.loads(DEFAULT_PROFILE.read_text(encoding="utf-8"))
+
+        with isolated_pipeline(tmp_path):
+            try:
+                scenario = await run_scenario(mode, 2, client, profile)
+            finally:
+                # Глобальный step logger привязан к event loop теста
+                await close_step_logger()
+
+        assert scenario["succeeded"] == 2
+        assert scenario["llm_calls"] == len(client.calls) > 0
+        assert all(call.track_id for call in client.calls)
+        assert scenario["latency_ms"]["p99"] >= scenario["latency_ms"]["p50"] > 0
+        assert set(scenario["event_loop_lag_ms"]) == {"p50", "p95", "p99", "mean", "max"}
@@ -0,0 +1,120 @@
+"""
+Тесты для hedged_client: параллельные сэмплы, первый валидный ответ, учёт стоимости.
+"""
+
+import asyncio
+from collections import deque
+
+import pytest
+from pydantic import BaseModel
+
+from ml.src.core.config import settings
+from ml.src.services import hedged_client
+from ml.src.services.hedged_client import HedgedClient, hedge_for_step
+
+
+class Answer(BaseModel):
+    value: int
+
+
+class ScriptedClient:
+    """Клиент, у которого i-й вызов выполняется за delays[i] и падает, если fails[i]."""
+
+    def __init__(self, delays: list[float], fails: list[bool] | None = None):
+        self.delays = delays
+        self.fails = fails or [False] * len(delays)
+        self.calls: list[dict] = []
+        self.cancelled = 0
+
+    async def chat_completion(self, prompt, response_model, **kwargs):
+        index = len(self.calls)
+        self.calls.append(kwargs)
+        try:
+            await asyncio.sleep(self.delays[index])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fails[index]:
+            raise ValueError(f"invalid sample {index}")
+        return response_model(value=index), {"tokens_used": 100}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_history(monkeypatch):
+    monkeypatch.setattr(
+        hedged_client, "_latency_history", hedged_client.defaultdict(lambda: deque(maxlen=200))
+    )
+
+
+class TestHedgedClient:
+    """Тесты гонки сэмплов."""
+
+    async def test_fastest_valid_sample_wins(self):
+        inner = ScriptedClient(delays=[0.3, 0.01, 0.05, 0.3], fails=[False, True, False, False])
+
+        result, metadata = await HedgedClient(inner, samples=3).chat_completion("p", Answer)
+
+        # Сэмпл 1 упал — сразу запущен сэмпл 3; победил сэмпл 2
+        assert result.value == 2
+        assert inner.cancelled == 2
+        assert [call["max_attempts"] for call in inner.calls] == [1, 1, 1, 1]
+        assert "use_cache" not in inner.calls[0]
+        assert inner.calls[1]["use_cache"] is False
+        hedge = metadata["hedge"]
+        assert (hedge["samples"], hedge["failed"], hedge["cancelled"]) == (4, 1, 2)
+        # Упавший сэмпл — полный ответ, отменённые — доля по времени работы
+        assert 300 <= metadata["tokens_used"] <= 400
+
+    async def test_delayed_hedge_not_launched_for_fast_answer(self):
+        inner = ScriptedClient(delays=[0.01, 0.01])
+
+        result, metadata = await HedgedClient(inner, 2, hedge_delay=0.5).chat_completion(
+            "p", Answer
+        )
+
+        assert result.value == 0
+        assert len(inner.calls) == 1
+        assert metadata["tokens_used"] == 100
+
+    async def test_delayed_hedge_wins_over_slow_sample(self):
+        inner = ScriptedClient(delays=[1.0, 0.01])
+
+        result, _ = await HedgedClient(inner, 2, hedge_delay=0.02).chat_completion("p", Answer)
+
+        assert result.value == 1
+        assert inner.cancelled == 1
+
+    async def test_failure_launches_replacement(self, monkeypatch):
+        monkeypatch.setattr(settings, "DEEPSEEK_MAX_RETRIES", 2)
+        inner = ScriptedClient(delays=[0.01, 0.01, 0.01], fails=[True, True, True])
+
+        with pytest.raises(ValueError, match="invalid sample 2"):
+            await HedgedClient(inner, 2, hedge_delay=10).chat_completion("p", Answer)
+
+        # samples + DEEPSEEK_MAX_RETRIES - 1
+        assert len(inner.calls) == 3
+
+    async def test_percentile_delay_needs_history(self):
+        client = HedgedClient(ScriptedClient([]), 2, hedge_delay="p90", step_name="B5_hierarchy")
+        assert client._delay() is None
+
+        hedged_client._latency_history["B5_hierarchy"].extend(i / 10 for i in range(1, 21))
+        assert client._delay() == pytest.approx(1.9)
+
+        with pytest.raises(ValueError, match="pNN"):
+            HedgedClient(ScriptedClient([]), 2, hedge_delay="slow")
+
+
+class TestHedgeForStep:
+    """Тесты включения hedging по настройкам шага."""
+
+    def test_only_configured_steps(self, monkeypatch):
+        monkeypatch.setattr(settings, "LLM_HEDGE_SAMPLES", {"B5_hierarchy": 3})
+        monkeypatch.setattr(settings, "LLM_HEDGE_DELAY", {"B5_hierarchy": "p90"})
+        inner = ScriptedClient([])
+
+        hedged = hedge_for_step(inner, "B5_hierarchy")
+
+        assert isinstance(hedged, HedgedClient)
+        assert (hedged.samples, hedged.hedge_delay) == (3, "p90")
+        assert hedge_for_step(inner, "B1_validate") is inner
@@ -0,0 +1,113 @@
+"""
+Тесты для incremental_json и потокового режима DeepSeekClient.chat_completion.
+"""
+
+import json
+
+import httpx
+import pytest
+
+from ml.src.schemas.pipeline_steps import HierarchyOutput
+from ml.src.services.deepseek_client import DeepSeekClient, DeepSeekError
+from ml.src.services.incremental_json import IncrementalJSONError, IncrementalJSONParser
+from ml.src.services.llm_cache import LLMResponseCache
+
+SCHEDULE_TEXT = json.dumps({
+    "weeks": [
+        {"week_number": 1, "theme": 'Основы {скобки} и "кавычки"'},
+        {"week_number": 2, "theme": "Практика", "days": [{"day_of_week": "Monday"}]},
+    ],
+    "total_weeks": 2,
+}, ensure_ascii=False)
+
+
+def _feed_in_chunks(parser: IncrementalJSONParser, text: str, size: int = 7) -> list[dict]:
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return events
+
+
+class TestIncrementalJSONParser:
+    """Тесты IncrementalJSONParser."""
+
+    def test_emits_event_per_array_item(self):
+        parser = IncrementalJSONParser()
+        events = _feed_in_chunks(parser, SCHEDULE_TEXT)
+
+        assert [(e["key"], e["index"]) for e in events] == [("weeks", 0), ("weeks", 1)]
+        assert events[0]["item"]["theme"].startswith("Основы {скобки}")
+        assert parser.finish()["total_weeks"] == 2
+
+    def test_skips_markdown_fence(self):
+        parser = IncrementalJSONParser()
+        _feed_in_chunks(parser, "```json\n" + SCHEDULE_TEXT + "\n```")
+        assert parser.done
+        assert parser.finish()["weeks"][1]["week_number"] == 2
+
+    def test_mismatched_bracket_fails_immediately(self):
+        parser = IncrementalJSONParser()
+        with pytest.raises(IncrementalJSONError, match="Mismatched"):
+            parser.feed('{"weeks": [1, 2}')
+
+    def test_stray_character_fails_immediately(self):
+        parser = IncrementalJSONParser()
+        with pytest.raises(IncrementalJSONError, match="Unexpected character"):
+            parser.feed('{"weeks": [oops')
+
+    def test_truncated_stream(self):
+        parser = IncrementalJSONParser()
+        parser.feed('{"weeks": [{"week_number": 1}')
+        with pytest.raises(IncrementalJSONError, match="truncated"):
+            parser.finish()
+
+
+def _sse_client(content: str, usage_tokens: int = 50) -> DeepSeekClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        lines = [
+            "data: " + json.dumps({"choices": [{"delta": {"content": content[i:i + 10]}}]})
+            for i in range(0, len(content), 10)
+        ]
+        lines.append("data: " + json.dumps({"choices": [], "usage": {"total_tokens": usage_tokens}}))
+        lines.append("data: [DONE]")
+        return httpx.Response(200, text="\n\n".join(lines) + "\n\n")
+
+    client = DeepSeekClient(cache=LLMResponseCache(path=None))
+    client.max_retries = 1
+    client.client = httpx.AsyncClient(
+        base_url="http://llm.test", transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+class TestDeepSeekStreaming:
+    """Тесты stream=True в chat_completion."""
+
+    async def test_stream_validates_and_reports_progress(self):
+        hierarchy = {
+            "levels": [
+                {"level": "foundational", "clusters": ["c1"], "estimated_weeks": 1},
+                {"level": "advanced", "clusters": ["c2"], "estimated_weeks": 1},
+            ],
+            "unit_sequence": ["tu1"],
+            "time_compression_applied": False,
+            "total_weeks": 2,
+        }
+        progress: list[dict] = []
+        client = _sse_client(json.dumps(hierarchy))
+
+        result, meta = await client.chat_completion(
+            "p", HierarchyOutput, use_cache=False, stream=True, on_progress=progress.append
+        )
+
+        assert result.total_weeks == 2
+        assert meta["tokens_used"] == 50
+        assert meta["streamed"] is True
+        assert [e["index"] for e in progress if e["key"] == "levels"] == [0, 1]
+
+    async def test_stream_malformed_json_raises(self):
+        client = _sse_client('{"levels": [}')
+
+        with pytest.raises(DeepSeekError, match="Invalid JSON"):
+            await client.chat_completion("p", HierarchyOutput, use_cache=False, stream=True)
@@ -0,0 +1,103 @@
+"""
+Тесты для json_utils: режимы сериализации промптов, проекции, сокращение ключей.
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from ml.src.prompts.b7_prompt import get_b7_prompt
+from ml.src.prompts.b8_prompt import get_b8_prompt
+from ml.src.prompts.json_utils import abbreviate_keys, estimate_tokens, project, to_json
+from ml.src.schemas.pipeline_steps import TrackLevel
+
+FIXTURES = Path(__file__).parent.parent / "fixtures" / "mock_responses"
+
+
+def _fixture(step_name: str) -> dict:
+    with open(FIXTURES / f"{step_name}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TestToJson:
+    """Тесты режимов to_json."""
+
+    def test_pretty_keeps_original_format(self):
+        assert to_json({"a": [1]}, mode="pretty") == '{\n  "a": [\n    1\n  ]\n}'
+
+    def test_minified_has_no_whitespace(self):
+        data = {"title": "Логика", "units": [{"id": "tu1"}]}
+        assert to_json(data, mode="minified") == '{"title":"Логика","units":[{"id":"tu1"}]}'
+
+    def test_projection_applied_only_from_pruned(self):
+        data = {"units": [{"id": "tu1", "content_outline": "long text"}]}
+        projection = {"units": {"id": True}}
+
+        assert "content_outline" in to_json(data, projection, mode="minified")
+        assert to_json(data, projection, mode="pruned") == '{"units":[{"id":"tu1"}]}'
+
+    def test_pydantic_models_projected(self):
+        level = TrackLevel(level="foundational", clusters=["c1"], estimated_weeks=2)
+        assert to_json({"levels": [level]}, {"levels": {"clusters": True}}, mode="pruned") == (
+            '{"levels":[{"clusters":["c1"]}]}'
+        )
+
+    def test_unknown_mode_rejected(self):
+        with pytest.raises(ValueError, match="Unknown prompt JSON mode"):
+            to_json({}, mode="tiny")
+
+
+class TestProjectAndAbbreviate:
+    """Тесты project и abbreviate_keys."""
+
+    def test_project_skips_missing_keys(self):
+        assert project({"a": 1}, {"a": True, "b": True}) == {"a": 1}
+
+    def test_abbreviates_only_repeated_field_names(self):
+        data = {
+            "units": [{"estimated_minutes": i, "id": f"tu{i}"} for i in range(5)],
+            "competency_task_map": {"c1": ["t1"]},
+        }
+
+        abbreviated, aliases = abbreviate_keys(data)
+
+        assert aliases == {"estimated_minutes": "em"}
+        assert abbreviated["units"][0] == {"em": 0, "id": "tu0"}
+        assert abbreviated["competency_task_map"] == {"c1": ["t1"]}  # встречается один раз
+
+    def test_abbreviated_mode_prepends_legend(self):
+        data = [{"estimated_minutes": i} for i in range(5)]
+        text = to_json(data, mode="abbreviated")
+        assert text.startswith("KEYS: em=estimated_minutes\n[")
+
+
+class TestPromptProjections:
+    """Тесты проекций в промптах B7/B8 на mock-данных."""
+
+    def test_b7_blueprints_keep_only_cluster_binding(self, monkeypatch):
+        from ml.src.core.config import settings
+
+        monkeypatch.setattr(settings, "PROMPT_JSON_MODE", "pruned")
+        blueprints = _fixture("B6_problem_formulations")
+        prompt = get_b7_prompt(_fixture("B5_hierarchy"), blueprints, {"weekly_hours": 5}, 4)
+
+        assert blueprints["blueprints"][0]["cluster_id"] in prompt
+        assert "fsm_rules" not in prompt and "practice_tasks" not in prompt
+
+    def test_b8_track_smaller_than_pretty(self, monkeypatch):
+        from ml.src.core.config import settings
+
+        track = {
+            "validated_profile": _fixture("B1_validate"),
+            "learning_units": _fixture("B4_learning_units"),
+            "lesson_blueprints": _fixture("B6_problem_formulations"),
+        }
+        monkeypatch.setattr(settings, "PROMPT_JSON_MODE", "pretty")
+        pretty = get_b8_prompt(track, {"topic": "Логика"})
+        monkeypatch.setattr(settings, "PROMPT_JSON_MODE", "pruned")
+        pruned = get_b8_prompt(track, {"topic": "Логика"})
+
+        assert "content_outline" in pretty and "content_outline" not in pruned
+        assert "fsm_rules" in pruned
+        assert estimate_tokens(pruned) < estimate_tokens(pretty)
@@ -0,0 +1,173 @@
+"""
+Тесты для llm_cache и кэширования в DeepSeekClient.chat_completion.
+"""
+
+import json
+
+import httpx
+import pytest
+
+from ml.src.schemas.pipeline_steps import HierarchyOutput
+from ml.src.services.deepseek_client import DeepSeekClient
+from ml.src.services.llm_cache import LLMResponseCache, ResponseCache, make_cache_key
+
+HIERARCHY = {
+    "levels": [{"level": "foundational", "clusters": ["c1"], "estimated_weeks": 2}],
+    "unit_sequence": ["tu1", "pu1"],
+    "time_compression_applied": False,
+    "total_weeks": 2,
+}
+
+
+class TestCacheKey:
+    """Тесты make_cache_key."""
+
+    def test_same_inputs_same_key(self):
+        params = {"temperature": 0.3, "max_tokens": 100}
+        k1 = make_cache_key("m", "prompt", params, HierarchyOutput)
+        k2 = make_cache_key("m", "prompt", dict(reversed(params.items())), HierarchyOutput)
+        assert k1 == k2
+
+    def test_any_component_changes_key(self):
+        base = make_cache_key("m", "p", {"temperature": 0.3}, HierarchyOutput)
+        assert make_cache_key("m2", "p", {"temperature": 0.3}, HierarchyOutput) != base
+        assert make_cache_key("m", "p2", {"temperature": 0.3}, HierarchyOutput) != base
+        assert make_cache_key("m", "p", {"temperature": 0.5}, HierarchyOutput) != base
+
+
+class TestResponseCacheInterface:
+    """Тесты базового класса кэша."""
+
+    def test_get_and_set_are_abstract(self):
+        class GetOnly(ResponseCache):
+            async def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnly()
+
+    async def test_default_stats_and_close(self):
+        class DictCache(ResponseCache):
+            async def get(self, key):
+                return None
+
+            async def set(self, key, value):
+                pass
+
+        cache = DictCache()
+
+        assert cache.get_stats() == {}
+        await cache.close()
+
+
+class TestLLMResponseCache:
+    """Тесты двухуровневого кэша."""
+
+    async def test_memory_lru_eviction(self):
+        cache = LLMResponseCache(path=None, memory_max_entries=2)
+        await cache.set("a", {"content": "1"})
+        await cache.set("b", {"content": "2"})
+        assert await cache.get("a") is not None  # a — самый свежий
+        await cache.set("c", {"content": "3"})
+
+        assert await cache.get("b") is None
+        assert (await cache.get("a"))["content"] == "1"
+        assert cache.get_stats()["misses"] == 1
+
+    async def test_ttl_expiry(self, monkeypatch):
+        cache = LLMResponseCache(path=None, ttl_sec=10)
+        now = 1000.0
+        monkeypatch.setattr("ml.src.services.llm_cache.time.time", lambda: now)
+        await cache.set("a", {"content": "1"})
+
+        now = 1011.0
+        assert await cache.get("a") is None
+
+    async def test_disk_tier_survives_new_instance(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        first = LLMResponseCache(path=path)
+        await first.set("k", {"content": "{}", "tokens_used": 42})
+        await first.close()
+
+        second = LLMResponseCache(path=path)
+        entry = await second.get("k")
+        assert entry["tokens_used"] == 42
+        assert entry["cache_tier"] == "disk"
+        assert (await second.get("k"))["cache_tier"] == "memory"
+        await second.close()
+
+    async def test_disk_size_eviction(self, tmp_path):
+        cache = LLMResponseCache(path=tmp_path / "c.sqlite3", memory_max_entries=1,
+                                 disk_max_entries=2)
+        for key in ("a", "b", "c"):
+            await cache.set(key, {"content": key})
+
+        assert await cache.get("a") is None
+        assert await cache.get("c") is not None
+        await cache.close()
+
+
+def _client_with_transport(cache, calls: list) -> DeepSeekClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": json.dumps(HIERARCHY)}}],
+            "usage": {"total_tokens": 123},
+        })
+
+    client = DeepSeekClient(cache=cache)
+    client.client = httpx.AsyncClient(
+        base_url="http://llm.test", transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+class TestDeepSeekClientCache:
+    """Тесты кэширования в chat_completion."""
+
+    async def test_second_call_is_served_from_cache(self):
+        calls: list = []
+        client = _client_with_transport(LLMResponseCache(path=None), calls)
+
+        _, first_meta = await client.chat_completion("p", HierarchyOutput, 0.0, 100)
+        result, meta = await client.chat_completion("p", HierarchyOutput, 0.0, 100)
+
+        assert len(calls) == 1
+        assert first_meta["cache"]["hit"] is False
+        assert meta["cache"]["hit"] is True
+        assert meta["cache"]["saved_tokens"] == 123
+        assert meta["tokens_used"] == 0
+        assert result.total_weeks == 2
+
+    async def test_use_cache_false_bypasses_cache(self):
+        calls: list = []
+        client = _client_with_transport(LLMResponseCache(path=None), calls)
+
+        await client.chat_completion("p", HierarchyOutput, 0.0, 100)
+        _, meta = await client.chat_completion("p", HierarchyOutput, 0.0, 100, use_cache=False)
+
+        assert len(calls) == 2
+        assert "cache" not in meta
+
+    async def test_sampled_calls_not_cached_by_default(self):
+        """temperature > 0 — повторная генерация должна дать новый ответ."""
+        calls: list = []
+        cache = LLMResponseCache(path=None)
+        client = _client_with_transport(cache, calls)
+
+        await client.chat_completion("p", HierarchyOutput, 0.7, 100)
+        _, meta = await client.chat_completion("p", HierarchyOutput, 0.7, 100)
+
+        assert len(calls) == 2
+        assert "cache" not in meta
+        assert cache.get_stats()["misses"] == 0
+
+    async def test_sampled_call_opt_in(self):
+        calls: list = []
+        client = _client_with_transport(LLMResponseCache(path=None), calls)
+
+        await client.chat_completion("p", HierarchyOutput, 0.7, 100, use_cache=True)
+        _, meta = await client.chat_completion("p", HierarchyOutput, 0.7, 100, use_cache=True)
+
+        assert len(calls) == 1
+        assert meta["cache"]["hit"] is True
@@ -0,0 +1,191 @@
+"""
+Тесты для llm_cassette: запись обменов с LLM API и воспроизведение через DeepSeekClient.
+"""
+
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from ml.src.core.config import settings
+from ml.src.schemas.pipeline_steps import CompetencySet
+from ml.src.services import llm_client_factory
+from ml.src.services.deepseek_client import DeepSeekClient, DeepSeekError
+from ml.src.services.llm_cache import LLMResponseCache
+from ml.src.services.llm_cassette import (
+    RecordingTransport,
+    ReplayTransport,
+    make_cassette_transport,
+)
+from ml.src.services.rate_limiter import LLMRateLimiter
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "mock_responses"
+COMPETENCIES = json.loads((FIXTURES_DIR / "B2_competencies.json").read_text(encoding="utf-8"))
+
+
+def _completion_response(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if body.get("stream"):
+        content = json.dumps(COMPETENCIES, ensure_ascii=False)
+        chunks = [
+            {"choices": [{"delta": {"content": content[:20]}}]},
+            {"choices": [{"delta": {"content": content[20:]}}]},
+            {"choices": [], "usage": {"total_tokens": 77}},
+        ]
+        sse = "".join(f"data: {json.dumps(c, ensure_ascii=False)}\n\n" for c in chunks)
+        return httpx.Response(
+            200, headers={"Content-Type": "text/event-stream"}, text=sse + "data: [DONE]\n\n"
+        )
+    return httpx.Response(200, json={
+        "choices": [{"message": {"content": json.dumps(COMPETENCIES, ensure_ascii=False)}}],
+        "usage": {"total_tokens": 42},
+    })
+
+
+def _client(transport: httpx.AsyncBaseTransport) -> DeepSeekClient:
+    # Кэш в памяти: не трогает кэш на диске и не зависит от прошлых запусков
+    return DeepSeekClient(
+        cache=LLMResponseCache(path=None), limiter=LLMRateLimiter(), transport=transport
+    )
+
+
+def _entries(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestRecording:
+    """Тесты записи кассеты."""
+
+    async def test_records_json_exchange(self, tmp_path):
+        path = tmp_path / "cassette.jsonl"
+        transport = RecordingTransport(path, inner=httpx.MockTransport(_completion_response))
+        client = _client(transport)
+
+        result, metadata = await client.chat_completion("prompt", CompetencySet, use_cache=False)
+        await client.close()
+
+        assert result.integral_competency_id == COMPETENCIES["integral_competency_id"]
+        [entry] = _entries(path)
+        assert entry["params"]["temperature"] == 0.7
+        assert entry["usage"]["total_tokens"] == 42
+        assert entry["status_code"] == 200
+        assert entry["latency_ms"] >= 0
+        assert len(entry["key"]) == len(entry["prompt_hash"]) == 64
+
+    async def test_records_streamed_exchange(self, tmp_path):
+        path = tmp_path / "cassette.jsonl"
+        transport = RecordingTransport(path, inner=httpx.MockTransport(_completion_response))
+        client = _client(transport)
+
+        await client.chat_completion("prompt", CompetencySet, use_cache=False, stream=True)
+        await client.close()
+
+        [entry] = _entries(path)
+        assert entry["params"]["stream"] is True
+        assert entry["usage"]["total_tokens"] == 77
+        assert "data: [DONE]" in entry["body"]
+
+
+class TestReplay:
+    """Тесты воспроизведения кассеты."""
+
+    async def _record(self, path, stream: bool = False) -> None:
+        transport = RecordingTransport(path, inner=httpx.MockTransport(_completion_response))
+        client = _client(transport)
+        await client.chat_completion("prompt", CompetencySet, use_cache=False, stream=stream)
+        await client.close()
+
+    @pytest.mark.parametrize("stream", [False, True])
+    async def test_replay_matches_recording(self, tmp_path, stream):
+        path = tmp_path / "cassette.jsonl"
+        await self._record(path, stream=stream)
+        transport = ReplayTransport(path, time_scale=0)
+        client = _client(transport)
+
+        result, metadata = await client.chat_completion(
+            "prompt", CompetencySet, use_cache=False, stream=stream
+        )
+        await client.close()
+
+        assert result.model_dump() == CompetencySet.model_validate(COMPETENCIES).model_dump()
+        assert metadata["tokens_used"] == (77 if stream else 42)
+        assert transport.get_stats() == {"hits": 1, "misses": 0, "requests": 1}
+
+    async def test_miss_raises_without_retry(self, tmp_path):
+        path = tmp_path / "cassette.jsonl"
+        await self._record(path)
+        transport = ReplayTransport(path, time_scale=0)
+        client = _client(transport)
+
+        with pytest.raises(DeepSeekError, match="404"):
+            await client.chat_completion("other prompt", CompetencySet, use_cache=False)
+        await client.close()
+
+        assert transport.misses == 1
+
+    async def test_scaled_latency(self, tmp_path, monkeypatch):
+        path = tmp_path / "cassette.jsonl"
+        path.write_text(json.dumps({
+            "key": "k", "status_code": 200, "headers": {}, "body": "{}", "latency_ms": 2000,
+        }) + "\n")
+        sleeps = []
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+
+        monkeypatch.setattr("ml.src.services.llm_cassette.asyncio.sleep", fake_sleep)
+        transport = ReplayTransport(path, time_scale=0.5)
+        monkeypatch.setattr("ml.src.services.llm_cassette.request_key", lambda body: "k")
+
+        await transport.handle_async_request(httpx.Request("POST", "http://x", content=b"{}"))
+
+        assert sleeps == [1.0]
+
+    def test_skips_truncated_line(self, tmp_path):
+        path = tmp_path / "cassette.jsonl"
+        path.write_text(json.dumps({
+            "key": "k", "status_code": 200, "headers": {}, "body": "{}", "latency_ms": 1,
+        }) + "\n{\"key\": \"trunc")
+
+        assert ReplayTransport(path).get_stats()["requests"] == 1
+
+    def test_replay_disables_default_cache(self, tmp_path):
+        path = tmp_path / "cassette.jsonl"
+        path.write_text("")
+
+        client = DeepSeekClient(transport=make_cassette_transport("replay", path))
+
+        assert client.cache is None
+        with pytest.raises(ValueError, match="Unknown cassette mode"):
+            make_cassette_transport("rewind", path)
+
+    async def test_cassette_provider(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(llm_client_factory, "_clients", {})
+        monkeypatch.setattr(settings, "LLM_CASSETTE_DIR", str(tmp_path))
+        path = tmp_path / "cassette.jsonl"
+        await self._record(path)
+
+        client = await llm_client_factory.get_llm_client("cassette:cassette")
+
+        assert isinstance(client.transport, ReplayTransport)
+        assert client.transport.path == path.resolve()
+        # Один клиент на файл: общая очередь ответов и лимитер
+        assert await llm_client_factory.get_llm_client("cassette:cassette") is client
+        assert list(llm_client_factory._clients) == [f"cassette:{path.resolve()}"]
+
+        await llm_client_factory.close_llm_clients()
+        assert client.client.is_closed
+        assert llm_client_factory._clients == {}
+
+    def test_cassette_name_confined_to_dir(self, tmp_path, monkeypatch):
+        (tmp_path / "secret.jsonl").write_text("")
+        cassettes = tmp_path / "cassettes"
+        cassettes.mkdir()
+
+        with pytest.raises(ValueError, match="disabled"):
+            llm_client_factory.resolve_cassette("secret")
+        monkeypatch.setattr(settings, "LLM_CASSETTE_DIR", str(cassettes))
+        for name in ("../secret", str(tmp_path / "secret"), "..", "missing"):
+            with pytest.raises(ValueError):
+                llm_client_factory.resolve_cassette(name)
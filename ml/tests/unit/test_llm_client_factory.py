@@ -0,0 +1,140 @@
+"""
+Тесты для llm_client_factory: реестр провайдеров, общие клиенты, cached и replay.
+"""
+
+import json
+import uuid
+from pathlib import Path
+
+import pytest
+
+from ml.src.schemas.pipeline_steps import (
+    CompetencySet,
+    HierarchyOutput,
+    ScheduleNarrativesOutput,
+    ValidatedStudentProfile,
+)
+from ml.src.services import llm_client_factory
+from ml.src.services import step_logger as step_logger_module
+from ml.src.services.deepseek_client import DeepSeekClient, DeepSeekError
+from ml.src.services.llm_cache import LLMResponseCache, make_cache_key
+from ml.src.services.llm_client_factory import get_llm_client, register_llm_provider
+from ml.src.services.mock_llm_client import MockLLMClient
+from ml.src.services.replay_llm_client import ReplayLLMClient
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "mock_responses"
+
+
+@pytest.fixture(autouse=True)
+def _isolated_registry(monkeypatch):
+    """Общие клиенты и провайдеры теста не переживают тест."""
+    monkeypatch.setattr(llm_client_factory, "_clients", {})
+    monkeypatch.setattr(llm_client_factory, "_providers", dict(llm_client_factory._providers))
+    monkeypatch.delenv("MOCK_LLM", raising=False)
+
+
+def _fixture(step_name: str) -> dict:
+    return json.loads((FIXTURES_DIR / f"{step_name}.json").read_text(encoding="utf-8"))
+
+
+class TestRegistry:
+    """Тесты выбора провайдера и переиспользования клиентов."""
+
+    async def test_shared_client_per_provider(self):
+        created = []
+
+        async def factory(argument):
+            created.append(argument)
+            return object()
+
+        register_llm_provider("fake", factory, takes_argument=True)
+
+        first = await get_llm_client("fake")
+        assert await get_llm_client("fake") is first
+        # Клиенты с аргументом — на каждый запрос, в общих не копятся
+        assert await get_llm_client("fake:x") is not await get_llm_client("fake:x")
+        assert created == [None, "x", "x"]
+        assert list(llm_client_factory._clients) == ["fake"]
+
+    async def test_argument_rejected_by_plain_provider(self):
+        with pytest.raises(ValueError, match="takes no argument"):
+            await get_llm_client("local:http://elsewhere")
+
+    async def test_unknown_provider(self):
+        with pytest.raises(ValueError, match="Unknown LLM provider: nope"):
+            await get_llm_client("nope")
+
+    async def test_mock_mode_and_env(self, monkeypatch):
+        register_llm_provider("mock", _fake_mock)
+
+        assert await get_llm_client(mock_mode=True) == "mock-client"
+        monkeypatch.setenv("MOCK_LLM", "true")
+        assert await get_llm_client() == "mock-client"
+
+    def test_fixed_step_view_shares_fixtures(self):
+        client = MockLLMClient(fixtures_dir=str(FIXTURES_DIR))
+
+        view = client.with_fixed_step("B5_hierarchy")
+
+        assert view.fixtures is client.fixtures
+        assert view.fixed_step_name == "B5_hierarchy"
+
+
+async def _fake_mock(argument):
+    return "mock-client"
+
+
+class TestCachedProvider:
+    """Тесты cache-only DeepSeekClient."""
+
+    async def test_hit_served_and_miss_raises(self):
+        cache = LLMResponseCache(path=None)
+        client = DeepSeekClient(cache=cache, cache_only=True)
+        hierarchy = _fixture("B5_hierarchy")
+        key = make_cache_key(
+            client.model, "cached prompt", {"temperature": 0.7, "max_tokens": 4000},
+            HierarchyOutput,
+        )
+        await cache.set(key, {"content": json.dumps(hierarchy), "tokens_used": 50})
+
+        result, metadata = await client.chat_completion(
+            "cached prompt", HierarchyOutput, use_cache=False
+        )
+        assert result.total_weeks == hierarchy["total_weeks"]
+        assert metadata["cache"]["hit"] is True
+
+        with pytest.raises(DeepSeekError, match="cache-only"):
+            await client.chat_completion("other prompt", HierarchyOutput)
+        await client.close()
+
+
+class TestReplayProvider:
+    """Тесты воспроизведения трека из логов шагов."""
+
+    async def test_replay_from_logs(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(step_logger_module, "LOG_DIR", tmp_path)
+        track_id = uuid.uuid4()
+        track_dir = tmp_path / str(track_id)
+        track_dir.mkdir()
+        for step_name in ("B1_validate", "B2_competencies", "B7_schedule"):
+            (track_dir / f"step_{step_name}.json").write_text(json.dumps({
+                "step_name": step_name, "step_output": _fixture(step_name),
+            }))
+
+        client = await get_llm_client(f"replay:{track_id}")
+
+        assert isinstance(client, ReplayLLMClient)
+        profile, _ = await client.chat_completion("p", ValidatedStudentProfile)
+        assert profile.effective_level == _fixture("B1_validate")["effective_level"]
+        competencies, metadata = await client.chat_completion("p", CompetencySet)
+        assert metadata["step_name"] == "B2_competencies"
+        # Частичная схема B7 packer — из результата B7
+        narratives, metadata = await client.chat_completion("p", ScheduleNarrativesOutput)
+        assert metadata["step_name"] == "B7_schedule"
+        assert metadata["tokens_used"] == 0
+        with pytest.raises(ValueError, match="HierarchyOutput"):
+            await client.chat_completion("p", HierarchyOutput)
+
+    async def test_replay_needs_track_id(self):
+        with pytest.raises(ValueError, match="replay:<track_id>"):
+            await get_llm_client("replay")
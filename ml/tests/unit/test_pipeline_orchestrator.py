@@ -1,17 +1,31 @@
 """
-Тесты для pipeline_orchestrator: cancellation, batch, PipelineCancelled.
+Тесты для pipeline_orchestrator: cancellation, batch, PipelineCancelled, граф шагов, resume,
+исправление после B8.
 """
 
+import asyncio
+import json
 import uuid
+from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
 import pytest
 
+from ml.src.core.config import settings
 from ml.src.services.pipeline_orchestrator import (
+    PIPELINE_STEPS,
     PipelineCancelled,
     PipelineError,
     _check_cancelled,
+    _run_step_graph,
+    downstream_steps,
+    iter_pipeline_batch,
+    plan_repair,
+    run_pipeline_batch,
+    run_pipeline,
+    select_resumable_outputs,
+    shared_prefix_steps,
 )
 from ml.src.schemas.pipeline import (
     PipelineBatchRequest,
@@ -125,6 +139,395 @@ class TestPipelineError:
         assert "B3_ksa_matrix" in str(exc)
 
 
+class TestStepGraph:
+    """Тесты _run_step_graph — планировщик шагов по графу зависимостей."""
+
+    @patch("ml.src.services.pipeline_orchestrator._check_cancelled", new_callable=AsyncMock)
+    async def test_b5_and_b6_run_concurrently(self, mock_cancelled):
+        """B6 стартует, пока B5 ещё выполняется; B7 ждёт оба."""
+        mock_cancelled.return_value = False
+        events: list[str] = []
+
+        async def run_node(step):
+            events.append(f"start:{step.short_name}")
+            await asyncio.sleep(0.02 if step.short_name == "B5" else 0)
+            events.append(f"end:{step.short_name}")
+
+        completed: list[str] = []
+        await _run_step_graph(PIPELINE_STEPS, uuid.uuid4(), run_node, completed)
+
+        assert events.index("start:B6") < events.index("end:B5")
+        assert events.index("start:B7") > events.index("end:B5")
+        assert events.index("start:B7") > events.index("end:B6")
+        assert completed[-1] == "B8"
+        assert sorted(completed) == sorted(s.short_name for s in PIPELINE_STEPS)
+
+    @patch("ml.src.services.pipeline_orchestrator._check_cancelled", new_callable=AsyncMock)
+    async def test_failure_cancels_running_siblings(self, mock_cancelled):
+        """Ошибка в B6 отменяет параллельно идущий B5."""
+        mock_cancelled.return_value = False
+        b5_cancelled = False
+
+        async def run_node(step):
+            nonlocal b5_cancelled
+            if step.short_name == "B5":
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    b5_cancelled = True
+                    raise
+            if step.short_name == "B6":
+                raise PipelineError(step.step_name, "boom")
+
+        with pytest.raises(PipelineError, match="boom"):
+            await _run_step_graph(PIPELINE_STEPS, uuid.uuid4(), run_node, [])
+        assert b5_cancelled
+
+    @patch("ml.src.services.pipeline_orchestrator._check_cancelled", new_callable=AsyncMock)
+    async def test_cancellation_checked_per_node(self, mock_cancelled):
+        """Отмена перед B3 — PipelineCancelled с завершёнными B1, B2."""
+        mock_cancelled.side_effect = [False, False, True]
+
+        async def run_node(step):
+            return None
+
+        with pytest.raises(PipelineCancelled) as exc_info:
+            await _run_step_graph(PIPELINE_STEPS, uuid.uuid4(), run_node, [])
+        assert exc_info.value.completed_steps == ["B1", "B2"]
+
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "mock_responses"
+
+
+def _fixture_outputs() -> dict[str, dict]:
+    """step_name → mock-ответ шага из tests/fixtures/mock_responses."""
+    return {
+        path.stem: json.loads(path.read_text(encoding="utf-8"))
+        for path in FIXTURES_DIR.glob("*.json")
+    }
+
+
+class TestResume:
+    """Тесты продолжения pipeline из сохранённых результатов шагов."""
+
+    def test_downstream_steps(self):
+        assert downstream_steps("B5_hierarchy") == {
+            "B5_hierarchy", "B7_schedule", "B8_validation",
+        }
+
+    def test_from_step_invalidates_dependents(self):
+        reusable = select_resumable_outputs(_fixture_outputs(), from_step="B6")
+        assert set(reusable) == {
+            "B1_validate", "B2_competencies", "B3_ksa_matrix",
+            "B4_learning_units", "B5_hierarchy",
+        }
+
+    def test_invalid_output_is_recomputed_with_dependents(self):
+        outputs = _fixture_outputs()
+        outputs["B3_ksa_matrix"] = {"broken": True}
+        reusable = select_resumable_outputs(outputs)
+        assert set(reusable) == {"B1_validate", "B2_competencies"}
+
+    @patch("ml.src.services.pipeline_orchestrator._check_cancelled", new_callable=AsyncMock)
+    @patch("ml.src.services.pipeline_orchestrator.get_step_logger", new_callable=AsyncMock)
+    @patch("ml.src.services.pipeline_orchestrator.get_llm_client", new_callable=AsyncMock)
+    async def test_resume_runs_only_missing_steps(
+        self, mock_client, mock_logger, mock_cancelled, monkeypatch
+    ):
+        """B1-B6 восстановлены — LLM вызывается только для B7 и B8."""
+        # B7 и B8 одним вызовом, чтобы ответы сопоставлялись шагам по response_model
+        monkeypatch.setattr(settings, "B7_SCHEDULER", "llm")
+        monkeypatch.setattr(settings, "B7_WEEKS_PER_SHARD", 0)
+        monkeypatch.setattr(settings, "B8_VALIDATION_MODE", "llm")
+        fixtures = _fixture_outputs()
+        called: list[str] = []
+
+        async def chat_completion(prompt, response_model, *args, **kwargs):
+            step = next(s for s in PIPELINE_STEPS if s.response_model is response_model)
+            called.append(step.short_name)
+            result = response_model.model_validate(fixtures[step.step_name])
+            return result, {"tokens_used": 10}
+
+        mock_client.return_value = MagicMock(chat_completion=chat_completion)
+        mock_cancelled.return_value = False
+        resume_from = select_resumable_outputs(fixtures, from_step="B7")
+
+        result = await run_pipeline({"topic": "Python"}, uuid.uuid4(), resume_from=resume_from)
+
+        assert called == ["B7", "B8"]
+        metadata = result["generation_metadata"]
+        assert len(metadata["resumed_steps"]) == 6
+        assert metadata["total_tokens"] == 20
+        assert [log["resumed"] for log in metadata["steps_log"]] == [True] * 6 + [False] * 2
+
+
+def _failed_validation(*checks: tuple[str, str]) -> dict:
+    """Результат B8 с проваленными проверками (check_name, severity)."""
+    return {
+        "overall_valid": False,
+        "checks": [
+            {"check_name": name, "passed": False, "severity": severity, "message": f"{name} broken"}
+            for name, severity in checks
+        ],
+        "critical_failures": sum(1 for _, severity in checks if severity == "critical"),
+        "warnings": sum(1 for _, severity in checks if severity == "warning"),
+        "retry_count": 0,
+        "final_status": "failed",
+    }
+
+
+class TestRepair:
+    """Тесты перегенерации шагов после критических провалов B8."""
+
+    def test_plan_repair_regenerates_owner_subgraph(self):
+        regenerate, constraints = plan_repair(_failed_validation(
+            ("schedule_hierarchy_match", "critical"),
+            ("checkpoint_timing", "warning"),
+            ("unit_time_realistic", "warning"),
+        ))
+
+        assert regenerate == {"B7_schedule", "B8_validation"}
+        assert constraints == {"B7_schedule": [
+            "schedule_hierarchy_match: schedule_hierarchy_match broken",
+            "checkpoint_timing: checkpoint_timing broken",
+        ]}
+
+    def test_plan_repair_ignores_warnings_only(self):
+        regenerate, constraints = plan_repair(_failed_validation(("level_progression", "warning")))
+
+        assert regenerate == set()
+        assert constraints == {}
+
+    def test_plan_repair_upstream_owner(self):
+        regenerate, constraints = plan_repair(_failed_validation(
+            ("unit_dependencies", "critical"), ("blueprints_have_fsm", "critical"),
+        ))
+
+        assert regenerate == {
+            "B5_hierarchy", "B6_problem_formulations", "B7_schedule", "B8_validation",
+        }
+        assert set(constraints) == {"B5_hierarchy", "B6_problem_formulations"}
+
+    async def _run(self, monkeypatch, validations: list[dict], **repair_settings):
+        """B1-B6 восстановлены; B8 отвечает по очереди validations, затем фикстурой."""
+        monkeypatch.setattr(settings, "B7_SCHEDULER", "llm")
+        monkeypatch.setattr(settings, "B7_WEEKS_PER_SHARD", 0)
+        monkeypatch.setattr(settings, "B8_VALIDATION_MODE", "llm")
+        for name, value in repair_settings.items():
+            monkeypatch.setattr(settings, name, value)
+        fixtures = _fixture_outputs()
+        calls: list[tuple[str, str, bool]] = []
+
+        async def chat_completion(prompt, response_model, *args, **kwargs):
+            step = next(s for s in PIPELINE_STEPS if s.response_model is response_model)
+            calls.append((step.short_name, prompt, kwargs.get("use_cache", True)))
+            output = fixtures[step.step_name]
+            if step.short_name == "B8" and validations:
+                output = validations.pop(0)
+            return response_model.model_validate(output), {"tokens_used": 10}
+
+        step_logger = MagicMock(log_step=AsyncMock(), flush=AsyncMock())
+        with patch(
+            "ml.src.services.pipeline_orchestrator._check_cancelled",
+            new_callable=AsyncMock, return_value=False,
+        ), patch(
+            "ml.src.services.pipeline_orchestrator.get_step_logger",
+            new_callable=AsyncMock, return_value=step_logger,
+        ), patch(
+            "ml.src.services.pipeline_orchestrator.get_llm_client",
+            new_callable=AsyncMock, return_value=MagicMock(chat_completion=chat_completion),
+        ):
+            result = await run_pipeline(
+                {"topic": "Python"}, uuid.uuid4(),
+                resume_from=select_resumable_outputs(fixtures, from_step="B7"),
+            )
+        return result, calls, step_logger
+
+    async def test_repair_regenerates_only_schedule(self, monkeypatch):
+        result, calls, step_logger = await self._run(
+            monkeypatch, [_failed_validation(("schedule_hierarchy_match", "critical"))],
+        )
+
+        assert [name for name, _, _ in calls] == ["B7", "B8", "B7", "B8"]
+        _, repair_prompt, use_cache = calls[2]
+        assert "CORRECTIONS REQUIRED" in repair_prompt
+        assert "schedule_hierarchy_match: schedule_hierarchy_match broken" in repair_prompt
+        assert use_cache is False
+        assert "CORRECTIONS REQUIRED" not in calls[3][1]
+
+        assert result["validation_b8"]["critical_failures"] == 0
+        assert result["validation_b8"]["retry_count"] == 1
+        metadata = result["generation_metadata"]
+        assert metadata["repair_rounds"] == 1
+        assert metadata["total_tokens"] == 40
+        assert [log["repair_round"] for log in metadata["steps_log"]][-2:] == [1, 1]
+        assert step_logger.log_step.await_count == 4
+
+    async def test_rejected_round_keeps_original(self, monkeypatch):
+        failed = _failed_validation(("schedule_hierarchy_match", "critical"))
+        worse = _failed_validation(
+            ("schedule_hierarchy_match", "critical"), ("prerequisite_ordering", "critical"),
+        )
+
+        result, calls, step_logger = await self._run(monkeypatch, [failed, worse])
+
+        assert len(calls) == 4
+        assert result["validation_b8"]["critical_failures"] == 1
+        assert result["validation_b8"]["retry_count"] == 1
+        assert step_logger.log_step.await_count == 2  # логи отклонённого раунда не пишутся
+
+    async def test_token_budget_blocks_round(self, monkeypatch):
+        result, calls, _ = await self._run(
+            monkeypatch,
+            [_failed_validation(("schedule_hierarchy_match", "critical"))],
+            B8_REPAIR_TOKEN_BUDGET=15,
+        )
+
+        assert [name for name, _, _ in calls] == ["B7", "B8"]
+        assert result["validation_b8"]["final_status"] == "failed"
+        assert result["generation_metadata"]["repair_rounds"] == 0
+
+
+class TestBatchStream:
+    """Тесты потоковой выдачи результатов batch."""
+
+    async def test_results_in_completion_order(self):
+        ids = [uuid.uuid4() for _ in range(3)]
+        delays = {ids[0]: 0.03, ids[1]: 0.0, ids[2]: 0.01}
+
+        async def fake_run(profile, tid, version, **kwargs):
+            await asyncio.sleep(delays[tid])
+            if tid == ids[2]:
+                raise PipelineError("B5", "boom")
+            return {"track_data": {"id": str(tid)}}
+
+        with patch("ml.src.services.pipeline_orchestrator.run_pipeline", side_effect=fake_run):
+            results = [r async for r in iter_pipeline_batch({}, ids, llm_client=MagicMock())]
+
+        assert [r["index"] for r in results] == [1, 2, 0]
+        assert results[1]["status"] == "failed"
+        assert results[2]["track_id"] == str(ids[0])
+
+    async def test_closing_stream_cancels_unfinished(self):
+        ids = [uuid.uuid4() for _ in range(2)]
+        cancelled: list = []
+
+        async def fake_run(profile, tid, version, **kwargs):
+            if tid == ids[1]:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(tid)
+                    raise
+            return {}
+
+        with patch("ml.src.services.pipeline_orchestrator.run_pipeline", side_effect=fake_run):
+            stream = iter_pipeline_batch({}, ids, llm_client=MagicMock())
+            first = await stream.__anext__()
+            await stream.aclose()
+
+        assert first["index"] == 0
+        assert cancelled == [ids[1]]
+
+    async def test_endpoint_streams_ndjson(self):
+        from fastapi import FastAPI
+        from ml.src.api import pipeline as pipeline_api
+
+        app = FastAPI()
+        app.include_router(pipeline_api.router)
+        ids = [str(uuid.uuid4()) for _ in range(2)]
+
+        async def fake_run(profile, tid, version, **kwargs):
+            return {"track_data": {}}
+
+        with patch("ml.src.services.pipeline_orchestrator.run_pipeline", side_effect=fake_run), \
+                patch.object(pipeline_api, "_llm_client", AsyncMock(return_value=MagicMock())):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://ml"
+            ) as client:
+                response = await client.post(
+                    "/pipeline/run-batch",
+                    json={"profile": {}, "track_ids": ids},
+                    headers={"Accept": pipeline_api.NDJSON_MEDIA_TYPE},
+                )
+
+        assert response.headers["content-type"].startswith(pipeline_api.NDJSON_MEDIA_TYPE)
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(r["track_id"] for r in records[:-1]) == sorted(ids)
+        assert records[-1] == {"done": True, "tracks": 2}
+
+
+class TestSharedPrefix:
+    """Тесты общего префикса шагов batch одного профиля."""
+
+    def test_prefix_is_fork_step_with_ancestors(self):
+        assert [s.short_name for s in shared_prefix_steps("B2")] == ["B1", "B2"]
+        assert [s.short_name for s in shared_prefix_steps("B6_problem_formulations")] == [
+            "B1", "B2", "B3", "B4", "B6",
+        ]
+        with pytest.raises(ValueError):
+            shared_prefix_steps("B9")
+
+    async def _run_batch(self, monkeypatch, fork_after, fail_b2=False):
+        """Batch из 3 треков на фикстурах; возвращает (результаты, вызовы, логгер)."""
+        monkeypatch.setattr(settings, "B7_SCHEDULER", "llm")
+        monkeypatch.setattr(settings, "B7_WEEKS_PER_SHARD", 0)
+        monkeypatch.setattr(settings, "B8_VALIDATION_MODE", "llm")
+        monkeypatch.setattr(settings, "B8_REPAIR_MAX_ROUNDS", 0)
+        fixtures = _fixture_outputs()
+        called: list[str] = []
+
+        async def chat_completion(prompt, response_model, *args, **kwargs):
+            step = next(s for s in PIPELINE_STEPS if s.response_model is response_model)
+            called.append(step.short_name)
+            if fail_b2 and step.short_name == "B2" and called.count("B2") == 1:
+                raise ValueError("bad json")
+            return response_model.model_validate(fixtures[step.step_name]), {"tokens_used": 10}
+
+        step_logger = MagicMock(log_step=AsyncMock(), flush=AsyncMock())
+        with patch(
+            "ml.src.services.pipeline_orchestrator._check_cancelled",
+            new_callable=AsyncMock, return_value=False,
+        ), patch(
+            "ml.src.services.pipeline_orchestrator.get_step_logger",
+            new_callable=AsyncMock, return_value=step_logger,
+        ):
+            batch = await run_pipeline_batch(
+                {"topic": "Python"}, [uuid.uuid4() for _ in range(3)],
+                llm_client=MagicMock(chat_completion=chat_completion), fork_after=fork_after,
+            )
+        return batch["results"], called, step_logger
+
+    async def test_prefix_computed_once(self, monkeypatch):
+        results, called, step_logger = await self._run_batch(monkeypatch, "B2")
+
+        assert (called.count("B1"), called.count("B2"), called.count("B3")) == (1, 1, 3)
+        logged = [c.kwargs["step_name"] for c in step_logger.log_step.await_args_list]
+        assert logged.count("B1_validate") == 3
+        lead, other = (r["generation_metadata"] for r in results[:2])
+        assert lead["shared_steps"] == other["shared_steps"] == [
+            "B1_validate", "B2_competencies",
+        ]
+        # Токены общих шагов — только у первого трека
+        assert lead["total_tokens"] - other["total_tokens"] == 20
+        assert [log["shared"] for log in other["steps_log"][:3]] == [True, True, False]
+        assert results[0]["track_data"] == results[1]["track_data"]
+
+    async def test_failed_prefix_falls_back_to_independent_tracks(self, monkeypatch):
+        results, called, _ = await self._run_batch(monkeypatch, "B2", fail_b2=True)
+
+        assert called.count("B1") == 4
+        assert all(r["generation_metadata"]["shared_steps"] == [] for r in results)
+
+    async def test_default_runs_all_steps_per_track(self, monkeypatch):
+        monkeypatch.setattr(settings, "BATCH_FORK_AFTER", "")
+
+        results, called, _ = await self._run_batch(monkeypatch, None)
+
+        assert called.count("B1") == 3
+        assert "error" not in results[0]
+
+
 # Фикстура-заглушка для respx (если не установлен)
 @pytest.fixture
 def respx_or_manual():
@@ -0,0 +1,181 @@
+"""
+Тесты для rate_limiter: token buckets, in-flight слоты, приоритетные полосы, 429.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from ml.src.schemas.pipeline_steps import HierarchyOutput
+from ml.src.services.deepseek_client import DeepSeekClient, DeepSeekRateLimitError
+from ml.src.services.llm_cache import LLMResponseCache
+from ml.src.services.rate_limiter import LLMRateLimiter, parse_reset, priority_lane
+
+HIERARCHY = {
+    "levels": [],
+    "unit_sequence": [],
+    "time_compression_applied": False,
+    "total_weeks": 1,
+}
+
+
+class FakeClock:
+    """Часы, которые двигает фейковый sleep."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestLLMRateLimiter:
+    """Тесты LLMRateLimiter."""
+
+    async def test_rpm_bucket_throttles_after_burst(self):
+        clock = FakeClock()
+        limiter = LLMRateLimiter(requests_per_minute=2, clock=clock, sleep=clock.sleep)
+
+        for _ in range(3):
+            (await limiter.acquire()).release()
+
+        assert clock.sleeps == [pytest.approx(30.0)]
+
+    async def test_tpm_bucket_reconciles_actual_usage(self):
+        clock = FakeClock()
+        limiter = LLMRateLimiter(tokens_per_minute=1000, clock=clock, sleep=clock.sleep)
+
+        lease = await limiter.acquire(estimated_tokens=900)
+        lease.release(tokens_used=100)  # вернуть 800 неиспользованных
+
+        assert limiter.tpm.tokens == pytest.approx(900)
+
+    async def test_interactive_lane_goes_before_batch(self):
+        limiter = LLMRateLimiter(max_in_flight=1)
+        holder = await limiter.acquire()
+        order: list[str] = []
+
+        async def call(lane: str):
+            with priority_lane(lane):
+                lease = await limiter.acquire()
+            order.append(lane)
+            lease.release()
+
+        batch = asyncio.create_task(call("batch"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("interactive"))
+        await asyncio.sleep(0)
+        holder.release()
+        await asyncio.gather(batch, interactive)
+
+        assert order == ["interactive", "batch"]
+
+    async def test_rate_limited_pauses_everyone(self):
+        clock = FakeClock()
+        limiter = LLMRateLimiter(clock=clock, sleep=clock.sleep)
+
+        limiter.on_rate_limited(7)
+        (await limiter.acquire()).release()
+
+        assert clock.sleeps == [7]
+        assert limiter.get_stats()["rate_limited"] == 1
+
+    async def test_headers_exhausted_remaining_pauses(self):
+        clock = FakeClock()
+        limiter = LLMRateLimiter(clock=clock, sleep=clock.sleep)
+
+        limiter.update_from_headers({
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "1m30s",
+        })
+        (await limiter.acquire()).release()
+
+        assert clock.sleeps == [90]
+
+    def test_parse_reset(self):
+        assert parse_reset("6m0s") == 360
+        assert parse_reset("20ms") == pytest.approx(0.02)
+        assert parse_reset("2.5") == 2.5
+        assert parse_reset(None) is None
+
+
+class TestDeepSeekClientAgainstStub:
+    """DeepSeekClient + лимитер против stub-сервера (httpx.MockTransport)."""
+
+    async def test_concurrency_cap_and_429_recovery(self):
+        state = {"active": 0, "peak": 0, "calls": 0}
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            state["calls"] += 1
+            if state["calls"] == 1:
+                return httpx.Response(429, headers={"Retry-After": "0"})
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            state["active"] -= 1
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": json.dumps(HIERARCHY)}}],
+                "usage": {"total_tokens": 10},
+            })
+
+        limiter = LLMRateLimiter(max_in_flight=3)
+        client = DeepSeekClient(cache=LLMResponseCache(path=None), limiter=limiter)
+        client.client = httpx.AsyncClient(
+            base_url="http://stub.test", transport=httpx.MockTransport(handler)
+        )
+
+        results = await asyncio.gather(*[
+            client.chat_completion(f"p{i}", HierarchyOutput, use_cache=False)
+            for i in range(10)
+        ])
+
+        assert len(results) == 10
+        assert state["peak"] <= 3
+        assert limiter.get_stats()["rate_limited"] == 1
+        assert limiter.get_stats()["in_flight"] == 0
+
+    async def test_backoff_does_not_hold_slot(self, monkeypatch):
+        """Пауза перед повтором 5xx — без слота лимитера."""
+        limiter = LLMRateLimiter(max_in_flight=1)
+        in_flight_during_backoff: list[int] = []
+        responses = [
+            httpx.Response(503),
+            httpx.Response(200, json={
+                "choices": [{"message": {"content": json.dumps(HIERARCHY)}}],
+                "usage": {"total_tokens": 10},
+            }),
+        ]
+
+        async def fake_sleep(delay):
+            in_flight_during_backoff.append(limiter.get_stats()["in_flight"])
+
+        monkeypatch.setattr("ml.src.services.deepseek_client.asyncio.sleep", fake_sleep)
+        client = DeepSeekClient(cache=LLMResponseCache(path=None), limiter=limiter)
+        client.client = httpx.AsyncClient(
+            base_url="http://stub.test",
+            transport=httpx.MockTransport(lambda request: responses.pop(0)),
+        )
+
+        result, _ = await client.chat_completion("p", HierarchyOutput, use_cache=False)
+
+        assert result.total_weeks == 1
+        assert in_flight_during_backoff == [0]
+
+    async def test_only_429s_raise_rate_limit_error(self):
+        client = DeepSeekClient(cache=LLMResponseCache(path=None), limiter=LLMRateLimiter())
+        client.client = httpx.AsyncClient(
+            base_url="http://stub.test",
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(429, headers={"Retry-After": "0"})
+            ),
+        )
+
+        with pytest.raises(DeepSeekRateLimitError, match="429"):
+            await client.chat_completion("p", HierarchyOutput, use_cache=False, max_attempts=2)
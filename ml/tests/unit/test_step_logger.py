@@ -0,0 +1,164 @@
+"""
+Тесты для step_logger: фоновый sink, батчи в bulk endpoint, fallback,
+backpressure и flush при закрытии.
+"""
+
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+
+from ml.src.services import step_logger as step_logger_module
+from ml.src.services.step_logger import StepLogger
+
+
+@pytest.fixture(autouse=True)
+def _log_dir(tmp_path, monkeypatch):
+    """Файлы логов — во временную директорию."""
+    monkeypatch.setattr(step_logger_module, "LOG_DIR", tmp_path)
+    monkeypatch.delenv("DISABLE_BACKEND_LOGGING", raising=False)
+    return tmp_path
+
+
+def _logger(handler, **kwargs) -> StepLogger:
+    step_logger = StepLogger(backend_url="http://backend", **kwargs)
+    step_logger.client = httpx.AsyncClient(
+        base_url="http://backend", transport=httpx.MockTransport(handler)
+    )
+    return step_logger
+
+
+async def _log(step_logger: StepLogger, track_id: uuid.UUID, step_name: str, **kwargs) -> None:
+    await step_logger.log_step(
+        track_id=track_id,
+        step_name=step_name,
+        step_output={"step": step_name},
+        llm_calls=[],
+        duration_sec=0.1,
+        **kwargs,
+    )
+
+
+class TestStepLoggerSink:
+    """Тесты доставки логов фоновым sink'ом."""
+
+    async def test_logs_batched_into_bulk_request(self, _log_dir):
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(201, json={"ids": []})
+
+        step_logger = _logger(handler, batch_size=10, flush_interval_sec=0.05)
+        track_id = uuid.uuid4()
+        for step_name in ["B1_validate", "B2_competencies", "B3_ksa_matrix"]:
+            await _log(step_logger, track_id, step_name)
+
+        assert await step_logger.flush(timeout=1.0)
+
+        assert len(requests) == 1
+        assert requests[0].url.path == "/api/logs/steps:bulk"
+        body = json.loads(requests[0].content)
+        assert [log["step_name"] for log in body] == ["B1_validate", "B2_competencies", "B3_ksa_matrix"]
+        assert (_log_dir / str(track_id) / "step_B2_competencies.json").exists()
+        assert step_logger.get_stats()["delivered"] == 3
+        await step_logger.close()
+
+    async def test_falls_back_to_single_endpoint(self):
+        paths: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            paths.append(request.url.path)
+            if request.url.path == "/api/logs/steps:bulk":
+                return httpx.Response(404)
+            return httpx.Response(201, json={})
+
+        step_logger = _logger(handler, flush_interval_sec=0.01)
+        track_id = uuid.uuid4()
+        await _log(step_logger, track_id, "B1_validate", save_to_file=False)
+        await _log(step_logger, track_id, "B2_competencies", save_to_file=False)
+        await step_logger.close()
+
+        assert paths.count("/api/logs/step") == 2
+        assert step_logger.get_stats()["delivered"] == 2
+
+    async def test_backend_errors_retried_then_counted(self, monkeypatch):
+        attempts = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal attempts
+            attempts += 1
+            return httpx.Response(503)
+
+        async def no_sleep(_delay):
+            return None
+
+        step_logger = _logger(handler, flush_interval_sec=0.0)
+        await _log(step_logger, uuid.uuid4(), "B1_validate", save_to_file=False)
+        monkeypatch.setattr(step_logger_module.asyncio, "sleep", no_sleep)
+        await step_logger.flush(timeout=1.0)
+
+        assert attempts == step_logger.max_attempts
+        stats = step_logger.get_stats()
+        assert stats["failed"] == 1
+        assert "503" in stats["last_error"]
+        await step_logger.close()
+
+    async def test_flush_waits_only_for_own_track(self):
+        release = asyncio.Event()
+        slow_track, fast_track = uuid.uuid4(), uuid.uuid4()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if json.loads(request.content)[0]["track_id"] == str(slow_track):
+                await release.wait()
+            return httpx.Response(201, json={"ids": []})
+
+        step_logger = _logger(handler, batch_size=1, flush_interval_sec=0.0)
+        await _log(step_logger, fast_track, "B1_validate", save_to_file=False)
+        await _log(step_logger, slow_track, "B1_validate", save_to_file=False)
+
+        # Лог другого трека ещё доставляется — flush своего трека не ждёт его
+        assert await step_logger.flush(fast_track, timeout=1.0)
+        assert not await step_logger.flush(slow_track, timeout=0.05)
+        assert await step_logger.flush(uuid.uuid4(), timeout=0.0)
+
+        release.set()
+        assert await step_logger.flush(slow_track, timeout=1.0)
+        await step_logger.close()
+
+    async def test_full_queue_applies_backpressure(self):
+        release = asyncio.Event()
+
+        async def slow_handler(request: httpx.Request) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(201, json={"ids": []})
+
+        step_logger = _logger(slow_handler, queue_size=1, batch_size=1, flush_interval_sec=0.0)
+        track_id = uuid.uuid4()
+        await _log(step_logger, track_id, "B1_validate", save_to_file=False)
+        await asyncio.sleep(0.01)  # sink забрал первый лог и ждёт backend
+        await _log(step_logger, track_id, "B2_competencies", save_to_file=False)
+
+        blocked = asyncio.create_task(_log(step_logger, track_id, "B3_ksa_matrix", save_to_file=False))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        release.set()
+        await blocked
+        await step_logger.close()
+
+        stats = step_logger.get_stats()
+        assert stats["producer_waits"] == 1
+        assert stats["delivered"] == 3
+
+    async def test_disabled_backend_still_writes_files(self, _log_dir, monkeypatch):
+        monkeypatch.setenv("DISABLE_BACKEND_LOGGING", "true")
+        step_logger = StepLogger(backend_url="http://backend", flush_interval_sec=0.0)
+        track_id = uuid.uuid4()
+        await _log(step_logger, track_id, "B1_validate")
+        await step_logger.close()
+
+        assert step_logger.client is None
+        assert step_logger.load_step_outputs(track_id) == {"B1_validate": {"step": "B1_validate"}}